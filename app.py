@@ -1,9 +1,11 @@
 # app.py
 # This is the entry point script to run the Flask server.
 
+import logging
 import os
 import sys
-import traceback # Import traceback for startup errors
+
+logger = logging.getLogger("app")
 
 # Add the src directory to the Python path so we can import from it
 # This is necessary when running the script directly from the project root
@@ -17,11 +19,10 @@ try:
     from src.app import app
     # Import config for paths needed in startup checks
     from src.config import OUTPUT_DIR, PERSIST_DIRECTORY
-    print("Successfully imported Flask app from src.app.")
+    logger.info("Successfully imported Flask app from src.app.")
 except Exception as e:
-    print(f"\n*** CRITICAL ERROR: Failed to import Flask app from src.app: {e} ***")
-    traceback.print_exc()
-    print("\nExiting due to critical startup failure.")
+    logger.critical("CRITICAL ERROR: Failed to import Flask app from src.app: %s. Exiting due to critical startup failure.",
+                    e, exc_info=True)
     # Exit if the app cannot even be imported
     sys.exit(1) # Use sys.exit with a non-zero code to indicate error
 
@@ -29,22 +30,22 @@ except Exception as e:
 # --- Startup Checks ---
 # Ensure output directory exists (config.py already tries, but double check or log)
 if not os.path.exists(OUTPUT_DIR):
-    print(f"WARNING: Output directory '{OUTPUT_DIR}' does not exist at startup.")
+    logger.warning("Output directory '%s' does not exist at startup.", OUTPUT_DIR)
     # config.py already attempts to create it with exist_ok=True,
     # so we just log here if it's still somehow missing.
 
 
 # Ensure vector store exists. The src.rag module logs a warning if it doesn't exist when loading.
 if not os.path.exists(PERSIST_DIRECTORY):
-    print(f"\n*** WARNING: Vector store directory '{PERSIST_DIRECTORY}' not found at startup.")
-    print("Please ensure you run 'python build_vector_store.py' successfully before starting the server.")
+    logger.warning("Vector store directory '%s' not found at startup. Please ensure you run 'python build_vector_store.py' "
+                   "successfully before starting the server.", PERSIST_DIRECTORY)
 else:
     # Optional: Add a basic check for vector store validity here if needed
     # (Caution: might add startup time)
-    print(f"Vector store directory '{PERSIST_DIRECTORY}' found.")
+    logger.info("Vector store directory '%s' found.", PERSIST_DIRECTORY)
 
 
-print("\n--- Starting Flask Server ---")
+logger.info("--- Starting Flask Server ---")
 
 # --- Run the Flask App ---
 if __name__ == '__main__':
@@ -53,8 +54,11 @@ if __name__ == '__main__':
     # Host '0.0.0.0' makes the server externally accessible (use with caution)
     # Default is '127.0.0.1' (localhost)
     try:
+        # Warm up in the process that serves requests (the debug reloader's child process)
+        if os.environ.get("WERKZEUG_RUN_MAIN") == "true":
+            from src.warmup import start_warmup
+            start_warmup()
         app.run(debug=True, port=5000) # Or use config.FLASK_PORT if you add it to config
     except Exception as e:
-        print(f"\n*** CRITICAL ERROR: Flask server failed to start: {e} ***")
-        traceback.print_exc()
+        logger.critical("CRITICAL ERROR: Flask server failed to start: %s", e, exc_info=True)
         sys.exit(1) # Exit with error code
\ No newline at end of file
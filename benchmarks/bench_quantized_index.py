@@ -0,0 +1,200 @@
+# benchmarks/bench_quantized_index.py
+# Compares the quantized index (src/quantized_index.py) with the Chroma store:
+# recall@k against exact float32 search, query latency and memory/disk footprint.
+#
+# Queries are stored embeddings with a small amount of noise added, so the benchmark
+# makes no Azure OpenAI calls. Without a Chroma store (or with --synthetic N) it runs on
+# clustered random vectors.
+#
+# Usage:
+#   python benchmarks/bench_quantized_index.py                      # vectors of vector_store_db
+#   python benchmarks/bench_quantized_index.py --synthetic 200000   # synthetic corpus
+#   python benchmarks/bench_quantized_index.py --output results.json
+
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.config import PERSIST_DIRECTORY
+from src.quantized_index import QuantizedIndexWriter, QuantizedVectorStore, _normalize
+
+
+def _rss_bytes() -> int:
+    """Resident set size of this process (Linux), 0 if unavailable."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return 0
+
+
+def _directory_bytes(path: str) -> int:
+    total = 0
+    for root, _, files in os.walk(path):
+        total += sum(os.path.getsize(os.path.join(root, name)) for name in files)
+    return total
+
+
+def load_chroma_vectors(persist_directory: str):
+    """Returns (collection, ids, float32 vectors) of the persisted Chroma store."""
+    import chromadb
+    client = chromadb.PersistentClient(path=persist_directory)
+    collections = client.list_collections()
+    if not collections:
+        raise SystemExit(f"No collections in '{persist_directory}'. Run build_vector_store.py or use --synthetic.")
+    collection = client.get_collection(getattr(collections[0], "name", collections[0]))
+    count = collection.count()
+    ids, vectors = [], []
+    for offset in range(0, count, 1000):
+        page = collection.get(limit=1000, offset=offset, include=["embeddings"])
+        ids.extend(page["ids"])
+        vectors.append(np.asarray(page["embeddings"], dtype=np.float32))
+    return collection, ids, np.concatenate(vectors) if vectors else np.empty((0, 0), dtype=np.float32)
+
+
+def synthetic_vectors(count: int, dim: int, seed: int = 0) -> np.ndarray:
+    """Clustered random vectors (embeddings of similar briefs are close to each other)."""
+    generator = np.random.default_rng(seed)
+    centers = generator.standard_normal((max(1, count // 50), dim), dtype=np.float32)
+    vectors = centers[generator.integers(0, len(centers), count)]
+    vectors += 0.5 * generator.standard_normal((count, dim), dtype=np.float32)
+    return vectors
+
+
+def make_queries(vectors: np.ndarray, count: int, noise: float, seed: int = 1) -> np.ndarray:
+    generator = np.random.default_rng(seed)
+    rows = generator.choice(len(vectors), size=min(count, len(vectors)), replace=False)
+    queries = _normalize(vectors[rows])
+    queries += noise * generator.standard_normal(queries.shape, dtype=np.float32) / np.sqrt(queries.shape[1])
+    return _normalize(queries)
+
+
+def exact_top_k(vectors: np.ndarray, queries: np.ndarray, k: int) -> list:
+    normalized = _normalize(vectors)
+    results = []
+    for query in queries:
+        scores = normalized @ query
+        top = np.argpartition(-scores, k - 1)[:k]
+        results.append(set(top.tolist()))
+    return results
+
+
+def _summarize(name: str, latencies: list, recalls: list, **extra) -> dict:
+    latencies_ms = np.asarray(latencies) * 1000
+    result = {
+        "variant": name,
+        "recall_at_k": round(float(np.mean(recalls)), 4),
+        "latency_ms_p50": round(float(np.percentile(latencies_ms, 50)), 3),
+        "latency_ms_p95": round(float(np.percentile(latencies_ms, 95)), 3),
+        "latency_ms_mean": round(float(latencies_ms.mean()), 3),
+    }
+    result.update(extra)
+    print(json.dumps(result))
+    return result
+
+
+def bench_quantized(vectors: np.ndarray, queries: np.ndarray, truth: list, k: int, dtype: str, rescore: bool,
+                    rescore_factor: int, workdir: str) -> dict:
+    directory = os.path.join(workdir, f"{dtype}_{'rescore' if rescore else 'plain'}")
+    writer = QuantizedIndexWriter(directory, len(vectors), vectors.shape[1], dtype, keep_float32=rescore)
+    for start in range(0, len(vectors), 10000):
+        end = min(start + 10000, len(vectors))
+        writer.write(vectors[start:end], [str(i) for i in range(start, end)], ["" for _ in range(start, end)],
+                     [{} for _ in range(start, end)])
+    writer.close(source="benchmark")
+
+    rss_before = _rss_bytes()
+    store = QuantizedVectorStore(directory, embedding=None, rescore=rescore, rescore_factor=rescore_factor)
+    latencies, recalls = [], []
+    for query, expected in zip(queries, truth):
+        started = time.perf_counter()
+        matches = store._search_indices(query, k)
+        latencies.append(time.perf_counter() - started)
+        recalls.append(len({row for row, _ in matches} & expected) / k)
+    searched_bytes = store.vectors.nbytes + (store.scales.nbytes if store.scales is not None else 0)
+    return _summarize(
+        f"quantized-{dtype}{'+rescore' if rescore else ''}", latencies, recalls,
+        searched_bytes=int(searched_bytes),
+        disk_bytes=_directory_bytes(directory),
+        rss_delta_bytes=_rss_bytes() - rss_before,
+    )
+
+
+def bench_float32(vectors: np.ndarray, queries: np.ndarray, truth: list, k: int) -> dict:
+    normalized = _normalize(vectors)
+    latencies, recalls = [], []
+    for query, expected in zip(queries, truth):
+        started = time.perf_counter()
+        scores = normalized @ query
+        top = np.argpartition(-scores, k - 1)[:k]
+        latencies.append(time.perf_counter() - started)
+        recalls.append(len(set(top.tolist()) & expected) / k)
+    return _summarize("exact-float32", latencies, recalls, searched_bytes=int(normalized.nbytes))
+
+
+def bench_chroma(collection, ids: list, queries: np.ndarray, truth: list, k: int, persist_directory: str) -> dict:
+    row_of = {item_id: row for row, item_id in enumerate(ids)}
+    latencies, recalls = [], []
+    for query, expected in zip(queries, truth):
+        started = time.perf_counter()
+        result = collection.query(query_embeddings=[query.tolist()], n_results=k, include=[])
+        latencies.append(time.perf_counter() - started)
+        recalls.append(len({row_of[i] for i in result["ids"][0]} & expected) / k)
+    return _summarize("chroma-hnsw-float32", latencies, recalls, disk_bytes=_directory_bytes(persist_directory))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the quantized vector index against Chroma.")
+    parser.add_argument("--synthetic", type=int, default=0, help="Use N synthetic vectors instead of the Chroma store.")
+    parser.add_argument("--dim", type=int, default=1536, help="Dimension of synthetic vectors.")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--noise", type=float, default=0.3, help="Relative noise added to stored vectors to form queries.")
+    parser.add_argument("--rescore-factor", type=int, default=4)
+    parser.add_argument("--output", help="Write the results as JSON to this file.")
+    args = parser.parse_args()
+
+    collection = None
+    if args.synthetic:
+        ids, vectors = None, synthetic_vectors(args.synthetic, args.dim)
+        source = f"synthetic:{args.synthetic}x{args.dim}"
+    elif os.path.exists(PERSIST_DIRECTORY):
+        collection, ids, vectors = load_chroma_vectors(PERSIST_DIRECTORY)
+        source = f"chroma:{PERSIST_DIRECTORY}"
+    else:
+        raise SystemExit(f"Vector store not found at '{PERSIST_DIRECTORY}'. Use --synthetic N.")
+    if len(vectors) < args.k:
+        raise SystemExit(f"Only {len(vectors)} vectors; need at least k={args.k}.")
+    print(f"Corpus: {source} ({len(vectors)} vectors, dim {vectors.shape[1]}), {args.queries} queries, k={args.k}")
+
+    queries = make_queries(vectors, args.queries, args.noise)
+    truth = exact_top_k(vectors, queries, args.k)
+
+    results = [bench_float32(vectors, queries, truth, args.k)]
+    if collection is not None:
+        results.append(bench_chroma(collection, ids, queries, truth, args.k, PERSIST_DIRECTORY))
+    workdir = tempfile.mkdtemp(prefix="bench_quantized_")
+    try:
+        for dtype in ("float16", "int8"):
+            for rescore in (False, True):
+                results.append(bench_quantized(vectors, queries, truth, args.k, dtype, rescore, args.rescore_factor, workdir))
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"source": source, "count": len(vectors), "dim": int(vectors.shape[1]), "queries": len(queries),
+                       "k": args.k, "results": results}, f, indent=2)
+        print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
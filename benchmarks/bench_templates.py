@@ -0,0 +1,327 @@
+# benchmarks/bench_templates.py
+# Micro-benchmarks of template extraction and population on synthetic .docx templates.
+#
+# Templates are generated with python-docx and vary the number of paragraphs, tables,
+# nested tables, placeholders split across runs (as Word does when a placeholder is partly
+# formatted) and image slots. For every template the stages are timed separately:
+#   compile  - parse the .docx and find the placeholders (src.template_registry.compile_template;
+#              extract_placeholders_from_template reads its result)
+#   open     - load a fresh document from the compiled template's bytes
+#   fill     - replace text and image placeholders (src.tools.populate_word.fill_document)
+#   save     - serialize the populated document (to memory, so disk speed does not count)
+# Each stage is run --repeat times (median/min/max in ms) and once more under tracemalloc
+# (peak and retained KiB). The tools' diagnostic prints are discarded while measuring.
+#
+# The results record the git commit; --compare prints the change against an earlier run.
+#
+# Usage:
+#   python benchmarks/bench_templates.py                          # all cases
+#   python benchmarks/bench_templates.py --case large --case nested --repeat 10
+#   python benchmarks/bench_templates.py --quick --output results/templates.json --compare results/base.json
+
+import argparse
+import contextlib
+import datetime
+import gc
+import glob
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import struct
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+import zlib
+from dataclasses import dataclass, asdict
+from io import BytesIO
+from typing import Dict, List, Optional
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+
+import docx  # Requires: pip install python-docx
+
+from src.config import LOGOS_DIR
+from src.template_registry import compile_template
+from src.tools.populate_word import fill_document
+
+STAGES = ("compile", "open", "fill", "save")
+FILLER_WORDS = ("campaign", "audience", "budget", "channel", "message", "launch", "brand", "offer", "insight",
+                "reach", "conversion", "creative", "partner", "season", "loyalty", "engagement", "retail", "digital")
+
+
+@dataclass
+class TemplateSpec:
+    """Shape of a synthetic template."""
+    name: str
+    paragraphs: int = 30
+    placeholders: int = 15
+    tables: int = 0
+    rows: int = 4
+    cols: int = 3
+    nested_depth: int = 0        # Tables nested in the first cell of every table, this many levels deep
+    split_fraction: float = 0.0  # Fraction of placeholders split across three runs
+    image_slots: int = 0
+
+
+CASES = [
+    TemplateSpec("small", paragraphs=30, placeholders=15),
+    TemplateSpec("medium", paragraphs=300, placeholders=60, tables=5, rows=8, cols=4),
+    TemplateSpec("large", paragraphs=3000, placeholders=300, tables=20, rows=20, cols=5),
+    TemplateSpec("split_runs", paragraphs=300, placeholders=100, split_fraction=1.0),
+    TemplateSpec("tables", paragraphs=50, placeholders=120, tables=30, rows=10, cols=6),
+    TemplateSpec("nested", paragraphs=50, placeholders=40, tables=4, rows=4, cols=3, nested_depth=2),
+    TemplateSpec("images", paragraphs=100, placeholders=20, image_slots=10),
+]
+QUICK_CASES = ("small", "medium", "split_runs")
+
+
+# --- Template generation ---
+def _filler(rng: random.Random, words: int = 12) -> str:
+    return " ".join(rng.choice(FILLER_WORDS) for _ in range(words)).capitalize() + "."
+
+
+def _add_table(container, spec: TemplateSpec, rng: random.Random, depth: int, cell_paragraphs: list):
+    table = container.add_table(rows=spec.rows, cols=spec.cols)
+    for row in table.rows:
+        for cell in row.cells:
+            cell.paragraphs[0].text = _filler(rng, 4)
+            cell_paragraphs.append(cell.paragraphs[0])
+    if depth < spec.nested_depth:
+        _add_table(table.cell(0, 0), spec, rng, depth + 1, cell_paragraphs)
+    return table
+
+
+def _add_placeholder(paragraph, name: str, split: bool, rng: random.Random):
+    paragraph.add_run(" ")
+    if not split:
+        paragraph.add_run(f"{{{{{name}}}}}")
+        return
+    # e.g. "{{PLACEHOLDER_FI" + "ELD_007" (bold) + "}}"
+    cut = rng.randint(1, len(name) - 1)
+    paragraph.add_run("{{" + name[:cut])
+    paragraph.add_run(name[cut:]).bold = True
+    paragraph.add_run("}}")
+
+
+def build_template(spec: TemplateSpec, path: str, seed: int = 0) -> dict:
+    """Writes the template and returns the data to populate it with."""
+    rng = random.Random(seed)
+    document = docx.Document()
+    targets = []
+    table_every = max(1, spec.paragraphs // spec.tables) if spec.tables else 0
+    tables_added = 0
+    for index in range(spec.paragraphs):
+        targets.append(document.add_paragraph(_filler(rng)))
+        if table_every and index % table_every == 0 and tables_added < spec.tables:
+            _add_table(document, spec, rng, 0, targets)
+            tables_added += 1
+
+    text_keys = [f"PLACEHOLDER_FIELD_{k:03d}" for k in range(spec.placeholders)]
+    split_count = int(round(spec.split_fraction * len(text_keys)))
+    for k, key in enumerate(text_keys):
+        _add_placeholder(rng.choice(targets), key, split=k < split_count, rng=rng)
+    image_keys = [f"PLACEHOLDER_LOGO_{k:02d}" for k in range(spec.image_slots)]
+    for key in image_keys:
+        document.add_paragraph(f"{{{{{key}}}}}")
+    document.save(path)
+    return {
+        "json_data": {key: _filler(rng, 20) for key in text_keys},
+        "image_keys": image_keys,
+        "expected_placeholders": len(text_keys) + len(image_keys),
+    }
+
+
+def _logo_path(workdir: str) -> str:
+    """A logo from LOGOS_DIR, or a generated 400x200 PNG if there is none."""
+    logos = sorted(glob.glob(os.path.join(LOGOS_DIR, "*.png")))
+    if logos:
+        return os.path.abspath(logos[0])
+    width, height = 400, 200
+    # RGB gradient rows, each prefixed with filter type 0
+    row = b"\x00" + b"".join(bytes((x * 255 // width, 80, 160)) for x in range(width))
+    raw = row * height
+
+    def chunk(kind: bytes, data: bytes) -> bytes:
+        return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data) & 0xFFFFFFFF)
+
+    path = os.path.join(workdir, "bench_logo.png")
+    with open(path, "wb") as f:
+        f.write(b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0))
+                + chunk(b"IDAT", zlib.compress(raw)) + chunk(b"IEND", b""))
+    return path
+
+
+# --- Measurement ---
+@contextlib.contextmanager
+def _quiet():
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        yield
+
+
+def _run_stages(path: str, json_data: dict, image_placeholders: dict, measure) -> dict:
+    """Runs compile -> open -> fill -> save once; 'measure(stage, func)' wraps each stage."""
+    compiled = measure("compile", lambda: compile_template(path))
+    document = measure("open", compiled.open_document)
+    text_keys, image_keys = measure("fill", lambda: fill_document(document, compiled, json_data, image_placeholders))
+    buffer = BytesIO()
+    measure("save", lambda: document.save(buffer))
+    return {
+        "placeholders_found": len(compiled.placeholders),
+        "text_replaced": len(text_keys),
+        "images_replaced": len(image_keys),
+        "output_bytes": buffer.tell(),
+    }
+
+
+def bench_case(spec: TemplateSpec, workdir: str, logo_path: str, repeat: int, seed: int) -> dict:
+    path = os.path.join(workdir, f"{spec.name}.docx")
+    data = build_template(spec, path, seed)
+    json_data = data["json_data"]
+    image_placeholders = {key: logo_path for key in data["image_keys"]}
+
+    timings: Dict[str, List[float]] = {stage: [] for stage in STAGES}
+
+    def timed(stage, func):
+        started = time.perf_counter()
+        result = func()
+        timings[stage].append(time.perf_counter() - started)
+        return result
+
+    with _quiet():
+        _run_stages(path, json_data, image_placeholders, lambda stage, func: func())  # Warm-up (imports, logo cache)
+        for _ in range(repeat):
+            gc.collect()
+            outcome = _run_stages(path, json_data, image_placeholders, timed)
+
+    allocations: Dict[str, dict] = {}
+
+    def traced(stage, func):
+        before, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        result = func()
+        current, peak = tracemalloc.get_traced_memory()
+        allocations[stage] = {"peak_kib": round((peak - before) / 1024, 1), "retained_kib": round((current - before) / 1024, 1)}
+        return result
+
+    gc.collect()
+    tracemalloc.start()
+    try:
+        with _quiet():
+            _run_stages(path, json_data, image_placeholders, traced)
+    finally:
+        tracemalloc.stop()
+
+    stages = {}
+    for stage in STAGES:
+        values = timings[stage]
+        stages[stage] = {
+            "median_ms": round(statistics.median(values) * 1000, 3),
+            "min_ms": round(min(values) * 1000, 3),
+            "max_ms": round(max(values) * 1000, 3),
+            **allocations.get(stage, {}),
+        }
+    return {
+        "case": spec.name,
+        "spec": asdict(spec),
+        "template_bytes": os.path.getsize(path),
+        "placeholders_expected": data["expected_placeholders"],
+        **outcome,
+        "total_median_ms": round(sum(s["median_ms"] for s in stages.values()), 3),
+        "stages": stages,
+    }
+
+
+# --- Report ---
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=PROJECT_ROOT, capture_output=True,
+                              text=True, timeout=5).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def print_results(results: List[dict]):
+    header = (f"{'case':<11} {'found':>9} {'compile':>9} {'open':>9} {'fill':>9} {'save':>9} {'total':>9} "
+              f"{'peak KiB':>9}")
+    print(header)
+    print("-" * len(header))
+    for r in results:
+        s = r["stages"]
+        peak = max(stage.get("peak_kib", 0) for stage in s.values())
+        found = f"{r['placeholders_found']}/{r['placeholders_expected']}"
+        print(f"{r['case']:<11} {found:>9} {s['compile']['median_ms']:>9.2f} {s['open']['median_ms']:>9.2f} "
+              f"{s['fill']['median_ms']:>9.2f} {s['save']['median_ms']:>9.2f} {r['total_median_ms']:>9.2f} {peak:>9.1f}")
+    print("(median ms per stage; 'found' = placeholders found by the compiler / placed in the template)")
+
+
+def print_comparison(results: List[dict], baseline: dict):
+    previous = {r["case"]: r for r in baseline.get("results", [])}
+    print(f"\n=== Compared with {baseline.get('git_commit') or 'baseline'} (median ms, change) ===")
+    for r in results:
+        old = previous.get(r["case"])
+        if old is None:
+            continue
+        cells = []
+        for stage in STAGES + ("total",):
+            new_ms = r["total_median_ms"] if stage == "total" else r["stages"][stage]["median_ms"]
+            old_ms = old["total_median_ms"] if stage == "total" else old["stages"][stage]["median_ms"]
+            change = f"{(new_ms - old_ms) / old_ms:+.0%}" if old_ms else "-"
+            cells.append(f"{stage} {new_ms:.2f} ({change})")
+        print(f"  {r['case']:<11} " + ", ".join(cells))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark template compilation and population on synthetic templates.")
+    parser.add_argument("--case", action="append", choices=[c.name for c in CASES], help="Run only these cases (repeatable).")
+    parser.add_argument("--quick", action="store_true", help=f"Run only {', '.join(QUICK_CASES)}.")
+    parser.add_argument("--repeat", type=int, default=5, help="Timed repetitions per case.")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the template generator.")
+    parser.add_argument("--keep", action="store_true", help="Keep the generated templates (path is printed).")
+    parser.add_argument("--output", help="Write the results as JSON to this file.")
+    parser.add_argument("--compare", help="Result file of an earlier run to compare with.")
+    args = parser.parse_args()
+
+    selected = args.case or (QUICK_CASES if args.quick else [c.name for c in CASES])
+    cases = [c for c in CASES if c.name in selected]
+    workdir = tempfile.mkdtemp(prefix="bench_templates_")
+    try:
+        logo_path = _logo_path(workdir)
+        results = []
+        for spec in cases:
+            print(f"Running case '{spec.name}' ({args.repeat} repetitions)...")
+            results.append(bench_case(spec, workdir, logo_path, args.repeat, args.seed))
+    finally:
+        if args.keep:
+            print(f"Templates kept in {workdir}")
+        else:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    print()
+    print_results(results)
+    report = {
+        "timestamp": datetime.datetime.now().isoformat(timespec="seconds"),
+        "git_commit": _git_commit(),
+        "python": platform.python_version(),
+        "python_docx": getattr(docx, "__version__", None),
+        "repeat": args.repeat,
+        "seed": args.seed,
+        "results": results,
+    }
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            print_comparison(results, json.load(f))
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nResults written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,456 @@
+# benchmarks/loadtest.py
+# End-to-end load test of the brief API: throughput, tail latency, per-stage breakdown,
+# error rates and server memory.
+#
+# Drives POST /create-brief (and optionally /briefs/preview and /briefs/render) with a
+# configurable number of concurrent clients and request mix. Prompts are generated from the
+# campaign briefs in data/. Each /create-brief response carries 'stage_timings' (seconds per
+# graph node, tool and agent LLM calls, see src/workflows/stage_timings.py), which are
+# averaged into the per-stage breakdown. Server memory is sampled from /healthz during the
+# run (one sample per answering worker process).
+# --cassettes re-sends the /create-brief requests recorded with LLM_CASSETTE_MODE=record
+# (see src/llm_cassettes.py) instead; with the app in replay mode, recorded production
+# traffic runs locally without model calls.
+#
+# Run it against the real app wired to the offline model stand-in:
+#   python benchmarks/mock_azure_openai.py --latency-ms 300 --tokens-per-second 80
+#   AZURE_OPENAI_CHAT_ENDPOINT=http://127.0.0.1:8089 ... python serve.py
+#   python benchmarks/loadtest.py --concurrency 8 --requests 200 --output results/baseline.json
+#   python benchmarks/loadtest.py --concurrency 8 --duration 120 --mix create=8,preview=1,render=1 \
+#       --mock-url http://127.0.0.1:8089 --output results/after.json --compare results/baseline.json
+
+import argparse
+import datetime
+import glob
+import itertools
+import json
+import os
+import random
+import re
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import Counter, defaultdict
+from typing import Dict, List, Optional
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+REQUEST_KINDS = ("create", "preview", "render")
+ENDPOINTS = {"create": "/create-brief", "preview": "/briefs/preview", "render": "/briefs/render"}
+
+
+# --- Workload ---
+def load_prompts(data_dir: str, limit: int = 0) -> List[str]:
+    """One brief prompt per campaign brief in data/ (campaign name, type, objectives and audience)."""
+    prompts = []
+    for path in sorted(glob.glob(os.path.join(data_dir, "*.txt"))):
+        with open(path, "r", encoding="utf-8", errors="replace") as f:
+            text = f.read()
+        fields = {}
+        for label in ("Campaign Name", "Campaign Type"):
+            match = re.search(label + r":\s*(.+)", text)
+            if match:
+                fields[label] = match.group(1).strip().strip('"')
+        sections = []
+        for heading in ("Objectives", "Target Audience"):
+            match = re.search(heading + r"[^\n]*:\s*\n(.+?)(?:\n\s*\n|$)", text, re.S)
+            if match:
+                sections.append(" ".join(match.group(1).split())[:300])
+        if not fields and not sections:
+            continue
+        prompt = (f"Create a campaign brief for a new campaign like \"{fields.get('Campaign Name', os.path.basename(path))}\""
+                  f" ({fields.get('Campaign Type', 'multi-channel')}). " + " ".join(sections))
+        prompts.append(prompt)
+    if limit:
+        prompts = prompts[:limit]
+    if not prompts:
+        prompts = ["Create a campaign brief for an EcoSmart Thermos Fall/Winter promotion targeting eco-conscious commuters."]
+    return prompts
+
+
+def load_cassette_prompts(cassette_dir: str, limit: int = 0) -> List[dict]:
+    """The recorded /create-brief requests (brief prompt and template id) of a cassette directory."""
+    prompts = []
+    for path in sorted(glob.glob(os.path.join(cassette_dir, "*.jsonl"))):
+        with open(path, "r", encoding="utf-8") as f:
+            header = json.loads(f.readline() or "{}")
+        if header.get("kind") == "request" and header.get("brief_details"):
+            prompt = {"brief_details": header["brief_details"]}
+            if header.get("template_id"):
+                prompt["template_id"] = header["template_id"]
+            prompts.append(prompt)
+    if limit:
+        prompts = prompts[:limit]
+    return prompts
+
+
+def parse_mix(mix: str) -> List[str]:
+    """'create=8,preview=1,render=1' -> weighted list of request kinds."""
+    weighted = []
+    for part in mix.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in REQUEST_KINDS:
+            raise ValueError(f"Unknown request kind '{name}' in --mix (choose from {', '.join(REQUEST_KINDS)}).")
+        weighted += [name] * int(weight or 1)
+    return weighted
+
+
+# --- HTTP ---
+def http_json(url: str, payload: Optional[dict] = None, timeout: float = 60.0):
+    """Returns (status code, parsed JSON body or None). Network errors raise."""
+    data = json.dumps(payload).encode("utf-8") if payload is not None else None
+    request = urllib.request.Request(url, data=data, method="POST" if data is not None else "GET",
+                                     headers={"Content-Type": "application/json"})
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            status, body = response.status, response.read()
+    except urllib.error.HTTPError as e:
+        status, body = e.code, e.read()
+    try:
+        return status, json.loads(body) if body else None
+    except ValueError:
+        return status, None
+
+
+class LoadTest:
+    """Runs the request mix with 'concurrency' client threads and collects one record per request."""
+
+    def __init__(self, args, prompts: List):
+        self.args = args
+        self.prompts = prompts
+        self.mix = parse_mix(args.mix)
+        self.random = random.Random(args.seed)
+        self.lock = threading.Lock()
+        self.records: List[dict] = []
+        self.prompt_counter = itertools.count()
+        self.issued = 0
+        self.brief_data: List[dict] = []  # Results of /create-brief reused by preview/render requests
+        self.memory_samples: Dict[int, List[int]] = defaultdict(list)
+        self.stop = threading.Event()
+
+    # --- Requests ---
+    def _next_kind(self) -> Optional[str]:
+        with self.lock:
+            if self.args.requests and self.issued >= self.args.requests:
+                return None
+            self.issued += 1
+            kind = self.random.choice(self.mix)
+            if kind != "create" and not self.brief_data:
+                kind = "create"  # Nothing to preview or render yet
+            return kind
+
+    def _payload(self, kind: str) -> dict:
+        if kind == "create":
+            prompt = self.prompts[next(self.prompt_counter) % len(self.prompts)]
+            # Recorded prompts (--cassettes) carry their template id
+            payload = dict(prompt) if isinstance(prompt, dict) else {"brief_details": prompt}
+            payload["force_refresh"] = not self.args.allow_cache
+            if self.args.template_id:
+                payload["template_id"] = self.args.template_id
+            return payload
+        with self.lock:
+            data = self.random.choice(self.brief_data)
+        payload = dict(data)
+        if kind == "preview":
+            payload["format"] = self.random.choice(("html", "markdown"))
+        return payload
+
+    def _issue(self, kind: str) -> dict:
+        url = self.args.url.rstrip("/") + ENDPOINTS[kind]
+        payload = self._payload(kind)
+        started = time.monotonic()
+        record = {"kind": kind, "started": started}
+        try:
+            status, body = http_json(url, payload, timeout=self.args.timeout)
+            record["status_code"] = status
+            body = body or {}
+            record["status"] = body.get("status")
+            record["result_source"] = body.get("result_source")
+            record["stage_timings"] = body.get("stage_timings")
+            if kind == "create" and status == 200 and body.get("brief_data_json"):
+                with self.lock:
+                    self.brief_data.append({"brief_data_json": body["brief_data_json"],
+                                            "image_placeholders_data": body.get("image_placeholders_data")})
+        except Exception as e:
+            record["status_code"] = None
+            record["error"] = f"{type(e).__name__}: {e}"
+        record["seconds"] = time.monotonic() - started
+        return record
+
+    def _client(self, deadline: Optional[float], measure: bool):
+        while not self.stop.is_set():
+            if deadline is not None and time.monotonic() >= deadline:
+                return
+            kind = self._next_kind()
+            if kind is None:
+                return
+            record = self._issue(kind)
+            if measure:
+                with self.lock:
+                    self.records.append(record)
+                    done = len(self.records)
+                if self.args.progress and done % self.args.progress == 0:
+                    print(f"  {done} request(s) done")
+
+    # --- Server memory ---
+    def _sample_memory(self):
+        url = self.args.url.rstrip("/") + "/healthz"
+        while True:
+            try:
+                status, body = http_json(url, timeout=5.0)
+                memory = (body or {}).get("memory") or {}
+                rss = memory.get("rss") or memory.get("max_rss")
+                if status == 200 and rss:
+                    with self.lock:
+                        self.memory_samples[body.get("pid")].append(rss)
+            except Exception:
+                pass
+            if self.stop.wait(self.args.rss_interval):
+                return
+
+    # --- Run ---
+    def run(self) -> float:
+        if self.args.warmup:
+            print(f"Warm-up: {self.args.warmup} request(s)...")
+            saved_limit, self.args.requests = self.args.requests, self.args.warmup
+            self._run_clients(None, measure=False)
+            self.args.requests, self.issued = saved_limit, 0
+        sampler = threading.Thread(target=self._sample_memory, daemon=True)
+        sampler.start()
+        print(f"Running {self.args.requests or 'unlimited'} request(s)"
+              f"{f' for at most {self.args.duration:.0f}s' if self.args.duration else ''} with {self.args.concurrency} client(s), "
+              f"mix {self.args.mix} ...")
+        started = time.monotonic()
+        deadline = started + self.args.duration if self.args.duration else None
+        try:
+            self._run_clients(deadline, measure=True)
+        except KeyboardInterrupt:
+            print("Interrupted; reporting the requests finished so far.")
+            self.stop.set()
+        elapsed = time.monotonic() - started
+        self.stop.set()
+        return elapsed
+
+    def _run_clients(self, deadline: Optional[float], measure: bool):
+        clients = [threading.Thread(target=self._client, args=(deadline, measure), daemon=True)
+                   for _ in range(self.args.concurrency)]
+        for client in clients:
+            client.start()
+        for client in clients:
+            while client.is_alive():
+                client.join(0.5)
+
+
+# --- Report ---
+def percentile(values: List[float], q: float) -> Optional[float]:
+    """Linear-interpolated percentile (q in 0..100)."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    position = (len(ordered) - 1) * q / 100.0
+    lower = int(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+
+def latency_summary(values: List[float]) -> dict:
+    rounded = lambda v: round(v, 3) if v is not None else None
+    return {
+        "mean": rounded(sum(values) / len(values)) if values else None,
+        "p50": rounded(percentile(values, 50)),
+        "p95": rounded(percentile(values, 95)),
+        "p99": rounded(percentile(values, 99)),
+        "max": rounded(max(values)) if values else None,
+    }
+
+
+def _is_error(record: dict) -> bool:
+    return record.get("status_code") is None or record["status_code"] >= 400
+
+
+def stage_breakdown(records: List[dict]) -> dict:
+    """Mean seconds per node, tool and agent LLM calls over the responses that report stage timings."""
+    timed = [r["stage_timings"] for r in records if r.get("stage_timings")]
+    totals = {"nodes": defaultdict(float), "tools": defaultdict(float), "llm": defaultdict(float)}
+    for timings in timed:
+        for section in totals:
+            for name, values in (timings.get(section) or {}).items():
+                totals[section][name] += values.get("seconds", 0.0)
+    breakdown = {section: {name: round(seconds / len(timed), 3) for name, seconds in sorted(values.items())}
+                 for section, values in totals.items()}
+    breakdown["workflow_seconds"] = latency_summary([t.get("total_seconds", 0.0) for t in timed])
+    breakdown["responses"] = len(timed)
+    return breakdown
+
+
+def build_report(test: LoadTest, elapsed: float, mock_stats: Optional[dict]) -> dict:
+    records = test.records
+    by_kind = {}
+    for kind in REQUEST_KINDS:
+        kind_records = [r for r in records if r["kind"] == kind]
+        if not kind_records:
+            continue
+        errors = [r for r in kind_records if _is_error(r)]
+        by_kind[kind] = {
+            "requests": len(kind_records),
+            "requests_per_second": round(len(kind_records) / elapsed, 3) if elapsed else None,
+            "errors": len(errors),
+            "error_rate": round(len(errors) / len(kind_records), 4),
+            "latency_seconds": latency_summary([r["seconds"] for r in kind_records if not _is_error(r)]),
+            "status_codes": dict(Counter(str(r.get("status_code")) for r in kind_records)),
+            "statuses": dict(Counter(str(r.get("status")) for r in kind_records)),
+            "result_sources": dict(Counter(str(r.get("result_source")) for r in kind_records if kind == "create")),
+        }
+    errors = [r for r in records if _is_error(r)]
+    memory = {str(pid): {"samples": len(values), "last_rss": values[-1], "max_rss": max(values)}
+              for pid, values in test.memory_samples.items()}
+    return {
+        "label": test.args.label,
+        "timestamp": datetime.datetime.now().isoformat(timespec="seconds"),
+        "git_commit": _git_commit(),
+        "config": {
+            "url": test.args.url,
+            "concurrency": test.args.concurrency,
+            "requests": test.args.requests,
+            "duration": test.args.duration,
+            "mix": test.args.mix,
+            "allow_cache": test.args.allow_cache,
+            "prompts": len(test.prompts),
+        },
+        "elapsed_seconds": round(elapsed, 3),
+        "requests": len(records),
+        "requests_per_second": round(len(records) / elapsed, 3) if elapsed else None,
+        "errors": len(errors),
+        "error_rate": round(len(errors) / len(records), 4) if records else None,
+        "error_samples": [r.get("error") or f"HTTP {r.get('status_code')} ({r.get('status')})" for r in errors[:10]],
+        "latency_seconds": latency_summary([r["seconds"] for r in records if not _is_error(r)]),
+        "by_kind": by_kind,
+        "stages": stage_breakdown([r for r in records if r["kind"] == "create"]),
+        "server_memory": {
+            "processes": memory,
+            "total_last_rss": sum(m["last_rss"] for m in memory.values()),
+            "max_rss": max((m["max_rss"] for m in memory.values()), default=None),
+        },
+        "mock_server": mock_stats,
+    }
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=PROJECT_ROOT, capture_output=True,
+                              text=True, timeout=5).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def _mib(value) -> str:
+    return f"{value / (1024 * 1024):.1f} MiB" if value else "-"
+
+
+def print_report(report: dict):
+    print(f"\n=== Load test {report['label'] or ''} ({report['git_commit'] or 'no git'}) ===")
+    print(f"{report['requests']} request(s) in {report['elapsed_seconds']:.1f}s: {report['requests_per_second']} req/s, "
+          f"error rate {report['error_rate']}")
+    header = f"{'kind':<8} {'reqs':>6} {'req/s':>7} {'errors':>7} {'mean':>7} {'p50':>7} {'p95':>7} {'p99':>7} {'max':>7}"
+    print(header)
+    print("-" * len(header))
+    for kind, stats in report["by_kind"].items():
+        latency = stats["latency_seconds"]
+        cells = [f"{latency[k]:>7.2f}" if latency[k] is not None else f"{'-':>7}" for k in ("mean", "p50", "p95", "p99", "max")]
+        print(f"{kind:<8} {stats['requests']:>6} {stats['requests_per_second']:>7.2f} {stats['errors']:>7} " + " ".join(cells))
+    stages = report["stages"]
+    if stages["responses"]:
+        print(f"\nStage breakdown (mean seconds over {stages['responses']} workflow response(s)):")
+        for section in ("nodes", "tools", "llm"):
+            for name, seconds in stages[section].items():
+                print(f"  {section:<6} {name:<36} {seconds:>8.3f}")
+    memory = report["server_memory"]
+    if memory["processes"]:
+        print(f"\nServer RSS: {len(memory['processes'])} process(es), total {_mib(memory['total_last_rss'])}, "
+              f"largest {_mib(memory['max_rss'])}")
+    for sample in report["error_samples"]:
+        print(f"  error: {sample}")
+
+
+def print_comparison(report: dict, baseline: dict):
+    """Relative change of the headline metrics against a previous result file."""
+    def change(new, old):
+        if new is None or not old:
+            return "-"
+        return f"{(new - old) / old:+.1%}"
+
+    print(f"\n=== Compared with {baseline.get('label') or 'baseline'} ({baseline.get('git_commit') or 'no git'}) ===")
+    rows = [("req/s", report["requests_per_second"], baseline.get("requests_per_second")),
+            ("error rate", report["error_rate"], baseline.get("error_rate"))]
+    for key in ("p50", "p95", "p99"):
+        rows.append((f"latency {key}", report["latency_seconds"][key], (baseline.get("latency_seconds") or {}).get(key)))
+    rows.append(("server RSS", report["server_memory"]["total_last_rss"],
+                 (baseline.get("server_memory") or {}).get("total_last_rss")))
+    for name, new, old in rows:
+        print(f"  {name:<12} {str(old):>12} -> {str(new):>12}  {change(new, old)}")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Load test of the campaign brief API.")
+    parser.add_argument("--url", default="http://127.0.0.1:5000", help="Base URL of the API.")
+    parser.add_argument("--concurrency", type=int, default=4, help="Concurrent clients.")
+    parser.add_argument("--requests", type=int, default=50, help="Requests to send (0 = until --duration ends).")
+    parser.add_argument("--duration", type=float, default=0.0, help="Stop after this many seconds (0 = no limit).")
+    parser.add_argument("--mix", default="create=1", help="Weighted request mix, e.g. create=8,preview=1,render=1.")
+    parser.add_argument("--data-dir", default=os.path.join(PROJECT_ROOT, "data"), help="Campaign briefs used to build prompts.")
+    parser.add_argument("--cassettes", default=None, help="Send the requests recorded in this cassette directory instead.")
+    parser.add_argument("--prompts", type=int, default=0, help="Use only the first N prompts (0 = all).")
+    parser.add_argument("--template-id", default=None, help="Template id sent with /create-brief.")
+    parser.add_argument("--allow-cache", action="store_true", help="Do not send force_refresh (measure cached repeats too).")
+    parser.add_argument("--warmup", type=int, default=0, help="Unmeasured requests sent before the run.")
+    parser.add_argument("--timeout", type=float, default=900.0, help="Client timeout per request in seconds.")
+    parser.add_argument("--rss-interval", type=float, default=2.0, help="Seconds between /healthz memory samples.")
+    parser.add_argument("--mock-url", default=None, help="Mock Azure OpenAI server to reset before and read stats from after the run.")
+    parser.add_argument("--seed", type=int, default=1, help="Seed of the request mix.")
+    parser.add_argument("--progress", type=int, default=10, help="Print progress every N requests (0 = off).")
+    parser.add_argument("--label", default="", help="Name of this run in the result file.")
+    parser.add_argument("--output", default=None, help="Write the results as JSON to this file.")
+    parser.add_argument("--compare", default=None, help="Result file of an earlier run to compare with.")
+    args = parser.parse_args()
+    if not args.requests and not args.duration:
+        parser.error("Set --requests or --duration.")
+    return args
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    if args.cassettes:
+        prompts = load_cassette_prompts(args.cassettes, args.prompts)
+        if not prompts:
+            sys.exit(f"No recorded requests in {args.cassettes}.")
+        print(f"{len(prompts)} recorded request(s) from {args.cassettes}.")
+    else:
+        prompts = load_prompts(args.data_dir, args.prompts)
+        print(f"{len(prompts)} prompt(s) from {args.data_dir}.")
+    if args.mock_url:
+        http_json(args.mock_url.rstrip("/") + "/mock/reset", {})
+
+    test = LoadTest(args, prompts)
+    elapsed = test.run()
+
+    mock_stats = None
+    if args.mock_url:
+        try:
+            mock_stats = http_json(args.mock_url.rstrip("/") + "/mock/stats")[1]
+        except Exception as e:
+            print(f"Could not read mock server stats: {e}")
+
+    report = build_report(test, elapsed, mock_stats)
+    print_report(report)
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            print_comparison(report, json.load(f))
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nResults written to {args.output}")
+    sys.exit(1 if report["requests"] and report["error_rate"] == 1.0 else 0)
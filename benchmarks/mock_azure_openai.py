@@ -0,0 +1,535 @@
+# benchmarks/mock_azure_openai.py
+# Offline stand-in for the Azure OpenAI chat completions and embeddings API.
+#
+# Serves the routes the openai SDK calls for AzureChatOpenAI / AzureOpenAIEmbeddings
+# (POST /openai/deployments/<deployment>/chat/completions and .../embeddings), so the
+# application and build_vector_store.py run end to end without Azure when the endpoints
+# point here:
+#   AZURE_OPENAI_CHAT_ENDPOINT=http://127.0.0.1:8089
+#   AZURE_OPENAI_EMBEDDING_ENDPOINT=http://127.0.0.1:8089
+#   OPENAI_API_KEY_CHAT=mock  OPENAI_API_KEY_EMBEDDING=mock  (any key is accepted)
+#
+# Chat responses are deterministic. A request that offers the workflow's tools (the
+# supervisor) gets the next step of the brief workflow as a tool call: extract placeholders,
+# retrieve campaign data, retrieve the logo metadata, hand off to the summarizer, hand off to
+# the generator, populate the template, then a final answer. Requests without tools (the
+# agents) get a summary of the retrieved context or one section per placeholder (section
+# regeneration requests get a JSON object with the requested sections). With
+# --script, responses are taken from a JSON file in order before falling back to this policy.
+#
+# Embeddings are hashed bag-of-words vectors: deterministic, unit length, and texts that
+# share words are similar, so retrieval over a mock-built index returns related chunks.
+#
+# Latency and failures are configurable: a fixed time to first token, a completion token
+# rate, jitter, per-deployment RPM/TPM quotas answered with 429 + Retry-After like Azure, and
+# random 429 injection. GET /mock/stats reports counters, POST /mock/reset clears them.
+#
+# Usage:
+#   python benchmarks/mock_azure_openai.py                                  # 127.0.0.1:8089, no delay
+#   python benchmarks/mock_azure_openai.py --latency-ms 400 --tokens-per-second 60
+#   python benchmarks/mock_azure_openai.py --rpm 60 --tpm 60000 --error-rate 0.05 --seed 7
+#   python benchmarks/mock_azure_openai.py --script responses.json
+# Script file: {"responses": [{"content": "...", "tool_calls": [{"name": "...", "arguments": {...}}]}, ...]}
+
+import argparse
+import ast
+import hashlib
+import json
+import math
+import random
+import re
+import threading
+import time
+from collections import deque, defaultdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import urlparse
+
+ROUTE_PATTERN = re.compile(r"^/openai(?:/deployments/(?P<deployment>[^/]+))?/(?P<operation>chat/completions|embeddings)$")
+WORD_PATTERN = re.compile(r"[a-z0-9]+")
+PLACEHOLDER_PATTERN = re.compile(r"\{\{\s*([^{}]+?)\s*\}\}")
+USER_PROMPT_PREFIX = "User's New Campaign Brief Prompt: "
+HANDOFF_TOOL_PREFIX = "transfer_to_"
+
+# Tool and agent names of the workflow (src/tools, src/agents)
+EXTRACT_TOOL = "extract_placeholders_from_template"
+RETRIEVE_TOOL = "retrieve_relevant_campaign_data"
+POPULATE_TOOL = "populate_word_from_json"
+SUMMARIZER_HANDOFF = HANDOFF_TOOL_PREFIX + "summarizer_agent"
+GENERATOR_HANDOFF = HANDOFF_TOOL_PREFIX + "brief_generator_agent"
+
+# Words that start a sentence rather than name a brand
+_NOT_BRANDS = {"create", "generate", "write", "make", "draft", "a", "an", "the", "new", "please", "campaign", "brief",
+               "for", "email", "launch", "our", "we", "i", "promote", "promotion"}
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (4 characters per token); the mock has no tokenizer dependency."""
+    return max(1, math.ceil(len(text) / 4)) if text else 0
+
+
+# --- Chat policy ---
+class Conversation:
+    """The parts of a chat completions request the policy looks at."""
+
+    def __init__(self, body: dict):
+        self.messages: List[dict] = body.get("messages") or []
+        self.tools = {((tool.get("function") or {}).get("name")) for tool in body.get("tools") or []}
+        self.system = "\n".join(_text(m.get("content")) for m in self.messages if m.get("role") in ("system", "developer"))
+        # Tool results in order as (tool name, content); names come from the assistant tool calls
+        call_names = {}
+        for message in self.messages:
+            for call in message.get("tool_calls") or []:
+                call_names[call.get("id")] = (call.get("function") or {}).get("name")
+        self.tool_results: List[Tuple[str, str]] = [
+            (call_names.get(m.get("tool_call_id"), m.get("name") or ""), _text(m.get("content")))
+            for m in self.messages if m.get("role") == "tool"
+        ]
+
+    def results_of(self, tool_name: str) -> List[str]:
+        return [content for name, content in self.tool_results if name == tool_name]
+
+    @property
+    def user_prompt(self) -> str:
+        for message in self.messages:
+            if message.get("role") == "user":
+                return _text(message.get("content")).removeprefix(USER_PROMPT_PREFIX).strip()
+        return ""
+
+    def placeholders(self) -> List[str]:
+        results = self.results_of(EXTRACT_TOOL)
+        if not results:
+            return []
+        parsed = _parse_object(results[-1])
+        if isinstance(parsed, dict):
+            return [str(p) for p in parsed.get("extracted_placeholders") or []]
+        return PLACEHOLDER_PATTERN.findall(results[-1])
+
+
+def _text(content: Any) -> str:
+    if isinstance(content, str):
+        return content
+    if isinstance(content, list):  # Content parts
+        return "".join(part.get("text", "") for part in content if isinstance(part, dict))
+    return "" if content is None else str(content)
+
+
+def _parse_object(text: str):
+    for parse in (json.loads, ast.literal_eval):
+        try:
+            return parse(text)
+        except (ValueError, SyntaxError):
+            continue
+    return None
+
+
+def _prompt_value(system: str, name: str) -> str:
+    """Value the supervisor prompt gives for a tool argument, e.g. `template_path` set to `...`."""
+    match = re.search(r"`" + name + r"`(?: set to|:)\s*`([^`]*)`", system)
+    return match.group(1) if match else ""
+
+
+def _brand(prompt: str) -> str:
+    for word in re.findall(r"[A-Z][\w&'-]+", prompt):
+        if word.lower() not in _NOT_BRANDS:
+            return word
+    return "company"
+
+
+def _placeholder_key(placeholder: str) -> str:
+    """'{{PLACEHOLDER_BUDGET}}' -> 'PLACEHOLDER_BUDGET' (the content inside the braces)."""
+    match = PLACEHOLDER_PATTERN.search(placeholder)
+    return (match.group(1) if match else placeholder).strip()
+
+
+def _section_text(key: str, prompt: str, brand: str) -> str:
+    topic = key.removeprefix("PLACEHOLDER_").replace("_", " ").lower()
+    if topic == "brand name":
+        return brand
+    return f"{topic.capitalize()} for the {brand} campaign: {prompt[:120]}"
+
+
+def _is_image_placeholder(key: str) -> bool:
+    return bool(re.search(r"LOGO|IMAGE", key))
+
+
+def supervisor_step(conversation: Conversation) -> dict:
+    """Next step of the brief workflow as a response {'content', 'tool_calls'}."""
+    tools = conversation.tools
+    prompt = conversation.user_prompt
+    brand = _brand(prompt)
+
+    def call(name: str, arguments: dict) -> dict:
+        return {"content": "", "tool_calls": [{"name": name, "arguments": arguments}]}
+
+    if EXTRACT_TOOL in tools and not conversation.results_of(EXTRACT_TOOL):
+        return call(EXTRACT_TOOL, {"template_path": _prompt_value(conversation.system, "template_path")})
+    retrievals = conversation.results_of(RETRIEVE_TOOL)
+    if RETRIEVE_TOOL in tools and len(retrievals) == 0:
+        return call(RETRIEVE_TOOL, {"query": " ".join(prompt.split()[:16]) or "past campaign data"})
+    if RETRIEVE_TOOL in tools and len(retrievals) == 1:
+        return call(RETRIEVE_TOOL, {"query": f"{brand} company logo"})
+    if SUMMARIZER_HANDOFF in tools and not conversation.results_of(SUMMARIZER_HANDOFF):
+        return call(SUMMARIZER_HANDOFF, {})
+    if GENERATOR_HANDOFF in tools and not conversation.results_of(GENERATOR_HANDOFF):
+        return call(GENERATOR_HANDOFF, {})
+    populated = conversation.results_of(POPULATE_TOOL)
+    if POPULATE_TOOL in tools and not populated:
+        keys = [_placeholder_key(p) for p in conversation.placeholders()]
+        image_placeholders = {}
+        logo_path = None
+        for text in retrievals[1:]:
+            match = re.search(r"ImagePath:\s*(\S+)", text)
+            if match:
+                logo_path = match.group(1)
+        for key in keys:
+            if _is_image_placeholder(key) and logo_path:
+                image_placeholders[key] = logo_path
+        return call(POPULATE_TOOL, {
+            "json_data": {key: _section_text(key, prompt, brand) for key in keys if not _is_image_placeholder(key)},
+            "image_placeholders": image_placeholders,
+            "template_path": _prompt_value(conversation.system, "template_path"),
+            "output_path": _prompt_value(conversation.system, "output_path"),
+        })
+    if populated:
+        return {"content": populated[-1], "tool_calls": []}
+    return {"content": "The workflow is complete.", "tool_calls": []}
+
+
+def agent_answer(conversation: Conversation) -> dict:
+    """Final answer of an agent without tools (summarizer or brief generator)."""
+    system = conversation.system.lower()
+    prompt = conversation.user_prompt
+    if "generator agent" in system:
+        brand = _brand(prompt)
+        keys = [_placeholder_key(p) for p in conversation.placeholders()] or ["PLACEHOLDER_CAMPAIGN_NAME"]
+        lines = [f"{key.removeprefix('PLACEHOLDER_')}: {_section_text(key, prompt, brand)}"
+                 for key in keys if not _is_image_placeholder(key)]
+        return {"content": "\n".join(lines), "tool_calls": []}
+    if "section editor" in system:
+        # Section regeneration (src/section_regeneration.py): a JSON object with the requested keys
+        text = "\n".join(_text(m.get("content")) for m in conversation.messages if m.get("role") == "user")
+        match = re.search(r"Keys to return: (\[.*\])", text)
+        keys = json.loads(match.group(1)) if match else []
+        sections = {key: f"Revised {key.removeprefix('PLACEHOLDER_').replace('_', ' ').lower()} section." for key in keys}
+        return {"content": json.dumps(sections), "tool_calls": []}
+    if "summarizer agent" in system:
+        retrievals = conversation.results_of(RETRIEVE_TOOL)
+        excerpt = " ".join(retrievals[0].split()[:120]) if retrievals else "No retrieved excerpts were provided."
+        return {"content": f"Summary of the retrieved campaign data: {excerpt}", "tool_calls": []}
+    return {"content": "OK", "tool_calls": []}
+
+
+def default_policy(body: dict) -> dict:
+    conversation = Conversation(body)
+    if conversation.tools & {EXTRACT_TOOL, RETRIEVE_TOOL, POPULATE_TOOL}:
+        return supervisor_step(conversation)
+    return agent_answer(conversation)
+
+
+# --- Embeddings ---
+def hashed_embedding(item: Any, dimensions: int) -> List[float]:
+    """Hashed bag-of-words vector of a text (or of a list of token ids), L2-normalized."""
+    if isinstance(item, list):
+        features = [str(token) for token in item]
+    else:
+        features = WORD_PATTERN.findall(str(item).lower())
+    vector = [0.0] * dimensions
+    for feature in features or [""]:
+        digest = hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest()
+        index = int.from_bytes(digest[:4], "little") % dimensions
+        vector[index] += 1.0 if digest[4] & 1 else -1.0
+    norm = math.sqrt(sum(v * v for v in vector)) or 1.0
+    return [v / norm for v in vector]
+
+
+# --- Quotas and failure injection ---
+class QuotaWindow:
+    """Sliding one-minute request/token window of one deployment (0 = unlimited)."""
+
+    def __init__(self, rpm: int, tpm: int):
+        self.rpm = rpm
+        self.tpm = tpm
+        self._events = deque()  # (timestamp, tokens)
+        self._lock = threading.Lock()
+
+    def admit(self, tokens: int) -> Optional[float]:
+        """Records the request if it fits the quota; otherwise returns the seconds until it would."""
+        with self._lock:
+            now = time.monotonic()
+            while self._events and now - self._events[0][0] >= 60.0:
+                self._events.popleft()
+            used_tokens = sum(t for _, t in self._events)
+            if (self.rpm and len(self._events) + 1 > self.rpm) or (self.tpm and used_tokens + tokens > self.tpm):
+                return max(0.1, 60.0 - (now - self._events[0][0])) if self._events else 1.0
+            self._events.append((now, tokens))
+            return None
+
+
+class MockSettings:
+    def __init__(self, args):
+        self.latency = args.latency_ms / 1000.0
+        self.tokens_per_second = args.tokens_per_second
+        self.jitter = args.jitter
+        self.error_rate = args.error_rate
+        self.rpm = args.rpm
+        self.tpm = args.tpm
+        self.embedding_dimensions = args.embedding_dimensions
+        self.random = random.Random(args.seed)
+        self.random_lock = threading.Lock()
+        self.windows: Dict[str, QuotaWindow] = {}
+        self.windows_lock = threading.Lock()
+        self.script = deque(_load_script(args.script)) if args.script else deque()
+        self.script_lock = threading.Lock()
+        self.stats_lock = threading.Lock()
+        self.reset_stats()
+
+    def reset_stats(self):
+        with self.stats_lock:
+            self.started = time.time()
+            self.stats = defaultdict(lambda: defaultdict(int))
+
+    def count(self, deployment: str, **values):
+        with self.stats_lock:
+            for key, value in values.items():
+                self.stats[deployment][key] += value
+
+    def window(self, deployment: str) -> QuotaWindow:
+        with self.windows_lock:
+            if deployment not in self.windows:
+                self.windows[deployment] = QuotaWindow(self.rpm, self.tpm)
+            return self.windows[deployment]
+
+    def uniform(self) -> float:
+        with self.random_lock:
+            return self.random.random()
+
+    def delay(self, completion_tokens: int) -> float:
+        seconds = self.latency
+        if self.tokens_per_second:
+            seconds += completion_tokens / self.tokens_per_second
+        if self.jitter:
+            seconds *= 1.0 + self.jitter * (2.0 * self.uniform() - 1.0)
+        return max(0.0, seconds)
+
+    def next_scripted(self) -> Optional[dict]:
+        with self.script_lock:
+            return self.script.popleft() if self.script else None
+
+
+def _load_script(path: str) -> List[dict]:
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    responses = data.get("responses", []) if isinstance(data, dict) else data
+    print(f"Loaded {len(responses)} scripted response(s) from {path}.")
+    return responses
+
+
+# --- HTTP ---
+class MockAzureOpenAIHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server_version = "MockAzureOpenAI/1.0"
+    settings: MockSettings = None
+
+    def log_message(self, format, *args):  # One line per request is printed by _log
+        pass
+
+    def _log(self, status: int, deployment: str, operation: str, detail: str = ""):
+        print(f"{self.command} {operation} [{deployment}] -> {status} {detail}".rstrip())
+
+    # --- Routing ---
+    def do_GET(self):
+        path = urlparse(self.path).path
+        if path == "/mock/stats":
+            with self.settings.stats_lock:
+                stats = {deployment: dict(values) for deployment, values in self.settings.stats.items()}
+            self._send_json(200, {"since": self.settings.started, "deployments": stats})
+        elif path in ("/", "/healthz"):
+            self._send_json(200, {"status": "ok"})
+        else:
+            self._send_error(404, "NotFound", f"Unknown path {path}.")
+
+    def do_POST(self):
+        path = urlparse(self.path).path
+        try:
+            length = int(self.headers.get("Content-Length") or 0)
+            body = json.loads(self.rfile.read(length) or b"{}")
+        except (ValueError, json.JSONDecodeError) as e:
+            self._send_error(400, "BadRequest", f"Invalid JSON body: {e}")
+            return
+        if path == "/mock/reset":
+            self.settings.reset_stats()
+            self._send_json(200, {"status": "reset"})
+            return
+        match = ROUTE_PATTERN.match(path)
+        if not match:
+            self._send_error(404, "DeploymentNotFound", f"Unknown path {path}.")
+            return
+        deployment = match.group("deployment") or body.get("model") or "default"
+        if match.group("operation") == "embeddings":
+            self._embeddings(deployment, body)
+        else:
+            self._chat(deployment, body)
+
+    # --- Operations ---
+    def _admit(self, deployment: str, operation: str, tokens: int) -> bool:
+        """Applies the quota and the 429 injection; sends the 429 and returns False if rejected."""
+        retry_after = self.settings.window(deployment).admit(tokens)
+        if retry_after is None and self.settings.error_rate and self.settings.uniform() < self.settings.error_rate:
+            retry_after = 1.0
+        if retry_after is None:
+            return True
+        self.settings.count(deployment, throttled=1)
+        self._log(429, deployment, operation, f"retry after {retry_after:.1f}s")
+        self._send_json(429, {"error": {
+            "code": "429",
+            "message": f"Requests to the {operation} operation of deployment '{deployment}' have exceeded the "
+                       f"rate limit of the mock server. Please retry after {math.ceil(retry_after)} seconds.",
+        }}, headers={"Retry-After": str(math.ceil(retry_after)), "retry-after-ms": str(int(retry_after * 1000))})
+        return False
+
+    def _chat(self, deployment: str, body: dict):
+        prompt_tokens = estimate_tokens(json.dumps(body.get("messages") or [])) + estimate_tokens(json.dumps(body.get("tools") or []))
+        if not self._admit(deployment, "ChatCompletions_Create", prompt_tokens):
+            return
+        answer = self.settings.next_scripted() or default_policy(body)
+        request_hash = hashlib.sha1(json.dumps(body.get("messages") or [], sort_keys=True).encode("utf-8")).hexdigest()
+        tool_calls = [
+            {
+                "id": f"call_{request_hash[:16]}_{index}",
+                "type": "function",
+                "function": {
+                    "name": call["name"],
+                    "arguments": call["arguments"] if isinstance(call.get("arguments"), str) else json.dumps(call.get("arguments") or {}),
+                },
+            }
+            for index, call in enumerate(answer.get("tool_calls") or [])
+        ]
+        content = answer.get("content") or ""
+        completion_tokens = estimate_tokens(content) + sum(estimate_tokens(c["function"]["arguments"]) + 3 for c in tool_calls)
+        usage = {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens, "total_tokens": prompt_tokens + completion_tokens}
+        self.settings.count(deployment, requests=1, prompt_tokens=prompt_tokens, completion_tokens=completion_tokens)
+        delay = self.settings.delay(completion_tokens)
+        detail = f"{'tool call ' + tool_calls[0]['function']['name'] if tool_calls else 'answer'}, {prompt_tokens}+{completion_tokens} tokens, {delay:.2f}s"
+        completion_id = f"chatcmpl-mock-{request_hash[:12]}"
+        finish_reason = "tool_calls" if tool_calls else "stop"
+
+        if body.get("stream"):
+            self._log(200, deployment, "ChatCompletions_Create", detail + " (stream)")
+            self._stream_chat(completion_id, deployment, content, tool_calls, finish_reason, usage, delay,
+                              include_usage=bool((body.get("stream_options") or {}).get("include_usage")))
+            return
+        time.sleep(delay)
+        message = {"role": "assistant", "content": content or None}
+        if tool_calls:
+            message["tool_calls"] = tool_calls
+        self._log(200, deployment, "ChatCompletions_Create", detail)
+        self._send_json(200, {
+            "id": completion_id,
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": deployment,
+            "choices": [{"index": 0, "message": message, "finish_reason": finish_reason, "logprobs": None}],
+            "usage": usage,
+        })
+
+    def _stream_chat(self, completion_id: str, deployment: str, content: str, tool_calls: List[dict], finish_reason: str,
+                     usage: dict, delay: float, include_usage: bool):
+        words = re.findall(r"\S+\s*", content)
+        deltas = [{"role": "assistant", "content": ""}] + [{"content": word} for word in words]
+        for index, call in enumerate(tool_calls):
+            deltas.append({"tool_calls": [dict(call, index=index)]})
+        # Time to first token, then the remaining time spread over the chunks
+        first_delay = min(delay, self.settings.latency)
+        chunk_delay = (delay - first_delay) / max(1, len(deltas) - 1)
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+        time.sleep(first_delay)
+
+        def chunk(delta: dict, finish: Optional[str] = None, with_usage: Optional[dict] = None, choices: bool = True):
+            data = {"id": completion_id, "object": "chat.completion.chunk", "created": int(time.time()), "model": deployment,
+                    "choices": [{"index": 0, "delta": delta, "finish_reason": finish}] if choices else []}
+            if with_usage is not None:
+                data["usage"] = with_usage
+            self.wfile.write(f"data: {json.dumps(data)}\n\n".encode("utf-8"))
+            self.wfile.flush()
+
+        for position, delta in enumerate(deltas):
+            if position:
+                time.sleep(chunk_delay)
+            chunk(delta)
+        chunk({}, finish=finish_reason)
+        if include_usage:
+            chunk({}, with_usage=usage, choices=False)
+        self.wfile.write(b"data: [DONE]\n\n")
+        self.wfile.flush()
+
+    def _embeddings(self, deployment: str, body: dict):
+        items = body.get("input")
+        if isinstance(items, str) or (isinstance(items, list) and items and isinstance(items[0], int)):
+            items = [items]
+        items = items or []
+        tokens = sum(len(item) if isinstance(item, list) else estimate_tokens(str(item)) for item in items)
+        if not self._admit(deployment, "Embeddings_Create", tokens):
+            return
+        dimensions = int(body.get("dimensions") or self.settings.embedding_dimensions)
+        self.settings.count(deployment, requests=1, embedding_inputs=len(items), prompt_tokens=tokens)
+        time.sleep(self.settings.delay(0))
+        self._log(200, deployment, "Embeddings_Create", f"{len(items)} input(s), {tokens} tokens")
+        self._send_json(200, {
+            "object": "list",
+            "model": deployment,
+            "data": [{"object": "embedding", "index": index, "embedding": hashed_embedding(item, dimensions)}
+                     for index, item in enumerate(items)],
+            "usage": {"prompt_tokens": tokens, "total_tokens": tokens},
+        })
+
+    # --- Responses ---
+    def _send_json(self, status: int, payload: dict, headers: Optional[dict] = None):
+        data = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _send_error(self, status: int, code: str, message: str):
+        self._send_json(status, {"error": {"code": code, "message": message}})
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Offline stand-in for the Azure OpenAI chat and embeddings API.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="Time to first token of every request.")
+    parser.add_argument("--tokens-per-second", type=float, default=0.0, help="Completion token rate (0 = instant).")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Random +/- fraction applied to every delay (e.g. 0.2).")
+    parser.add_argument("--rpm", type=int, default=0, help="Requests per minute per deployment before 429 (0 = unlimited).")
+    parser.add_argument("--tpm", type=int, default=0, help="Tokens per minute per deployment before 429 (0 = unlimited).")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests answered with an injected 429.")
+    parser.add_argument("--seed", type=int, default=None, help="Seed of the jitter and 429 injection.")
+    parser.add_argument("--embedding-dimensions", type=int, default=1536)
+    parser.add_argument("--script", default=None, help="JSON file of chat responses served in order before the default policy.")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    MockAzureOpenAIHandler.settings = MockSettings(args)
+    server = ThreadingHTTPServer((args.host, args.port), MockAzureOpenAIHandler)
+    server.daemon_threads = True
+    print(f"Mock Azure OpenAI server on http://{args.host}:{args.port} (latency {args.latency_ms:.0f} ms, "
+          f"{args.tokens_per_second or 'unlimited'} tokens/s, RPM {args.rpm or 'unlimited'}, TPM {args.tpm or 'unlimited'}, "
+          f"429 rate {args.error_rate:.0%}).")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("Stopping mock server.")
+    finally:
+        server.server_close()
@@ -1,6 +1,7 @@
 # build_vector_store.py
 # This script builds the Chroma vector store from source documents.
 
+import argparse
 import os
 import sys
 import shutil # To remove directory if needed
@@ -20,16 +21,28 @@ from src.config import (
     AZURE_OPENAI_EMBEDDING_DEPLOYMENT_NAME,
     AZURE_OPENAI_EMBEDDING_ENDPOINT,
     OPENAI_API_KEY_EMBEDDING,
-    OPENAI_API_VERSION_EMBEDDING
+    OPENAI_API_VERSION_EMBEDDING,
+    INGEST_WORKERS,
+    INGEST_BATCH_SIZE,
+    DEDUP_ENABLED,
+    QUANTIZED_INDEX_DIR,
+    QUANTIZED_INDEX_DTYPE,
+    INDEXING_QUOTA_SHARE,
 )
 # Import embeddings directly from src.llm or initialize here using config
 # Option 1: Import initialized embeddings (requires src.llm to init on import)
 # from src.llm import embeddings
 # Option 2: Initialize embeddings specifically for this script using config (safer if src.llm has other side effects)
 from langchain_openai import AzureOpenAIEmbeddings
+# Rate-limited embeddings client: indexing traffic queues behind user-facing requests
+from src.llm_clients import RateLimitedAzureOpenAIEmbeddings
+from src.request_context import request_scope, PRIORITY_BACKGROUND
+from src.rate_limiter import limit_to_quota_share
 from langchain_community.vectorstores import Chroma
-from langchain_community.document_loaders import TextLoader, DirectoryLoader  # Add more loaders if needed
-from langchain.text_splitter import RecursiveCharacterTextSplitter
+# Streaming ingestion: parallel section-aware splitting, batched embedding, resumable progress
+from src.ingestion import ingest_directories
+# Compact int8/float16 copy of the index (RAG_INDEX_BACKEND=quantized)
+from src.quantized_index import export_from_chroma
 
 print("--- Starting Vector Store Build Script ---")
 
@@ -41,7 +54,7 @@ try:
     if not all([AZURE_OPENAI_EMBEDDING_ENDPOINT, OPENAI_API_KEY_EMBEDDING, AZURE_OPENAI_EMBEDDING_DEPLOYMENT_NAME]):
         print("Error: Embedding model configuration is incomplete. Cannot build vector store.")
     else:
-        embeddings = AzureOpenAIEmbeddings(
+        embeddings = RateLimitedAzureOpenAIEmbeddings(
             azure_endpoint=AZURE_OPENAI_EMBEDDING_ENDPOINT,
             api_key=OPENAI_API_KEY_EMBEDDING,
             model=AZURE_OPENAI_EMBEDDING_DEPLOYMENT_NAME,
@@ -60,67 +73,10 @@ if embeddings is None:
 
 # --- Define Data Loading and Processing ---
 
-def load_documents(data_dir: str, metadata_dir: str) -> list:
-    """Loads documents from the specified directories."""
-    print(f"\nLoading documents from '{data_dir}' and '{metadata_dir}'...")
-    documents = []
-
-    # Load text files from Data directory
-    if os.path.exists(data_dir):
-        print(f"Loading text files from {data_dir}...")
-        # Specify encoding='utf-8' when initializing TextLoader
-        text_loader = DirectoryLoader(data_dir, glob="**/*.txt", loader_cls=TextLoader, loader_kwargs={'encoding': 'utf-8'}) # <--- Modified line
-        try:
-            documents.extend(text_loader.load())
-            print(f"Loaded {len(documents)} text documents from {data_dir}.")
-        except Exception as e:
-            print(f"Error loading documents from {data_dir}: {e}")
-            traceback.print_exc()
-    else:
-        print(f"Warning: Data directory not found at '{data_dir}'. No text documents loaded.")
-
-
-    # Load metadata files from Metadata directory
-    if os.path.exists(metadata_dir):
-        print(f"Loading metadata files from {metadata_dir}...")
-        # Specify encoding='utf-8' when initializing TextLoader for metadata too
-        metadata_loader = DirectoryLoader(metadata_dir, glob="**/*.txt", loader_cls=TextLoader, loader_kwargs={'encoding': 'utf-8'}) # <--- Modified line
-        try:
-            metadata_docs = metadata_loader.load()
-            documents.extend(metadata_docs)
-            print(f"Loaded {len(metadata_docs)} metadata documents from {metadata_dir}.")
-        except Exception as e:
-            print(f"Error loading documents from {metadata_dir}: {e}")
-            traceback.print_exc()
-    else:
-        print(f"Warning: Metadata directory not found at '{metadata_dir}'. No metadata documents loaded.")
-
-    if not documents:
-        print("No documents were loaded from either directory.")
-
-    return documents
-
-def split_documents(documents: list) -> list:
-    """Splits documents into chunks."""
-    print("\nSplitting documents into chunks...")
-    # Configure the text splitter - adjust chunk_size and chunk_overlap as needed
-    # based on your embeddings model and the nature of your data.
-    text_splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=200)
-    chunks = text_splitter.split_documents(documents)
-    print(f"Split into {len(chunks)} chunks.")
-    return chunks
-
-def build_vector_store(chunks: list, embeddings: AzureOpenAIEmbeddings, persist_directory: str):
-    """Builds and persists the Chroma vector store."""
-    if not chunks:
-        print("No chunks to process. Skipping vector store creation.")
-        return
-
-    print(f"\nBuilding and persisting vector store to '{persist_directory}'...")
-
-    # Clean up existing vector store directory if it exists
-    if os.path.exists(persist_directory):
-        print(f"Existing vector store found at '{persist_directory}'. Removing...")
+def open_vector_store(embeddings: AzureOpenAIEmbeddings, persist_directory: str, rebuild: bool = False):
+    """Opens (and creates if needed) the persistent Chroma vector store. 'rebuild' deletes the existing one first."""
+    if rebuild and os.path.exists(persist_directory):
+        print(f"Existing vector store found at '{persist_directory}'. Removing for rebuild...")
         try:
             shutil.rmtree(persist_directory)
             print("Existing vector store removed.")
@@ -130,46 +86,107 @@ def build_vector_store(chunks: list, embeddings: AzureOpenAIEmbeddings, persist_
             sys.exit("Failed to clear existing vector store. Aborting build.")
 
     try:
-        # Create the vector store from the document chunks and embeddings
         # Chroma will create the directory if it doesn't exist
-        vector_store = Chroma.from_documents(
-            documents=chunks,
-            embedding=embeddings,
-            persist_directory=persist_directory
+        vector_store = Chroma(persist_directory=persist_directory, embedding_function=embeddings)
+        print(f"Chroma vector store opened at: {os.path.abspath(persist_directory)}")
+        return vector_store
+    except Exception as e:
+        print(f"\n*** ERROR opening Chroma vector store: {e} ***")
+        traceback.print_exc()
+        sys.exit("Vector store build failed.")
+
+
+def build_vector_store(embeddings: AzureOpenAIEmbeddings, persist_directory: str, rebuild: bool = False,
+                       workers: int = INGEST_WORKERS, batch_size: int = INGEST_BATCH_SIZE, dedup: bool = DEDUP_ENABLED,
+                       index: bool = True):
+    """
+    Streams the source documents into the persistent Chroma vector store.
+    Files are read and split in worker processes and embedded in batches; progress is
+    recorded in the ingestion manifest, so an interrupted build continues where it stopped.
+    With 'dedup', near-duplicate chunks are collapsed into one representative with provenance metadata.
+    With 'index' False, the existing store is only opened. Returns the Chroma vector store.
+    """
+    vector_store = open_vector_store(embeddings, persist_directory, rebuild=rebuild)
+    if not index:
+        return vector_store
+    print(f"\nIndexing documents from '{DATA_DIR}' and '{METADATA_DIR}' "
+          f"({workers} worker(s), batches of {batch_size} chunks)...")
+    try:
+        stats = ingest_directories(
+            vector_store,
+            [DATA_DIR, METADATA_DIR],
+            # Brand names declared in the logo metadata files are used to tag briefs with their brand
+            brand_directories=[METADATA_DIR],
+            workers=workers,
+            batch_size=batch_size,
+            dedup=dedup,
         )
-        # persist() is called implicitly by from_documents with persist_directory
-        print("Chroma vector store built and persisted successfully.")
-        print(f"Vector store saved to: {os.path.abspath(persist_directory)}")
+    except Exception as e:
+        print(f"\n*** ERROR building Chroma vector store: {e} ***")
+        traceback.print_exc()
+        sys.exit("Vector store build failed. Run the script again to resume from the last completed batch.")
+
+    if stats.files_failed:
+        print(f"Warning: {stats.files_failed} file(s) could not be indexed:")
+        for error in stats.errors:
+            print(f"  {error}")
+    print(f"Vector store saved to: {os.path.abspath(persist_directory)}")
+    return vector_store
 
+
+def export_quantized_index(vector_store, dtype: str = QUANTIZED_INDEX_DTYPE, keep_float32: bool = True):
+    """Writes the compact quantized copy of the Chroma store used with RAG_INDEX_BACKEND=quantized."""
+    try:
+        export_from_chroma(vector_store, QUANTIZED_INDEX_DIR, dtype=dtype, keep_float32=keep_float32)
     except Exception as e:
-        print(f"\n*** ERROR building or persisting Chroma vector store: {e} ***")
+        print(f"\n*** ERROR exporting quantized index: {e} ***")
         traceback.print_exc()
-        sys.exit("Vector store build failed.")
+        sys.exit("Quantized index export failed.")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Build or update the Chroma vector store from the source documents.")
+    parser.add_argument("--rebuild", action="store_true",
+                        help="Delete the existing vector store and index everything from scratch.")
+    parser.add_argument("--workers", type=int, default=INGEST_WORKERS,
+                        help=f"Worker processes for reading/splitting files, 0 = none (default: {INGEST_WORKERS}).")
+    parser.add_argument("--batch-size", type=int, default=INGEST_BATCH_SIZE,
+                        help=f"Chunks embedded per batch (default: {INGEST_BATCH_SIZE}).")
+    parser.add_argument("--no-dedup", action="store_true",
+                        help="Embed near-duplicate chunks instead of collapsing them (use with --rebuild).")
+    parser.add_argument("--export-quantized", action="store_true",
+                        help=f"Also export a quantized copy of the index to '{QUANTIZED_INDEX_DIR}' (RAG_INDEX_BACKEND=quantized).")
+    parser.add_argument("--export-only", action="store_true",
+                        help="Skip indexing; only export the quantized index from the existing store.")
+    parser.add_argument("--quantized-dtype", choices=["int8", "float16"], default=QUANTIZED_INDEX_DTYPE,
+                        help=f"Storage type of the quantized index (default: {QUANTIZED_INDEX_DTYPE}).")
+    parser.add_argument("--no-float32-rescoring", action="store_true",
+                        help="Do not keep the float32 vectors used to rescore top candidates (smallest index).")
+    return parser.parse_args()
 
 
 # --- Main Execution ---
 if __name__ == "__main__":
+    args = parse_args()
     print("Starting vector store build process...")
 
     # Check if embeddings were successfully initialized
     if embeddings is None:
         sys.exit("Embeddings not available. Aborting build.")
 
-    # 1. Load documents
-    all_documents = load_documents(DATA_DIR, METADATA_DIR) 
-
-    # 2. Split documents into chunks
-    if all_documents:
-        all_chunks = split_documents(all_documents)
-    else:
-        all_chunks = []
-        print("No documents loaded, no chunks created.")
-
-    # 3. Build and persist the vector store
-    build_vector_store(all_chunks, embeddings, PERSIST_DIRECTORY)
+    # Embedding calls are issued as background traffic for the client-side rate limiter. Priorities only
+    # apply within this process; against a running server, the quota share is what leaves room for it.
+    if INDEXING_QUOTA_SHARE < 1:
+        limit_to_quota_share(INDEXING_QUOTA_SHARE)
+    with request_scope(request_id="build_vector_store", priority=PRIORITY_BACKGROUND):
+        vector_store = build_vector_store(embeddings, PERSIST_DIRECTORY, rebuild=args.rebuild and not args.export_only,
+                                          workers=args.workers, batch_size=args.batch_size,
+                                          dedup=DEDUP_ENABLED and not args.no_dedup, index=not args.export_only)
+    if args.export_quantized or args.export_only:
+        export_quantized_index(vector_store, dtype=args.quantized_dtype, keep_float32=not args.no_float32_rescoring)
 
     print("\nVector Store Build Script Finished.")
     if os.path.exists(PERSIST_DIRECTORY):
         print("Vector store directory exists. Build likely successful.")
     else:
-        print("Vector store directory was NOT created. Build failed.")
\ No newline at end of file
+        print("Vector store directory was NOT created. Build failed.")
@@ -0,0 +1,180 @@
+# serve.py
+# Production entry point: serves the Flask app with gunicorn worker processes.
+#
+# The application (compiled workflow, template registry, logo cache, quantized vector index)
+# is imported once in the gunicorn master before the workers are forked, so every worker
+# shares that read-only state copy-on-write instead of building its own. gc.freeze()
+# moves the preloaded objects out of the garbage collector's reach, so collections in the
+# workers do not touch (and thereby copy) their memory pages.
+#
+# After the fork each worker reopens what must not be shared between processes (SQLite
+# connection of the checkpointer, template watcher thread; the Chroma client is only ever
+# opened in the workers, see src/rag.py) and takes its share of the
+# Azure OpenAI quotas. Every worker reports its startup time and memory use and warms
+# itself up in the background (/readyz answers 200 once it is done).
+#
+# Usage:
+#   python serve.py                       # SERVER_WORKERS x SERVER_THREADS on SERVER_HOST:SERVER_PORT
+#   python serve.py --workers 8 --threads 4 --bind 0.0.0.0:8000
+# For development with auto-reload use 'python app.py'.
+
+import argparse
+import gc
+import logging
+import os
+import sys
+import time
+
+# Add the src directory to the Python path (same as app.py)
+project_root = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(project_root, 'src'))
+
+try:
+    from gunicorn.app.base import BaseApplication  # Requires: pip install gunicorn
+except ImportError:
+    BaseApplication = None
+
+from src.config import (
+    SERVER_HOST,
+    SERVER_PORT,
+    SERVER_WORKERS,
+    SERVER_THREADS,
+    SERVER_TIMEOUT_SECONDS,
+    SERVER_GRACEFUL_TIMEOUT_SECONDS,
+    SERVER_MAX_REQUESTS,
+)
+from src.process_info import format_bytes, process_memory
+
+logger = logging.getLogger("serve")
+
+_load_started = time.monotonic()
+_worker_forked_at = None
+
+
+def load_application():
+    """Imports the Flask app and all state it initializes (runs once, in the master process)."""
+    started = time.monotonic()
+    try:
+        from src.app import app
+    except Exception as e:
+        logger.critical("CRITICAL ERROR: Failed to import Flask app from src.app: %s", e, exc_info=True)
+        sys.exit(1)
+    load_seconds = time.monotonic() - started
+    # Preloaded objects are never freed; keep the collector from writing to their pages in the workers
+    gc.collect()
+    gc.freeze()
+    logger.info("Application loaded in %.1fs (pid %d, %d objects frozen, %s).", load_seconds, os.getpid(),
+                gc.get_freeze_count(), _memory_line(), extra={"duration_ms": round(load_seconds * 1000, 1)})
+    return app
+
+
+def _memory_line() -> str:
+    memory = process_memory()
+    if "rss" in memory:
+        return f"RSS {format_bytes(memory['rss'])}, shared {format_bytes(memory['shared'])}, private {format_bytes(memory['private'])}"
+    if "max_rss" in memory:
+        return f"peak RSS {format_bytes(memory['max_rss'])}"
+    return "memory use unavailable"
+
+
+# --- gunicorn hooks ---
+def when_ready(server):
+    logger.info("Server master ready in %.1fs, starting %d worker(s) x %d thread(s) on %s.", time.monotonic() - _load_started,
+                server.cfg.workers, server.cfg.threads, server.cfg.bind)
+    # The master does not serve requests: its template watcher would only recompile templates no worker sees
+    try:
+        from src.template_registry import template_registry
+        template_registry.stop_watcher()
+    except Exception as e:
+        logger.exception("ERROR stopping the template watcher of the master: %s", e)
+
+
+def post_fork(server, worker):
+    """Runs in the new worker: re-creates per-process resources."""
+    global _worker_forked_at
+    _worker_forked_at = time.monotonic()
+    try:
+        from src.workflows.checkpointer import reopen_after_fork
+        from src.template_registry import template_registry
+        from src.rate_limiter import share_quotas_between_workers
+        from src.warmup import start_warmup
+
+        reopen_after_fork()
+        template_registry.after_fork()
+        share_quotas_between_workers(server.cfg.workers)
+        start_warmup()
+    except Exception as e:
+        logger.exception("ERROR initializing worker %d: %s", os.getpid(), e)
+
+
+def post_worker_init(worker):
+    startup = time.monotonic() - _worker_forked_at if _worker_forked_at is not None else 0.0
+    logger.info("Worker %d ready in %.2fs after fork (%s).", os.getpid(), startup, _memory_line(),
+                extra={"duration_ms": round(startup * 1000, 1)})
+
+
+def worker_exit(server, worker):
+    logger.info("Worker %d exiting (%s).", worker.pid, _memory_line())
+
+
+class BriefServer(BaseApplication if BaseApplication is not None else object):
+    """gunicorn application serving the preloaded Flask app."""
+
+    def __init__(self, app, options: dict):
+        self.application = app
+        self.options = options
+        super().__init__()
+
+    def load_config(self):
+        for key, value in self.options.items():
+            if key in self.cfg.settings and value is not None:
+                self.cfg.set(key, value)
+
+    def load(self):
+        return self.application
+
+
+def gunicorn_options(bind: str, workers: int, threads: int) -> dict:
+    options = {
+        "bind": bind,
+        "workers": workers,
+        "threads": threads,
+        "worker_class": "gthread",
+        # The app is already imported in this process; gunicorn must not import it again per worker
+        "preload_app": True,
+        "timeout": SERVER_TIMEOUT_SECONDS,
+        "graceful_timeout": SERVER_GRACEFUL_TIMEOUT_SECONDS,
+        "max_requests": SERVER_MAX_REQUESTS,
+        "max_requests_jitter": SERVER_MAX_REQUESTS // 10,
+        "when_ready": when_ready,
+        "post_fork": post_fork,
+        "post_worker_init": post_worker_init,
+        "worker_exit": worker_exit,
+    }
+    # Worker heartbeat files on a disk-backed /tmp can stall workers (e.g. in containers)
+    if os.path.isdir("/dev/shm"):
+        options["worker_tmp_dir"] = "/dev/shm"
+    return options
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Run the campaign brief API with gunicorn worker processes.")
+    parser.add_argument("--bind", default=f"{SERVER_HOST}:{SERVER_PORT}", help="host:port to listen on.")
+    parser.add_argument("--workers", type=int, default=SERVER_WORKERS, help="Worker processes (default: CPU cores).")
+    parser.add_argument("--threads", type=int, default=SERVER_THREADS, help="Request threads per worker.")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    app = load_application()
+
+    if BaseApplication is None or not hasattr(os, "fork"):
+        # No prefork server available (gunicorn not installed, or Windows): one threaded process
+        logger.warning("gunicorn is not available on this system. Serving with the Flask server in a single process.")
+        host, _, port = args.bind.rpartition(":")
+        from src.warmup import start_warmup
+        start_warmup()
+        app.run(host=host or SERVER_HOST, port=int(port), threaded=True, debug=False, use_reloader=False)
+    else:
+        BriefServer(app, gunicorn_options(args.bind, args.workers, args.threads)).run()
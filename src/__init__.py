@@ -4,48 +4,51 @@
 # It can also be used to initialize package-level settings or import key components
 # to make them easily accessible.
 
-print("Initializing src package...")
+import logging
+
+logger = logging.getLogger(__name__)
+logger.debug("Initializing src package...")
 
 # Import key modules to trigger their initialization logic
 # The order is important due to dependencies: config -> llm -> rag
 try:
     from . import config
-    print("src.config loaded.")
+    logger.debug("src.config loaded.")
 except Exception as e:
-    print(f"*** ERROR loading src.config: {e} ***")
+    logger.exception("ERROR loading src.config: %s", e)
     # Depending on severity, you might want to exit here or later
 
 try:
     from . import llm
-    print("src.llm initialized (LLMs created).")
+    logger.debug("src.llm initialized (LLMs created).")
 except Exception as e:
-    print(f"*** ERROR initializing src.llm: {e} ***")
+    logger.exception("ERROR initializing src.llm: %s", e)
     # LLM initialization errors are critical, subsequent steps will likely fail
     # Continue, but know that llm.chat_llm and llm.embedding_llm might be None
 
 try:
     from . import rag
-    print("src.rag initialized (Retriever created/loaded).")
+    logger.debug("src.rag initialized (Retriever created/loaded).")
 except Exception as e:
-    print(f"*** ERROR initializing src.rag: {e} ***")
+    logger.exception("ERROR initializing src.rag: %s", e)
     # RAG initialization errors mean retrieval tool will fail
-    # Continue, but know that rag.retriever might be None
+    # Continue, but know that rag.get_retriever() might return None
 
 
 # Import the tools and agents sub-packages.
 # This makes their contents (like all_tools list, agent objects) available under src.tools and src.agents
 try:
     from . import tools
-    print("src.tools package imported.")
+    logger.debug("src.tools package imported.")
 except Exception as e:
-    print(f"*** ERROR importing src.tools: {e} ***")
+    logger.exception("ERROR importing src.tools: %s", e)
     # Tools won't be available
 
 try:
     from . import agents
-    print("src.agents package imported.")
+    logger.debug("src.agents package imported.")
 except Exception as e:
-    print(f"*** ERROR importing src.agents: {e} ***")
+    logger.exception("ERROR importing src.agents: %s", e)
     # Agents won't be available
 
 
@@ -60,4 +63,4 @@ __all__ = [
     'agents'   # Contains all individual agent objects
 ]
 
-print("src package initialization complete.")
\ No newline at end of file
+logger.info("src package initialization complete.")
\ No newline at end of file
@@ -1,5 +1,7 @@
 # src/agents/__init__.py
 
+import logging
+
 # Import the agents so they can be easily accessed from 'from src.agents import ...'
 from .summarizer_agent import summarizer_agent
 from .brief_generator_agent import brief_generator_agent
@@ -10,4 +12,4 @@ __all__ = [
     "brief_generator_agent",
 ]
 
-print("src.agents package initialized.")
\ No newline at end of file
+logging.getLogger(__name__).debug("src.agents package initialized.")
\ No newline at end of file
@@ -1,15 +1,18 @@
 # src/agents/brief_generator_agent.py
 
-# Import the LLM instance from src.llm
-from src.llm import llm
+# Import the chat model of this role from src.llm (GENERATOR_MODEL_* in config)
+from src.llm import generator_llm
 
 # Import necessary components for creating agent and prompt
 from langchain.prompts import ChatPromptTemplate, MessagesPlaceholder
 from langgraph.prebuilt import create_react_agent
+# Typed workflow state; the agent's final answer is stored in its 'brief_text' field
+from src.brief_state import BriefState, record_agent_output
 from langchain_core.messages import SystemMessage
-import traceback # Import traceback
+import logging
 
-print("--- Defining Brief Generator Agent ---")
+logger = logging.getLogger(__name__)
+logger.debug("--- Defining Brief Generator Agent ---")
 
 # --- Define Brief Generator Prompt (COPIED EXACTLY from app copy.py) ---
 # I am strictly using the prompt text from your original app copy.py
@@ -64,27 +67,28 @@ brief_generator_prompt_template = ChatPromptTemplate.from_messages([
 ])
 
 # --- Create the Brief Generator Agent (Copied from app copy.py) ---
-# Use the initialized LLM from src.llm
+# Use the role's chat model from src.llm
 brief_generator_agent = None # Initialize to None
 
-if llm is None:
-    print("*** WARNING: LLM not initialized. Cannot create Brief Generator Agent. ***")
+if generator_llm is None:
+    logger.warning("LLM not initialized. Cannot create Brief Generator Agent.")
 else:
     try:
         # create_react_agent can be used for agents that don't call tools themselves
         brief_generator_agent = create_react_agent(
-            model=llm,
+            model=generator_llm,
             tools=[], # Generator doesn't call tools, it synthesizes
             prompt=brief_generator_prompt_template,
-            name="brief_generator_agent" # Define the agent name for the supervisor to use
+            name="brief_generator_agent", # Define the agent name for the supervisor to use
+            state_schema=BriefState
         )
-        print(f"Brief Generator Agent '{brief_generator_agent.name}' defined successfully.")
+        brief_generator_agent = record_agent_output(brief_generator_agent, "brief_text")
+        logger.debug("Brief Generator Agent '%s' defined successfully.", brief_generator_agent.name)
     except Exception as e:
-        print(f"\n*** ERROR creating Brief Generator Agent: {e} ***")
-        traceback.print_exc()
+        logger.exception("ERROR creating Brief Generator Agent: %s", e)
         brief_generator_agent = None
 
 
 if brief_generator_agent is None:
-    print("Brief Generator Agent creation failed.")
+    logger.error("Brief Generator Agent creation failed.")
     # Handle criticality if needed
\ No newline at end of file
@@ -1,15 +1,18 @@
 # src/agents/summarizer_agent.py
 
-# Import the LLM instance from src.llm
-from src.llm import llm
+# Import the chat model of this role from src.llm (SUMMARIZER_MODEL_* in config)
+from src.llm import summarizer_llm
 
 # Import necessary components for creating agent and prompt
 from langchain.prompts import ChatPromptTemplate, MessagesPlaceholder
 from langgraph.prebuilt import create_react_agent
+# Typed workflow state; the agent's final answer is stored in its 'summary' field
+from src.brief_state import BriefState, record_agent_output
 from langchain_core.messages import SystemMessage
-import traceback # Import traceback
+import logging
 
-print("--- Defining Summarizer Agent ---")
+logger = logging.getLogger(__name__)
+logger.debug("--- Defining Summarizer Agent ---")
 
 # --- Define Summarizer Prompt (COPIED EXACTLY from app copy.py) ---
 # I am strictly using the prompt text from your original app copy.py
@@ -41,28 +44,29 @@ summarizer_prompt_template = ChatPromptTemplate.from_messages([
 ])
 
 # --- Create the Summarizer Agent (Copied from app copy.py) ---
-# Use the initialized LLM from src.llm
+# Use the role's chat model from src.llm
 summarizer_agent = None # Initialize to None
 
-if llm is None:
-    print("*** WARNING: LLM not initialized. Cannot create Summarizer Agent. ***")
+if summarizer_llm is None:
+    logger.warning("LLM not initialized. Cannot create Summarizer Agent.")
 else:
     try:
         # create_react_agent can be used for agents that don't call tools themselves
         # They still operate within a message history context provided by the graph
         summarizer_agent = create_react_agent(
-            model=llm,
+            model=summarizer_llm,
             tools=[], # Summarizer doesn't call tools, it processes history
             prompt=summarizer_prompt_template,
-            name="summarizer_agent" # Define the agent name for the supervisor to use
+            name="summarizer_agent", # Define the agent name for the supervisor to use
+            state_schema=BriefState
         )
-        print(f"Summarizer Agent '{summarizer_agent.name}' defined successfully.")
+        summarizer_agent = record_agent_output(summarizer_agent, "summary")
+        logger.debug("Summarizer Agent '%s' defined successfully.", summarizer_agent.name)
     except Exception as e:
-        print(f"\n*** ERROR creating Summarizer Agent: {e} ***")
-        traceback.print_exc()
+        logger.exception("ERROR creating Summarizer Agent: %s", e)
         summarizer_agent = None
 
 
 if summarizer_agent is None:
-   print("Summarizer Agent creation failed.")
+   logger.error("Summarizer Agent creation failed.")
    # Handle criticality if needed
\ No newline at end of file
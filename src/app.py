@@ -1,40 +1,76 @@
 # src/app.py
 
 # --- Flask Specific Imports ---
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, Response
 
 # --- Import necessary components from the src package ---
 from src.workflows.brief_generation_workflow import compiled_supervisor_workflow
 # Import config for paths and log config
-from src.config import OUTPUT_PATH, WORKFLOW_LOG_DIR, WORKFLOW_LOG_BASE_FILENAME
+from src.config import OUTPUT_DIR, OUTPUT_FILENAME, DEFAULT_TEMPLATE_ID, WORKFLOW_RECURSION_LIMIT, PROFILING_ENABLED
+from src.workflows.checkpointer import thread_config, claim_checkpoints, latest_checkpoint_id, snapshot_checkpoint_id
+from src.template_registry import template_registry
+from src.logo_cache import logo_cache
+from src.preview import render_preview, PREVIEW_FORMATS
+from src.tools.populate_word import populate_word_from_json_func, repopulate_sections
+from src.request_context import request_scope
+from src.token_budget import new_token_profile
+from src.workflow_log import log_workflow_run
+from src.workflows.guards import WorkflowAborted, STATUS_DEADLINE_EXCEEDED, guarded_run, cancel_run, active_runs, is_running
+from src.workflows.stage_timings import StageTimer
+from src.llm_cassettes import cassettes
+from src.profiling import RequestProfiler
+from src.warmup import warmup_state
+from src.process_info import process_summary
+from src.brief_state import brief_outputs, populate_artifact
+from src.section_regeneration import SectionRequestError, SectionRegenerationError, resolve_sections, regenerate_sections
+from src.brief_cache import (
+    BriefResult,
+    SOURCE_WORKFLOW,
+    brief_result_cache,
+    get_index_generation,
+    make_brief_cache_key,
+)
 
 # Import Langchain Core components potentially needed for message types or processing results
 from langchain_core.messages import ToolCall, AIMessage, HumanMessage, SystemMessage, ToolMessage
-import traceback # Import traceback for better error logging
+import logging
+import traceback # For the error entry of the workflow log
 import datetime # For timestamp in log filename
 import uuid # For unique ID in log filename
 import os # For path joining
+import time # For the section regeneration timings
 
-print("Initializing Flask app...")
+# Prefix of the HumanMessage that carries the user's prompt into the workflow
+USER_PROMPT_PREFIX = "User's New Campaign Brief Prompt: "
+
+logger = logging.getLogger(__name__)
 
 # --- Initialize Flask App ---
 app = Flask(__name__)
 
-print("Flask app initialized.")
+logger.info("Flask app initialized.")
 
 # --- Define Flask Route ---
 @app.route('/create-brief', methods=['POST'])
 def handle_create_brief():
     """
     Flask endpoint to receive campaign brief requirements and trigger the workflow.
-    Expects JSON payload: {"brief_details": "Your campaign requirements here..."}
+    Expects JSON payload: {"brief_details": "Your campaign requirements here...", "template_id": "default", "force_refresh": false}
+    'template_id' selects a template from the template registry (optional, see GET /templates).
+
+    Identical concurrent requests share one workflow run, and successful results are
+    served from the brief result cache (see src/brief_cache.py) unless 'force_refresh' is set.
+
+    With PROFILING_ENABLED, the header 'X-Profile: 1' or the query parameter '?profile=1'
+    profiles the request's own workflow run (never cached or shared, see src/profiling.py)
+    and adds the paths of the profile files to the response under 'profile'.
 
     Returns JSON payload including the generated brief text data and image data.
     """
     # Check if the workflow is ready before processing the request
     if compiled_supervisor_workflow is None:
         error_msg = "Workflow components failed to initialize during server startup. Cannot process request."
-        print(f"ERROR: {error_msg}")
+        logger.error(error_msg)
         return jsonify({"status": "error", "message": error_msg}), 500
 
     # --- Parse Request ---
@@ -48,220 +84,594 @@ def handle_create_brief():
     if not new_brief_prompt:
         return jsonify({"status": "error", "message": "Brief details cannot be empty."}), 400
 
-    # Construct the initial message for the workflow state
-    initial_user_message_content = f"User's New Campaign Brief Prompt: {new_brief_prompt}"
-    # The initial state expects a list of messages
-    initial_messages = [HumanMessage(content=initial_user_message_content)]
-    # The initial state dictionary expected by invoke
-    initial_state = {"messages": initial_messages}
-
-
-    print("\n--- Received Request via Flask. Invoking Workflow ---")
-    print(f"User Prompt: {new_brief_prompt}")
-
-    # --- Generate unique filename for workflow log ---
+    force_refresh = bool(data.get('force_refresh', False))
+
+    # --- Select the template (pre-parsed in the template registry) ---
+    template_id = data.get('template_id') or DEFAULT_TEMPLATE_ID
+    compiled_template = template_registry.get(template_id)
+    if compiled_template is None:
+        return jsonify({"status": "error", "message": f"Unknown template_id '{template_id}'. Available templates: {template_registry.ids()}"}), 400
+
+    # --- Profiled requests run their own workflow (a cached or shared run has nothing to profile) ---
+    if _profiling_requested():
+        response_payload, status_code = _profiled_brief_run(new_brief_prompt, template_path=compiled_template.path)
+        return jsonify(response_payload), status_code
+
+    # --- Coalesce identical requests / serve cached results ---
+    cache_key = make_brief_cache_key(new_brief_prompt, compiled_template.sha256, get_index_generation())
+    brief_result, result_source = brief_result_cache.get_or_run(
+        cache_key,
+        lambda: _run_brief_workflow(new_brief_prompt, template_path=compiled_template.path),
+        force_refresh=force_refresh
+    )
+    if result_source != SOURCE_WORKFLOW:
+        logger.debug("Answering request from %s result (original request: %s).", result_source, brief_result.payload.get('request_id'))
+
+    response_payload = dict(brief_result.payload)
+    response_payload["result_source"] = result_source
+    return jsonify(response_payload), brief_result.status_code
+
+
+def _profiling_requested() -> bool:
+    """True if the current request asks to be profiled ('X-Profile' header or 'profile' query parameter)."""
+    flag = request.headers.get("X-Profile") or request.args.get("profile") or ""
+    if flag.lower() not in ("1", "true", "yes"):
+        return False
+    if not PROFILING_ENABLED:
+        logger.warning("Profiling was requested but PROFILING_ENABLED is off. Running the request unprofiled.")
+        return False
+    return True
+
+
+def _profiled_brief_run(new_brief_prompt: str, resume_request_id: str = None, template_path: str = None):
+    """Runs the workflow under a RequestProfiler; returns the response payload (with 'profile') and status code."""
+    profiler = RequestProfiler()
+    with profiler.running():
+        brief_result = _run_brief_workflow(new_brief_prompt, resume_request_id=resume_request_id,
+                                           template_path=template_path, profiler=profiler)
+    response_payload = dict(brief_result.payload)
+    response_payload["profile"] = profiler.save(response_payload.get("request_id") or resume_request_id or "unknown_request")
+    return response_payload, brief_result.status_code
+
+
+def _run_brief_workflow(new_brief_prompt: str, resume_request_id: str = None, template_path: str = None,
+                        profiler: RequestProfiler = None) -> BriefResult:
+    """
+    Runs the supervisor workflow for one brief prompt, saves the workflow history log
+    and returns the response payload together with the generated document bytes.
+
+    If 'resume_request_id' is given, the checkpointed run of that request is continued
+    from its last completed step instead of starting a new run.
+    'template_path' is the template selected for the request (the tools use it instead
+    of the default template named in the supervisor prompt).
+    'profiler' (a running RequestProfiler) is added to the graph callbacks to profile node and tool threads.
+    """
     timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
-    unique_id = uuid.uuid4().hex[:6] # Use first 6 chars of a UUID
-    workflow_log_filename = f"{WORKFLOW_LOG_BASE_FILENAME}_{timestamp}_{unique_id}.log"
-    workflow_log_filepath = os.path.join(WORKFLOW_LOG_DIR, workflow_log_filename)
-    print(f"Workflow message history will be saved to: {workflow_log_filepath}")
+    if resume_request_id is None:
+        # Construct the initial message for the workflow state
+        initial_user_message_content = f"{USER_PROMPT_PREFIX}{new_brief_prompt}"
+        # The initial state expects a list of messages
+        initial_messages = [HumanMessage(content=initial_user_message_content)]
+        # The initial state dictionary expected by invoke
+        workflow_input = {"messages": initial_messages}
+
+        unique_id = uuid.uuid4().hex[:6] # Use first 6 chars of a UUID
+        request_id = f"{timestamp}_{unique_id}"
+        logger.debug("--- Received Request via Flask. Invoking Workflow ---", extra={"request_id": request_id})
+    else:
+        # Input None tells LangGraph to continue from the thread's last checkpoint
+        workflow_input = None
+
+        request_id = resume_request_id
+        logger.debug("--- Received Resume Request via Flask. Resuming Workflow ---", extra={"request_id": request_id})
+    logger.debug("User Prompt: %s", new_brief_prompt, extra={"request_id": request_id})
+
+    # Each request writes its own document so concurrent requests do not overwrite each other
+    request_output_path = _request_output_path(request_id)
+    # Records every LLM call of this run and enforces the token/turn budgets
+    token_profile = new_token_profile(request_id)
+    # Seconds per graph node, tool and agent LLM calls ('stage_timings' in the response)
+    stage_timer = StageTimer()
+    guard = None
 
 
     try:
         # --- Invoke the compiled LangGraph app ---
-        # Pass the initial state dictionary
+        # The request id is the checkpoint thread id, so a failed run can be resumed
         # Use a reasonable recursion limit as in original code
-        result = compiled_supervisor_workflow.invoke(
-            initial_state, # Pass the state dictionary
-            {"recursion_limit": 150} # Set a reasonable recursion limit to prevent infinite loops
-        )
+        # The guard aborts the run on repeated identical calls, deadlines or client cancellation
+        with guarded_run(request_id) as (guard, guard_callback), \
+                request_scope(request_id=request_id, output_path=request_output_path, template_path=template_path,
+                              token_profile=token_profile, guard=guard):
+            # Header of this request's cassette in LLM_CASSETTE_MODE=record (see src/llm_cassettes.py)
+            if cassettes.recording:
+                compiled_template = template_registry.get_by_path(template_path) if template_path else None
+                cassettes.start_request(new_brief_prompt, compiled_template.template_id if compiled_template else None)
+            result = compiled_supervisor_workflow.invoke(
+                workflow_input, # Initial state dictionary, or None when resuming
+                # Recursion limit prevents infinite loops; the metadata is stored with the checkpoints for resuming
+                thread_config(request_id, recursion_limit=WORKFLOW_RECURSION_LIMIT, metadata={"template_path": template_path},
+                              callbacks=[guard_callback, stage_timer] + ([profiler] if profiler is not None else []))
+            )
 
         # --- Process and Return Final Results from Workflow History ---
-        print("\n--- Workflow Completed. Preparing Response ---")
+        logger.debug("--- Workflow Completed. Preparing Response ---", extra={"request_id": request_id})
 
-        # Initialize variables to hold the extracted data from the final ToolCall args
-        brief_text_json_data = None
-        image_placeholders_data = None
-        # Initial status message based on the workflow finishing
-        final_status_message = "Workflow completed, attempting to find save status." # Default initial status
-
-        # Find the final status message from the populate_word_from_json tool's output (ToolMessage)
-        # And find the ToolCall that invoked it to get the arguments (json_data, image_placeholders)
-        final_populate_output_message = None
-        populate_tool_call_args = None # Dictionary to hold the args from the ToolCall
-
-        # Get the messages list from the result state, default to empty list if missing
+        # The results are fields of the final state (see src/brief_state.py); no history scan needed
         messages_history = list(result.get('messages', []))
-
-        print(f"DEBUG: Reviewing {len(messages_history)} messages in workflow history for final output.")
-
-        # Search history in reverse for the populate tool output and call
-        for msg_index in range(len(messages_history) - 1, -1, -1):
-            msg = messages_history[msg_index]
-
-            # 1. Look for the ToolMessage which is the *output* of the populate tool
-            # Use getattr for safety when checking name
-            if isinstance(msg, ToolMessage) and getattr(msg, 'name', None) == 'populate_word_from_json':
-                final_populate_output_message = msg # Keep the whole message object
-                print(f"DEBUG: Found populate_word_from_json ToolMessage (Output) at index {msg_index}.")
-
-                # 2. Now, look backwards *just before* this message to find the preceding AIMessage with the ToolCall
-                for prev_msg_index in range(msg_index - 1, -1, -1):
-                    prev_msg = messages_history[prev_msg_index]
-
-                    if isinstance(prev_msg, AIMessage):
-                        tool_calls = getattr(prev_msg, 'tool_calls', None)
-                        if tool_calls:
-                            for tool_call in tool_calls:
-                                tool_call_name = tool_call.get('name') if isinstance(tool_call, dict) else getattr(tool_call, 'name', None)
-                                if tool_call_name == 'populate_word_from_json':
-                                    populate_tool_call_args = tool_call.get('args') if isinstance(tool_call, dict) else getattr(tool_call, 'args', None)
-                                    if populate_tool_call_args:
-                                        if isinstance(populate_tool_call_args, dict):
-                                            brief_text_json_data = populate_tool_call_args.get('json_data')
-                                            image_placeholders_data = populate_tool_call_args.get('image_placeholders')
-                                        else:
-                                            print(f"DEBUG: populate_word_from_json args were not a dict: {type(populate_tool_call_args)}")
-
-                                        print(f"DEBUG: Found populate_word_from_json ToolCall (Input Args) at index {prev_msg_index}.")
-                                    else:
-                                        print(f"DEBUG: Found populate_word_from_json ToolCall at index {prev_msg_index}, but could not extract args.")
-
-                                    break # Exit inner tool_calls loop
-                            if populate_tool_call_args is not None:
-                                break # Exit outer prev_msg loop
-                break # Found the ToolMessage output, stop searching the history
-
-
-        # Determine the final status message to return in the response
-        if final_populate_output_message is not None:
-            final_status_message = getattr(final_populate_output_message, 'content', 'Tool execution message has no content.')
-            final_status_message = str(final_status_message)
-            print(f"DEBUG: Using status message from populate_word_from_json ToolMessage: '{final_status_message[:100]}...'")
-        else:
-            last_message = messages_history[-1] if messages_history else None
-            if last_message:
-                final_status_message = getattr(last_message, 'content', 'Last message has no content.')
-                final_status_message = str(final_status_message)
-                print(f"DEBUG: Using status message from last message in history: '{final_status_message[:100]}...'")
-            else:
-                final_status_message = "Workflow finished, no messages found in history."
-                print("DEBUG: No messages found in workflow history.")
-
-
-        # --- Save Workflow History to Log File ---
-        print("\n--- Saving Workflow Message History to File ---")
-        try:
-            with open(workflow_log_filepath, 'w', encoding='utf-8') as log_file:
-                log_file.write(f"--- Workflow Message History for Request {timestamp}_{unique_id} ---\n")
-                log_file.write(f"User Prompt: {new_brief_prompt}\n")
-                log_file.write("-" * 30 + "\n\n")
-
-                if messages_history:
-                    for i, m in enumerate(messages_history):
-                        log_file.write(f"--- Message {i+1} ({type(m).__name__}, role: {getattr(m, 'type', 'N/A')}) ---\n")
-                        # Use pretty_print if available, otherwise write string representation
-                        if hasattr(m, 'pretty_print'):
-                            # Capture pretty_print output by temporarily redirecting stdout
-                            import io, sys
-                            old_stdout = sys.stdout
-                            redirected_output = io.StringIO()
-                            sys.stdout = redirected_output
-                            try:
-                                m.pretty_print()
-                                pretty_output = redirected_output.getvalue()
-                                log_file.write(pretty_output)
-                            except Exception as pp_e:
-                                log_file.write(f"Error pretty printing message {i+1}: {pp_e}\n")
-                                log_file.write(str(m) + "\n") # Fallback to standard print
-                            finally:
-                                sys.stdout = old_stdout # Restore stdout
-                        else:
-                            log_file.write(str(m) + "\n") # Write string representation
-
-                        log_file.write("\n" + "="*20 + "\n\n") # Separator between messages
-
-                else:
-                    log_file.write("No messages in workflow history to display.")
-                log_file.write(f"\n--- End Workflow Message History for Request {timestamp}_{unique_id} ---\n")
-            print(f"Workflow message history saved to {workflow_log_filepath}")
-
-        except Exception as log_e:
-            print(f"\n*** ERROR saving workflow message history to file {workflow_log_filepath}: {log_e} ***")
-            traceback.print_exc()
-            # Decide if failure to log should make the request fail - usually not.
+        outputs = brief_outputs(result)
+        brief_text_json_data = outputs["brief_data"]
+        image_placeholders_data = outputs["image_placeholders"]
+        final_status_message = outputs["status_message"]
+        logger.debug("Workflow state: %d messages, placeholders: %d, retrieved context: %d, output artifact: %s",
+                     len(messages_history), len(outputs['placeholders'] or []), len(outputs['retrieved_context']),
+                     outputs['output_artifact'], extra={"request_id": request_id})
 
 
         # Prepare the JSON response payload
-        overall_status = "success" if "Successfully populated template" in final_status_message else "workflow_completed_with_issues"
+        artifact = outputs["output_artifact"]
+        overall_status = "success" if artifact is not None and artifact["success"] else "workflow_completed_with_issues"
+        if token_profile is not None and token_profile.exceeded_reason and overall_status != "success":
+            overall_status = "budget_exceeded"
+        if overall_status == "success":
+            # Written by the supervisor's tools; a completed run without them lost them on a hand-off
+            missing_fields = [field for field in ("placeholders", "retrieved_context") if not outputs[field]]
+            if missing_fields:
+                logger.warning("Completed workflow has no %s in its final state.", " or ".join(missing_fields),
+                               extra={"request_id": request_id})
+
+        # --- Log the run (JSONL, written in the background; see src/workflow_log.py) ---
+        workflow_log_filepath = log_workflow_run(
+            request_id, overall_status, new_brief_prompt, messages_history,
+            resumed=resume_request_id is not None, token_profile=token_profile, guard=guard
+        )
 
         response_payload = {
             "status": overall_status,
+            "request_id": request_id,
+            "template_path": template_path,
             "message": final_status_message, # Status from the populate tool or fallback message
-            "output_file": OUTPUT_PATH, # Path to the saved file from config
+            "output_file": request_output_path, # Path to this request's saved document
             "workflow_log_file": workflow_log_filepath, # Add path to the log file
             "brief_data_json": brief_text_json_data,
-            "image_placeholders_data": image_placeholders_data
+            "image_placeholders_data": image_placeholders_data,
+            "placeholders": outputs["placeholders"],
+            "summary": outputs["summary"],
+            "token_usage": token_profile.summary() if token_profile is not None else None,
+            "stage_timings": stage_timer.report(token_profile)
         }
 
-        print("Sending JSON response.")
-        return jsonify(response_payload), 200
+        # Keep the document bytes with the result so cached repeats can restore the file
+        document_bytes = None
+        if os.path.exists(request_output_path):
+            with open(request_output_path, 'rb') as document_file:
+                document_bytes = document_file.read()
+
+        return BriefResult(payload=response_payload, status_code=200, document_bytes=document_bytes)
 
     except Exception as e:
-        print(f"\n*** UNEXPECTED ERROR during workflow execution or result processing: {e} ***")
-        traceback.print_exc()
+        logger.exception("UNEXPECTED ERROR during workflow execution or result processing: %s", e, extra={"request_id": request_id})
         # If an error occurred during workflow execution, the status should reflect that
         # Attempt to save history up to the point of error
-        error_messages_history = list(result.get('messages', [])) if 'result' in locals() and result and isinstance(result, dict) else []
-        # Add the exception details to the history that will be saved
-        error_messages_history.append(SystemMessage(content=f"Workflow terminated unexpectedly due to error: {str(e)}\nTraceback: {traceback.format_exc()}"))
-
-        # Generate a log filename for the error case
-        error_timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
-        error_unique_id = uuid.uuid4().hex[:6]
-        error_workflow_log_filename = f"{WORKFLOW_LOG_BASE_FILENAME}_{error_timestamp}_{error_unique_id}_ERROR.log"
-        error_workflow_log_filepath = os.path.join(WORKFLOW_LOG_DIR, error_workflow_log_filename)
-
-        try:
-            print(f"\n--- Saving Workflow Message History (Error Case) to File ---")
-            with open(error_workflow_log_filepath, 'w', encoding='utf-8') as log_file:
-                log_file.write(f"--- Workflow Message History (ERROR) for Request {error_timestamp}_{error_unique_id} ---\n")
-                log_file.write(f"User Prompt: {new_brief_prompt}\n")
-                log_file.write("-" * 30 + "\n\n")
-                # Use the potentially incomplete history including the error message
-                if error_messages_history:
-                    for i, m in enumerate(error_messages_history):
-                        log_file.write(f"--- Message {i+1} ({type(m).__name__}, role: {getattr(m, 'type', 'N/A')}) ---\n")
-                        import io, sys
-                        old_stdout = sys.stdout
-                        redirected_output = io.StringIO()
-                        sys.stdout = redirected_output
-                        try:
-                            if hasattr(m, 'pretty_print'): m.pretty_print()
-                            else: print(m)
-                            log_file.write(redirected_output.getvalue())
-                        except:
-                            log_file.write(str(m) + "\n")
-                        finally:
-                            sys.stdout = old_stdout
-                        log_file.write("\n" + "="*20 + "\n\n")
-                log_file.write(f"\n--- End Workflow Message History (ERROR) for Request {error_timestamp}_{error_unique_id} ---\n")
-            print(f"Workflow message history (error case) saved to {error_workflow_log_filepath}")
-            log_file_info_for_response = error_workflow_log_filepath
-        except Exception as log_e:
-            print(f"\n*** ERROR saving workflow message history to file in error handler {error_workflow_log_filepath}: {log_e} ***")
-            traceback.print_exc()
-            log_file_info_for_response = "Failed to save workflow log in error handler."
+        error_state = result if 'result' in locals() and result and isinstance(result, dict) else None
+        if not error_state:
+            # The workflow raised before returning: use the state of the last checkpoint
+            error_state = _checkpointed_state(request_id)
+        error_messages_history = list(error_state.get('messages', []))
+        aborted = _aborted_cause(e)
+        # The structured log keeps the history up to the error together with the error and its traceback
+        log_file_info_for_response = log_workflow_run(
+            request_id, aborted.status if aborted is not None else "workflow_failed", new_brief_prompt, error_messages_history,
+            resumed=resume_request_id is not None, error=f"{type(e).__name__}: {e}\n{traceback.format_exc()}",
+            token_profile=token_profile, guard=guard
+        )
 
+        if aborted is not None:
+            # Stopped by the workflow guard: return what the run produced so far with the abort status
+            return BriefResult(payload={
+                "status": aborted.status,
+                "request_id": request_id,
+                "resume_url": f"/briefs/{request_id}/resume",
+                "message": aborted.reason,
+                "workflow_log_file": log_file_info_for_response,
+                "brief_data_json": None,
+                "image_placeholders_data": None,
+                "partial_result": _partial_result(error_state, guard),
+                "token_usage": token_profile.summary() if token_profile is not None else None,
+                "stage_timings": stage_timer.report(token_profile)
+            }, status_code=504 if aborted.status == STATUS_DEADLINE_EXCEEDED else 500)
 
         # Return error response
-        return jsonify({
+        # The checkpoints of this request are kept, so the run can be resumed from the failed step
+        return BriefResult(payload={
             "status": "workflow_failed",
+            "request_id": request_id,
+            "resume_url": f"/briefs/{request_id}/resume",
             "message": f"An unexpected error occurred during workflow execution: {str(e)}",
             "workflow_log_file": log_file_info_for_response, # Include path to error log
             "brief_data_json": None, # Data likely incomplete on error
-            "image_placeholders_data": None # Data likely incomplete on error
-        }), 500
+            "image_placeholders_data": None, # Data likely incomplete on error
+            "token_usage": token_profile.summary() if token_profile is not None else None,
+            "stage_timings": stage_timer.report(token_profile)
+        }, status_code=500)
+
+
+def _aborted_cause(error: BaseException):
+    """Returns the WorkflowAborted behind an exception raised by the workflow (None if it was not aborted)."""
+    while error is not None:
+        if isinstance(error, WorkflowAborted):
+            return error
+        error = error.__cause__ or error.__context__
+    return None
+
+
+def _partial_result(state: dict, guard) -> dict:
+    """Progress and latest agent outputs of an aborted run."""
+    outputs = brief_outputs(state)
+    partial = guard.report() if guard is not None else {}
+    partial["placeholders"] = outputs["placeholders"]
+    partial["summary"] = outputs["summary"]
+    partial["generated_brief_text"] = outputs["brief_text"]
+    partial["brief_data_json"] = outputs["brief_data"]
+    return partial
+
+
+@app.route('/healthz', methods=['GET'])
+def handle_healthz():
+    """Liveness: the process is up and serving requests (no dependency checks)."""
+    return jsonify({"status": "ok", **process_summary()}), 200
+
+
+@app.route('/readyz', methods=['GET'])
+def handle_readyz():
+    """Readiness: 200 once the warm-up of this process succeeded, 503 before or if a component failed."""
+    report = warmup_state.report()
+    return jsonify(report), 200 if report["ready"] else 503
+
+
+@app.route('/templates', methods=['GET'])
+def handle_list_templates():
+    """Flask endpoint listing the registered brief templates and their placeholders."""
+    return jsonify({"status": "success", "default_template_id": DEFAULT_TEMPLATE_ID, "templates": template_registry.describe()}), 200
+
+
+def _parse_brief_data_request():
+    """
+    Parses the JSON payload shared by /briefs/preview and /briefs/render:
+    {"brief_data_json": {...}, "image_placeholders_data": {...}, "template_id": "default"}
+
+    Returns:
+        Tuple of (data, compiled_template, error_response). error_response is None if valid.
+    """
+    data = request.get_json(silent=True)
+    if not data or not isinstance(data.get('brief_data_json'), dict):
+        return None, None, (jsonify({"status": "error", "message": "Invalid request: JSON payload required with a 'brief_data_json' object."}), 400)
+    image_placeholders_data = data.get('image_placeholders_data')
+    if image_placeholders_data is not None and not isinstance(image_placeholders_data, dict):
+        return None, None, (jsonify({"status": "error", "message": "'image_placeholders_data' must be an object if provided."}), 400)
+    outside = [path for path in (image_placeholders_data or {}).values()
+               if not isinstance(path, str) or logo_cache.points_outside(path)]
+    if outside:
+        return None, None, (jsonify({"status": "error", "message": f"'image_placeholders_data' may only reference logo files "
+                                                                   f"in the logos directory (rejected: {outside})."}), 400)
+    template_id = data.get('template_id') or DEFAULT_TEMPLATE_ID
+    compiled_template = template_registry.get(template_id)
+    if compiled_template is None:
+        return None, None, (jsonify({"status": "error", "message": f"Unknown template_id '{template_id}'. Available templates: {template_registry.ids()}"}), 400)
+    return data, compiled_template, None
+
+
+@app.route('/briefs/preview', methods=['POST'])
+def handle_preview_brief():
+    """
+    Flask endpoint rendering brief data as HTML or Markdown without building a .docx.
+    Expects the 'brief_data_json' / 'image_placeholders_data' returned by /create-brief,
+    plus optional "template_id" and "format" ('html' (default) or 'markdown').
+
+    Returns the preview document; the ETag header supports conditional requests.
+    """
+    data, compiled_template, error_response = _parse_brief_data_request()
+    if error_response is not None:
+        return error_response
+    fmt = (data.get('format') or 'html').lower()
+    if fmt not in PREVIEW_FORMATS:
+        return jsonify({"status": "error", "message": f"Unsupported format '{fmt}'. Use one of: {sorted(PREVIEW_FORMATS)}"}), 400
+
+    rendered, preview_hash = render_preview(compiled_template, data['brief_data_json'], data.get('image_placeholders_data'), fmt)
+    if request.if_none_match and preview_hash in request.if_none_match:
+        return Response(status=304)
+    response = Response(rendered, mimetype=PREVIEW_FORMATS[fmt])
+    response.set_etag(preview_hash)
+    return response
+
+
+@app.route('/briefs/render', methods=['POST'])
+def handle_render_brief():
+    """
+    Flask endpoint producing the Word document from (possibly edited) brief data, without
+    running the workflow. Accepts the same payload as /briefs/preview.
+    """
+    data, compiled_template, error_response = _parse_brief_data_request()
+    if error_response is not None:
+        return error_response
+
+    request_id = f"{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:6]}"
+    output_path = _request_output_path(request_id)
+    status_message = populate_word_from_json_func(
+        json_data=data['brief_data_json'],
+        template_path=compiled_template.path,
+        output_path=output_path,
+        image_placeholders=data.get('image_placeholders_data'),
+    )
+    success = "Successfully populated template" in status_message
+    return jsonify({
+        "status": "success" if success else "error",
+        "request_id": request_id,
+        "message": status_message,
+        "output_file": output_path if success else None,
+    }), 200 if success else 500
+
+
+def _request_output_path(request_id: str) -> str:
+    """Path of the document generated for a request."""
+    return os.path.join(OUTPUT_DIR, f"{request_id}_{OUTPUT_FILENAME}")
+
+
+def _checkpointed_state(request_id: str) -> dict:
+    """Returns the workflow state stored in the latest checkpoint of a request (empty if none)."""
+    try:
+        snapshot = compiled_supervisor_workflow.get_state(thread_config(request_id))
+        return dict(snapshot.values) if snapshot and snapshot.values else {}
+    except Exception as state_e:
+        logger.warning("Could not load checkpointed state for request %s: %s", request_id, state_e)
+        return {}
+
+
+_CHECKPOINT_BUSY_MESSAGE = "Workflow for request '{}' is already being resumed or updated."
+_CHECKPOINT_CHANGED_MESSAGE = "Workflow for request '{}' was changed by another resume or update. Reload it and retry."
+
+
+@app.route('/briefs/<request_id>/resume', methods=['POST'])
+def handle_resume_brief(request_id):
+    """
+    Flask endpoint to resume a failed workflow run from its last completed step.
+    Uses the checkpoints stored under the request id returned by /create-brief.
+
+    Returns the same JSON payload as /create-brief (and can be profiled the same way).
+    """
+    if compiled_supervisor_workflow is None:
+        error_msg = "Workflow components failed to initialize during server startup. Cannot process request."
+        logger.error(error_msg)
+        return jsonify({"status": "error", "message": error_msg}), 500
+
+    try:
+        snapshot = compiled_supervisor_workflow.get_state(thread_config(request_id))
+    except Exception as e:
+        logger.exception("ERROR loading checkpoint for request %s: %s", request_id, e)
+        return jsonify({"status": "error", "message": f"Could not load checkpoint for request '{request_id}': {e}"}), 500
+
+    if not snapshot or not snapshot.values:
+        return jsonify({"status": "error", "message": f"No checkpointed workflow found for request '{request_id}'."}), 404
+    if not snapshot.next:
+        return jsonify({"status": "error", "message": f"Workflow for request '{request_id}' already completed. Nothing to resume."}), 409
+
+    new_brief_prompt = _original_prompt(snapshot.values)
+
+    # Template selected by the original request (stored in the checkpoint metadata)
+    template_path = (snapshot.metadata or {}).get("template_path")
+
+    # One writer per request across all server workers; a run must not be resumed twice concurrently
+    with claim_checkpoints(request_id) as claimed:
+        if not claimed:
+            return jsonify({"status": "error", "message": _CHECKPOINT_BUSY_MESSAGE.format(request_id)}), 409
+        # An unfinished run that is still executing also has next nodes; a second executor would race it
+        if is_running(request_id):
+            return jsonify({"status": "error", "message": f"Workflow for request '{request_id}' is still running. "
+                                                          "Cancel it first or wait for it to finish."}), 409
+        if latest_checkpoint_id(compiled_supervisor_workflow, request_id) != snapshot_checkpoint_id(snapshot):
+            return jsonify({"status": "error", "message": _CHECKPOINT_CHANGED_MESSAGE.format(request_id)}), 409
+        logger.debug("Resuming request %s before node(s): %s", request_id, list(snapshot.next))
+        if _profiling_requested():
+            response_payload, status_code = _profiled_brief_run(new_brief_prompt, resume_request_id=request_id, template_path=template_path)
+        else:
+            brief_result = _run_brief_workflow(new_brief_prompt, resume_request_id=request_id, template_path=template_path)
+            response_payload, status_code = brief_result.payload, brief_result.status_code
+
+    return jsonify(response_payload), status_code
+
+
+def _original_prompt(state: dict) -> str:
+    """The user's prompt of a run, from the first HumanMessage of its stored history."""
+    for msg in state.get('messages', []):
+        if isinstance(msg, HumanMessage):
+            return str(msg.content).removeprefix(USER_PROMPT_PREFIX)
+    return ""
+
+
+def _checkpoint_template_path(request_id: str, snapshot):
+    """Template of a run: from the metadata of its latest checkpoint, or of the newest earlier one that has it."""
+    template_path = (snapshot.metadata or {}).get("template_path")
+    if template_path:
+        return template_path
+    # Checkpoints written by update_state (section updates) may not carry the run's metadata
+    for earlier in compiled_supervisor_workflow.get_state_history(thread_config(request_id)):
+        template_path = (earlier.metadata or {}).get("template_path")
+        if template_path:
+            return template_path
+    return None
+
+
+@app.route('/briefs/<request_id>/sections', methods=['POST'])
+def handle_regenerate_sections(request_id):
+    """
+    Flask endpoint rewriting selected sections of a completed brief without re-running the workflow.
+    Expects JSON payload: {"sections": ["AUDIENCE", "EMAIL_CONTENT"], "instructions": "optional guidance"}
+
+    The stored state of the run (prompt, summary, brief data, image map) is sent to the generator
+    model in one small call for the named sections only (see src/section_regeneration.py). Only the
+    paragraphs of those sections are re-rendered, into a new revision of the run's document; the
+    checkpoint is updated, so later requests build on the new revision.
+
+    Returns the updated 'brief_data_json', the 'regenerated_sections' and the new 'output_file'.
+    """
+    if compiled_supervisor_workflow is None:
+        error_msg = "Workflow components failed to initialize during server startup. Cannot process request."
+        logger.error(error_msg)
+        return jsonify({"status": "error", "message": error_msg}), 500
+
+    data = request.get_json(silent=True) or {}
+    sections = data.get('sections')
+    if isinstance(sections, str):
+        sections = [sections]
+    if not isinstance(sections, list) or not sections or not all(isinstance(name, str) for name in sections):
+        return jsonify({"status": "error", "message": "Invalid request: JSON payload required with a non-empty 'sections' list."}), 400
+    instructions = data.get('instructions')
+    if instructions is not None and not isinstance(instructions, str):
+        return jsonify({"status": "error", "message": "'instructions' must be a string if provided."}), 400
+
+    try:
+        snapshot = compiled_supervisor_workflow.get_state(thread_config(request_id))
+        template_path = _checkpoint_template_path(request_id, snapshot) if snapshot and snapshot.values else None
+    except Exception as e:
+        logger.exception("ERROR loading checkpoint for request %s: %s", request_id, e)
+        return jsonify({"status": "error", "message": f"Could not load checkpoint for request '{request_id}': {e}"}), 500
+
+    if not snapshot or not snapshot.values:
+        return jsonify({"status": "error", "message": f"No checkpointed workflow found for request '{request_id}'."}), 404
+    if snapshot.next:
+        return jsonify({"status": "error", "message": f"Workflow for request '{request_id}' has not completed. Resume it first."}), 409
+    outputs = brief_outputs(snapshot.values)
+    if not isinstance(outputs["brief_data"], dict) or not outputs["brief_data"]:
+        return jsonify({"status": "error", "message": f"Workflow for request '{request_id}' produced no brief data to update."}), 409
+
+    compiled_template = template_registry.get_by_path(template_path) if template_path else template_registry.get(DEFAULT_TEMPLATE_ID)
+    if compiled_template is None:
+        return jsonify({"status": "error", "message": f"Template '{template_path or DEFAULT_TEMPLATE_ID}' of request '{request_id}' is no longer available."}), 409
+    try:
+        keys = resolve_sections(sections, outputs["brief_data"], compiled_template)
+    except SectionRequestError as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
+
+    with claim_checkpoints(request_id) as claimed:
+        if not claimed:
+            return jsonify({"status": "error", "message": _CHECKPOINT_BUSY_MESSAGE.format(request_id)}), 409
+        response_payload, status_code = _regenerate_brief_sections(request_id, snapshot_checkpoint_id(snapshot), snapshot.values,
+                                                                   outputs, compiled_template, keys, instructions)
+
+    return jsonify(response_payload), status_code
+
+
+def _regenerate_brief_sections(request_id: str, checkpoint_id: str, state: dict, outputs: dict, compiled_template, keys: list,
+                               instructions):
+    """
+    Regenerates the sections 'keys' of a completed run and renders them into a new revision of its document.
+    The checkpoint is only updated if it is still 'checkpoint_id' (the one 'state' was read from).
+    """
+    # Each update writes its own file: the previous revision stays as it was (and may be served from the result cache)
+    revision_id = f"{request_id}_sections_{datetime.datetime.now().strftime('%H%M%S')}_{uuid.uuid4().hex[:4]}"
+    output_path = _request_output_path(revision_id)
+    token_profile = new_token_profile(request_id)
+    previous_data = outputs["brief_data"]
+    image_placeholders = outputs["image_placeholders"] or {}
+    previous_document = (outputs["output_artifact"] or {}).get("path")
+
+    started = time.monotonic()
+    try:
+        with guarded_run(request_id) as (guard, guard_callback), \
+                request_scope(request_id=request_id, output_path=output_path, template_path=compiled_template.path,
+                              token_profile=token_profile, guard=guard):
+            regenerated = regenerate_sections(_original_prompt(state), outputs["summary"], previous_data, keys, instructions,
+                                              callbacks=[guard_callback])
+            llm_seconds = time.monotonic() - started
+            brief_data = {**previous_data, **regenerated}
+
+            # Only the paragraphs of the regenerated sections change; fall back to a full render if the
+            # previous document cannot be updated in place
+            rendered = repopulate_sections(previous_document, compiled_template, brief_data, previous_data, keys, output_path)
+            if rendered is not None:
+                render_mode = "partial"
+                status_message, paragraphs_updated = rendered
+            else:
+                render_mode = "full"
+                paragraphs_updated = None
+                status_message = populate_word_from_json_func(brief_data, compiled_template.path, output_path, image_placeholders)
+    except SectionRegenerationError as e:
+        logger.warning("Could not regenerate sections %s of request %s: %s", keys, request_id, e)
+        return {"status": "error", "request_id": request_id, "message": str(e),
+                "token_usage": token_profile.summary() if token_profile is not None else None}, 502
+    except Exception as e:
+        aborted = _aborted_cause(e)
+        if aborted is None:
+            logger.exception("UNEXPECTED ERROR regenerating sections %s of request %s: %s", keys, request_id, e)
+        return {
+            "status": aborted.status if aborted is not None else "error",
+            "request_id": request_id,
+            "message": aborted.reason if aborted is not None else f"An unexpected error occurred while regenerating sections: {e}",
+            "token_usage": token_profile.summary() if token_profile is not None else None,
+        }, 504 if aborted is not None and aborted.status == STATUS_DEADLINE_EXCEEDED else 500
+
+    artifact = populate_artifact(status_message, output_path)
+    state_updated = False
+    conflict = False
+    if artifact["success"]:
+        # The next update (or a client reading the checkpoint) starts from this revision
+        try:
+            # Another update that finished between reading the state and claiming the request would be overwritten
+            if latest_checkpoint_id(compiled_supervisor_workflow, request_id) != checkpoint_id:
+                conflict = True
+                logger.warning("Checkpoint of request %s changed while sections %s were regenerated; not storing them.",
+                               request_id, keys)
+            else:
+                compiled_supervisor_workflow.update_state(
+                    thread_config(request_id, metadata={"template_path": compiled_template.path}),
+                    {"brief_data": brief_data, "output_artifact": artifact},
+                    as_node="supervisor",
+                )
+                state_updated = True
+        except Exception as e:
+            logger.exception("Could not store the regenerated sections of request %s in its checkpoint: %s", request_id, e)
+
+    if conflict:
+        status, status_message, status_code = "conflict", _CHECKPOINT_CHANGED_MESSAGE.format(request_id), 409
+    else:
+        status, status_code = ("success", 200) if artifact["success"] else ("error", 500)
+    return {
+        "status": status,
+        "request_id": request_id,
+        "template_path": compiled_template.path,
+        "message": status_message,
+        "output_file": output_path if artifact["success"] else None,
+        "regenerated_sections": regenerated,
+        "render_mode": render_mode,
+        "paragraphs_updated": paragraphs_updated,
+        "state_updated": state_updated,
+        "brief_data_json": brief_data,
+        "image_placeholders_data": image_placeholders,
+        "token_usage": token_profile.summary() if token_profile is not None else None,
+        "timings": {
+            "llm_seconds": round(llm_seconds, 3),
+            "render_seconds": round(time.monotonic() - started - llm_seconds, 3),
+        },
+    }, status_code
+
+
+@app.route('/briefs/running', methods=['GET'])
+def handle_running_briefs():
+    """Flask endpoint listing the workflow runs of this server process with their progress."""
+    return jsonify({"pid": os.getpid(), "runs": active_runs()}), 200
+
+
+@app.route('/briefs/<request_id>/cancel', methods=['POST'])
+def handle_cancel_brief(request_id):
+    """
+    Flask endpoint to cancel a running workflow. The run stops at its next LLM call, tool call
+    or graph step (an LLM call in flight is aborted) and its /create-brief (or resume) request
+    answers with status 'cancelled'. Runs of other server workers are cancelled through the
+    checkpoint database.
+    """
+    if not cancel_run(request_id):
+        return jsonify({"status": "error", "message": f"No running workflow found for request '{request_id}'."}), 404
+    return jsonify({"status": "cancelling", "request_id": request_id}), 202
 
 # Note: The Flask app instance 'app' is defined here.
 # Running the Flask app (app.run) will be handled by the root app.py file.
\ No newline at end of file
@@ -0,0 +1,226 @@
+# src/brief_cache.py
+# Single-flight coalescing and result cache for /create-brief.
+#
+# Identical requests (same normalized prompt, same template contents and same vector
+# store generation) produce the same brief, so:
+#   - concurrent identical requests share one in-flight workflow run (single-flight);
+#   - completed successful results are kept in a bounded LRU cache with a TTL, so
+#     repeats are answered without running the multi-agent workflow again.
+
+import hashlib
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from src.config import BRIEF_CACHE_ENABLED, BRIEF_CACHE_MAX_ENTRIES, BRIEF_CACHE_TTL_SECONDS, PERSIST_DIRECTORY
+from src.config import RAG_INDEX_BACKEND, QUANTIZED_INDEX_DIR
+
+logger = logging.getLogger(__name__)
+
+# Result sources reported to the client
+SOURCE_WORKFLOW = "workflow"    # This request ran the workflow
+SOURCE_COALESCED = "coalesced"  # Shared the run of an identical in-flight request
+SOURCE_CACHE = "cache"          # Served from the result cache
+
+
+@dataclass
+class BriefResult:
+    """Outcome of one workflow run as returned to the client."""
+    payload: Dict[str, Any]
+    status_code: int
+    document_bytes: Optional[bytes] = None
+    created_at: float = field(default_factory=time.time)
+
+    @property
+    def cacheable(self) -> bool:
+        return self.status_code == 200 and self.payload.get("status") == "success" and self.document_bytes is not None
+
+    def restore_document(self):
+        """Re-writes the output document from the cached bytes if the file was removed."""
+        output_file = self.payload.get("output_file")
+        if output_file and self.document_bytes is not None and not os.path.exists(output_file):
+            os.makedirs(os.path.dirname(output_file), exist_ok=True)
+            with open(output_file, "wb") as f:
+                f.write(self.document_bytes)
+            logger.debug("Restored cached brief document to '%s'.", output_file)
+
+
+# --- Cache Key Components ---
+def normalize_prompt(prompt: str) -> str:
+    """Case- and whitespace-insensitive form of a brief prompt."""
+    return " ".join(prompt.split()).casefold()
+
+
+_file_hash_lock = threading.Lock()
+_file_hash_memo: Dict[str, Tuple[Tuple[int, int], str]] = {}
+
+
+def get_file_hash(path: str) -> str:
+    """SHA-256 of a file's contents, memoized on (mtime, size) so unchanged files are not re-read."""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return "missing"
+    signature = (stat.st_mtime_ns, stat.st_size)
+    with _file_hash_lock:
+        memo = _file_hash_memo.get(path)
+        if memo and memo[0] == signature:
+            return memo[1]
+    with open(path, "rb") as f:
+        digest = hashlib.sha256(f.read()).hexdigest()
+    with _file_hash_lock:
+        _file_hash_memo[path] = (signature, digest)
+    return digest
+
+
+def get_index_generation(persist_directory: str = PERSIST_DIRECTORY) -> str:
+    """
+    Identifies the current build of the vector store.
+    build_vector_store.py recreates the Chroma database file, which changes its mtime.
+    """
+    db_file = os.path.join(persist_directory, "chroma.sqlite3")
+    if RAG_INDEX_BACKEND == "quantized":
+        # Rewritten last by every export
+        db_file = os.path.join(QUANTIZED_INDEX_DIR, "index.json")
+    try:
+        stat = os.stat(db_file)
+    except OSError:
+        return "none"
+    return f"{stat.st_mtime_ns}-{stat.st_size}"
+
+
+def make_brief_cache_key(prompt: str, template_hash: str, index_generation: str) -> str:
+    """Builds the cache/coalescing key of a brief request."""
+    raw = "\x1f".join([normalize_prompt(prompt), template_hash, index_generation])
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+# --- Single-Flight + TTL Cache ---
+class _InFlight:
+    __slots__ = ("done", "result", "error", "followers")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.followers = 0
+
+
+class BriefResultCache:
+    """
+    Bounded LRU cache of BriefResult objects with a TTL, combined with single-flight
+    execution of identical requests.
+
+    Args:
+        max_entries: Maximum number of cached results (least recently used are evicted).
+        ttl_seconds: Lifetime of a cached result.
+        enabled: If False, results are not cached (concurrent requests are still coalesced).
+    """
+
+    def __init__(self, max_entries: int = 128, ttl_seconds: float = 3600.0, enabled: bool = True):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, BriefResult]" = OrderedDict()
+        self._in_flight: Dict[str, _InFlight] = {}
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    def _get_fresh(self, key: str) -> Optional[BriefResult]:
+        # Caller holds self._lock
+        result = self._entries.get(key)
+        if result is None:
+            return None
+        if time.time() - result.created_at > self.ttl_seconds:
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return result
+
+    def _store(self, key: str, result: BriefResult):
+        # Caller holds self._lock
+        self._entries[key] = result
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def get_or_run(self, key: str, run: Callable[[], BriefResult], force_refresh: bool = False) -> Tuple[BriefResult, str]:
+        """
+        Returns the result for 'key', running 'run' at most once for concurrent callers.
+
+        Args:
+            key: Cache key from make_brief_cache_key().
+            run: Callable executing the workflow and returning a BriefResult.
+            force_refresh: Ignore a cached result (the new result replaces it).
+
+        Returns:
+            Tuple of (BriefResult, source) where source is one of SOURCE_WORKFLOW,
+            SOURCE_COALESCED or SOURCE_CACHE.
+        """
+        with self._lock:
+            hit = self._get_fresh(key) if self.enabled and not force_refresh else None
+            if hit is not None:
+                self.hits += 1
+            else:
+                call = self._in_flight.get(key)
+                if call is not None:
+                    call.followers += 1
+                    self.coalesced += 1
+                    leader = False
+                else:
+                    call = _InFlight()
+                    self._in_flight[key] = call
+                    self.misses += 1
+                    leader = True
+
+        if hit is not None:
+            hit.restore_document()
+            return hit, SOURCE_CACHE
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, SOURCE_COALESCED
+
+        try:
+            result = run()
+            call.result = result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._in_flight.pop(key, None)
+                if call.result is not None and self.enabled and call.result.cacheable:
+                    self._store(key, call.result)
+            call.done.set()
+
+        if call.followers:
+            logger.debug("Brief request coalesced with %d identical concurrent request(s).", call.followers)
+        return result, SOURCE_WORKFLOW
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "entries": len(self._entries),
+                "in_flight": len(self._in_flight),
+                "hits": self.hits,
+                "misses": self.misses,
+                "coalesced": self.coalesced,
+            }
+
+
+# --- Process-wide cache instance ---
+brief_result_cache = BriefResultCache(
+    max_entries=BRIEF_CACHE_MAX_ENTRIES,
+    ttl_seconds=BRIEF_CACHE_TTL_SECONDS,
+    enabled=BRIEF_CACHE_ENABLED,
+)
@@ -0,0 +1,186 @@
+# src/brief_state.py
+# Typed state of the brief generation workflow.
+#
+# Besides the message history, the graph state carries the intermediate and final
+# results of a run in explicit fields. Each field is written by the node that produces it:
+#   placeholders        <- extract_placeholders_from_template tool
+#   retrieved_context   <- retrieve_relevant_campaign_data tool (one entry per query)
+#   summary             <- summarizer_agent (its final answer)
+#   brief_text          <- brief_generator_agent (its final answer)
+#   brief_data,
+#   image_placeholders,
+#   output_artifact     <- populate_word_from_json tool (the arguments it was called with and its result)
+# The tools write their fields by returning a Command together with their ToolMessage.
+# The supervisor runs as a subgraph that a hand-off to an agent leaves with
+# Command(graph=PARENT), so the hand-off tools (handoff_tool) carry the fields the
+# supervisor's tools wrote during its turn up to the graph state.
+# The API response, the cache and other consumers read the fields from the final state
+# (brief_outputs) instead of searching the message history.
+
+import json
+import os
+from typing import Any, Dict, List, Optional
+
+from typing_extensions import Annotated, NotRequired, TypedDict
+
+from langchain_core.messages import AIMessage, ToolMessage
+from langchain_core.tools import BaseTool, InjectedToolCallId, tool
+from langgraph.graph import StateGraph, START, END
+from langgraph.prebuilt import InjectedState
+from langgraph.prebuilt.chat_agent_executor import AgentState
+from langgraph.types import Command
+
+POPULATE_SUCCESS_MARKER = "Successfully populated template"
+
+
+class RetrievedContext(TypedDict):
+    query: str
+    text: str
+    # Context assembly figures (chunks, candidates, tokens, raw_tokens, tokens_saved); absent without assembly
+    stats: NotRequired[Dict[str, int]]
+
+
+class OutputArtifact(TypedDict):
+    path: Optional[str]
+    success: bool
+    message: str
+
+
+def merge_retrieved_context(existing: Optional[List[RetrievedContext]], new: Optional[List[RetrievedContext]]) -> List[RetrievedContext]:
+    """
+    Reducer of 'retrieved_context': appends new entries, skipping ones already present.
+    Subgraphs (the agents) return their whole state to the parent graph, so a plain
+    list concatenation would duplicate every entry at each hand-off.
+    """
+    merged = list(existing or [])
+    seen = {(entry["query"], entry["text"]) for entry in merged}
+    for entry in new or []:
+        if (entry["query"], entry["text"]) not in seen:
+            seen.add((entry["query"], entry["text"]))
+            merged.append(entry)
+    return merged
+
+
+class BriefState(AgentState, total=False):
+    """State schema of the supervisor graph and its agents (messages + brief fields)."""
+    placeholders: List[str]
+    retrieved_context: Annotated[List[RetrievedContext], merge_retrieved_context]
+    summary: str
+    brief_text: str
+    brief_data: Dict[str, Any]
+    image_placeholders: Dict[str, str]
+    output_artifact: OutputArtifact
+
+
+BRIEF_FIELDS = ("placeholders", "retrieved_context", "summary", "brief_text", "brief_data", "image_placeholders",
+                "output_artifact")
+
+
+# --- Writing fields ---
+def tool_command(tool_name: str, tool_call_id: str, content: Any, **fields) -> Command:
+    """
+    Tool result that updates state fields in addition to adding the ToolMessage.
+    Non-string content is JSON-encoded, as the tool node does for plain return values.
+    """
+    if not isinstance(content, str):
+        content = json.dumps(content, default=str)
+    return Command(update={
+        **fields,
+        "messages": [ToolMessage(content=content, name=tool_name, tool_call_id=tool_call_id)],
+    })
+
+
+def record_agent_output(agent, field: str):
+    """
+    Wraps a compiled agent so that its final answer is stored in 'field' of the state.
+    The wrapper keeps the agent's name, so the supervisor hands off to it as before.
+    """
+    def _record(state: BriefState) -> dict:
+        messages = state.get("messages") or []
+        last = messages[-1] if messages else None
+        if isinstance(last, AIMessage) and not last.tool_calls and last.content:
+            return {field: str(last.content)}
+        return {}
+
+    builder = StateGraph(BriefState)
+    builder.add_node("agent", agent)
+    builder.add_node(f"record_{field}", _record)
+    builder.add_edge(START, "agent")
+    builder.add_edge("agent", f"record_{field}")
+    builder.add_edge(f"record_{field}", END)
+    return builder.compile(name=agent.name)
+
+
+def handoff_tool(agent_name: str) -> BaseTool:
+    """
+    The supervisor's transfer_to_<agent_name> tool (as created by langgraph_supervisor), whose
+    hand-off also writes the brief fields of the supervisor's state to the graph state.
+    """
+    from langgraph_supervisor.handoff import METADATA_KEY_HANDOFF_DESTINATION, create_handoff_tool
+
+    handoff = create_handoff_tool(agent_name=agent_name)
+
+    @tool(handoff.name, description=handoff.description)
+    def handoff_with_fields(state: Annotated[dict, InjectedState], tool_call_id: Annotated[str, InjectedToolCallId]):
+        command = handoff.func(state=state, tool_call_id=tool_call_id)
+        # Parallel hand-offs send the whole state to the agent, which returns it to the graph
+        if not isinstance(command.update, dict):
+            return command
+        fields = {field: state[field] for field in BRIEF_FIELDS if state.get(field) is not None}
+        return Command(graph=command.graph, goto=command.goto, update={**fields, **command.update})
+
+    handoff_with_fields.metadata = {METADATA_KEY_HANDOFF_DESTINATION: agent_name}
+    return handoff_with_fields
+
+
+# --- Reading fields ---
+def brief_outputs(state: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    The results of a run as a stable dict: placeholders, retrieved_context, summary,
+    brief_text, brief_data, image_placeholders, output_artifact and status_message.
+    Checkpoints written before the state had these fields fall back to the message history.
+    """
+    state = state or {}
+    messages = list(state.get("messages") or [])
+    outputs = {
+        "placeholders": state.get("placeholders"),
+        "retrieved_context": state.get("retrieved_context") or [],
+        "summary": state.get("summary"),
+        "brief_text": state.get("brief_text"),
+        "brief_data": state.get("brief_data"),
+        "image_placeholders": state.get("image_placeholders"),
+        "output_artifact": state.get("output_artifact"),
+    }
+    if outputs["output_artifact"] is None and messages:
+        outputs.update(_outputs_from_history(messages))
+    artifact = outputs["output_artifact"]
+    if artifact is not None:
+        outputs["status_message"] = artifact["message"]
+    elif messages:
+        outputs["status_message"] = str(getattr(messages[-1], "content", "Last message has no content."))
+    else:
+        outputs["status_message"] = "Workflow finished, no messages found in history."
+    return outputs
+
+
+def _outputs_from_history(messages: List[Any]) -> Dict[str, Any]:
+    """Finds the last populate_word_from_json call and its result in the message history."""
+    for index in range(len(messages) - 1, -1, -1):
+        message = messages[index]
+        if isinstance(message, ToolMessage) and message.name == "populate_word_from_json":
+            for previous in reversed(messages[:index]):
+                for call in getattr(previous, "tool_calls", None) or []:
+                    if call.get("id") == message.tool_call_id or call.get("name") == "populate_word_from_json":
+                        args = call.get("args") or {}
+                        return {
+                            "brief_data": args.get("json_data"),
+                            "image_placeholders": args.get("image_placeholders"),
+                            "output_artifact": populate_artifact(str(message.content), None),
+                        }
+            return {"output_artifact": populate_artifact(str(message.content), None)}
+    return {}
+
+
+def populate_artifact(message: str, path: Optional[str]) -> OutputArtifact:
+    success = POPULATE_SUCCESS_MARKER in message
+    return {"path": os.path.abspath(path) if success and path else None, "success": success, "message": message}
@@ -0,0 +1,185 @@
+# src/chunking.py
+# Structure-aware splitting of campaign brief documents for the vector store.
+#
+# Our briefs share a fixed layout ("Campaign Name:", "Target Audience:", "Channels:",
+# "Budget Allocation:", ...). Instead of cutting them into fixed-size, overlapping
+# character windows, each section becomes one chunk. Every chunk starts with a short
+# header naming the campaign, brand and section, and carries them as metadata, so
+# retrieved chunks are compact, non-overlapping and self-describing.
+#
+# Documents without recognizable brief sections (e.g. logo metadata files) are kept
+# whole when small, or split with the generic character splitter otherwise.
+
+import hashlib
+import re
+from typing import Iterable, List, Optional
+
+from langchain_core.documents import Document
+from langchain.text_splitter import RecursiveCharacterTextSplitter
+
+from src.config import CHUNK_MAX_SECTION_CHARS, CHUNK_FALLBACK_SIZE, CHUNK_FALLBACK_OVERLAP
+
+# Section headings of our brief layout (matched case-insensitively at the start of a line)
+BRIEF_SECTION_HEADINGS = [
+    "Campaign Name",
+    "Campaign Type",
+    "Business & Marketing Objectives",
+    "Target Audience",
+    "Channels",
+    "Concept & Execution",
+    "Campaign Duration",
+    "Budget Allocation",
+    "Core Message & Positioning",
+    "Creative Assets Required",
+    "Compliance, Legal & Brand Guidelines",
+    "Technical & Operational Requirements",
+    "Measurement & Reporting",
+    "Historical Insights",
+    "Roles & Responsibilities",
+    "Email Subject Line",
+    "Email Content",
+]
+# Short one-line fields collected into a single "Overview" chunk
+OVERVIEW_FIELDS = {"campaign name", "campaign type"}
+
+_HEADING_REGEX = re.compile(
+    r"^\s*(" + "|".join(re.escape(h) for h in BRIEF_SECTION_HEADINGS) + r")\s*:\s*(.*)$",
+    re.IGNORECASE,
+)
+_BRAND_REGEX = re.compile(r"^\s*Brand\s*:\s*(.+?)\s*$", re.IGNORECASE | re.MULTILINE)
+
+
+def _compact(text: str) -> str:
+    """Lower-case alphanumerics only ('Eco Smart' and 'EcoSmart' compare equal)."""
+    return re.sub(r"[^0-9a-z]", "", text.lower())
+
+
+def detect_brand(text: str, known_brands: Iterable[str] = ()) -> Optional[str]:
+    """Returns the brand of a document: an explicit 'Brand:' line, else the first known brand mentioned."""
+    match = _BRAND_REGEX.search(text)
+    if match:
+        return match.group(1)
+    compact_text = _compact(text)
+    for brand in known_brands:
+        if brand and _compact(brand) in compact_text:
+            return brand
+    return None
+
+
+def extract_known_brands(documents: Iterable[Document]) -> List[str]:
+    """Collects the brand names declared with 'Brand:' lines (the logo metadata files)."""
+    brands = []
+    for doc in documents:
+        for match in _BRAND_REGEX.finditer(doc.page_content):
+            if match.group(1) not in brands:
+                brands.append(match.group(1))
+    return brands
+
+
+def _parse_sections(text: str):
+    """Returns [(heading, body)] for the recognized sections of a brief, in order."""
+    sections = []
+    heading, body_lines = None, []
+    for line in text.splitlines():
+        match = _HEADING_REGEX.match(line)
+        if match:
+            if heading is not None:
+                sections.append((heading, "\n".join(body_lines).strip()))
+            # Use the canonical spelling of the heading
+            heading = next(h for h in BRIEF_SECTION_HEADINGS if h.lower() == match.group(1).lower())
+            body_lines = [match.group(2)] if match.group(2).strip() else []
+        elif heading is not None:
+            body_lines.append(line)
+    if heading is not None:
+        sections.append((heading, "\n".join(body_lines).strip()))
+    return sections
+
+
+def chunk_id(source: str, chunk_index: int) -> str:
+    """Deterministic vector store id of a chunk, so re-indexing a file replaces its chunks."""
+    return hashlib.sha1(f"{source}\x1f{chunk_index}".encode("utf-8")).hexdigest()
+
+
+def _chunk_header(campaign_name: Optional[str], brand: Optional[str], section: str) -> str:
+    parts = []
+    if campaign_name:
+        parts.append(f"Campaign: {campaign_name}")
+    if brand:
+        parts.append(f"Brand: {brand}")
+    parts.append(f"Section: {section}")
+    return " | ".join(parts)
+
+
+def split_brief_document(document: Document, known_brands: Iterable[str] = (),
+                         max_section_chars: int = CHUNK_MAX_SECTION_CHARS) -> List[Document]:
+    """
+    Splits one document into section chunks.
+
+    Args:
+        document: A loaded document (page_content + metadata with 'source').
+        known_brands: Brand names used to tag briefs that do not state their brand.
+        max_section_chars: Sections longer than this are split further (without overlap).
+
+    Returns:
+        List of chunk Documents. Metadata: source, section, campaign_name, brand, chunk_index.
+    """
+    text = document.page_content
+    sections = _parse_sections(text)
+    if not sections:
+        return _split_generic(document)
+
+    fields = {heading.lower(): body for heading, body in sections}
+    campaign_name = fields.get("campaign name", "").strip().strip('"').strip() or None
+    brand = detect_brand(text, known_brands)
+
+    # Group the short one-line fields into one overview chunk, keep the other sections as they are
+    grouped = []
+    overview_lines = [f"{h}: {b}" for h, b in sections if h.lower() in OVERVIEW_FIELDS]
+    if overview_lines:
+        grouped.append(("Overview", "\n".join(overview_lines)))
+    grouped.extend((h, f"{h}:\n{b}") for h, b in sections if h.lower() not in OVERVIEW_FIELDS)
+
+    chunks = []
+    for section, body in grouped:
+        header = _chunk_header(campaign_name, brand, section)
+        if len(body) <= max_section_chars:
+            pieces = [body]
+        else:
+            pieces = RecursiveCharacterTextSplitter(chunk_size=max_section_chars, chunk_overlap=0).split_text(body)
+        for piece in pieces:
+            metadata = dict(document.metadata)
+            metadata.update({
+                "section": section,
+                "campaign_name": campaign_name or "",
+                "brand": brand or "",
+                "chunk_index": len(chunks),
+            })
+            chunks.append(Document(page_content=f"{header}\n{piece}", metadata=metadata))
+    return chunks
+
+
+def _split_generic(document: Document) -> List[Document]:
+    """Fallback for documents that are not briefs: whole if small, else the generic character splitter."""
+    if len(document.page_content) <= CHUNK_FALLBACK_SIZE:
+        metadata = dict(document.metadata)
+        metadata.setdefault("chunk_index", 0)
+        brand = detect_brand(document.page_content)
+        if brand:
+            metadata.setdefault("brand", brand)
+        return [Document(page_content=document.page_content, metadata=metadata)]
+    splitter = RecursiveCharacterTextSplitter(chunk_size=CHUNK_FALLBACK_SIZE, chunk_overlap=CHUNK_FALLBACK_OVERLAP)
+    chunks = splitter.split_documents([document])
+    for index, chunk in enumerate(chunks):
+        chunk.metadata["chunk_index"] = index
+    return chunks
+
+
+def split_brief_documents(documents: List[Document], known_brands: Optional[Iterable[str]] = None) -> List[Document]:
+    """Splits a list of documents (see split_brief_document). Brands default to those declared in the documents."""
+    if known_brands is None:
+        known_brands = extract_known_brands(documents)
+    known_brands = list(known_brands)
+    chunks = []
+    for document in documents:
+        chunks.extend(split_brief_document(document, known_brands))
+    return chunks
@@ -1,11 +1,30 @@
 # src/config.py
 
+import logging
 import os
 from dotenv import load_dotenv
 
+from src.logging_setup import configure_logging
+
 # Load environment variables from .env file
 load_dotenv()
 
+# --- Logging (see src/logging_setup.py) ---
+# Configured first, so every module's logger uses it. At INFO the request path logs only
+# warnings and errors; DEBUG adds the per-request diagnostics.
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+# "text" (human-readable, structured fields as key=value) or "json" (one object per line, for log collectors)
+LOG_FORMAT = os.getenv("LOG_FORMAT", "text").lower()
+# Per-module overrides, e.g. "src.tools.populate_word=DEBUG,src.rag=WARNING"
+LOG_MODULE_LEVELS = os.getenv("LOG_MODULE_LEVELS", "")
+# Share of hot-path DEBUG events kept per event name (e.g. one line per replaced placeholder); 1.0 = all
+LOG_DEBUG_SAMPLE_RATE = float(os.getenv("LOG_DEBUG_SAMPLE_RATE", "0.1"))
+# Records buffered for the log writer thread before new ones are dropped
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+
+configure_logging(LOG_LEVEL, LOG_FORMAT, LOG_MODULE_LEVELS, LOG_DEBUG_SAMPLE_RATE, LOG_QUEUE_SIZE)
+logger = logging.getLogger(__name__)
+
 # --- Azure OpenAI Configuration (Separate for Chat and Embeddings) ---
 # Use os.getenv with default values or raise errors if required variables are missing
 
@@ -29,6 +48,61 @@ OPENAI_API_KEY_EMBEDDING = os.getenv("OPENAI_API_KEY_EMBEDDING")
 AZURE_OPENAI_EMBEDDING_DEPLOYMENT_NAME = os.getenv("AZURE_OPENAI_EMBEDDING_DEPLOYMENT_NAME") # e.g., "text-embedding-ada-002" or your deployment name
 
 
+# --- Azure OpenAI Quotas (client-side rate limiting, see src/rate_limiter.py) ---
+# Requests-per-minute and tokens-per-minute quotas of each deployment (as shown in the Azure portal).
+# Set to 0 to disable the corresponding limit.
+AZURE_OPENAI_CHAT_RPM = int(os.getenv("AZURE_OPENAI_CHAT_RPM", "0"))
+AZURE_OPENAI_CHAT_TPM = int(os.getenv("AZURE_OPENAI_CHAT_TPM", "0"))
+AZURE_OPENAI_EMBEDDING_RPM = int(os.getenv("AZURE_OPENAI_EMBEDDING_RPM", "0"))
+AZURE_OPENAI_EMBEDDING_TPM = int(os.getenv("AZURE_OPENAI_EMBEDDING_TPM", "0"))
+# Share of the embedding/chat quotas used by build_vector_store.py (0-1). The indexing script runs in
+# a process of its own, whose limiter does not see the server's calls: PRIORITY_BACKGROUND only ranks
+# indexing behind interactive calls within one process. Lower this when indexing while the server runs.
+INDEXING_QUOTA_SHARE = float(os.getenv("INDEXING_QUOTA_SHARE", "1.0"))
+# Seconds of quota that may be spent in a single burst (Azure evaluates quotas over ~10s windows)
+RATE_LIMIT_BURST_SECONDS = float(os.getenv("RATE_LIMIT_BURST_SECONDS", "10"))
+# Maximum time a call waits for capacity before failing
+RATE_LIMIT_MAX_WAIT_SECONDS = float(os.getenv("RATE_LIMIT_MAX_WAIT_SECONDS", "120"))
+# Completion size assumed for chat calls that do not set max_tokens
+RATE_LIMIT_COMPLETION_TOKENS_ESTIMATE = int(os.getenv("RATE_LIMIT_COMPLETION_TOKENS_ESTIMATE", "1000"))
+# tiktoken encoding used when the deployment name is not a known OpenAI model name
+TIKTOKEN_ENCODING = os.getenv("TIKTOKEN_ENCODING", "o200k_base")
+
+
+# --- Per-Role Chat Models (see src/llm.py) ---
+# The supervisor (routing), the summarizer and the brief generator can each use their own
+# deployment. Every setting falls back to the AZURE_OPENAI_CHAT_* values above, so without
+# any of these variables all three share the single chat client. Put a small, fast
+# deployment on SUPERVISOR/SUMMARIZER and keep the large one for the GENERATOR, e.g.:
+#   SUPERVISOR_MODEL_DEPLOYMENT_NAME=gpt-4o-mini   SUMMARIZER_MODEL_MAX_TOKENS=800
+# Per role (<ROLE> = SUPERVISOR, SUMMARIZER, GENERATOR):
+#   <ROLE>_MODEL_DEPLOYMENT_NAME, <ROLE>_MODEL_ENDPOINT, <ROLE>_MODEL_API_KEY, <ROLE>_MODEL_API_VERSION
+#   <ROLE>_MODEL_TEMPERATURE (empty = deployment default), <ROLE>_MODEL_MAX_TOKENS (0 = no limit),
+#   <ROLE>_MODEL_TIMEOUT_SECONDS (0 = client default), <ROLE>_MODEL_MAX_RETRIES
+#   <ROLE>_MODEL_RPM / <ROLE>_MODEL_TPM: quota of a deployment other than AZURE_OPENAI_CHAT_DEPLOYMENT_NAME
+CHAT_MODEL_ROLES = ("supervisor", "summarizer", "generator")
+
+
+def _chat_role_config(role: str) -> dict:
+    prefix = f"{role.upper()}_MODEL_"
+    temperature = os.getenv(prefix + "TEMPERATURE", "")
+    return {
+        "deployment": os.getenv(prefix + "DEPLOYMENT_NAME") or AZURE_OPENAI_CHAT_DEPLOYMENT_NAME,
+        "endpoint": os.getenv(prefix + "ENDPOINT") or AZURE_OPENAI_CHAT_ENDPOINT,
+        "api_key": os.getenv(prefix + "API_KEY") or OPENAI_API_KEY_CHAT,
+        "api_version": os.getenv(prefix + "API_VERSION") or OPENAI_API_VERSION_CHAT,
+        "temperature": float(temperature) if temperature else None,
+        "max_tokens": int(os.getenv(prefix + "MAX_TOKENS", "0")) or None,
+        "timeout": float(os.getenv(prefix + "TIMEOUT_SECONDS", "0")) or None,
+        "max_retries": int(os.getenv(prefix + "MAX_RETRIES", "2")),
+        "rpm": int(os.getenv(prefix + "RPM", "0")),
+        "tpm": int(os.getenv(prefix + "TPM", "0")),
+    }
+
+
+CHAT_MODEL_CONFIGS = {role: _chat_role_config(role) for role in CHAT_MODEL_ROLES}
+
+
 # --- Application Paths and Constants ---
 # Define paths relative to the project root
 PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
@@ -45,11 +119,126 @@ OUTPUT_FILENAME = "Final_Campaign_Brief.docx"
 TEMPLATE_PATH = os.path.join(DATA_DIR, TEMPLATE_FILENAME)
 OUTPUT_PATH = os.path.join(OUTPUT_DIR, OUTPUT_FILENAME)
 
+# --- Production Server (see serve.py) ---
+SERVER_HOST = os.getenv("SERVER_HOST", "0.0.0.0")
+SERVER_PORT = int(os.getenv("SERVER_PORT", "5000"))
+# Worker processes (default: one per CPU core) and request threads per worker
+SERVER_WORKERS = int(os.getenv("SERVER_WORKERS", str(os.cpu_count() or 1)))
+SERVER_THREADS = int(os.getenv("SERVER_THREADS", "4"))
+# A brief workflow makes many LLM calls; requests may legitimately take minutes
+SERVER_TIMEOUT_SECONDS = int(os.getenv("SERVER_TIMEOUT_SECONDS", "900"))
+SERVER_GRACEFUL_TIMEOUT_SECONDS = int(os.getenv("SERVER_GRACEFUL_TIMEOUT_SECONDS", "120"))
+# Restart a worker after this many requests (0 = never), with random jitter to avoid simultaneous restarts
+SERVER_MAX_REQUESTS = int(os.getenv("SERVER_MAX_REQUESTS", "0"))
+
+# --- Warm-up and Readiness (see src/warmup.py) ---
+WARMUP_ENABLED = os.getenv("WARMUP_ENABLED", "true").lower() in ("1", "true", "yes")
+# Also send one embedding request / one 1-token chat completion to open the Azure OpenAI connections
+WARMUP_EMBEDDING_PING = os.getenv("WARMUP_EMBEDDING_PING", "false").lower() in ("1", "true", "yes")
+WARMUP_LLM_PING = os.getenv("WARMUP_LLM_PING", "false").lower() in ("1", "true", "yes")
+WARMUP_PROBE_QUERY = os.getenv("WARMUP_PROBE_QUERY", "campaign brief target audience")
+
+# --- Logo Assets (see src/logo_cache.py) ---
+# Width logos are rendered at in the brief and the resolution they are downscaled to
+LOGO_RENDER_WIDTH_INCHES = float(os.getenv("LOGO_RENDER_WIDTH_INCHES", "1.5"))
+LOGO_RENDER_DPI = int(os.getenv("LOGO_RENDER_DPI", "220"))
+# Downscale oversized logos once when they are loaded (requires Pillow)
+LOGO_DOWNSCALE_ENABLED = os.getenv("LOGO_DOWNSCALE_ENABLED", "true").lower() in ("1", "true", "yes")
+# Logo files larger than this are rejected
+LOGO_MAX_FILE_BYTES = int(os.getenv("LOGO_MAX_FILE_BYTES", str(10 * 1024 * 1024)))
+# Logos kept in memory; the least recently used are evicted beyond this
+LOGO_CACHE_MAX_ENTRIES = int(os.getenv("LOGO_CACHE_MAX_ENTRIES", "256"))
+
+# --- Template Registry (see src/template_registry.py) ---
+# Additional templates (e.g. one per business unit); the template id is the file name without '.docx'
+TEMPLATES_DIR = os.getenv("TEMPLATES_DIR", os.path.join(PROJECT_ROOT, "templates"))
+# Id under which TEMPLATE_PATH is registered
+DEFAULT_TEMPLATE_ID = os.getenv("DEFAULT_TEMPLATE_ID", "default")
+# Placeholders matching this pattern are treated as image slots
+TEMPLATE_IMAGE_PLACEHOLDER_PATTERN = os.getenv("TEMPLATE_IMAGE_PLACEHOLDER_PATTERN", r"LOGO|IMAGE")
+# Hot reload of changed template files
+TEMPLATE_WATCH_ENABLED = os.getenv("TEMPLATE_WATCH_ENABLED", "true").lower() in ("1", "true", "yes")
+TEMPLATE_WATCH_INTERVAL_SECONDS = float(os.getenv("TEMPLATE_WATCH_INTERVAL_SECONDS", "2"))
+
 # --- Workflow Log Configuration ---
 # Directory to save workflow history logs
 WORKFLOW_LOG_DIR = os.path.join(PROJECT_ROOT, "logs", "workflow_history") # New directory 'logs/workflow_history'
-# Base filename for workflow logs (unique ID/timestamp will be added)
+# Base filename of the JSONL workflow log (see src/workflow_log.py): <base>.jsonl, rotated to <base>.<timestamp>.jsonl.gz
 WORKFLOW_LOG_BASE_FILENAME = "workflow_history"
+# Rotation size, rotated files kept, their maximum age (0 = unlimited) and gzip compression of rotated files
+WORKFLOW_LOG_MAX_BYTES = int(os.getenv("WORKFLOW_LOG_MAX_BYTES", str(50 * 1024 * 1024)))
+WORKFLOW_LOG_BACKUP_COUNT = int(os.getenv("WORKFLOW_LOG_BACKUP_COUNT", "20"))
+WORKFLOW_LOG_RETENTION_DAYS = float(os.getenv("WORKFLOW_LOG_RETENTION_DAYS", "30"))
+WORKFLOW_LOG_COMPRESS = os.getenv("WORKFLOW_LOG_COMPRESS", "true").lower() in ("1", "true", "yes")
+# Records buffered for the writer thread; further records are dropped rather than blocking requests
+WORKFLOW_LOG_QUEUE_SIZE = int(os.getenv("WORKFLOW_LOG_QUEUE_SIZE", "1000"))
+
+# --- Workflow Checkpoints (see src/workflows/checkpointer.py) ---
+# SQLite database holding the per-request graph checkpoints used to resume failed runs
+CHECKPOINT_DB_PATH = os.getenv("CHECKPOINT_DB_PATH", os.path.join(PROJECT_ROOT, "logs", "checkpoints.sqlite"))
+# Retention: checkpoints of requests without activity for this long are deleted (0 = keep regardless of age)
+CHECKPOINT_RETENTION_HOURS = float(os.getenv("CHECKPOINT_RETENTION_HOURS", "168"))
+# At most this many requests keep their checkpoints; the least recently active are deleted first (0 = no limit)
+CHECKPOINT_MAX_THREADS = int(os.getenv("CHECKPOINT_MAX_THREADS", "5000"))
+# Seconds between two pruning passes of each process (0 disables pruning)
+CHECKPOINT_PRUNE_INTERVAL_SECONDS = float(os.getenv("CHECKPOINT_PRUNE_INTERVAL_SECONDS", "600"))
+# Recursion limit passed to every workflow invocation
+WORKFLOW_RECURSION_LIMIT = int(os.getenv("WORKFLOW_RECURSION_LIMIT", "150"))
+
+# --- Token Budgets and Profiling (see src/token_budget.py) ---
+# Record the token breakdown of every LLM call of a request (workflow log + API response)
+TOKEN_PROFILING_ENABLED = os.getenv("TOKEN_PROFILING_ENABLED", "true").lower() in ("1", "true", "yes")
+# Per-request limits (0 = unlimited). A run that reaches one is stopped gracefully with
+# status "budget_exceeded" instead of running on up to WORKFLOW_RECURSION_LIMIT.
+WORKFLOW_TOKEN_BUDGET = int(os.getenv("WORKFLOW_TOKEN_BUDGET", "300000"))
+WORKFLOW_TURN_BUDGET = int(os.getenv("WORKFLOW_TURN_BUDGET", "40"))
+
+# --- LLM Cassettes (see src/llm_cassettes.py) ---
+# "record" saves every chat/embedding call with its response to <LLM_CASSETTE_DIR>/<request id>.jsonl,
+# "replay" answers the calls from those files instead of Azure OpenAI, "off" does neither.
+LLM_CASSETTE_MODE = os.getenv("LLM_CASSETTE_MODE", "off").lower()
+LLM_CASSETTE_DIR = os.getenv("LLM_CASSETTE_DIR", os.path.join(PROJECT_ROOT, "logs", "cassettes"))
+# Replay with the recorded duration of each call ("original") or immediately ("zero")
+LLM_CASSETTE_REPLAY_LATENCY = os.getenv("LLM_CASSETTE_REPLAY_LATENCY", "original").lower()
+# Unrecorded calls during replay: "error" fails the call, "live" sends it to the deployment
+LLM_CASSETTE_MISS_POLICY = os.getenv("LLM_CASSETTE_MISS_POLICY", "error").lower()
+
+# --- Workflow Guards (see src/workflows/guards.py) ---
+# Maximum duration of a whole run, and of one uninterrupted graph node (supervisor or agent); 0 = unlimited.
+# Keep WORKFLOW_DEADLINE_SECONDS below SERVER_TIMEOUT_SECONDS so the response reaches the client.
+WORKFLOW_DEADLINE_SECONDS = float(os.getenv("WORKFLOW_DEADLINE_SECONDS", "600"))
+WORKFLOW_NODE_DEADLINE_SECONDS = float(os.getenv("WORKFLOW_NODE_DEADLINE_SECONDS", "240"))
+# How often an identical tool call (same tool and arguments) or agent hand-off may occur in one run
+WORKFLOW_MAX_REPEATED_CALLS = int(os.getenv("WORKFLOW_MAX_REPEATED_CALLS", "3"))
+# How often a running workflow looks for cancellation requests made through another server worker
+# (they are shared through a table in CHECKPOINT_DB_PATH); also the poll interval of in-flight LLM calls
+WORKFLOW_CANCEL_POLL_SECONDS = float(os.getenv("WORKFLOW_CANCEL_POLL_SECONDS", "1.0"))
+
+# --- Per-Request Profiling (see src/profiling.py) ---
+# Allows profiling single /create-brief requests sent with 'X-Profile: 1' or '?profile=1'
+PROFILING_ENABLED = os.getenv("PROFILING_ENABLED", "false").lower() in ("1", "true", "yes")
+# Profiles and allocation reports are written next to the workflow history
+PROFILING_DIR = os.getenv("PROFILING_DIR", os.path.join(PROJECT_ROOT, "logs", "profiles"))
+# Functions (by cumulative time) and source lines (by allocated memory) listed in the text reports
+PROFILING_TOP_FUNCTIONS = int(os.getenv("PROFILING_TOP_FUNCTIONS", "60"))
+PROFILING_TOP_ALLOCATIONS = int(os.getenv("PROFILING_TOP_ALLOCATIONS", "30"))
+
+# --- Brief Previews (see src/preview.py) ---
+# Number of rendered HTML/Markdown previews kept in memory
+PREVIEW_CACHE_MAX_ENTRIES = int(os.getenv("PREVIEW_CACHE_MAX_ENTRIES", "256"))
+
+# --- Section Regeneration (see src/section_regeneration.py) ---
+# Sections one POST /briefs/<request_id>/sections request may rewrite (keeps the LLM call small)
+SECTION_REGENERATION_MAX_SECTIONS = int(os.getenv("SECTION_REGENERATION_MAX_SECTIONS", "5"))
+# Tokens of the stored summary and of the unchanged sections included as context
+SECTION_REGENERATION_CONTEXT_TOKENS = int(os.getenv("SECTION_REGENERATION_CONTEXT_TOKENS", "3000"))
+
+# --- Brief Result Cache (see src/brief_cache.py) ---
+# Identical /create-brief requests are coalesced onto one workflow run and successful
+# results are cached for repeats.
+BRIEF_CACHE_ENABLED = os.getenv("BRIEF_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+BRIEF_CACHE_MAX_ENTRIES = int(os.getenv("BRIEF_CACHE_MAX_ENTRIES", "128"))
+BRIEF_CACHE_TTL_SECONDS = float(os.getenv("BRIEF_CACHE_TTL_SECONDS", "3600"))
 
 # --- Ensure directories exist ---
 # Create output directory if it doesn't exist
@@ -82,7 +271,7 @@ for var in required_embedding_vars:
         missing_vars.append(var)
 
 if missing_vars:
-    print(f"Warning: The following required environment variables are not set: {', '.join(missing_vars)}")
+    logger.warning("The following required environment variables are not set: %s", ", ".join(missing_vars))
     # In a production app, you might want to raise an error here
     # raise ValueError(f"Missing required environment variables: {', '.join(missing_vars)}")
 
@@ -90,11 +279,61 @@ if missing_vars:
 PERSIST_DIRECTORY = os.path.join(PROJECT_ROOT, "vector_store_db") # For Chroma DB
 RAG_SEARCH_KWARGS = {"k": 5} 
 
-print("Configuration loaded.")
-# print specific endpoint details for clarity
-print(f"Chat Endpoint: {AZURE_OPENAI_CHAT_ENDPOINT} (Deployment: {AZURE_OPENAI_CHAT_DEPLOYMENT_NAME})")
-print(f"Embedding Endpoint: {AZURE_OPENAI_EMBEDDING_ENDPOINT} (Deployment: {AZURE_OPENAI_EMBEDDING_DEPLOYMENT_NAME})")
-print(f"Template Path: {TEMPLATE_PATH}")
-print(f"Output Path: {OUTPUT_PATH}")
-print(f"Vector Store Path: {PERSIST_DIRECTORY}")
-print(f"Workflow Logs Directory: {WORKFLOW_LOG_DIR}")
\ No newline at end of file
+# Vector index used for retrieval: "chroma" (float32 + HNSW) or "quantized" (see src/quantized_index.py,
+# exported with: python build_vector_store.py --export-quantized)
+RAG_INDEX_BACKEND = os.getenv("RAG_INDEX_BACKEND", "chroma").lower()
+QUANTIZED_INDEX_DIR = os.getenv("QUANTIZED_INDEX_DIR", os.path.join(PERSIST_DIRECTORY, "quantized"))
+# "int8" (per-vector scale, 4x smaller than float32) or "float16" (2x smaller)
+QUANTIZED_INDEX_DTYPE = os.getenv("QUANTIZED_INDEX_DTYPE", "int8").lower()
+# Rescore the top candidates with the exact float32 vectors (memory-mapped from disk)
+QUANTIZED_INDEX_RESCORE = os.getenv("QUANTIZED_INDEX_RESCORE", "true").lower() in ("1", "true", "yes")
+QUANTIZED_RESCORE_FACTOR = int(os.getenv("QUANTIZED_RESCORE_FACTOR", "4"))
+
+# --- Retrieval Context Assembly (see src/context_assembly.py) ---
+RAG_CONTEXT_ASSEMBLY_ENABLED = os.getenv("RAG_CONTEXT_ASSEMBLY_ENABLED", "true").lower() in ("1", "true", "yes")
+# Maximum tokens of retrieved context returned to the agent per retrieval call
+RAG_CONTEXT_TOKEN_BUDGET = int(os.getenv("RAG_CONTEXT_TOKEN_BUDGET", "1500"))
+# Candidates fetched by similarity before maximal marginal relevance (MMR) re-ranking
+RAG_FETCH_K = int(os.getenv("RAG_FETCH_K", "20"))
+# Chunks kept by MMR (packed in MMR order until the token budget is used up)
+RAG_MMR_K = int(os.getenv("RAG_MMR_K", "8"))
+# 1.0 = pure relevance, 0.0 = maximal diversity
+RAG_MMR_LAMBDA = float(os.getenv("RAG_MMR_LAMBDA", "0.5"))
+# Shared text between two chunks of the same source shorter than this is not treated as overlap
+RAG_MIN_OVERLAP_CHARS = int(os.getenv("RAG_MIN_OVERLAP_CHARS", "40"))
+
+# --- Chunking (see src/chunking.py) ---
+# Brief sections longer than this are split further (without overlap)
+CHUNK_MAX_SECTION_CHARS = int(os.getenv("CHUNK_MAX_SECTION_CHARS", "2000"))
+# Generic splitter settings for documents that are not structured briefs
+CHUNK_FALLBACK_SIZE = int(os.getenv("CHUNK_FALLBACK_SIZE", "1000"))
+CHUNK_FALLBACK_OVERLAP = int(os.getenv("CHUNK_FALLBACK_OVERLAP", "200"))
+
+# --- Document Ingestion (see src/ingestion.py) ---
+# Worker processes reading and splitting files (0 = split in the main process)
+INGEST_WORKERS = int(os.getenv("INGEST_WORKERS", str(min(8, os.cpu_count() or 1))))
+# Chunks embedded and written to the vector store per batch
+INGEST_BATCH_SIZE = int(os.getenv("INGEST_BATCH_SIZE", "256"))
+# Files submitted to the worker pool ahead of the writer (bounds memory use)
+INGEST_MAX_PENDING_FILES = int(os.getenv("INGEST_MAX_PENDING_FILES", "64"))
+# Progress manifest used to resume interrupted builds and skip unchanged files
+INGEST_MANIFEST_PATH = os.getenv("INGEST_MANIFEST_PATH", os.path.join(PERSIST_DIRECTORY, "ingest_manifest.sqlite"))
+
+# --- Near-Duplicate Detection (see src/dedup.py) ---
+DEDUP_ENABLED = os.getenv("DEDUP_ENABLED", "true").lower() in ("1", "true", "yes")
+# Minimum estimated Jaccard similarity (of 5-word shingles) for two chunks to be collapsed
+DEDUP_THRESHOLD = float(os.getenv("DEDUP_THRESHOLD", "0.8"))
+DEDUP_NUM_PERM = int(os.getenv("DEDUP_NUM_PERM", "64"))
+# LSH bands (DEDUP_NUM_PERM must be divisible by it)
+DEDUP_BANDS = int(os.getenv("DEDUP_BANDS", "16"))
+DEDUP_SHINGLE_SIZE = int(os.getenv("DEDUP_SHINGLE_SIZE", "5"))
+DEDUP_INDEX_PATH = os.getenv("DEDUP_INDEX_PATH", os.path.join(PERSIST_DIRECTORY, "dedup_index.sqlite"))
+
+# Log the specific endpoint details for clarity
+logger.info(
+    "Configuration loaded. Chat endpoint: %s (deployment: %s). Embedding endpoint: %s (deployment: %s). "
+    "Template: %s. Templates directory: %s. Output: %s. Vector store: %s. Workflow logs: %s.",
+    AZURE_OPENAI_CHAT_ENDPOINT, AZURE_OPENAI_CHAT_DEPLOYMENT_NAME,
+    AZURE_OPENAI_EMBEDDING_ENDPOINT, AZURE_OPENAI_EMBEDDING_DEPLOYMENT_NAME,
+    TEMPLATE_PATH, TEMPLATES_DIR, OUTPUT_PATH, PERSIST_DIRECTORY, WORKFLOW_LOG_DIR,
+)
\ No newline at end of file
@@ -0,0 +1,171 @@
+# src/context_assembly.py
+# Builds the retrieval context handed to the agents from vector store hits.
+#
+# Instead of joining the top-k chunks verbatim, the assembler:
+#   1. fetches RAG_FETCH_K candidates and re-ranks them with maximal marginal relevance
+#      (MMR), so near-identical chunks do not crowd out other relevant material,
+#   2. removes text that overlaps with an already selected chunk of the same source
+#      (chunks produced with a character overlap repeat the end of their neighbour),
+#   3. packs the chunks in MMR order until RAG_CONTEXT_TOKEN_BUDGET tokens are used.
+# Every call reports how many tokens were saved compared to joining all candidates: the
+# retrieve tool records the figures in the retrieved_context entry of the workflow state
+# and in the request's token profile (token_usage.retrieval of the API response).
+
+import logging
+from dataclasses import dataclass, field
+from typing import List, Optional
+
+from langchain_core.documents import Document
+
+from src.config import (
+    RAG_CONTEXT_TOKEN_BUDGET,
+    RAG_FETCH_K,
+    RAG_MMR_K,
+    RAG_MMR_LAMBDA,
+    RAG_MIN_OVERLAP_CHARS,
+)
+from src.tokens import count_tokens, truncate_to_tokens
+
+logger = logging.getLogger(__name__)
+
+CONTEXT_SEPARATOR = "\n\n---\n\n"
+
+
+@dataclass
+class AssembledContext:
+    """Result of one context assembly."""
+    text: str
+    documents: List[Document] = field(default_factory=list)  # Chunks included (possibly trimmed)
+    candidates: int = 0           # Chunks returned by the vector store
+    dropped: int = 0              # Candidates left out (duplicates or over budget)
+    raw_tokens: int = 0           # Tokens of all candidates joined verbatim
+    tokens: int = 0               # Tokens of the assembled context
+    overlap_chars_removed: int = 0
+
+    @property
+    def tokens_saved(self) -> int:
+        return max(0, self.raw_tokens - self.tokens)
+
+    def stats(self) -> dict:
+        """Token figures of this assembly (reported per retrieval)."""
+        return {
+            "chunks": len(self.documents),
+            "candidates": self.candidates,
+            "tokens": self.tokens,
+            "raw_tokens": self.raw_tokens,
+            "tokens_saved": self.tokens_saved,
+        }
+
+
+# --- Overlap Removal ---
+def _overlap_length(first: str, second: str, min_overlap: int) -> int:
+    """Length of the longest suffix of 'first' that is also a prefix of 'second' (0 if below min_overlap)."""
+    if len(first) < min_overlap or len(second) < min_overlap:
+        return 0
+    probe = second[:min_overlap]
+    best = 0
+    start = max(0, len(first) - len(second))
+    position = first.find(probe, start)
+    while position != -1:
+        length = len(first) - position
+        if second.startswith(first[position:]):
+            best = length  # Earliest match = longest overlap
+            break
+        position = first.find(probe, position + 1)
+    return best
+
+
+def remove_overlap(text: str, kept_texts: List[str], min_overlap: int = RAG_MIN_OVERLAP_CHARS) -> Optional[str]:
+    """
+    Trims the parts of 'text' already present in 'kept_texts' (chunks of the same source).
+
+    Returns:
+        The remaining text, or None if 'text' is entirely contained in a kept chunk.
+    """
+    for kept in kept_texts:
+        if len(text) >= min_overlap and text in kept:
+            return None
+        # 'text' continues a kept chunk: drop its leading overlap
+        overlap = _overlap_length(kept, text, min_overlap)
+        if overlap:
+            text = text[overlap:].lstrip()
+        # 'text' precedes a kept chunk: drop its trailing overlap
+        overlap = _overlap_length(text, kept, min_overlap)
+        if overlap:
+            text = text[:-overlap].rstrip()
+        if not text.strip():
+            return None
+    return text
+
+
+# --- Retrieval ---
+def _fetch_candidates(vector_store, query: str, k: int, fetch_k: int, lambda_mult: float) -> List[Document]:
+    """MMR search, falling back to plain similarity for stores that do not implement it."""
+    try:
+        return vector_store.max_marginal_relevance_search(query, k=k, fetch_k=max(fetch_k, k), lambda_mult=lambda_mult)
+    except NotImplementedError:
+        logger.debug("Vector store does not support MMR search. Using similarity search.")
+        return vector_store.similarity_search(query, k=k)
+
+
+def assemble_context(documents: List[Document], token_budget: int = RAG_CONTEXT_TOKEN_BUDGET,
+                     min_overlap: int = RAG_MIN_OVERLAP_CHARS) -> AssembledContext:
+    """
+    Deduplicates and packs ranked chunks into a context string.
+
+    Args:
+        documents: Chunks in rank order (most useful first).
+        token_budget: Maximum tokens of the returned context (0 = unlimited).
+        min_overlap: Minimum shared characters treated as overlap between chunks of the same source.
+
+    Returns:
+        AssembledContext with the context text and token statistics.
+    """
+    result = AssembledContext(text="", candidates=len(documents))
+    result.raw_tokens = count_tokens(CONTEXT_SEPARATOR.join(doc.page_content for doc in documents))
+    separator_tokens = count_tokens(CONTEXT_SEPARATOR)
+
+    kept_by_source = {}
+    parts = []
+    used_tokens = 0
+    for doc in documents:
+        source = doc.metadata.get("source")
+        kept = kept_by_source.setdefault(source, [])
+        text = remove_overlap(doc.page_content, kept, min_overlap) if source is not None else doc.page_content
+        if text is None:
+            result.overlap_chars_removed += len(doc.page_content)
+            result.dropped += 1
+            continue
+        result.overlap_chars_removed += len(doc.page_content) - len(text)
+
+        cost = count_tokens(text) + (separator_tokens if parts else 0)
+        if token_budget and used_tokens + cost > token_budget:
+            if parts:
+                # Smaller lower-ranked chunks may still fit
+                result.dropped += 1
+                continue
+            # Even the best chunk exceeds the budget: keep what fits of it
+            text = truncate_to_tokens(text, token_budget)
+            cost = count_tokens(text)
+
+        kept.append(doc.page_content)
+        parts.append(text)
+        used_tokens += cost
+        result.documents.append(Document(page_content=text, metadata=dict(doc.metadata)))
+
+    result.text = CONTEXT_SEPARATOR.join(parts)
+    result.tokens = count_tokens(result.text)
+    return result
+
+
+def retrieve_context(vector_store, query: str, k: int = RAG_MMR_K, fetch_k: int = RAG_FETCH_K,
+                     lambda_mult: float = RAG_MMR_LAMBDA, token_budget: int = RAG_CONTEXT_TOKEN_BUDGET) -> AssembledContext:
+    """Retrieves MMR-ranked chunks for 'query' and assembles them within the token budget."""
+    documents = _fetch_candidates(vector_store, query, k, fetch_k, lambda_mult)
+    assembled = assemble_context(documents, token_budget=token_budget)
+    logger.debug("Context assembly: %d/%d chunks, %d tokens (raw %d, saved %d, overlap chars removed %d, budget %d).",
+                 len(assembled.documents), assembled.candidates, assembled.tokens, assembled.raw_tokens,
+                 assembled.tokens_saved, assembled.overlap_chars_removed, token_budget,
+                 extra={"event": "context_assembled", "stage": "retrieve"})
+    return assembled
+
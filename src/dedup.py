@@ -0,0 +1,278 @@
+# src/dedup.py
+# Near-duplicate detection for indexing (MinHash signatures + LSH banding).
+#
+# Historical briefs contain many near-identical copies (the same campaign re-run per
+# region or quarter). During ingestion every chunk gets a MinHash signature of its word
+# shingles; LSH buckets find earlier chunks that are probably similar and the estimated
+# Jaccard similarity confirms them. A near-duplicate chunk is not embedded: its source is
+# added to the provenance metadata ("duplicate_sources", "duplicate_count") of the
+# representative chunk that is indexed. Whole documents are tracked the same way.
+#
+# Signatures are persisted in SQLite next to the vector store, so incremental builds keep
+# deduplicating against chunks indexed by earlier runs. Lookups query the SQLite tables
+# instead of holding all signatures in memory.
+
+import hashlib
+import logging
+import os
+import re
+import sqlite3
+import threading
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+
+from src.config import (
+    DEDUP_THRESHOLD,
+    DEDUP_NUM_PERM,
+    DEDUP_BANDS,
+    DEDUP_SHINGLE_SIZE,
+)
+
+logger = logging.getLogger(__name__)
+
+_MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+_MAX_HASH = np.uint64((1 << 32) - 1)
+_WORD_REGEX = re.compile(r"[0-9a-z]+")
+
+DUPLICATE_SOURCES_SEPARATOR = ";"
+
+
+# --- Signatures ---
+def _shingle_hashes(text: str, shingle_size: int) -> np.ndarray:
+    """Stable 32-bit hashes of the word n-grams of a text (blake2b, independent of PYTHONHASHSEED)."""
+    words = _WORD_REGEX.findall(text.lower())
+    if len(words) <= shingle_size:
+        shingles = {" ".join(words)}
+    else:
+        shingles = {" ".join(words[i:i + shingle_size]) for i in range(len(words) - shingle_size + 1)}
+    return np.fromiter(
+        (int.from_bytes(hashlib.blake2b(s.encode("utf-8"), digest_size=4).digest(), "little") for s in shingles),
+        dtype=np.uint64,
+        count=len(shingles),
+    )
+
+
+class MinHasher:
+    """
+    Computes MinHash signatures with 'num_perm' universal hash permutations (a * x + b mod p).
+    The permutations are derived from a fixed seed, so signatures are comparable across runs and processes.
+    """
+
+    def __init__(self, num_perm: int = DEDUP_NUM_PERM, shingle_size: int = DEDUP_SHINGLE_SIZE, seed: int = 1):
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        generator = np.random.RandomState(seed)
+        # a, b < 2**32 so that a * x + b stays below 2**64 for 32-bit x
+        self._a = generator.randint(1, 1 << 32, size=num_perm, dtype=np.uint64)
+        self._b = generator.randint(0, 1 << 32, size=num_perm, dtype=np.uint64)
+
+    def signature(self, text: str) -> np.ndarray:
+        hashes = _shingle_hashes(text, self.shingle_size)
+        if hashes.size == 0:
+            return np.full(self.num_perm, _MAX_HASH, dtype=np.uint32)
+        permuted = (np.outer(hashes, self._a) + self._b) % _MERSENNE_PRIME & _MAX_HASH
+        return permuted.min(axis=0).astype(np.uint32)
+
+
+def estimated_jaccard(first: np.ndarray, second: np.ndarray) -> float:
+    return float(np.count_nonzero(first == second)) / len(first)
+
+
+# --- LSH Index ---
+class NearDuplicateIndex:
+    """
+    LSH index of MinHash signatures for one kind of item ("chunks" or "documents"), kept in SQLite
+    (items, LSH band keys and duplicate sources in indexed tables), so memory use does not grow with
+    the corpus: a lookup reads only the candidates sharing a band with the signature.
+
+    Args:
+        connection: SQLite connection holding the tables.
+        kind: Table name prefix.
+        schema: Database of the connection holding the tables ("main" or the name it is attached as).
+        threshold: Minimum estimated Jaccard similarity for a near-duplicate.
+        bands: LSH bands (num_perm must be divisible by it); more bands find less similar candidates.
+    """
+
+    def __init__(self, connection: sqlite3.Connection, kind: str, schema: str = "main", num_perm: int = DEDUP_NUM_PERM,
+                 threshold: float = DEDUP_THRESHOLD, bands: int = DEDUP_BANDS):
+        if num_perm % bands:
+            raise ValueError(f"DEDUP_NUM_PERM ({num_perm}) must be divisible by DEDUP_BANDS ({bands}).")
+        self.connection = connection
+        self.kind = kind
+        self.schema = schema
+        self.table = f"{schema}.{kind}"
+        self.num_perm = num_perm
+        self.threshold = threshold
+        self.bands = bands
+        self.rows = num_perm // bands
+        self._lock = threading.Lock()
+        self._setup()
+
+    def _band_keys(self, signature: np.ndarray):
+        for band in range(self.bands):
+            yield band, signature[band * self.rows:(band + 1) * self.rows].tobytes()
+
+    def _setup(self):
+        table = self.table
+        execute = self.connection.execute
+        execute(f"CREATE TABLE IF NOT EXISTS {table} (item_id TEXT PRIMARY KEY, source TEXT NOT NULL, signature BLOB NOT NULL)")
+        execute(f"CREATE INDEX IF NOT EXISTS {table}_source ON {self.kind} (source)")
+        execute(f"CREATE TABLE IF NOT EXISTS {table}_bands (band INTEGER NOT NULL, key BLOB NOT NULL, item_id TEXT NOT NULL)")
+        execute(f"CREATE INDEX IF NOT EXISTS {table}_bands_key ON {self.kind}_bands (band, key)")
+        execute(f"CREATE INDEX IF NOT EXISTS {table}_bands_item ON {self.kind}_bands (item_id)")
+        execute(f"CREATE TABLE IF NOT EXISTS {table}_duplicates (item_id TEXT NOT NULL, source TEXT NOT NULL, "
+                "PRIMARY KEY (item_id, source))")
+        execute(f"CREATE INDEX IF NOT EXISTS {table}_duplicates_source ON {self.kind}_duplicates (source)")
+        execute(f"CREATE TABLE IF NOT EXISTS {self.schema}.lsh_settings (kind TEXT PRIMARY KEY, num_perm INTEGER, bands INTEGER)")
+        columns = [row[1] for row in execute(f"PRAGMA {self.schema}.table_info({self.kind})")]
+        if "duplicate_sources" in columns:
+            # Index written before duplicates had a table of their own: move them (the old column stays empty)
+            rows = execute(f"SELECT item_id, duplicate_sources FROM {table} WHERE duplicate_sources != ''").fetchall()
+            self.connection.executemany(f"INSERT OR IGNORE INTO {table}_duplicates (item_id, source) VALUES (?, ?)",
+                                        [(item_id, source) for item_id, duplicates in rows
+                                         for source in duplicates.split(DUPLICATE_SOURCES_SEPARATOR) if source])
+            execute(f"UPDATE {table} SET duplicate_sources = '' WHERE duplicate_sources != ''")
+        settings = execute(f"SELECT num_perm, bands FROM {self.schema}.lsh_settings WHERE kind = ?", (self.kind,)).fetchone()
+        if settings != (self.num_perm, self.bands):
+            self._rebuild_bands()
+        self.connection.commit()
+
+    def _rebuild_bands(self):
+        """(Re)computes the band keys, e.g. after DEDUP_BANDS changed. Signatures of another DEDUP_NUM_PERM are dropped."""
+        table = self.table
+        self.connection.execute(f"DELETE FROM {table}_bands")
+        for item_id, blob in self.connection.execute(f"SELECT item_id, signature FROM {table}").fetchall():
+            signature = np.frombuffer(blob, dtype=np.uint32)
+            if len(signature) != self.num_perm:
+                self._delete_item(item_id)
+                continue
+            self._insert_bands(item_id, signature)
+        self.connection.execute(f"INSERT OR REPLACE INTO {self.schema}.lsh_settings (kind, num_perm, bands) VALUES (?, ?, ?)",
+                                (self.kind, self.num_perm, self.bands))
+
+    def _insert_bands(self, item_id: str, signature: np.ndarray):
+        self.connection.executemany(f"INSERT INTO {self.table}_bands (band, key, item_id) VALUES (?, ?, ?)",
+                                    [(band, key, item_id) for band, key in self._band_keys(signature)])
+
+    def _delete_item(self, item_id: str):
+        for table in (self.table, f"{self.table}_bands", f"{self.table}_duplicates"):
+            self.connection.execute(f"DELETE FROM {table} WHERE item_id = ?", (item_id,))
+
+    def _duplicate_sources(self, item_id: str) -> List[str]:
+        return [source for (source,) in self.connection.execute(
+            f"SELECT source FROM {self.table}_duplicates WHERE item_id = ? ORDER BY rowid", (item_id,))]
+
+    def __len__(self):
+        with self._lock:
+            return self.connection.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()[0]
+
+    def find(self, signature: np.ndarray, exclude_source: Optional[str] = None) -> Optional[str]:
+        """Returns the id of the most similar indexed item at or above the threshold (items of 'exclude_source' are ignored)."""
+        with self._lock:
+            candidates = set()
+            for band, key in self._band_keys(signature):
+                candidates.update(item_id for (item_id,) in self.connection.execute(
+                    f"SELECT item_id FROM {self.table}_bands WHERE band = ? AND key = ?", (band, key)))
+            best_id, best_similarity = None, self.threshold
+            for item_id in sorted(candidates):
+                row = self.connection.execute(f"SELECT source, signature FROM {self.table} WHERE item_id = ?", (item_id,)).fetchone()
+                if row is None or (exclude_source is not None and row[0] == exclude_source):
+                    continue
+                similarity = estimated_jaccard(signature, np.frombuffer(row[1], dtype=np.uint32))
+                if similarity >= best_similarity:
+                    best_id, best_similarity = item_id, similarity
+            return best_id
+
+    def add(self, item_id: str, source: str, signature: np.ndarray):
+        """Registers an indexed (representative) item."""
+        with self._lock:
+            self._delete_item(item_id)
+            self.connection.execute(f"INSERT INTO {self.table} (item_id, source, signature) VALUES (?, ?, ?)",
+                                    (item_id, source, signature.astype(np.uint32).tobytes()))
+            self._insert_bands(item_id, signature)
+
+    def add_duplicate(self, item_id: str, source: str) -> List[str]:
+        """Records 'source' as containing a near-duplicate of 'item_id'. Returns its duplicate sources."""
+        with self._lock:
+            self.connection.execute(f"INSERT OR IGNORE INTO {self.table}_duplicates (item_id, source) VALUES (?, ?)",
+                                    (item_id, source))
+            return self._duplicate_sources(item_id)
+
+    def forget_sources(self, sources: Iterable[str]) -> Tuple[Set[str], Dict[str, List[str]]]:
+        """
+        Removes the items of changed/deleted sources and their mentions as duplicates.
+
+        Returns:
+            (sources whose content had been collapsed into a removed item and must be indexed again,
+             item id -> remaining duplicate sources for representatives whose provenance changed)
+        """
+        sources = set(sources)
+        orphaned, changed_ids = set(), set()
+        with self._lock:
+            for source in sources:
+                for (item_id,) in self.connection.execute(f"SELECT item_id FROM {self.table} WHERE source = ?", (source,)).fetchall():
+                    orphaned.update(self._duplicate_sources(item_id))
+                    self._delete_item(item_id)
+            for source in sources:
+                changed_ids.update(item_id for (item_id,) in self.connection.execute(
+                    f"SELECT item_id FROM {self.table}_duplicates WHERE source = ?", (source,)).fetchall())
+                self.connection.execute(f"DELETE FROM {self.table}_duplicates WHERE source = ?", (source,))
+            changed = {item_id: self._duplicate_sources(item_id) for item_id in changed_ids}
+        return orphaned - sources, changed
+
+
+def provenance_metadata(duplicate_sources: List[str]) -> dict:
+    """Vector store metadata describing the sources collapsed into a representative (scalar values only)."""
+    return {
+        "duplicate_sources": DUPLICATE_SOURCES_SEPARATOR.join(duplicate_sources),
+        "duplicate_count": len(duplicate_sources),
+    }
+
+
+class DedupStore:
+    """
+    Chunk and document near-duplicate indexes sharing one SQLite file.
+
+    Args:
+        path: SQLite file of the index (None = in-memory only).
+        connection: Connection to attach the file to (as 'dedup'), so that its changes are committed or
+            rolled back in the same transaction as the caller's tables (the ingestion manifest).
+            Without it, the store opens a connection of its own.
+    """
+
+    def __init__(self, path: Optional[str] = None, connection: Optional[sqlite3.Connection] = None):
+        self.path = path
+        if path:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._owns_connection = connection is None
+        if connection is None:
+            # Without a path the index lives in an in-memory database (nothing persisted)
+            self.connection, schema = sqlite3.connect(path or ":memory:"), "main"
+        else:
+            connection.execute("ATTACH DATABASE ? AS dedup", (path or ":memory:",))
+            self.connection, schema = connection, "dedup"
+        self.hasher = MinHasher()
+        self.chunks = NearDuplicateIndex(self.connection, "chunks", schema)
+        self.documents = NearDuplicateIndex(self.connection, "documents", schema)
+        logger.info("Near-duplicate index opened: %d chunk(s), %d document(s).", len(self.chunks), len(self.documents))
+
+    def commit(self):
+        if self.connection is not None:
+            self.connection.commit()
+
+    def rollback(self):
+        """Discards the changes since the last commit."""
+        if self.connection is not None:
+            self.connection.rollback()
+
+    def close(self):
+        """Closes the store without committing (commit() first to keep pending changes)."""
+        if self.connection is None:
+            return
+        if self._owns_connection:
+            self.connection.close()
+        else:
+            self.connection.rollback()
+            self.connection.execute("DETACH DATABASE dedup")
+        self.connection = None
@@ -0,0 +1,491 @@
+# src/ingestion.py
+# Streaming, resumable ingestion of source documents into the vector store.
+#
+# Files are discovered lazily, read and split into chunks by a pool of worker processes
+# and written to the vector store in fixed-size batches, so memory use depends on the
+# batch size and the number of files in flight, not on the size of the corpus.
+#
+# Chunks get deterministic ids (see src.chunking.chunk_id) and a SQLite manifest records
+# every file whose chunks are fully written (with its mtime and size). An interrupted
+# build resumes where it stopped, unchanged files are skipped, changed files replace
+# their chunks and chunks of deleted files are removed. The manifest is queried per file
+# and updated row by row, so neither it nor the error list is held in memory as a whole.
+#
+# With DEDUP_ENABLED, near-duplicate chunks are collapsed into one representative chunk
+# carrying the other sources as provenance metadata (see src/dedup.py). The near-duplicate
+# index is attached to the manifest's connection: its rows and the manifest entries are
+# committed in one transaction, only at points where every file added so far has all its
+# chunks in the vector store (the partial batch is written first). A failed build rolls
+# back to the last such point, so no signature outlives the chunks it stands for.
+
+import json
+import logging
+import multiprocessing
+import os
+import re
+import sqlite3
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from langchain_core.documents import Document
+
+from src.chunking import chunk_id, split_brief_document
+from src.config import (
+    INGEST_WORKERS,
+    INGEST_BATCH_SIZE,
+    INGEST_MAX_PENDING_FILES,
+    INGEST_MANIFEST_PATH,
+    DEDUP_ENABLED,
+    DEDUP_INDEX_PATH,
+)
+from src.dedup import DedupStore, MinHasher, provenance_metadata
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_VERSION = 1  # Of the JSON manifests written by earlier versions (imported once)
+MANIFEST_COMMIT_INTERVAL_SECONDS = 5.0  # Manifest rows of completed files are committed at most this often
+MAX_RECORDED_ERRORS = 100  # Errors kept in IngestionStats.errors (files_failed counts all of them)
+SOURCE_FILE_PATTERN = re.compile(r".*\.txt$", re.IGNORECASE)
+_BRAND_LINE_REGEX = re.compile(r"^\s*Brand\s*:\s*(.+?)\s*$", re.IGNORECASE)
+
+
+@dataclass
+class IngestionStats:
+    files_seen: int = 0
+    files_skipped: int = 0      # Unchanged since the last build
+    files_indexed: int = 0
+    files_failed: int = 0
+    files_removed: int = 0      # Deleted from disk, chunks removed from the store
+    files_duplicate: int = 0    # Near-duplicates of an already indexed document
+    chunks_written: int = 0
+    chunks_collapsed: int = 0   # Near-duplicate chunks recorded as provenance instead of embedded
+    batches: int = 0
+    seconds: float = 0.0
+    errors: List[str] = field(default_factory=list)  # The first MAX_RECORDED_ERRORS errors
+
+    def record_error(self, message: str):
+        self.files_failed += 1
+        if len(self.errors) < MAX_RECORDED_ERRORS:
+            self.errors.append(message)
+
+
+# --- Discovery ---
+def iter_source_files(directories: Iterable[str]) -> Iterator[str]:
+    """Yields the .txt files below the given directories in a stable (sorted) order."""
+    for directory in directories:
+        if not os.path.isdir(directory):
+            logger.warning("Source directory not found at '%s'. Skipping.", directory)
+            continue
+        for root, dirs, files in os.walk(directory):
+            dirs.sort()
+            for name in sorted(files):
+                if SOURCE_FILE_PATTERN.match(name):
+                    yield os.path.join(root, name)
+
+
+def scan_known_brands(directories: Iterable[str]) -> List[str]:
+    """Collects brand names from 'Brand:' lines, reading the files line by line."""
+    brands = []
+    for path in iter_source_files(directories):
+        try:
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    match = _BRAND_LINE_REGEX.match(line)
+                    if match and match.group(1) not in brands:
+                        brands.append(match.group(1))
+        except (OSError, UnicodeDecodeError) as e:
+            logger.warning("Could not scan '%s' for brands: %s", path, e)
+    return brands
+
+
+# --- Worker ---
+_worker_hasher = None
+
+
+def load_and_split_file(path: str, known_brands: Tuple[str, ...], with_signatures: bool = False):
+    """
+    Reads one file and splits it into chunks (runs in a worker process).
+
+    Returns:
+        (chunks, signatures): chunks as (page_content, metadata) tuples (plain tuples keep
+        inter-process traffic small); signatures = (document MinHash, [chunk MinHashes]) or None.
+    """
+    global _worker_hasher
+    with open(path, encoding="utf-8") as f:
+        text = f.read()
+    chunks = split_brief_document(Document(page_content=text, metadata={"source": path}), known_brands)
+    signatures = None
+    if with_signatures:
+        if _worker_hasher is None:
+            _worker_hasher = MinHasher()
+        signatures = (_worker_hasher.signature(text), [_worker_hasher.signature(chunk.page_content) for chunk in chunks])
+    return [(chunk.page_content, chunk.metadata) for chunk in chunks], signatures
+
+
+def _pool_context():
+    # Forked workers inherit the already initialized modules; spawned workers would
+    # re-run the src package initialization (LLM clients, vector store) in every process.
+    if "fork" in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context("fork")
+    return None
+
+
+# --- Manifest ---
+class IngestManifest:
+    """
+    Files already indexed (source path -> {"mtime_ns", "size", "chunks", ...}) in a SQLite table.
+
+    Args:
+        path: SQLite file. A JSON manifest of an earlier version next to it (same name, .json) is imported once.
+    """
+
+    def __init__(self, path: str = INGEST_MANIFEST_PATH):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.connection = sqlite3.connect(path)
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS files (path TEXT PRIMARY KEY, mtime_ns INTEGER, size INTEGER, "
+            "chunks INTEGER NOT NULL DEFAULT 0, details TEXT NOT NULL DEFAULT '{}')"
+        )
+        self._import_json(os.path.splitext(path)[0] + ".json")
+        self.connection.commit()
+
+    def _import_json(self, json_path: str):
+        if json_path == self.path or not os.path.exists(json_path):
+            return
+        try:
+            with open(json_path, encoding="utf-8") as f:
+                manifest = json.load(f)
+            if manifest.get("version") == MANIFEST_VERSION:
+                for path, entry in manifest.get("files", {}).items():
+                    self.put(path, entry)
+                logger.info("Imported %d file(s) from the JSON ingestion manifest '%s'.", len(manifest.get("files", {})), json_path)
+            else:
+                logger.warning("Ingestion manifest '%s' has an old format. Ignoring it.", json_path)
+            os.replace(json_path, json_path + ".imported")
+        except (OSError, ValueError) as e:
+            logger.warning("Could not import ingestion manifest '%s': %s", json_path, e)
+
+    def __len__(self):
+        return self.connection.execute("SELECT COUNT(*) FROM files").fetchone()[0]
+
+    def __contains__(self, path: str) -> bool:
+        return self.connection.execute("SELECT 1 FROM files WHERE path = ?", (path,)).fetchone() is not None
+
+    def get(self, path: str) -> Optional[dict]:
+        row = self.connection.execute("SELECT mtime_ns, size, chunks, details FROM files WHERE path = ?", (path,)).fetchone()
+        if row is None:
+            return None
+        return {"mtime_ns": row[0], "size": row[1], "chunks": row[2], **json.loads(row[3])}
+
+    def put(self, path: str, entry: dict):
+        details = {key: value for key, value in entry.items() if key not in ("mtime_ns", "size", "chunks")}
+        self.connection.execute(
+            "INSERT OR REPLACE INTO files (path, mtime_ns, size, chunks, details) VALUES (?, ?, ?, ?, ?)",
+            (path, entry.get("mtime_ns"), entry.get("size"), entry.get("chunks", 0), json.dumps(details)),
+        )
+
+    def pop(self, path: str, default: Optional[dict] = None) -> Optional[dict]:
+        entry = self.get(path)
+        if entry is None:
+            return default
+        self.connection.execute("DELETE FROM files WHERE path = ?", (path,))
+        return entry
+
+    def signatures(self) -> Iterator[Tuple[str, Optional[int], Optional[int]]]:
+        """(path, mtime_ns, size) of every indexed file, read in pages."""
+        last = ""
+        while True:
+            rows = self.connection.execute("SELECT path, mtime_ns, size FROM files WHERE path > ? ORDER BY path LIMIT 1000",
+                                           (last,)).fetchall()
+            if not rows:
+                return
+            yield from rows
+            last = rows[-1][0]
+
+    def commit(self):
+        self.connection.commit()
+
+    def rollback(self):
+        self.connection.rollback()
+
+    def close(self):
+        """Closes the manifest without committing (commit() first to keep pending changes)."""
+        self.connection.close()
+
+
+def _file_signature(path: str) -> dict:
+    stat = os.stat(path)
+    return {"mtime_ns": stat.st_mtime_ns, "size": stat.st_size}
+
+
+# --- Pipeline ---
+class _BatchWriter:
+    """Buffers chunks and writes them to the vector store in batches; tracks which files are complete."""
+
+    def __init__(self, vector_store, manifest: IngestManifest, batch_size: int, stats: IngestionStats,
+                 dedup: Optional[DedupStore] = None):
+        self.vector_store = vector_store
+        self.manifest = manifest
+        self.dedup = dedup
+        self.buffered: Dict[str, Document] = {}        # Chunk id -> Document not yet written
+        self.provenance_updates: Dict[str, List[str]] = {}  # Written chunk id -> duplicate sources
+        self.batch_size = max(1, batch_size)
+        self.stats = stats
+        self.buffer: List[Document] = []
+        self.buffer_ids: List[str] = []
+        self.pending_files = deque()  # (path, manifest entry) of files added since the last commit
+        self.last_commit = time.monotonic()
+
+    def add_file(self, path: str, signature: dict, chunks: List[Tuple[str, dict]], signatures=None):
+        entry = {**signature, "chunks": len(chunks)}
+        if self.dedup is not None and signatures is not None:
+            entry.update(self._dedup_document(path, signatures[0]))
+        collapsed = 0
+        for index, (page_content, metadata) in enumerate(chunks):
+            item_id = chunk_id(path, metadata.get("chunk_index", index))
+            if self.dedup is not None and signatures is not None:
+                representative = self.dedup.chunks.find(signatures[1][index], exclude_source=path)
+                if representative is not None:
+                    self._record_duplicate(representative, path)
+                    collapsed += 1
+                    continue
+                self.dedup.chunks.add(item_id, path, signatures[1][index])
+            document = Document(page_content=page_content, metadata=metadata)
+            self.buffer.append(document)
+            self.buffer_ids.append(item_id)
+            self.buffered[item_id] = document
+        if collapsed:
+            entry["collapsed"] = collapsed
+            self.stats.chunks_collapsed += collapsed
+        self.pending_files.append((path, entry))
+        while len(self.buffer) >= self.batch_size:
+            self._write(self.batch_size)
+        self._commit_files()
+
+    def flush(self):
+        self._commit_files(force=True)
+
+    # --- Near-duplicates ---
+    def _dedup_document(self, path: str, document_signature) -> dict:
+        representative = self.dedup.documents.find(document_signature, exclude_source=path)
+        if representative is None:
+            self.dedup.documents.add(path, path, document_signature)
+            return {}
+        self.dedup.documents.add_duplicate(representative, path)
+        self.stats.files_duplicate += 1
+        logger.info("Ingestion: '%s' is a near-duplicate of '%s'.", path, representative)
+        return {"duplicate_of": representative}
+
+    def _record_duplicate(self, representative: str, path: str):
+        duplicate_sources = self.dedup.chunks.add_duplicate(representative, path)
+        document = self.buffered.get(representative)
+        if document is not None:
+            # Not embedded yet: the provenance is written together with the chunk
+            document.metadata.update(provenance_metadata(duplicate_sources))
+        else:
+            self.provenance_updates[representative] = duplicate_sources
+
+    def _apply_provenance_updates(self):
+        if not self.provenance_updates:
+            return
+        updates, self.provenance_updates = self.provenance_updates, {}
+        update_provenance(self.vector_store, updates)
+
+    def _write(self, count: int):
+        documents, ids = self.buffer[:count], self.buffer_ids[:count]
+        del self.buffer[:count]
+        del self.buffer_ids[:count]
+        for item_id in ids:
+            self.buffered.pop(item_id, None)
+        # Embeds the batch and upserts it (ids are deterministic, so repeating a batch is harmless)
+        self.vector_store.add_documents(documents, ids=ids)
+        self.stats.chunks_written += count
+        self.stats.batches += 1
+        logger.info("Ingestion: wrote batch %d (%d chunks, %d total).", self.stats.batches, count, self.stats.chunks_written)
+        self._apply_provenance_updates()
+
+    def _commit_files(self, force: bool = False):
+        """
+        Records the completed files in the manifest and commits it together with the near-duplicate rows.
+        Runs every MANIFEST_COMMIT_INTERVAL_SECONDS: the partial batch is written first, so that every
+        file whose signatures are committed has all of its chunks in the store.
+        """
+        if not force and time.monotonic() - self.last_commit < MANIFEST_COMMIT_INTERVAL_SECONDS:
+            return
+        if self.buffer:
+            self._write(len(self.buffer))
+        self._apply_provenance_updates()
+        while self.pending_files:
+            path, entry = self.pending_files.popleft()
+            self.manifest.put(path, entry)
+            self.stats.files_indexed += 1
+        # Same connection: commits the near-duplicate index as well
+        self.manifest.commit()
+        self.last_commit = time.monotonic()
+
+
+def _delete_chunks(vector_store, path: str, chunk_count: int):
+    if chunk_count:
+        vector_store.delete(ids=[chunk_id(path, i) for i in range(chunk_count)])
+
+
+def update_provenance(vector_store, updates: Dict[str, List[str]]):
+    """Rewrites the duplicate provenance metadata of already indexed chunks (without re-embedding them)."""
+    collection = getattr(vector_store, "_collection", None)
+    if collection is None:
+        logger.warning("Vector store does not expose its collection. Provenance metadata not updated.")
+        return
+    ids = list(updates)
+    existing = collection.get(ids=ids, include=["metadatas"])
+    metadatas = []
+    found_ids = []
+    for item_id, metadata in zip(existing["ids"], existing["metadatas"]):
+        found_ids.append(item_id)
+        metadatas.append({**(metadata or {}), **provenance_metadata(updates[item_id])})
+    if found_ids:
+        collection.update(ids=found_ids, metadatas=metadatas)
+
+
+def _remove_stale_files(vector_store, manifest: IngestManifest, dedup: Optional[DedupStore], stats: IngestionStats):
+    """
+    Removes the chunks of indexed files that were changed or deleted since the last build.
+    Files whose content had been collapsed into a removed representative are indexed again.
+    """
+    stale = set()
+    for path, mtime_ns, size in manifest.signatures():
+        try:
+            signature = _file_signature(path)
+        except OSError:
+            stale.add(path)
+            stats.files_removed += 1
+            continue
+        if (mtime_ns, size) != (signature["mtime_ns"], signature["size"]):
+            stale.add(path)
+
+    removed = set()
+    while stale:
+        for path in stale:
+            entry = manifest.pop(path, None)
+            if entry:
+                _delete_chunks(vector_store, path, entry.get("chunks", 0))
+        removed |= stale
+        if dedup is None:
+            break
+        orphaned, changed = dedup.chunks.forget_sources(stale)
+        orphaned_documents, _ = dedup.documents.forget_sources(stale)
+        if changed:
+            update_provenance(vector_store, changed)
+        # Their own chunks may have absorbed other files in turn: repeat until nothing is left
+        stale = (orphaned | orphaned_documents) - removed
+    # One transaction with the near-duplicate index (attached to the manifest's connection)
+    manifest.commit()
+    if removed:
+        logger.info("Ingestion: removed the chunks of %d changed, deleted or re-elected file(s).", len(removed))
+
+
+def ingest_directories(vector_store, directories: List[str], brand_directories: Optional[List[str]] = None,
+                       workers: int = INGEST_WORKERS, batch_size: int = INGEST_BATCH_SIZE,
+                       max_pending_files: int = INGEST_MAX_PENDING_FILES,
+                       manifest_path: str = INGEST_MANIFEST_PATH, dedup: bool = DEDUP_ENABLED,
+                       dedup_path: str = DEDUP_INDEX_PATH) -> IngestionStats:
+    """
+    Indexes all .txt files below 'directories' into 'vector_store', resuming from the manifest.
+
+    Args:
+        vector_store: LangChain vector store (add_documents with ids must upsert, delete by ids).
+        directories: Source directories.
+        brand_directories: Directories scanned for 'Brand:' lines used to tag briefs (default: all sources).
+        workers: Worker processes for reading/splitting (0 = in-process).
+        batch_size: Chunks per add_documents call.
+        max_pending_files: Files submitted ahead of the writer.
+        manifest_path: Progress manifest (SQLite) location.
+        dedup: Collapse near-duplicate chunks into a representative with provenance metadata.
+        dedup_path: SQLite file of the near-duplicate index.
+
+    Returns:
+        IngestionStats of the run.
+    """
+    started = time.monotonic()
+    stats = IngestionStats()
+    manifest = IngestManifest(manifest_path)
+    logger.info("Ingestion manifest: %d file(s) already indexed.", len(manifest))
+
+    known_brands = tuple(scan_known_brands(brand_directories if brand_directories is not None else directories))
+    logger.info("Known brands: %s", list(known_brands))
+
+    dedup_store = DedupStore(dedup_path, connection=manifest.connection) if dedup else None
+    # Changed and deleted files first, so their chunks do not act as representatives
+    _remove_stale_files(vector_store, manifest, dedup_store, stats)
+
+    writer = _BatchWriter(vector_store, manifest, batch_size, stats, dedup=dedup_store)
+
+    def files_to_index():
+        for path in iter_source_files(directories):
+            stats.files_seen += 1
+            if path in manifest:  # Unchanged (stale entries were removed above)
+                stats.files_skipped += 1
+                continue
+            try:
+                signature = _file_signature(path)
+            except OSError as e:
+                logger.warning("Could not stat '%s': %s", path, e)
+                continue
+            yield path, signature
+
+    def handle(path, signature, result=None, error=None):
+        if error is not None:
+            stats.record_error(f"{path}: {error}")
+            logger.error("ERROR reading/splitting '%s': %s", path, error)
+            return
+        chunks, signatures = result
+        writer.add_file(path, signature, chunks, signatures)
+
+    try:
+        if workers and workers > 0:
+            with ProcessPoolExecutor(max_workers=workers, mp_context=_pool_context()) as executor:
+                in_flight = deque()
+                for path, signature in files_to_index():
+                    in_flight.append((path, signature, executor.submit(load_and_split_file, path, known_brands, dedup)))
+                    # Results are consumed in submission order so the manifest advances monotonically
+                    while len(in_flight) >= max(1, max_pending_files):
+                        _drain_one(in_flight, handle)
+                while in_flight:
+                    _drain_one(in_flight, handle)
+        else:
+            for path, signature in files_to_index():
+                try:
+                    handle(path, signature, load_and_split_file(path, known_brands, dedup))
+                except (OSError, UnicodeDecodeError, ValueError) as e:
+                    handle(path, signature, error=e)
+        writer.flush()
+    except BaseException:
+        # Back to the last commit: the manifest entries and signatures of files whose chunks were all
+        # written are kept; files added since are indexed again by the next run
+        manifest.rollback()
+        raise
+    finally:
+        if dedup_store is not None:
+            dedup_store.close()
+        manifest.close()
+
+    stats.seconds = time.monotonic() - started
+    logger.info("Ingestion finished in %.1fs: %d indexed, %d unchanged, %d failed, %d removed, %d near-duplicate; "
+                "%d chunks in %d batches, %d duplicate chunks collapsed.",
+                stats.seconds, stats.files_indexed, stats.files_skipped, stats.files_failed, stats.files_removed,
+                stats.files_duplicate, stats.chunks_written, stats.batches, stats.chunks_collapsed,
+                extra={"duration_ms": round(stats.seconds * 1000, 1)})
+    return stats
+
+
+def _drain_one(in_flight, handle):
+    path, signature, future = in_flight.popleft()
+    try:
+        result = future.result()
+    except (OSError, UnicodeDecodeError, ValueError) as e:
+        handle(path, signature, error=e)
+        return
+    handle(path, signature, result)
@@ -1,8 +1,10 @@
 # src/llm.py
 
+import logging
 import os
-# Assuming the primary LLM class used in app copy.py was AzureChatOpenAI from langchain_openai
-from langchain_openai import AzureChatOpenAI, AzureOpenAIEmbeddings
+# Rate-limited subclasses of AzureChatOpenAI / AzureOpenAIEmbeddings from langchain_openai
+# (see src/rate_limiter.py for the process-wide RPM/TPM scheduler)
+from src.llm_clients import RateLimitedAzureChatOpenAI, RateLimitedAzureOpenAIEmbeddings
 # Import config for environment variables
 from src.config import (
     AZURE_OPENAI_CHAT_ENDPOINT,
@@ -12,44 +14,99 @@ from src.config import (
     AZURE_OPENAI_EMBEDDING_ENDPOINT,
     OPENAI_API_KEY_EMBEDDING,
     AZURE_OPENAI_EMBEDDING_DEPLOYMENT_NAME,
-    OPENAI_API_VERSION_EMBEDDING # Use the versions from config
+    OPENAI_API_VERSION_EMBEDDING, # Use the versions from config
+    CHAT_MODEL_ROLES,
+    CHAT_MODEL_CONFIGS,
 )
+from src.rate_limiter import chat_rate_limiter_for
 
-print("Initializing Azure OpenAI LLM and Embeddings...")
+logger = logging.getLogger(__name__)
+logger.debug("Initializing Azure OpenAI LLM and Embeddings...")
 
 # --- Initialize Azure OpenAI Chat Model ---
 llm = None # Initialize to None
 try:
     # Check config variables
     if not all([AZURE_OPENAI_CHAT_ENDPOINT, OPENAI_API_KEY_CHAT, AZURE_OPENAI_CHAT_DEPLOYMENT_NAME]):
-         print("Warning: Chat model configuration is incomplete in config. Skipping chat model initialization.")
+         logger.warning("Chat model configuration is incomplete in config. Skipping chat model initialization.")
     else:
         # Initialize using config variables
-        llm = AzureChatOpenAI(
+        llm = RateLimitedAzureChatOpenAI(
             azure_endpoint=AZURE_OPENAI_CHAT_ENDPOINT,
             api_key=OPENAI_API_KEY_CHAT,
             model=AZURE_OPENAI_CHAT_DEPLOYMENT_NAME,
             api_version=OPENAI_API_VERSION_CHAT, # Use API version from config
             # deployment_name=AZURE_OPENAI_CHAT_DEPLOYMENT_NAME # Can add if needed
         )
-        print(f"AzureChatOpenAI initialized successfully with deployment/model: {AZURE_OPENAI_CHAT_DEPLOYMENT_NAME}.")
+        logger.info("AzureChatOpenAI initialized successfully with deployment/model: %s.", AZURE_OPENAI_CHAT_DEPLOYMENT_NAME)
 
 except Exception as e:
-    print(f"\n*** ERROR initializing AzureChatOpenAI: {e} ***")
-    import traceback
-    traceback.print_exc()
+    logger.exception("ERROR initializing AzureChatOpenAI: %s", e)
     llm = None # Ensure it's None if initialization fails
 
 
+# --- Initialize the Per-Role Chat Models (supervisor, summarizer, generator) ---
+def _uses_default_client(config: dict) -> bool:
+    """True if a role config adds nothing to the default chat client (it can then share 'llm')."""
+    return (
+        config["deployment"] == AZURE_OPENAI_CHAT_DEPLOYMENT_NAME
+        and config["endpoint"] == AZURE_OPENAI_CHAT_ENDPOINT
+        and config["api_key"] == OPENAI_API_KEY_CHAT
+        and config["api_version"] == OPENAI_API_VERSION_CHAT
+        and config["temperature"] is None
+        and config["max_tokens"] is None
+        and config["timeout"] is None
+        and config["max_retries"] == 2
+    )
+
+
+def create_chat_model(role: str):
+    """Creates the chat client of a workflow role from CHAT_MODEL_CONFIGS (None if it cannot be created)."""
+    config = CHAT_MODEL_CONFIGS[role]
+    if _uses_default_client(config):
+        return llm
+    if not all([config["endpoint"], config["api_key"], config["deployment"]]):
+        logger.warning("Chat model configuration for role '%s' is incomplete. Skipping.", role)
+        return None
+    try:
+        options = {
+            "azure_endpoint": config["endpoint"],
+            "api_key": config["api_key"],
+            "model": config["deployment"],
+            "api_version": config["api_version"],
+            "max_retries": config["max_retries"],
+        }
+        # Only pass what is configured, so the deployment/client defaults apply otherwise
+        for key in ("temperature", "max_tokens", "timeout"):
+            if config[key] is not None:
+                options[key] = config[key]
+        model = RateLimitedAzureChatOpenAI(
+            deployment_limiter=chat_rate_limiter_for(config["deployment"], config["endpoint"], config["rpm"], config["tpm"]),
+            **options,
+        )
+        logger.info("Chat model for role '%s' initialized with deployment/model: %s (temperature=%s, max_tokens=%s, timeout=%s).",
+                    role, config["deployment"], config["temperature"], config["max_tokens"], config["timeout"])
+        return model
+    except Exception as e:
+        logger.exception("ERROR initializing chat model for role '%s': %s", role, e)
+        return None
+
+
+role_llms = {role: create_chat_model(role) for role in CHAT_MODEL_ROLES}
+supervisor_llm = role_llms["supervisor"]
+summarizer_llm = role_llms["summarizer"]
+generator_llm = role_llms["generator"]
+
+
 # --- Initialize Azure OpenAI Embeddings Model ---
 embeddings = None # Initialize to None
 try:
     # Check config variables
     if not all([AZURE_OPENAI_EMBEDDING_ENDPOINT, OPENAI_API_KEY_EMBEDDING, AZURE_OPENAI_EMBEDDING_DEPLOYMENT_NAME]):
-         print("Warning: Embedding model configuration is incomplete in config. Skipping embeddings initialization.")
+         logger.warning("Embedding model configuration is incomplete in config. Skipping embeddings initialization.")
     else:
         # Initialize using config variables
-        embeddings = AzureOpenAIEmbeddings(
+        embeddings = RateLimitedAzureOpenAIEmbeddings(
             azure_endpoint=AZURE_OPENAI_EMBEDDING_ENDPOINT,
             api_key=OPENAI_API_KEY_EMBEDDING,
             model=AZURE_OPENAI_EMBEDDING_DEPLOYMENT_NAME,
@@ -57,23 +114,21 @@ try:
             chunk_size=1 # Keep chunk_size as in original/config
             # deployment=AZURE_OPENAI_EMBEDDING_DEPLOYMENT_NAME # Can add if needed
         )
-        print(f"AzureOpenAIEmbeddings initialized successfully with deployment/model: {AZURE_OPENAI_EMBEDDING_DEPLOYMENT_NAME}.")
+        logger.info("AzureOpenAIEmbeddings initialized successfully with deployment/model: %s.", AZURE_OPENAI_EMBEDDING_DEPLOYMENT_NAME)
 
 except Exception as e:
-     print(f"\n*** ERROR initializing AzureOpenAIEmbeddings: {e} ***")
-     import traceback
-     traceback.print_exc()
+     logger.exception("ERROR initializing AzureOpenAIEmbeddings: %s", e)
      embeddings = None # Ensure it's None if initialization fails
 
 
-# Optional: Final check and print status
+# Optional: Final check and log status
 if llm is None:
-    print("\n*** WARNING: AzureChatOpenAI was NOT initialized. Agent functionality will be limited. ***")
+    logger.warning("AzureChatOpenAI was NOT initialized. Agent functionality will be limited.")
 if embeddings is None:
-    print("\n*** WARNING: AzureOpenAIEmbeddings was NOT initialized. RAG functionality will be impacted. ***")
+    logger.warning("AzureOpenAIEmbeddings was NOT initialized. RAG functionality will be impacted.")
 # Add check if both failed - might be a critical issue
 if llm is None and embeddings is None:
-    print("\n*** CRITICAL WARNING: Neither LLM nor Embeddings initialized. Most functionality will fail. ***")
+    logger.critical("Neither LLM nor Embeddings initialized. Most functionality will fail.")
 
 
-print("src.llm initialization attempted.")
\ No newline at end of file
+logger.debug("src.llm initialization attempted.")
\ No newline at end of file
@@ -0,0 +1,286 @@
+# src/llm_cassettes.py
+# Record/replay of the chat and embedding calls made through src/llm.py ("cassettes").
+#
+# LLM_CASSETTE_MODE=record writes every chat completion and embedding request together with
+# its response and duration to one cassette file per /create-brief request
+# (<LLM_CASSETTE_DIR>/<request id>.jsonl, calls outside a request go to outside_request.jsonl).
+# The first line of a request's cassette holds the brief prompt and template id, so the
+# traffic can be re-sent later (benchmarks/loadtest.py --cassettes).
+#
+# LLM_CASSETTE_MODE=replay answers the calls from the recorded cassettes instead of Azure
+# OpenAI. Calls are matched by a hash of the request (deployment, messages, tool schemas,
+# tool choice / embedded texts), with the recorded latency or none at all
+# (LLM_CASSETTE_REPLAY_LATENCY). The rate limiters are bypassed; token profiles, budgets
+# and guards still apply. This makes regression and profiling runs of everything but the
+# model deterministic and free.
+#
+# Request hashes are machine-independent: the project root and the id of the current
+# request are replaced by placeholders before hashing (the supervisor prompt names the
+# template path and the tools return per-request output paths). Replayed responses get the
+# local values back. Tool call ids are hashed as their position in the conversation: the
+# hand-back messages of langgraph_supervisor get new random ids on every run. Retrieval results are part of the later prompts, so replaying needs the
+# same vector store the cassettes were recorded with.
+#
+# The clients call into this module (src/llm_clients.py); with the default mode "off"
+# nothing is recorded or looked up.
+
+import glob
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import defaultdict
+from typing import Any, Dict, List, Optional, Tuple
+
+from langchain_core.messages import AIMessage, AIMessageChunk
+from langchain_core.messages.tool import tool_call_chunk
+
+from src.config import (
+    PROJECT_ROOT,
+    LLM_CASSETTE_MODE,
+    LLM_CASSETTE_DIR,
+    LLM_CASSETTE_REPLAY_LATENCY,
+    LLM_CASSETTE_MISS_POLICY,
+)
+from src.request_context import get_request_context
+
+logger = logging.getLogger(__name__)
+
+MODE_OFF = "off"
+MODE_RECORD = "record"
+MODE_REPLAY = "replay"
+CASSETTE_MODES = (MODE_OFF, MODE_RECORD, MODE_REPLAY)
+
+KIND_REQUEST = "request"
+KIND_CHAT = "chat"
+KIND_EMBEDDINGS = "embeddings"
+
+OUTSIDE_REQUEST_CASSETTE = "outside_request"
+ROOT_PLACEHOLDER = "{PROJECT_ROOT}"
+REQUEST_ID_PLACEHOLDER = "{REQUEST_ID}"
+
+# Chat call options that change the answer (timeouts, retries, ... do not)
+_HASHED_CHAT_OPTIONS = ("tools", "tool_choice", "parallel_tool_calls", "stop", "temperature", "max_tokens", "response_format")
+
+
+class CassetteMiss(Exception):
+    """Raised in replay mode for a call that is not in any cassette (LLM_CASSETTE_MISS_POLICY=error)."""
+
+
+# --- Normalization ---
+def _json_escaped(value: str) -> str:
+    """'value' as it appears inside a JSON string (backslashes of Windows paths are escaped)."""
+    return json.dumps(value)[1:-1]
+
+
+def _current_request_id() -> Optional[str]:
+    context = get_request_context()
+    return getattr(context, "request_id", None)
+
+
+def normalize(data: Any) -> str:
+    """JSON of 'data' with the project root and the current request id replaced by placeholders."""
+    text = json.dumps(data, sort_keys=True, default=str, ensure_ascii=False)
+    text = text.replace(_json_escaped(PROJECT_ROOT), ROOT_PLACEHOLDER)
+    request_id = _current_request_id()
+    if request_id:
+        text = text.replace(_json_escaped(request_id), REQUEST_ID_PLACEHOLDER)
+    return text
+
+
+def denormalize(data: Any) -> Any:
+    """Inverse of normalize() for the local project root and the current request."""
+    text = json.dumps(data, ensure_ascii=False)
+    text = text.replace(ROOT_PLACEHOLDER, _json_escaped(PROJECT_ROOT))
+    request_id = _current_request_id()
+    if request_id:
+        text = text.replace(REQUEST_ID_PLACEHOLDER, _json_escaped(request_id))
+    return json.loads(text)
+
+
+def _message_request(message, call_positions: Dict[str, int]) -> dict:
+    """
+    The parts of a prompt message the model sees (no message ids or run metadata).
+    Tool call ids are replaced by their position in 'call_positions' (tool call id -> order of first appearance).
+    """
+    def position(call_id):
+        return call_positions.setdefault(call_id, len(call_positions))
+
+    entry = {"type": message.type, "content": message.content}
+    if getattr(message, "name", None):
+        entry["name"] = message.name
+    if getattr(message, "tool_calls", None):
+        entry["tool_calls"] = [{"name": c["name"], "args": c["args"], "id": position(c.get("id"))} for c in message.tool_calls]
+    if getattr(message, "tool_call_id", None):
+        entry["tool_call_id"] = position(message.tool_call_id)
+    return entry
+
+
+def chat_request(model: str, messages: List[Any], kwargs: dict) -> dict:
+    options = {key: kwargs[key] for key in _HASHED_CHAT_OPTIONS if kwargs.get(key) is not None}
+    call_positions: Dict[str, int] = {}
+    return {"model": model, "messages": [_message_request(m, call_positions) for m in messages], "options": options}
+
+
+def embeddings_request(model: str, texts: List[str]) -> dict:
+    return {"model": model, "texts": list(texts)}
+
+
+def request_key(kind: str, normalized_request: str) -> str:
+    return hashlib.sha256(f"{kind}\n{normalized_request}".encode("utf-8")).hexdigest()
+
+
+# --- Messages ---
+def message_to_record(message) -> dict:
+    """The recorded form of a (possibly streamed) AIMessage."""
+    return {
+        "content": message.content,
+        "tool_calls": [{"name": c["name"], "args": c["args"], "id": c.get("id")} for c in (message.tool_calls or [])],
+        "usage_metadata": dict(message.usage_metadata) if getattr(message, "usage_metadata", None) else None,
+        "response_metadata": dict(message.response_metadata or {}),
+    }
+
+
+def message_from_record(record: dict) -> AIMessage:
+    return AIMessage(
+        content=record["content"],
+        tool_calls=[{"name": c["name"], "args": c["args"], "id": c["id"], "type": "tool_call"} for c in record["tool_calls"]],
+        usage_metadata=record.get("usage_metadata"),
+        response_metadata=record.get("response_metadata") or {},
+    )
+
+
+def chunk_from_record(record: dict) -> AIMessageChunk:
+    """The recorded answer as a single stream chunk (tool call arguments as JSON text, as the API streams them)."""
+    return AIMessageChunk(
+        content=record["content"],
+        tool_call_chunks=[
+            tool_call_chunk(name=c["name"], args=json.dumps(c["args"]), id=c["id"], index=index)
+            for index, c in enumerate(record["tool_calls"])
+        ],
+        usage_metadata=record.get("usage_metadata"),
+        response_metadata=record.get("response_metadata") or {},
+    )
+
+
+# --- Cassette Store ---
+class CassetteStore:
+    """Writes cassettes in record mode and serves their entries in replay mode."""
+
+    def __init__(self, mode: str, directory: str, replay_latency: str = "original", miss_policy: str = "error"):
+        if mode not in CASSETTE_MODES:
+            logger.warning("Unknown LLM_CASSETTE_MODE '%s' (expected one of %s). Cassettes are off.", mode, CASSETTE_MODES)
+            mode = MODE_OFF
+        self.mode = mode
+        self.directory = directory
+        self.replay_latency = replay_latency
+        self.miss_policy = miss_policy
+        self._lock = threading.Lock()
+        self._entries: Optional[Dict[str, List[dict]]] = None   # key -> recorded entries (replay)
+        self._cursors: Dict[str, int] = defaultdict(int)        # key -> entries served so far
+        self.stats = {"recorded": 0, "replayed": 0, "missed": 0}
+
+    @property
+    def recording(self) -> bool:
+        return self.mode == MODE_RECORD
+
+    @property
+    def replaying(self) -> bool:
+        return self.mode == MODE_REPLAY
+
+    # --- Record ---
+    def _cassette_path(self) -> str:
+        return os.path.join(self.directory, f"{_current_request_id() or OUTSIDE_REQUEST_CASSETTE}.jsonl")
+
+    def _append(self, path: str, entry: dict):
+        line = json.dumps(entry, default=str, ensure_ascii=False)
+        with self._lock:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+
+    def start_request(self, brief_details: str, template_id: Optional[str]):
+        """Writes the header line of the current request's cassette (once; resumed runs append to it)."""
+        if not self.recording:
+            return
+        path = self._cassette_path()
+        if os.path.exists(path):
+            return
+        self._append(path, {
+            "kind": KIND_REQUEST,
+            "request_id": _current_request_id(),
+            "brief_details": brief_details,
+            "template_id": template_id,
+            "recorded_at": time.time(),
+        })
+
+    def record(self, kind: str, request: dict, response: Any, seconds: float):
+        normalized_request = normalize(request)
+        try:
+            self._append(self._cassette_path(), {
+                "kind": kind,
+                "key": request_key(kind, normalized_request),
+                "seconds": round(seconds, 4),
+                "request": json.loads(normalized_request),
+                "response": json.loads(normalize(response)),
+            })
+            self.stats["recorded"] += 1
+        except Exception as e:
+            # Recording must never fail the call it records
+            logger.warning("Could not record %s call to cassette: %s", kind, e)
+
+    # --- Replay ---
+    def _load(self) -> Dict[str, List[dict]]:
+        with self._lock:
+            if self._entries is None:
+                paths = [self.directory] if os.path.isfile(self.directory) else sorted(glob.glob(os.path.join(self.directory, "*.jsonl")))
+                entries = defaultdict(list)
+                for path in paths:
+                    with open(path, "r", encoding="utf-8") as f:
+                        for line in f:
+                            if line.strip():
+                                entry = json.loads(line)
+                                if entry.get("kind") in (KIND_CHAT, KIND_EMBEDDINGS):
+                                    entries[entry["key"]].append(entry)
+                self._entries = entries
+                logger.info("Loaded %d recorded LLM call(s) from %d cassette(s) in %s.",
+                            sum(len(e) for e in entries.values()), len(paths), self.directory)
+        return self._entries
+
+    def lookup(self, kind: str, request: dict) -> Optional[Tuple[Any, float]]:
+        """
+        The recorded response to 'request' and the delay to replay it with.
+        Identical requests recorded several times are answered in recorded order (then cyclically).
+
+        Returns:
+            (response, delay in seconds), or None if the call is not recorded and LLM_CASSETTE_MISS_POLICY=live.
+
+        Raises:
+            CassetteMiss: The call is not recorded and LLM_CASSETTE_MISS_POLICY=error.
+        """
+        key = request_key(kind, normalize(request))
+        recorded = self._load().get(key)
+        if not recorded:
+            self.stats["missed"] += 1
+            if self.miss_policy == "live":
+                logger.warning("Cassette miss for %s call %s; calling the deployment.", kind, key[:12])
+                return None
+            raise CassetteMiss(f"No recorded {kind} call matches request {key[:12]} (model {request.get('model')}). "
+                               f"Record cassettes with the same prompts, templates and vector store, "
+                               f"or set LLM_CASSETTE_MISS_POLICY=live.")
+        with self._lock:
+            entry = recorded[self._cursors[key] % len(recorded)]
+            self._cursors[key] += 1
+        self.stats["replayed"] += 1
+        delay = entry["seconds"] if self.replay_latency == "original" else 0.0
+        return denormalize(entry["response"]), delay
+
+    def describe(self) -> dict:
+        return {"mode": self.mode, "directory": self.directory, **self.stats}
+
+
+cassettes = CassetteStore(LLM_CASSETTE_MODE, LLM_CASSETTE_DIR, LLM_CASSETTE_REPLAY_LATENCY, LLM_CASSETTE_MISS_POLICY)
+if cassettes.mode != MODE_OFF:
+    logger.info("LLM cassettes: %s (%s).", cassettes.mode, cassettes.directory)
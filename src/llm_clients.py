@@ -0,0 +1,333 @@
+# src/llm_clients.py
+# Azure OpenAI client classes used by the application.
+# They behave exactly like the LangChain classes they extend, but acquire capacity from
+# the process-wide rate limiters (src/rate_limiter.py) before every call.
+# Chat calls made for a request are also recorded in its token profile and stopped once
+# the request's token/turn budget is exhausted (src/token_budget.py), and they honour the
+# deadlines and cancellation of the request's workflow guard (src/workflows/guards.py):
+# a guarded request is sent on an event loop of its own thread and aborted (task
+# cancellation closes its HTTP connection) as soon as the guard trips while it is in flight.
+# With LLM_CASSETTE_MODE set, calls are recorded to or replayed from cassettes
+# (src/llm_cassettes.py); replayed calls skip the rate limiters.
+# This module has no side effects on import; src/llm.py creates the instances.
+
+import asyncio
+import concurrent.futures
+import json
+import os
+import threading
+import time
+from contextlib import closing
+from typing import Any, List, Optional
+
+from langchain_core.messages import AIMessage, AIMessageChunk
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from langchain_openai import AzureChatOpenAI, AzureOpenAIEmbeddings
+from pydantic import PrivateAttr
+
+from src.config import RATE_LIMIT_COMPLETION_TOKENS_ESTIMATE
+from src.llm_cassettes import (
+    KIND_CHAT, KIND_EMBEDDINGS, cassettes, chat_request, embeddings_request,
+    message_to_record, message_from_record, chunk_from_record,
+)
+from src.rate_limiter import chat_rate_limiter, embedding_rate_limiter
+from src.request_context import get_request_context
+from src.token_budget import BUDGET_EXCEEDED_MESSAGE, BudgetExceeded, call_site, profile_prompt
+from src.tokens import count_message_tokens, count_tokens
+
+
+# How often a guarded request in flight checks its guard
+_ABORT_POLL_SECONDS = 0.25
+
+_call_loop = None
+_call_loop_pid = None
+_call_loop_lock = threading.Lock()
+
+
+def _abortable_call_loop() -> asyncio.AbstractEventLoop:
+    """Event loop (in a daemon thread of this process) that runs the guarded LLM requests."""
+    global _call_loop, _call_loop_pid
+    with _call_loop_lock:
+        # A loop inherited through fork() has no thread running it
+        if _call_loop is None or _call_loop_pid != os.getpid():
+            loop = asyncio.new_event_loop()
+            threading.Thread(target=loop.run_forever, name="guarded-llm-calls", daemon=True).start()
+            _call_loop, _call_loop_pid = loop, os.getpid()
+        return _call_loop
+
+
+def _run_abortable(coroutine, guard):
+    """Runs a request coroutine to completion, cancelling it (and raising the guard's error) once the guard trips."""
+    future = asyncio.run_coroutine_threadsafe(coroutine, _abortable_call_loop())
+    while True:
+        done, _ = concurrent.futures.wait([future], timeout=_ABORT_POLL_SECONDS)
+        if done:
+            return future.result()
+        try:
+            guard.check()
+        except BaseException:
+            future.cancel()
+            raise
+
+
+async def _arun_abortable(coroutine, guard):
+    """Async variant of _run_abortable."""
+    task = asyncio.ensure_future(coroutine)
+    while True:
+        done, _ = await asyncio.wait({task}, timeout=_ABORT_POLL_SECONDS)
+        if done:
+            return task.result()
+        try:
+            guard.check()
+        except BaseException:
+            task.cancel()
+            raise
+
+
+def _current_guard():
+    return getattr(get_request_context(), "guard", None)
+
+
+class _ProfiledCall:
+    """A chat call being recorded in the token profile of the current request."""
+
+    def __init__(self, profile, record):
+        self.profile = profile
+        self.record = record
+        self.started = time.monotonic()
+
+    def finish(self, message, model: Optional[str]):
+        usage = getattr(message, "usage_metadata", None) or {}
+        completion_tokens = usage.get("output_tokens") or count_message_tokens(message, model)
+        self.profile.finish_call(self.record, completion_tokens, usage.get("input_tokens"), self.started)
+
+
+class RateLimitedAzureChatOpenAI(AzureChatOpenAI):
+    """
+    AzureChatOpenAI that waits for RPM/TPM capacity before each request.
+    Uses the limiter of the default chat deployment unless another one is passed as 'deployment_limiter'
+    (clients of a separate per-role deployment, see src/llm.py).
+    """
+
+    _deployment_limiter: Any = PrivateAttr(default=None)
+
+    def __init__(self, deployment_limiter=None, **kwargs):
+        super().__init__(**kwargs)
+        self._deployment_limiter = deployment_limiter
+
+    @property
+    def deployment_limiter(self):
+        # Not 'rate_limiter': that name is a field of LangChain's BaseChatModel
+        return self._deployment_limiter or chat_rate_limiter
+
+    def _prepare_call(self, messages: List[Any], kwargs: dict, run_manager):
+        """
+        Counts the request's tokens and records the call in the current request's token profile.
+
+        Returns:
+            (tokens to acquire from the rate limiter, _ProfiledCall or None, budget stop message or None)
+        """
+        context = get_request_context()
+        guard = getattr(context, "guard", None)
+        if guard is not None:
+            # Aborted/expired runs make no further calls; a call may not outlive the run's deadline
+            guard.check()
+            remaining = guard.remaining_seconds()
+            if remaining is not None:
+                configured = self.request_timeout if isinstance(self.request_timeout, (int, float)) else None
+                kwargs["timeout"] = max(1.0, min(remaining, configured or remaining))
+        tool_schemas = json.dumps(kwargs["tools"], default=str) if kwargs.get("tools") else ""
+        breakdown = profile_prompt(messages, tool_schemas, self.model_name)
+        # Azure charges a request against the TPM quota with its prompt tokens plus max_tokens,
+        # so estimate the completion with max_tokens when it is set.
+        tokens = breakdown.prompt_tokens + (kwargs.get("max_tokens") or self.max_tokens or RATE_LIMIT_COMPLETION_TOKENS_ESTIMATE)
+        profile = getattr(context, "token_profile", None)
+        if profile is None:
+            return tokens, None, None
+        record = profile.start_call(call_site(run_manager), self.model_name, breakdown, len(messages))
+        call = _ProfiledCall(profile, record)
+        try:
+            profile.check_budget(breakdown.prompt_tokens)
+        except BudgetExceeded as e:
+            # Answer without calling the deployment: a final message without tool calls ends the agent/supervisor
+            stop_message = BUDGET_EXCEEDED_MESSAGE.format(reason=e)
+            profile.finish_call(record, 0, None, call.started, skipped=True)
+            return tokens, None, stop_message
+        return tokens, call, None
+
+    # --- Cassettes (src/llm_cassettes.py) ---
+    def _replay(self, messages, stop, kwargs):
+        """(recorded answer, delay) in replay mode, else None."""
+        if not cassettes.replaying:
+            return None
+        return cassettes.lookup(KIND_CHAT, chat_request(self.model_name, messages, {**kwargs, "stop": stop}))
+
+    def _record(self, messages, stop, kwargs, message, started: float):
+        if cassettes.recording and message is not None:
+            cassettes.record(KIND_CHAT, chat_request(self.model_name, messages, {**kwargs, "stop": stop}),
+                             message_to_record(message), time.monotonic() - started)
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        tokens, call, stop_message = self._prepare_call(messages, kwargs, run_manager)
+        if stop_message is not None:
+            return ChatResult(generations=[ChatGeneration(message=AIMessage(content=stop_message))])
+        replayed = self._replay(messages, stop, kwargs)
+        if replayed is not None:
+            record, delay = replayed
+            time.sleep(delay)
+            result = ChatResult(generations=[ChatGeneration(message=message_from_record(record))])
+        else:
+            self.deployment_limiter.acquire(tokens)
+            started = time.monotonic()
+            guard = _current_guard()
+            if guard is not None:
+                result = _run_abortable(super()._agenerate(messages, stop=stop, **kwargs), guard)
+            else:
+                result = super()._generate(messages, stop=stop, run_manager=run_manager, **kwargs)
+            self._record(messages, stop, kwargs, result.generations[0].message if result.generations else None, started)
+        if call is not None and result.generations:
+            call.finish(result.generations[0].message, self.model_name)
+        return result
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        tokens, call, stop_message = self._prepare_call(messages, kwargs, run_manager)
+        if stop_message is not None:
+            return ChatResult(generations=[ChatGeneration(message=AIMessage(content=stop_message))])
+        replayed = self._replay(messages, stop, kwargs)
+        if replayed is not None:
+            record, delay = replayed
+            await asyncio.sleep(delay)
+            result = ChatResult(generations=[ChatGeneration(message=message_from_record(record))])
+        else:
+            await self.deployment_limiter.aacquire(tokens)
+            started = time.monotonic()
+            guard = _current_guard()
+            request = super()._agenerate(messages, stop=stop, run_manager=run_manager, **kwargs)
+            result = await (_arun_abortable(request, guard) if guard is not None else request)
+            self._record(messages, stop, kwargs, result.generations[0].message if result.generations else None, started)
+        if call is not None and result.generations:
+            call.finish(result.generations[0].message, self.model_name)
+        return result
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs):
+        tokens, call, stop_message = self._prepare_call(messages, kwargs, run_manager)
+        if stop_message is not None:
+            yield ChatGenerationChunk(message=AIMessageChunk(content=stop_message))
+            return
+        replayed = self._replay(messages, stop, kwargs)
+        if replayed is not None:
+            record, delay = replayed
+            time.sleep(delay)
+            chunk = ChatGenerationChunk(message=chunk_from_record(record))
+            if run_manager is not None:
+                run_manager.on_llm_new_token(chunk.text, chunk=chunk)
+            yield chunk
+            message = chunk.message
+        else:
+            self.deployment_limiter.acquire(tokens)
+            started = time.monotonic()
+            message = None
+            guard = _current_guard()
+            # Closing the stream closes its HTTP connection when the guard trips between chunks
+            with closing(super()._stream(messages, stop=stop, run_manager=run_manager, **kwargs)) as stream:
+                for chunk in stream:
+                    if guard is not None:
+                        guard.check()
+                    message = chunk.message if message is None else message + chunk.message
+                    yield chunk
+            self._record(messages, stop, kwargs, message, started)
+        if call is not None and message is not None:
+            call.finish(message, self.model_name)
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs):
+        tokens, call, stop_message = self._prepare_call(messages, kwargs, run_manager)
+        if stop_message is not None:
+            yield ChatGenerationChunk(message=AIMessageChunk(content=stop_message))
+            return
+        replayed = self._replay(messages, stop, kwargs)
+        if replayed is not None:
+            record, delay = replayed
+            await asyncio.sleep(delay)
+            chunk = ChatGenerationChunk(message=chunk_from_record(record))
+            if run_manager is not None:
+                await run_manager.on_llm_new_token(chunk.text, chunk=chunk)
+            yield chunk
+            message = chunk.message
+        else:
+            await self.deployment_limiter.aacquire(tokens)
+            started = time.monotonic()
+            message = None
+            guard = _current_guard()
+            stream = super()._astream(messages, stop=stop, run_manager=run_manager, **kwargs)
+            try:
+                async for chunk in stream:
+                    if guard is not None:
+                        guard.check()
+                    message = chunk.message if message is None else message + chunk.message
+                    yield chunk
+            finally:
+                # Closes the HTTP connection when the guard trips between chunks
+                await stream.aclose()
+            self._record(messages, stop, kwargs, message, started)
+        if call is not None and message is not None:
+            call.finish(message, self.model_name)
+
+
+class RateLimitedAzureOpenAIEmbeddings(AzureOpenAIEmbeddings):
+    """AzureOpenAIEmbeddings that waits for RPM/TPM capacity before each embedding request."""
+
+    @property
+    def _cassette_model(self) -> str:
+        return self.deployment or self.model
+
+    def _replay(self, batch: List[str]):
+        if not cassettes.replaying:
+            return None
+        return cassettes.lookup(KIND_EMBEDDINGS, embeddings_request(self._cassette_model, batch))
+
+    def _record(self, batch: List[str], batch_vectors: List[List[float]], started: float):
+        if cassettes.recording:
+            cassettes.record(KIND_EMBEDDINGS, embeddings_request(self._cassette_model, batch),
+                             batch_vectors, time.monotonic() - started)
+
+    def _batches(self, texts: List[str], chunk_size: Optional[int]):
+        batch_size = chunk_size or self.chunk_size or 1
+        for start in range(0, len(texts), batch_size):
+            yield texts[start:start + batch_size], batch_size
+
+    def embed_documents(self, texts: List[str], chunk_size: Optional[int] = None) -> List[List[float]]:
+        # One acquire per HTTP request: the parent class sends 'chunk_size' texts per request.
+        vectors = []
+        for batch, batch_size in self._batches(texts, chunk_size):
+            replayed = self._replay(batch)
+            if replayed is not None:
+                batch_vectors, delay = replayed
+                time.sleep(delay)
+            else:
+                embedding_rate_limiter.acquire(sum(count_tokens(text) for text in batch))
+                started = time.monotonic()
+                batch_vectors = super().embed_documents(batch, chunk_size=batch_size)
+                self._record(batch, batch_vectors, started)
+            vectors.extend(batch_vectors)
+        return vectors
+
+    async def aembed_documents(self, texts: List[str], chunk_size: Optional[int] = None) -> List[List[float]]:
+        vectors = []
+        for batch, batch_size in self._batches(texts, chunk_size):
+            replayed = self._replay(batch)
+            if replayed is not None:
+                batch_vectors, delay = replayed
+                await asyncio.sleep(delay)
+            else:
+                await embedding_rate_limiter.aacquire(sum(count_tokens(text) for text in batch))
+                started = time.monotonic()
+                batch_vectors = await super().aembed_documents(batch, chunk_size=batch_size)
+                self._record(batch, batch_vectors, started)
+            vectors.extend(batch_vectors)
+        return vectors
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+    async def aembed_query(self, text: str) -> List[float]:
+        return (await self.aembed_documents([text]))[0]
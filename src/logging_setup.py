@@ -0,0 +1,225 @@
+# src/logging_setup.py
+# Central logging configuration of the application (replaces per-message print calls).
+#
+# Modules log through standard per-module loggers (logging.getLogger(__name__)).
+# configure_logging() is called once by src/config.py, which every module imports first.
+# It installs a single root handler that:
+#   - adds the id of the current request (src/request_context.py) to every record,
+#   - samples hot-path DEBUG events: records logged with extra={"event": "<name>"} are
+#     kept 1 in N per event name (LOG_DEBUG_SAMPLE_RATE),
+#   - hands the records to a background thread that formats and writes them, so request
+#     threads never wait for stdout. If the queue is full, records are dropped and counted.
+# Output is plain text with the structured fields appended as key=value pairs, or one JSON
+# object per line (LOG_FORMAT=json) with fields such as request_id, stage and duration_ms.
+#
+# Per-request diagnostics are logged at DEBUG; at the production level (INFO) the request
+# path writes nothing except warnings and errors. Start-up and shutdown messages are INFO.
+# This module only uses the standard library and does not import src.config.
+
+import atexit
+import datetime
+import json
+import logging
+import os
+import queue
+import sys
+import threading
+from typing import Dict, Optional
+
+TEXT_FORMAT = "%(asctime)s %(levelname)-7s %(name)s [%(request_id)s] %(message)s"
+# Third-party loggers that log every HTTP request at INFO
+DEFAULT_MODULE_LEVELS = {"httpx": "WARNING", "httpcore": "WARNING", "openai": "WARNING", "urllib3": "WARNING"}
+
+# Attributes every LogRecord has; anything else was passed via 'extra' and is a structured field
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime", "request_id"}
+_STOP = object()
+
+
+# --- Filters ---
+class RequestContextFilter(logging.Filter):
+    """Adds 'request_id' of the active request context ('-' outside of requests)."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if not hasattr(record, "request_id"):
+            from src.request_context import get_request_context
+            context = get_request_context()
+            record.request_id = context.request_id if context is not None else "-"
+        return True
+
+
+class DebugSampler(logging.Filter):
+    """Keeps 1 in N DEBUG records of each 'event' (records without an event are not sampled)."""
+
+    def __init__(self, rate: float):
+        super().__init__()
+        self.every = max(1, round(1 / rate)) if rate > 0 else 0
+        self._counts: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        event = getattr(record, "event", None)
+        if event is None or record.levelno > logging.DEBUG or self.every == 1:
+            return True
+        if self.every == 0:
+            return False
+        with self._lock:
+            count = self._counts.get(event, 0)
+            self._counts[event] = count + 1
+        if count % self.every:
+            return False
+        record.sampled = f"1/{self.every}"
+        return True
+
+
+# --- Formatters ---
+def _structured_fields(record: logging.LogRecord) -> dict:
+    return {key: value for key, value in vars(record).items() if key not in _RECORD_ATTRIBUTES and not key.startswith("_")}
+
+
+class KeyValueFormatter(logging.Formatter):
+    """TEXT_FORMAT followed by the structured fields as key=value."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        text = super().format(record)
+        fields = _structured_fields(record)
+        if fields:
+            suffix = " ".join(f"{key}={value}" for key, value in fields.items())
+            first_line, newline, rest = text.partition("\n")
+            text = f"{first_line} | {suffix}{newline}{rest}"
+        return text
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.datetime.fromtimestamp(record.created, datetime.timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "request_id": getattr(record, "request_id", "-"),
+            "pid": record.process,
+        }
+        entry.update(_structured_fields(record))
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exception"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+# --- Handler ---
+class BackgroundLogHandler(logging.Handler):
+    """
+    Queues records for a writer thread that formats them and writes them to stdout.
+    Never blocks the logging thread; the thread is (re)started lazily in each process,
+    since threads do not survive the fork of the server workers.
+    """
+
+    def __init__(self, queue_size: int = 10000):
+        super().__init__()
+        self.queue_size = queue_size
+        self.dropped_records = 0
+        self._reported_drops = 0
+        self._queue = None
+        self._thread = None
+        self._pid = None
+        self._start_lock = threading.Lock()
+
+    def emit(self, record: logging.LogRecord):
+        self._ensure_started()
+        try:
+            # Resolve the message now: its arguments may change (or hold frames) by the time the writer runs
+            record.message = record.getMessage()
+            record.msg, record.args = record.message, None
+            if record.exc_info:
+                record.exc_text = self.formatter.formatException(record.exc_info) if self.formatter else None
+                record.exc_info = None
+            self._queue.put_nowait(record)
+        except queue.Full:
+            self.dropped_records += 1
+        except Exception:
+            self.handleError(record)
+
+    def _ensure_started(self):
+        if self._thread is not None and self._pid == os.getpid():
+            return
+        with self._start_lock:
+            if self._thread is not None and self._pid == os.getpid():
+                return
+            self._queue = queue.Queue(maxsize=self.queue_size)
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name="log-writer", daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            record = self._queue.get()
+            if record is _STOP:
+                break
+            try:
+                stream = sys.stdout
+                if self.dropped_records > self._reported_drops:
+                    stream.write(f"WARNING: log queue full; {self.dropped_records - self._reported_drops} record(s) dropped\n")
+                    self._reported_drops = self.dropped_records
+                stream.write(self.format(record) + "\n")
+                stream.flush()
+            except Exception:
+                self.handleError(record)
+
+    def close(self, timeout: float = 5.0):
+        """Writes the queued records and stops the writer thread (called at exit)."""
+        if self._thread is not None and self._pid == os.getpid():
+            try:
+                self._queue.put(_STOP, timeout=timeout)
+                self._thread.join(timeout)
+            except queue.Full:
+                pass
+            self._thread = None
+        super().close()
+
+
+# --- Setup ---
+_handler: Optional[BackgroundLogHandler] = None
+
+
+def parse_module_levels(spec: str) -> Dict[str, str]:
+    """'src.tools=DEBUG,httpx=INFO' -> {'src.tools': 'DEBUG', 'httpx': 'INFO'}"""
+    levels = {}
+    for item in (spec or "").split(","):
+        name, _, level = item.partition("=")
+        if name.strip() and level.strip():
+            levels[name.strip()] = level.strip().upper()
+    return levels
+
+
+def configure_logging(level: str = "INFO", log_format: str = "text", module_levels: str = "",
+                      debug_sample_rate: float = 1.0, queue_size: int = 10000):
+    """
+    Installs the application's root handler (once per process; later calls only update levels).
+
+    Args:
+        level: Root level (DEBUG, INFO, WARNING, ...).
+        log_format: "text" or "json".
+        module_levels: Per-logger levels, e.g. "src.tools.populate_word=DEBUG,src.rag=WARNING".
+        debug_sample_rate: Share of DEBUG records kept per 'event' (1.0 = all, 0 = none).
+        queue_size: Records buffered for the writer thread before new ones are dropped.
+    """
+    global _handler
+    root = logging.getLogger()
+    if _handler is None:
+        _handler = BackgroundLogHandler(queue_size)
+        _handler.setFormatter(JsonFormatter() if log_format == "json" else KeyValueFormatter(TEXT_FORMAT))
+        _handler.addFilter(RequestContextFilter())
+        _handler.addFilter(DebugSampler(debug_sample_rate))
+        for existing in list(root.handlers):
+            root.removeHandler(existing)
+        root.addHandler(_handler)
+        atexit.register(_handler.close)
+    root.setLevel(level.upper())
+    for name, module_level in {**DEFAULT_MODULE_LEVELS, **parse_module_levels(module_levels)}.items():
+        logging.getLogger(name).setLevel(module_level)
+    # Warnings of libraries (e.g. deprecations) go through the same handler
+    logging.captureWarnings(True)
+
@@ -0,0 +1,246 @@
+# src/logo_cache.py
+# In-memory cache of pre-processed logo images.
+#
+# Logos are loaded from disk once, validated, optionally downscaled to the size they are
+# rendered at in the brief (oversized brand assets otherwise inflate render time and
+# document size) and kept as encoded bytes together with their pixel dimensions.
+# populate_word_from_json inserts them from memory and embeds each image only once per
+# document, even when it fills several placeholders.
+#
+# Image paths come from logo metadata parsed by the LLM (e.g. './logos/Nike.png' or the
+# malformed '.logos/JPM_PB.png'), so paths are resolved against the project root and,
+# failing that, by file name (case-insensitive) inside LOGOS_DIR. Only files inside
+# LOGOS_DIR are ever loaded: paths (or symlinks) leading elsewhere are not resolved.
+
+import hashlib
+import logging
+import os
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from io import BytesIO
+from typing import Dict, Optional
+
+from docx.image.image import Image as DocxImage  # Header parser shipped with python-docx
+from docx.oxml.shape import CT_Inline
+from docx.shared import Inches
+
+try:
+    from PIL import Image as PILImage  # Optional: pip install Pillow (needed for downscaling only)
+except ImportError:
+    PILImage = None
+
+from src.config import (
+    PROJECT_ROOT,
+    LOGOS_DIR,
+    LOGO_RENDER_WIDTH_INCHES,
+    LOGO_RENDER_DPI,
+    LOGO_DOWNSCALE_ENABLED,
+    LOGO_MAX_FILE_BYTES,
+    LOGO_CACHE_MAX_ENTRIES,
+)
+
+logger = logging.getLogger(__name__)
+logger.debug("--- Setting up logo asset cache ---")
+
+if PILImage is None and LOGO_DOWNSCALE_ENABLED:
+    logger.warning("Pillow is not installed. Logos will be embedded at their original resolution.")
+
+
+@dataclass(frozen=True)
+class LogoAsset:
+    """A validated logo image ready to be embedded."""
+    path: str
+    filename: str
+    data: bytes = field(repr=False)
+    content_type: str
+    px_width: int
+    px_height: int
+    sha1: str
+    original_bytes: int
+    mtime_ns: int
+
+    def rendered_size(self, width_inches: float = LOGO_RENDER_WIDTH_INCHES):
+        """(cx, cy) in EMU for the given rendered width, keeping the aspect ratio."""
+        cx = Inches(width_inches)
+        cy = int(cx * self.px_height / self.px_width) if self.px_width else cx
+        return cx, cy
+
+
+class LogoAssetCache:
+    """
+    Thread-safe LRU cache of LogoAsset objects keyed by resolved file path.
+
+    Args:
+        logos_dir: Directory holding the logo files.
+        render_width_inches: Width the logos are rendered at in the document.
+        render_dpi: Target resolution; larger images are downscaled to width_inches * dpi pixels.
+        downscale: Enable downscaling (requires Pillow).
+        max_file_bytes: Files larger than this are rejected.
+        max_entries: Assets kept; the least recently used are evicted beyond this.
+    """
+
+    def __init__(self, logos_dir: str, render_width_inches: float = 1.5, render_dpi: int = 220,
+                 downscale: bool = True, max_file_bytes: int = 10 * 1024 * 1024, max_entries: int = 256):
+        self.logos_dir = logos_dir
+        self.max_entries = max(1, max_entries)
+        self.render_width_inches = render_width_inches
+        self.max_px_width = int(render_width_inches * render_dpi)
+        self.downscale = downscale and PILImage is not None
+        self.max_file_bytes = max_file_bytes
+        self._lock = threading.Lock()
+        self._assets: "OrderedDict[str, LogoAsset]" = OrderedDict()
+
+    # --- Path resolution ---
+    def _inside_logos_dir(self, path: str) -> bool:
+        root = os.path.realpath(self.logos_dir)
+        return os.path.commonpath([root, os.path.realpath(path)]) == root
+
+    def points_outside(self, img_path: str) -> bool:
+        """True for absolute or '..' paths that lead out of logos_dir (other sloppy paths are matched by file name)."""
+        candidate = (img_path or "").strip().strip('"\'')
+        if not os.path.isabs(candidate) and ".." not in candidate.replace("\\", "/").split("/"):
+            return False
+        return not self._inside_logos_dir(candidate if os.path.isabs(candidate) else os.path.join(PROJECT_ROOT, candidate))
+
+    def resolve_path(self, img_path: str) -> Optional[str]:
+        """Returns the absolute path of an existing logo file in logos_dir for a (possibly sloppy) path, or None."""
+        if not img_path:
+            return None
+        candidate = img_path.strip().strip('"\'')
+        candidates = [candidate] if os.path.isabs(candidate) else [os.path.join(PROJECT_ROOT, candidate), os.path.abspath(candidate)]
+        for path in candidates:
+            if os.path.isfile(path) and self._inside_logos_dir(path):
+                return os.path.abspath(path)
+        # Fall back to the file name inside LOGOS_DIR (case-insensitive)
+        wanted = os.path.basename(candidate.replace("\\", "/")).lower()
+        if wanted and os.path.isdir(self.logos_dir):
+            for name in os.listdir(self.logos_dir):
+                if name.lower() == wanted:
+                    return os.path.join(self.logos_dir, name)
+        return None
+
+    # --- Loading ---
+    def _downscale(self, data: bytes, px_width: int, px_height: int):
+        """Returns (data, px_width, px_height), resized to max_px_width if the image is wider."""
+        if not self.downscale or px_width <= self.max_px_width:
+            return data, px_width, px_height
+        with PILImage.open(BytesIO(data)) as image:
+            image_format = image.format or "PNG"
+            new_size = (self.max_px_width, max(1, round(px_height * self.max_px_width / px_width)))
+            resized = image.resize(new_size, PILImage.LANCZOS)
+            out = BytesIO()
+            save_kwargs = {"optimize": True} if image_format in ("PNG", "JPEG") else {}
+            if image_format == "JPEG":
+                save_kwargs["quality"] = 90
+            resized.save(out, format=image_format, **save_kwargs)
+        scaled = out.getvalue()
+        if len(scaled) >= len(data):
+            return data, px_width, px_height
+        return scaled, new_size[0], new_size[1]
+
+    def _load(self, path: str) -> LogoAsset:
+        stat = os.stat(path)
+        if stat.st_size > self.max_file_bytes:
+            raise ValueError(f"Logo file '{path}' is {stat.st_size} bytes (limit {self.max_file_bytes}).")
+        with open(path, "rb") as f:
+            original = f.read()
+        # Validates the file is a supported image and reads its pixel size (raises on invalid files)
+        image = DocxImage.from_blob(original)
+        data, px_width, px_height = self._downscale(original, image.px_width, image.px_height)
+        if data is not original:
+            logger.info("Downscaled logo '%s' from %dx%d (%d bytes) to %dx%d (%d bytes).", os.path.basename(path),
+                        image.px_width, image.px_height, len(original), px_width, px_height, len(data))
+        return LogoAsset(
+            path=path,
+            filename=os.path.basename(path),
+            data=data,
+            content_type=image.content_type,
+            px_width=px_width,
+            px_height=px_height,
+            sha1=hashlib.sha1(data).hexdigest(),
+            original_bytes=len(original),
+            mtime_ns=stat.st_mtime_ns,
+        )
+
+    def get(self, img_path: str) -> Optional[LogoAsset]:
+        """
+        Returns the cached LogoAsset for an image path, loading it on first use
+        (and again if the file changed). Returns None if the file is missing or invalid.
+        """
+        path = self.resolve_path(img_path)
+        if path is None:
+            return None
+        try:
+            mtime_ns = os.stat(path).st_mtime_ns
+        except OSError:
+            return None
+        with self._lock:
+            asset = self._assets.get(path)
+            if asset is not None:
+                self._assets.move_to_end(path)
+        if asset is not None and asset.mtime_ns == mtime_ns:
+            return asset
+        try:
+            asset = self._load(path)
+        except Exception as e:
+            logger.warning("Could not load logo '%s': %s", path, e)
+            return None
+        with self._lock:
+            self._assets[path] = asset
+            self._assets.move_to_end(path)
+            while len(self._assets) > self.max_entries:
+                self._assets.popitem(last=False)
+        return asset
+
+    def preload(self) -> int:
+        """Loads every image in logos_dir. Returns the number of assets cached."""
+        if not os.path.isdir(self.logos_dir):
+            logger.warning("Logos directory not found at '%s'. No logos preloaded.", self.logos_dir)
+            return 0
+        loaded = 0
+        for name in sorted(os.listdir(self.logos_dir)):
+            if self.get(os.path.join(self.logos_dir, name)) is not None:
+                loaded += 1
+        return loaded
+
+    def stats(self) -> dict:
+        with self._lock:
+            assets = list(self._assets.values())
+        return {
+            "assets": len(assets),
+            "bytes": sum(len(a.data) for a in assets),
+            "original_bytes": sum(a.original_bytes for a in assets),
+        }
+
+
+def add_logo_to_run(run, asset: LogoAsset, embedded_parts: Dict[str, str], width_inches: float = LOGO_RENDER_WIDTH_INCHES):
+    """
+    Inserts a cached logo into a python-docx run.
+
+    'embedded_parts' maps image sha1 -> relationship id for the document being rendered, so
+    an image used by several placeholders is stored once and referenced by every picture.
+    """
+    document_part = run.part
+    rId = embedded_parts.get(asset.sha1)
+    if rId is None:
+        rId, _ = document_part.get_or_add_image(BytesIO(asset.data))
+        embedded_parts[asset.sha1] = rId
+    cx, cy = asset.rendered_size(width_inches)
+    inline = CT_Inline.new_pic_inline(document_part.next_id, rId, asset.filename, cx, cy)
+    run._r.add_drawing(inline)
+
+
+# --- Process-wide cache, preloaded at startup ---
+logo_cache = LogoAssetCache(
+    LOGOS_DIR,
+    render_width_inches=LOGO_RENDER_WIDTH_INCHES,
+    render_dpi=LOGO_RENDER_DPI,
+    downscale=LOGO_DOWNSCALE_ENABLED,
+    max_file_bytes=LOGO_MAX_FILE_BYTES,
+    max_entries=LOGO_CACHE_MAX_ENTRIES,
+)
+try:
+    logger.info("Preloaded %d logo(s) from '%s'.", logo_cache.preload(), LOGOS_DIR)
+except Exception as e:
+    logger.exception("ERROR preloading logos: %s", e)
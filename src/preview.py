@@ -0,0 +1,176 @@
+# src/preview.py
+# Lightweight HTML / Markdown preview of a populated brief.
+#
+# Renders the placeholder JSON into the structure of a compiled template (paragraph
+# order, headings, tables, image slots) without building a .docx, so marketers can
+# iterate on the wording cheaply and generate the Word file only when they want it.
+# Rendered previews are cached by (template version, format, content hash).
+
+import base64
+import hashlib
+import html
+import json
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from src.config import PREVIEW_CACHE_MAX_ENTRIES
+from src.logo_cache import logo_cache
+from src.template_registry import CompiledTemplate, TemplateParagraph, TemplateTable
+from src.tools.populate_word import replace_text_placeholders
+
+PREVIEW_FORMATS = {
+    "html": "text/html",
+    "markdown": "text/markdown",
+}
+
+
+def _heading_level(style: str) -> int:
+    """Heading level for a Word paragraph style (0 = not a heading)."""
+    if style == "Title":
+        return 1
+    if style.startswith("Heading "):
+        level = style[len("Heading "):]
+        if level.isdigit():
+            return min(int(level), 6)
+    return 0
+
+
+def _image_slots_in(paragraph: TemplateParagraph, image_placeholders: Dict[str, str]):
+    return [content for content in image_placeholders if f"{{{{{content}}}}}" in paragraph.text]
+
+
+def _paragraph_text(paragraph: TemplateParagraph, json_data: Dict[str, Any], image_placeholders: Dict[str, str]) -> str:
+    if not paragraph.placeholders:
+        return paragraph.text
+    text, _ = replace_text_placeholders(paragraph.text, json_data)
+    # Image placeholders are replaced by the picture; remove their text like populate_word_from_json does
+    for content in _image_slots_in(paragraph, image_placeholders):
+        text = text.replace(f"{{{{{content}}}}}", "")
+    return text
+
+
+# --- HTML ---
+def _html_image(content: str, img_path: str) -> str:
+    asset = logo_cache.get(img_path)
+    if asset is None:
+        return f'<span class="missing-image">[{html.escape(content)}: image not found]</span>'
+    data_uri = f"data:{asset.content_type};base64,{base64.b64encode(asset.data).decode('ascii')}"
+    return f'<img src="{data_uri}" alt="{html.escape(content)}" style="width:{asset.rendered_size()[0] / 914400:.2f}in">'
+
+
+def _html_paragraph(paragraph: TemplateParagraph, json_data, image_placeholders, in_cell: bool = False) -> str:
+    text = html.escape(_paragraph_text(paragraph, json_data, image_placeholders)).replace("\n", "<br>")
+    images = "".join(_html_image(c, image_placeholders[c]) for c in _image_slots_in(paragraph, image_placeholders))
+    level = 0 if in_cell else _heading_level(paragraph.style)
+    tag = f"h{level}" if level else "p"
+    return f"<{tag}>{images}{text}</{tag}>"
+
+
+def _render_html(template: CompiledTemplate, json_data, image_placeholders) -> str:
+    parts = ['<div class="brief-preview">']
+    for block in template.blocks:
+        if isinstance(block, TemplateParagraph):
+            if block.text.strip():
+                parts.append(_html_paragraph(block, json_data, image_placeholders))
+        elif isinstance(block, TemplateTable):
+            parts.append("<table>")
+            for row in block.rows:
+                cells = "".join(
+                    "<td>" + "".join(_html_paragraph(p, json_data, image_placeholders, in_cell=True) for p in cell) + "</td>"
+                    for cell in row
+                )
+                parts.append(f"<tr>{cells}</tr>")
+            parts.append("</table>")
+    parts.append("</div>")
+    return "\n".join(parts)
+
+
+# --- Markdown ---
+def _markdown_image(content: str, img_path: str) -> str:
+    asset = logo_cache.get(img_path)
+    if asset is None:
+        return f"[{content}: image not found]"
+    # The logo's file name, never a server path
+    return f"![{content}]({asset.filename})"
+
+
+def _markdown_paragraph(paragraph: TemplateParagraph, json_data, image_placeholders, in_cell: bool = False) -> str:
+    text = _paragraph_text(paragraph, json_data, image_placeholders)
+    images = " ".join(_markdown_image(c, image_placeholders[c]) for c in _image_slots_in(paragraph, image_placeholders))
+    text = f"{images} {text}".strip() if images else text
+    level = 0 if in_cell else _heading_level(paragraph.style)
+    return f"{'#' * level} {text}" if level else text
+
+
+def _markdown_cell(cell, json_data, image_placeholders) -> str:
+    text = "<br>".join(_markdown_paragraph(p, json_data, image_placeholders, in_cell=True) for p in cell)
+    return text.replace("|", "\\|").replace("\n", "<br>")
+
+
+def _render_markdown(template: CompiledTemplate, json_data, image_placeholders) -> str:
+    parts = []
+    for block in template.blocks:
+        if isinstance(block, TemplateParagraph):
+            if block.text.strip():
+                parts.append(_markdown_paragraph(block, json_data, image_placeholders))
+        elif isinstance(block, TemplateTable) and block.rows:
+            # Markdown tables need a header row: use the first row of the Word table
+            columns = max(len(row) for row in block.rows)
+            lines = []
+            for row_index, row in enumerate(block.rows):
+                cells = [_markdown_cell(cell, json_data, image_placeholders) for cell in row]
+                cells += [""] * (columns - len(cells))
+                lines.append("| " + " | ".join(cells) + " |")
+                if row_index == 0:
+                    lines.append("|" + " --- |" * columns)
+            parts.append("\n".join(lines))
+    return "\n\n".join(parts) + "\n"
+
+
+# --- Cached entry point ---
+_preview_cache: "OrderedDict[str, str]" = OrderedDict()
+_preview_cache_lock = threading.Lock()
+
+
+def preview_key(template: CompiledTemplate, fmt: str, json_data: Dict[str, Any], image_placeholders: Optional[Dict[str, str]]) -> str:
+    """Content hash identifying a preview (also used as HTTP ETag)."""
+    content = json.dumps([json_data, image_placeholders or {}], sort_keys=True, default=str)
+    return hashlib.sha256(f"{template.sha256}\x1f{fmt}\x1f{content}".encode("utf-8")).hexdigest()
+
+
+def render_preview(template: CompiledTemplate, json_data: Dict[str, Any],
+                   image_placeholders: Optional[Dict[str, str]] = None, fmt: str = "html") -> Tuple[str, str]:
+    """
+    Renders the brief as HTML or Markdown using the structure of a compiled template.
+
+    Args:
+        template: CompiledTemplate from the template registry.
+        json_data: Text placeholder data (same format as populate_word_from_json).
+        image_placeholders: Image placeholder content -> image path (optional).
+        fmt: 'html' or 'markdown'.
+
+    Returns:
+        Tuple of (rendered preview, preview key).
+    """
+    if fmt not in PREVIEW_FORMATS:
+        raise ValueError(f"Unsupported preview format '{fmt}'. Use one of: {sorted(PREVIEW_FORMATS)}")
+    image_placeholders = image_placeholders or {}
+
+    key = preview_key(template, fmt, json_data, image_placeholders)
+    with _preview_cache_lock:
+        cached = _preview_cache.get(key)
+        if cached is not None:
+            _preview_cache.move_to_end(key)
+            return cached, key
+
+    if fmt == "html":
+        rendered = _render_html(template, json_data, image_placeholders)
+    else:
+        rendered = _render_markdown(template, json_data, image_placeholders)
+
+    with _preview_cache_lock:
+        _preview_cache[key] = rendered
+        while len(_preview_cache) > PREVIEW_CACHE_MAX_ENTRIES:
+            _preview_cache.popitem(last=False)
+    return rendered, key
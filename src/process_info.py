@@ -0,0 +1,55 @@
+# src/process_info.py
+# Memory and uptime figures of the current process (server worker diagnostics).
+
+import os
+import sys
+import time
+
+try:
+    import resource  # Not available on Windows
+except ImportError:
+    resource = None
+
+PROCESS_STARTED_AT = time.time()
+
+
+def process_memory() -> dict:
+    """
+    Returns the memory use of this process in bytes.
+    'shared' and 'private' (from /proc/self/smaps_rollup, Linux only) show how much of the
+    resident memory is still shared copy-on-write with the server master process.
+    """
+    memory = {}
+    try:
+        with open("/proc/self/smaps_rollup") as f:
+            for line in f:
+                parts = line.split()
+                if len(parts) >= 3 and parts[2] == "kB":
+                    memory[parts[0].rstrip(":")] = int(parts[1]) * 1024
+    except OSError:
+        pass
+    if memory:
+        return {
+            "rss": memory.get("Rss", 0),
+            "pss": memory.get("Pss", 0),
+            "shared": memory.get("Shared_Clean", 0) + memory.get("Shared_Dirty", 0),
+            "private": memory.get("Private_Clean", 0) + memory.get("Private_Dirty", 0),
+        }
+    if resource is None:
+        return {}
+    # Elsewhere only the peak RSS is available (kilobytes on Linux, bytes on macOS)
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return {"max_rss": max_rss if sys.platform == "darwin" else max_rss * 1024}
+
+
+def format_bytes(value: int) -> str:
+    return f"{value / (1024 * 1024):.1f} MiB"
+
+
+def process_summary() -> dict:
+    """pid, uptime and memory of this process."""
+    return {
+        "pid": os.getpid(),
+        "uptime_seconds": round(time.time() - PROCESS_STARTED_AT, 1),
+        "memory": process_memory(),
+    }
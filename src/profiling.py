@@ -0,0 +1,211 @@
+# src/profiling.py
+# On-demand CPU and allocation profiling of a single /create-brief request.
+#
+# With PROFILING_ENABLED=true a request sent with the header 'X-Profile: 1' (or the query
+# parameter '?profile=1') runs its workflow under cProfile and tracemalloc. Afterwards three
+# files are written to PROFILING_DIR (logs/profiles, next to the workflow history):
+#   <request id>.prof              cProfile data (python -m pstats, snakeviz, ...)
+#   <request id>.profile.txt       the functions with the highest cumulative time
+#   <request id>.allocations.txt   peak traced memory and the source lines that allocated most
+# and their paths are returned in the response under 'profile'.
+#
+# LangGraph runs graph nodes and tool calls in worker threads. Up to Python 3.11 cProfile
+# profiles only the thread that enables it, so the profiler is also a callback handler that
+# enables a profiler in every thread a node or tool of this run starts in (and disables it
+# when it ends); the per-thread profiles are merged when saving. From Python 3.12 on, one
+# cProfile covers all threads of the process; the profile then also contains whatever other
+# requests did meanwhile, and only one request can be profiled at a time.
+# tracemalloc is process-wide as well: allocations of concurrent requests are included.
+
+import cProfile
+import io
+import logging
+import os
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+from src.config import PROFILING_DIR, PROFILING_TOP_FUNCTIONS, PROFILING_TOP_ALLOCATIONS
+
+logger = logging.getLogger(__name__)
+
+# Python 3.12+ cProfile (sys.monitoring) is process-wide; before, it is per thread
+PER_THREAD_PROFILING = sys.version_info < (3, 12)
+
+
+# --- tracemalloc (shared by concurrently profiled requests) ---
+_tracemalloc_lock = threading.Lock()
+_tracemalloc_users = 0
+_tracemalloc_owned = False  # Started here (not via PYTHONTRACEMALLOC), so stopped here too
+
+
+def _acquire_tracemalloc():
+    global _tracemalloc_users, _tracemalloc_owned
+    with _tracemalloc_lock:
+        if _tracemalloc_users == 0 and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            _tracemalloc_owned = True
+        elif _tracemalloc_users == 0:
+            tracemalloc.reset_peak()
+        _tracemalloc_users += 1
+
+
+def _release_tracemalloc():
+    global _tracemalloc_users, _tracemalloc_owned
+    with _tracemalloc_lock:
+        _tracemalloc_users -= 1
+        if _tracemalloc_users == 0 and _tracemalloc_owned:
+            tracemalloc.stop()
+            _tracemalloc_owned = False
+
+
+class RequestProfiler(BaseCallbackHandler):
+    """
+    Profiles one workflow run. Use 'with profiler.running():' around the run, pass the
+    profiler to the graph as a callback handler and call save() afterwards.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._profiles: Dict[int, cProfile.Profile] = {}  # thread ident -> profiler of that thread
+        self._depth: Dict[int, int] = {}                   # thread ident -> open nodes/tools in that thread
+        self._baseline = None
+        self._snapshot = None
+        self.peak_bytes = 0
+        self.seconds = 0.0
+        self.error: Optional[str] = None
+
+    # --- Run ---
+    @contextmanager
+    def running(self):
+        """Profiles the calling thread (and the process' allocations) for the duration of the 'with' block."""
+        self._start()
+        try:
+            yield self
+        finally:
+            self._stop()
+
+    def _start(self):
+        _acquire_tracemalloc()
+        self._baseline = tracemalloc.take_snapshot()
+        self._started = time.monotonic()
+        self._enter()
+
+    def _stop(self):
+        self._exit()
+        self.seconds = time.monotonic() - self._started
+        self.peak_bytes = tracemalloc.get_traced_memory()[1]
+        self._snapshot = tracemalloc.take_snapshot()
+        _release_tracemalloc()
+
+    # --- Per-thread profilers (entered/left with the graph's nodes and tools) ---
+    def _enter(self):
+        ident = threading.get_ident()
+        with self._lock:
+            depth = self._depth.get(ident, 0)
+            self._depth[ident] = depth + 1
+            if depth:
+                return
+            profile = self._profiles.setdefault(ident, cProfile.Profile())
+        try:
+            profile.enable()
+        except ValueError as e:
+            # Python 3.12+: another request is being profiled already
+            self.error = f"Profiler not started: {e}"
+            with self._lock:
+                self._profiles.pop(ident, None)
+
+    def _exit(self):
+        ident = threading.get_ident()
+        with self._lock:
+            depth = self._depth.get(ident, 0) - 1
+            if depth > 0:
+                self._depth[ident] = depth
+                return
+            self._depth.pop(ident, None)
+            profile = self._profiles.get(ident)
+        if profile is not None:
+            profile.disable()
+
+    def on_chain_start(self, serialized, inputs, **kwargs):
+        if PER_THREAD_PROFILING:
+            self._enter()
+
+    def on_chain_end(self, outputs, **kwargs):
+        if PER_THREAD_PROFILING:
+            self._exit()
+
+    def on_chain_error(self, error, **kwargs):
+        if PER_THREAD_PROFILING:
+            self._exit()
+
+    def on_tool_start(self, serialized, input_str, **kwargs):
+        if PER_THREAD_PROFILING:
+            self._enter()
+
+    def on_tool_end(self, output, **kwargs):
+        if PER_THREAD_PROFILING:
+            self._exit()
+
+    def on_tool_error(self, error, **kwargs):
+        if PER_THREAD_PROFILING:
+            self._exit()
+
+    # --- Results ---
+    def save(self, request_id: str) -> dict:
+        """Writes the profile files of the run and returns their paths (the 'profile' field of the response)."""
+        os.makedirs(PROFILING_DIR, exist_ok=True)
+        base = os.path.join(PROFILING_DIR, request_id)
+        result = {
+            "seconds": round(self.seconds, 3),
+            "threads": len(self._profiles),
+            "traced_peak_kib": round(self.peak_bytes / 1024, 1),
+            "error": self.error,
+        }
+        try:
+            stats = None
+            for profile in list(self._profiles.values()):
+                if stats is None:
+                    stats = pstats.Stats(profile)
+                else:
+                    stats.add(profile)
+            if stats is not None:
+                stats.dump_stats(base + ".prof")
+                summary = io.StringIO()
+                stats.stream = summary
+                stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(PROFILING_TOP_FUNCTIONS)
+                with open(base + ".profile.txt", "w", encoding="utf-8") as f:
+                    f.write(f"Request {request_id}: {self.seconds:.3f}s, {len(self._profiles)} profiled thread(s)\n")
+                    f.write(summary.getvalue())
+                result["cpu_profile"] = base + ".prof"
+                result["cpu_summary"] = base + ".profile.txt"
+            if self._snapshot is not None:
+                with open(base + ".allocations.txt", "w", encoding="utf-8") as f:
+                    f.write(self._format_allocations(request_id))
+                result["allocations"] = base + ".allocations.txt"
+        except Exception as e:
+            logger.exception("ERROR saving profile of request %s: %s", request_id, e)
+            result["error"] = f"Could not save profile: {e}"
+        logger.info("Profile of request %s: %s", request_id, result, extra={"stage": "profile", "duration_ms": round(self.seconds * 1000, 1)})
+        return result
+
+    def _format_allocations(self, request_id: str) -> str:
+        # Memory still allocated at the end of the run, by the source line that allocated it
+        ignore = [tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, "<frozen importlib._bootstrap*>")]
+        snapshot = self._snapshot.filter_traces(ignore)
+        baseline = self._baseline.filter_traces(ignore)
+        lines = [
+            f"Request {request_id}: traced peak {self.peak_bytes / 1024:.1f} KiB during the run "
+            f"(process-wide; includes concurrent requests)",
+            f"Top {PROFILING_TOP_ALLOCATIONS} source lines by memory allocated during the run and still held at its end:",
+        ]
+        for stat in snapshot.compare_to(baseline, "lineno")[:PROFILING_TOP_ALLOCATIONS]:
+            frame = stat.traceback[0]
+            lines.append(f"{stat.size_diff / 1024:10.1f} KiB {stat.count_diff:8d} blocks  {frame.filename}:{frame.lineno}")
+        return "\n".join(lines) + "\n"
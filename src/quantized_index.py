@@ -0,0 +1,342 @@
+# src/quantized_index.py
+# Compact, read-only vector index with quantized embeddings.
+#
+# The Chroma store keeps every embedding as float32 (6 KB per 1536-dim chunk) plus its
+# HNSW graph, both on disk and in the memory of every server worker. This index stores
+# L2-normalized embeddings as float16 or int8 (with one float32 scale per vector, 1.5 KB
+# per chunk) and searches them by brute-force inner product in fixed-size blocks.
+# Optionally a float32 copy is kept on disk: only the rows of the top candidates are read
+# from it to rescore them exactly, so recall stays close to float32 search.
+#
+# The index is exported from the Chroma store (build_vector_store.py --export-quantized)
+# and selected with RAG_INDEX_BACKEND=quantized.
+#
+# Files in the index directory:
+#   index.json        - format, dtype, dimension, count, export time
+#   vectors.npy       - (count, dim) float16 or int8 embeddings
+#   scales.npy        - (count,) float32 per-vector scales (int8 only)
+#   vectors_f32.npy   - (count, dim) float32 embeddings for rescoring (optional)
+#   documents.jsonl   - one {"id", "text", "metadata"} object per vector, same order
+
+import json
+import logging
+import os
+import threading
+import time
+from typing import Any, Iterable, List, Optional, Tuple
+
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.vectorstores import VectorStore
+
+try:
+    from langchain_core.vectorstores.utils import maximal_marginal_relevance
+except ImportError:  # Older langchain-core
+    from langchain_community.vectorstores.utils import maximal_marginal_relevance
+
+from src.config import (
+    QUANTIZED_INDEX_DIR,
+    QUANTIZED_INDEX_DTYPE,
+    QUANTIZED_INDEX_RESCORE,
+    QUANTIZED_RESCORE_FACTOR,
+)
+
+logger = logging.getLogger(__name__)
+
+INDEX_FORMAT_VERSION = 1
+SUPPORTED_DTYPES = ("float16", "int8")
+SEARCH_BLOCK_ROWS = 1024   # Rows converted to float32 at a time (small blocks stay in the CPU cache)
+EXPORT_PAGE_SIZE = 1000    # Rows read from Chroma at a time
+
+
+# --- Quantization ---
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+def quantize(vectors: np.ndarray, dtype: str) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+    """Returns (quantized vectors, per-vector scales or None) for normalized float32 vectors."""
+    if dtype == "float16":
+        return vectors.astype(np.float16), None
+    if dtype == "int8":
+        scales = np.abs(vectors).max(axis=1) / 127.0
+        scales[scales == 0] = 1.0
+        quantized = np.clip(np.rint(vectors / scales[:, None]), -127, 127).astype(np.int8)
+        return quantized, scales.astype(np.float32)
+    raise ValueError(f"Unsupported quantized index dtype '{dtype}'. Use one of: {SUPPORTED_DTYPES}")
+
+
+def dequantize(quantized: np.ndarray, scales: Optional[np.ndarray]) -> np.ndarray:
+    vectors = quantized.astype(np.float32)
+    if scales is not None:
+        vectors *= scales[:, None]
+    return vectors
+
+
+class _Float32RowReader:
+    """
+    Reads single rows of a float32 .npy file with positioned reads.
+    A memory map would fault in neighbouring pages too and, over many queries, make most
+    of the file resident; the rows needed for rescoring are only a few KB per query.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as f:
+            version = np.lib.format.read_magic(f)
+            if version == (1, 0):
+                shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(f)
+            else:
+                shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(f)
+            self.header_bytes = f.tell()
+        if fortran_order or dtype != np.float32 or len(shape) != 2:
+            raise ValueError(f"Unexpected float32 vector file layout in '{path}'.")
+        self.shape = shape
+        self.row_bytes = shape[1] * 4
+        self._fd = os.open(path, os.O_RDONLY | getattr(os, "O_BINARY", 0))
+        self._lock = threading.Lock()  # Only used where os.pread is unavailable (seek + read)
+
+    def __len__(self):
+        return self.shape[0]
+
+    def _read(self, offset: int) -> bytes:
+        if hasattr(os, "pread"):
+            return os.pread(self._fd, self.row_bytes, offset)
+        with self._lock:
+            os.lseek(self._fd, offset, os.SEEK_SET)
+            return os.read(self._fd, self.row_bytes)
+
+    def read_rows(self, rows) -> np.ndarray:
+        out = np.empty((len(rows), self.shape[1]), dtype=np.float32)
+        for i, row in enumerate(rows):
+            out[i] = np.frombuffer(self._read(self.header_bytes + int(row) * self.row_bytes), dtype=np.float32)
+        return out
+
+
+# --- Vector Store ---
+class QuantizedVectorStore(VectorStore):
+    """
+    Read-only LangChain vector store over a quantized index directory.
+
+    Args:
+        directory: Index directory written by export_from_chroma / save.
+        embedding: Embeddings used to embed queries (must match the exported embeddings).
+        rescore: Rescore the top candidates with the float32 vectors (if they were exported).
+        rescore_factor: Candidates rescored per requested result.
+    """
+
+    def __init__(self, directory: str, embedding: Embeddings, rescore: bool = QUANTIZED_INDEX_RESCORE,
+                 rescore_factor: int = QUANTIZED_RESCORE_FACTOR):
+        self.directory = directory
+        self._embedding = embedding
+        with open(os.path.join(directory, "index.json"), encoding="utf-8") as f:
+            self.info = json.load(f)
+        if self.info.get("version") != INDEX_FORMAT_VERSION:
+            raise ValueError(f"Quantized index '{directory}' has format {self.info.get('version')}, expected {INDEX_FORMAT_VERSION}.")
+        self.dtype = self.info["dtype"]
+        # Memory-mapped: pages are loaded on first use and shared between forked workers
+        self.vectors = np.load(os.path.join(directory, "vectors.npy"), mmap_mode="r")
+        scales_path = os.path.join(directory, "scales.npy")
+        self.scales = np.load(scales_path) if os.path.exists(scales_path) else None
+        float32_path = os.path.join(directory, "vectors_f32.npy")
+        self.float32_vectors = _Float32RowReader(float32_path) if rescore and os.path.exists(float32_path) else None
+        self.rescore_factor = max(1, rescore_factor)
+        self.ids, self.texts, self.metadatas = [], [], []
+        with open(os.path.join(directory, "documents.jsonl"), encoding="utf-8") as f:
+            for line in f:
+                record = json.loads(line)
+                self.ids.append(record["id"])
+                self.texts.append(record["text"])
+                self.metadatas.append(record.get("metadata") or {})
+        if len(self.ids) != len(self.vectors):
+            raise ValueError(f"Quantized index '{directory}' is inconsistent: {len(self.ids)} documents, {len(self.vectors)} vectors.")
+
+    @property
+    def embeddings(self) -> Embeddings:
+        return self._embedding
+
+    def __len__(self):
+        return len(self.ids)
+
+    # --- Search ---
+    def _approximate_scores(self, query: np.ndarray) -> np.ndarray:
+        """Inner products of the query with every stored vector, computed block by block."""
+        scores = np.empty(len(self.vectors), dtype=np.float32)
+        for start in range(0, len(self.vectors), SEARCH_BLOCK_ROWS):
+            block = np.asarray(self.vectors[start:start + SEARCH_BLOCK_ROWS], dtype=np.float32)
+            block_scores = block @ query
+            if self.scales is not None:
+                block_scores *= self.scales[start:start + SEARCH_BLOCK_ROWS]
+            scores[start:start + len(block)] = block_scores
+        return scores
+
+    def _search_indices(self, query_vector: List[float], k: int) -> List[Tuple[int, float]]:
+        """Returns [(row, cosine similarity)] of the k best matches, best first."""
+        if not len(self.vectors) or k <= 0:
+            return []
+        query = _normalize(np.asarray(query_vector, dtype=np.float32))
+        scores = self._approximate_scores(query)
+        candidates = k * self.rescore_factor if self.float32_vectors is not None else k
+        candidates = min(candidates, len(scores))
+        top = np.argpartition(-scores, candidates - 1)[:candidates]
+        if self.float32_vectors is not None:
+            rows = np.sort(top)
+            scores_exact = self.float32_vectors.read_rows(rows) @ query
+            order = np.argsort(-scores_exact)[:k]
+            return [(int(rows[i]), float(scores_exact[i])) for i in order]
+        order = top[np.argsort(-scores[top])][:k]
+        return [(int(i), float(scores[i])) for i in order]
+
+    def _document(self, row: int) -> Document:
+        return Document(page_content=self.texts[row], metadata=dict(self.metadatas[row]), id=self.ids[row])
+
+    def similarity_search_with_score_by_vector(self, embedding: List[float], k: int = 4, **kwargs: Any) -> List[Tuple[Document, float]]:
+        return [(self._document(row), score) for row, score in self._search_indices(embedding, k)]
+
+    def similarity_search_by_vector(self, embedding: List[float], k: int = 4, **kwargs: Any) -> List[Document]:
+        return [doc for doc, _ in self.similarity_search_with_score_by_vector(embedding, k)]
+
+    def similarity_search_with_score(self, query: str, k: int = 4, **kwargs: Any) -> List[Tuple[Document, float]]:
+        return self.similarity_search_with_score_by_vector(self._embedding.embed_query(query), k)
+
+    def similarity_search(self, query: str, k: int = 4, **kwargs: Any) -> List[Document]:
+        return [doc for doc, _ in self.similarity_search_with_score(query, k)]
+
+    def _select_relevance_score_fn(self):
+        # Cosine similarity in [-1, 1] -> relevance in [0, 1]
+        return lambda score: (score + 1.0) / 2.0
+
+    def max_marginal_relevance_search_by_vector(self, embedding: List[float], k: int = 4, fetch_k: int = 20,
+                                                lambda_mult: float = 0.5, **kwargs: Any) -> List[Document]:
+        matches = self._search_indices(embedding, max(fetch_k, k))
+        if not matches:
+            return []
+        rows = [row for row, _ in matches]
+        if self.float32_vectors is not None:
+            candidates = self.float32_vectors.read_rows(rows)
+        else:
+            scales = self.scales[rows] if self.scales is not None else None
+            candidates = dequantize(np.asarray(self.vectors[rows]), scales)
+        query = _normalize(np.asarray(embedding, dtype=np.float32))
+        selected = maximal_marginal_relevance(query, candidates, lambda_mult=lambda_mult, k=k)
+        return [self._document(rows[i]) for i in selected]
+
+    def max_marginal_relevance_search(self, query: str, k: int = 4, fetch_k: int = 20,
+                                      lambda_mult: float = 0.5, **kwargs: Any) -> List[Document]:
+        return self.max_marginal_relevance_search_by_vector(self._embedding.embed_query(query), k, fetch_k, lambda_mult)
+
+    # --- Building ---
+    def add_texts(self, texts: Iterable[str], metadatas: Optional[List[dict]] = None, **kwargs: Any) -> List[str]:
+        raise NotImplementedError("QuantizedVectorStore is read-only. Rebuild the Chroma store and export it again.")
+
+    @classmethod
+    def from_texts(cls, texts: List[str], embedding: Embeddings, metadatas: Optional[List[dict]] = None, *,
+                   ids: Optional[List[str]] = None, directory: str = QUANTIZED_INDEX_DIR,
+                   dtype: str = QUANTIZED_INDEX_DTYPE, keep_float32: bool = True, **kwargs: Any) -> "QuantizedVectorStore":
+        """Embeds the texts, writes a quantized index to 'directory' and opens it."""
+        vectors = embedding.embed_documents(list(texts))
+        writer = QuantizedIndexWriter(directory, len(texts), len(vectors[0]) if vectors else 0, dtype, keep_float32)
+        writer.write(np.asarray(vectors, dtype=np.float32), ids or [str(i) for i in range(len(texts))],
+                     list(texts), metadatas or [{} for _ in texts])
+        writer.close(source="from_texts")
+        return cls(directory, embedding)
+
+
+class QuantizedIndexWriter:
+    """Writes a quantized index incrementally (rows are streamed in pages, not held in memory)."""
+
+    def __init__(self, directory: str, count: int, dim: int, dtype: str = QUANTIZED_INDEX_DTYPE, keep_float32: bool = True):
+        if dtype not in SUPPORTED_DTYPES:
+            raise ValueError(f"Unsupported quantized index dtype '{dtype}'. Use one of: {SUPPORTED_DTYPES}")
+        if count <= 0 or dim <= 0:
+            raise ValueError("Cannot write an empty quantized index.")
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.count, self.dim, self.dtype = count, dim, dtype
+        self.offset = 0
+        self.vectors = np.lib.format.open_memmap(os.path.join(directory, "vectors.npy.tmp"), mode="w+",
+                                                 dtype=np.dtype(dtype), shape=(count, dim))
+        self.scales = np.empty(count, dtype=np.float32) if dtype == "int8" else None
+        self.float32_vectors = None
+        if keep_float32:
+            self.float32_vectors = np.lib.format.open_memmap(os.path.join(directory, "vectors_f32.npy.tmp"), mode="w+",
+                                                             dtype=np.float32, shape=(count, dim))
+        self.documents_file = open(os.path.join(directory, "documents.jsonl.tmp"), "w", encoding="utf-8")
+
+    def write(self, vectors: np.ndarray, ids: List[str], texts: List[str], metadatas: List[dict]):
+        end = self.offset + len(ids)
+        normalized = _normalize(vectors)
+        quantized, scales = quantize(normalized, self.dtype)
+        self.vectors[self.offset:end] = quantized
+        if self.scales is not None:
+            self.scales[self.offset:end] = scales
+        if self.float32_vectors is not None:
+            self.float32_vectors[self.offset:end] = normalized
+        for item_id, text, metadata in zip(ids, texts, metadatas):
+            self.documents_file.write(json.dumps({"id": item_id, "text": text, "metadata": metadata or {}}) + "\n")
+        self.offset = end
+
+    def close(self, source: str = ""):
+        """Flushes the files and moves them into place (index.json last, so readers never see a partial index)."""
+        if self.offset != self.count:
+            raise ValueError(f"Quantized index writer received {self.offset} rows, expected {self.count}.")
+        self.documents_file.close()
+        self.vectors.flush()
+        del self.vectors
+        os.replace(os.path.join(self.directory, "vectors.npy.tmp"), os.path.join(self.directory, "vectors.npy"))
+        scales_path = os.path.join(self.directory, "scales.npy")
+        if self.scales is not None:
+            np.save(scales_path, self.scales)
+        elif os.path.exists(scales_path):
+            os.remove(scales_path)
+        float32_path = os.path.join(self.directory, "vectors_f32.npy")
+        if self.float32_vectors is not None:
+            self.float32_vectors.flush()
+            del self.float32_vectors
+            os.replace(float32_path + ".tmp", float32_path)
+        elif os.path.exists(float32_path):
+            os.remove(float32_path)
+        os.replace(os.path.join(self.directory, "documents.jsonl.tmp"), os.path.join(self.directory, "documents.jsonl"))
+        info = {
+            "version": INDEX_FORMAT_VERSION,
+            "dtype": self.dtype,
+            "dim": self.dim,
+            "count": self.count,
+            "float32_rescoring": os.path.exists(float32_path),
+            "source": source,
+            "exported_at": time.time(),
+        }
+        with open(os.path.join(self.directory, "index.json.tmp"), "w", encoding="utf-8") as f:
+            json.dump(info, f, indent=2)
+        os.replace(os.path.join(self.directory, "index.json.tmp"), os.path.join(self.directory, "index.json"))
+
+
+def export_from_chroma(chroma_store, directory: str = QUANTIZED_INDEX_DIR, dtype: str = QUANTIZED_INDEX_DTYPE,
+                       keep_float32: bool = True) -> dict:
+    """
+    Exports the embeddings, texts and metadata of a LangChain Chroma store to a quantized index.
+    Rows are read in pages, so the export does not load the whole collection into memory.
+
+    Returns:
+        The index info written to index.json.
+    """
+    collection = chroma_store._collection
+    count = collection.count()
+    dim = 0
+    if count:
+        first = collection.get(limit=1, include=["embeddings"])
+        dim = len(first["embeddings"][0])
+    logger.info("Exporting %d vectors (dim %d) from Chroma to a %s index at '%s'...", count, dim, dtype, directory)
+    writer = QuantizedIndexWriter(directory, count, dim, dtype, keep_float32)
+    for offset in range(0, count, EXPORT_PAGE_SIZE):
+        page = collection.get(limit=EXPORT_PAGE_SIZE, offset=offset, include=["embeddings", "documents", "metadatas"])
+        writer.write(np.asarray(page["embeddings"], dtype=np.float32), page["ids"], page["documents"], page["metadatas"])
+    writer.close(source=f"chroma:{getattr(chroma_store, '_persist_directory', '') or ''}")
+    with open(os.path.join(directory, "index.json"), encoding="utf-8") as f:
+        info = json.load(f)
+    logger.info("Quantized index exported: %s", info)
+    return info
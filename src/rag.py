@@ -1,67 +1,124 @@
 # src/rag.py
+#
+# Vector store and retriever used by the retrieval tool.
+#
+# The quantized index (numpy arrays, memory-mapped files) is fork-safe and loaded at import,
+# so serve.py shares it copy-on-write between the gunicorn workers. The Chroma client is not:
+# its SQLite connection and background threads must not cross a fork (inherited clients abort
+# the worker at exit). The Chroma store is therefore opened lazily, once per process, on the
+# first call of get_vector_store()/get_retriever() - in the workers, never in the master.
 
+import logging
 import os
+import threading
 from langchain_community.vectorstores import Chroma
 # Use the initialized embeddings object from src/llm
 from src.llm import embeddings
 # Import configuration variables for path and search kwargs
 from src.config import PERSIST_DIRECTORY, RAG_SEARCH_KWARGS # Use PERSIST_DIRECTORY from config
+from src.config import RAG_INDEX_BACKEND, QUANTIZED_INDEX_DIR
 
-vector_store = None
-retriever = None
+logger = logging.getLogger(__name__)
+
+# Preloaded (fork-safe) store and retriever; None for the Chroma backend
+_preloaded = None
+# Chroma store and retriever of the current process: (pid, vector_store, retriever)
+_process_store = None
+_process_lock = threading.Lock()
+available = False
+
+logger.debug("Setting up RAG components (vector store and Retriever)...")
+
+
+def _retriever_for(vector_store):
+    # Use search kwargs from config
+    retriever = vector_store.as_retriever(
+        search_type="similarity", # Common search type
+        search_kwargs=RAG_SEARCH_KWARGS
+    )
+    logger.debug("Retriever initialized with search kwargs: %s", RAG_SEARCH_KWARGS)
+    return retriever
+
+
+def _open_chroma():
+    """Opens the Chroma store for the current process. Returns (vector_store, retriever) or (None, None)."""
+    try:
+        logger.debug("Attempting to load Chroma vector store from: %s (pid %d)", PERSIST_DIRECTORY, os.getpid())
+        vector_store = Chroma(
+            persist_directory=PERSIST_DIRECTORY,
+            embedding_function=embeddings # Use the initialized embeddings object
+        )
+        logger.info("Chroma vector store loaded from %s (pid %d).", PERSIST_DIRECTORY, os.getpid())
+        retriever = _retriever_for(vector_store)
+    except Exception as e:
+        logger.exception("ERROR initializing Chroma vector store or retriever: %s", e)
+        return None, None
+
+    # Optional: Basic check if the store has content
+    try:
+        collection_names = [c.name for c in vector_store._client.list_collections()]
+        if not collection_names:
+            logger.warning("Vector store directory '%s' found, but appears empty (no collections). Run build_vector_store.py.", PERSIST_DIRECTORY)
+        else:
+            logger.debug("Vector store appears to contain collections: %s.", collection_names)
+    except Exception as e:
+        logger.debug("Could not perform detailed check on vector store collections: %s", e)
+    return vector_store, retriever
+
+
+def _current():
+    global _process_store
+    if _preloaded is not None:
+        return _preloaded
+    if not available:
+        return None, None
+    pid = os.getpid()
+    store = _process_store
+    if store is None or store[0] != pid:
+        with _process_lock:
+            store = _process_store
+            if store is None or store[0] != pid:
+                # A store inherited from the parent process is left alone (not closed): finalizing
+                # it here would act on the parent's connection and threads
+                store = (pid,) + _open_chroma()
+                _process_store = store
+    return store[1], store[2]
+
+
+def get_vector_store():
+    """Returns the vector store of this process, or None if RAG is not available."""
+    return _current()[0]
+
+
+def get_retriever():
+    """Returns the retriever of this process, or None if RAG is not available."""
+    return _current()[1]
 
-print("Setting up RAG components (Chroma vector store and Retriever)...")
 
 if embeddings is None:
-    print("*** ERROR: Embeddings not initialized in src/llm.py. Cannot set up RAG retriever. ***")
+    logger.error("Embeddings not initialized in src/llm.py. Cannot set up RAG retriever.")
+# Check if the vector store directory exists *before* attempting to load
+elif not os.path.exists(PERSIST_DIRECTORY):
+    # The build_vector_store.py script must create this directory and populate it.
+    logger.warning("Vector store directory not found at '%s'. Run build_vector_store.py first. RAG will not function.", PERSIST_DIRECTORY)
+elif RAG_INDEX_BACKEND == "quantized":
+    try:
+        # Compact read-only index exported from the Chroma store (build_vector_store.py --export-quantized)
+        from src.quantized_index import QuantizedVectorStore
+        logger.debug("Attempting to load quantized vector index from: %s", QUANTIZED_INDEX_DIR)
+        quantized_store = QuantizedVectorStore(QUANTIZED_INDEX_DIR, embeddings)
+        logger.info("Quantized vector index loaded (%d vectors, %s, float32 rescoring: %s).",
+                    len(quantized_store), quantized_store.dtype, quantized_store.float32_vectors is not None)
+        _preloaded = (quantized_store, _retriever_for(quantized_store))
+        available = True
+    except Exception as e:
+        logger.exception("ERROR initializing quantized vector index or retriever: %s", e)
 else:
-    # Check if the vector store directory exists *before* attempting to load
-    if not os.path.exists(PERSIST_DIRECTORY):
-        # The build_vector_store.py script must create this directory and populate it.
-        print(f"\n*** WARNING: Vector store directory not found at '{PERSIST_DIRECTORY}'. Run build_vector_store.py first. RAG will not function. ***\n")
-    else:
-        try:
-            # Attempt to load the existing vector store
-            print(f"Attempting to load Chroma vector store from: {PERSIST_DIRECTORY}")
-            vector_store = Chroma(
-                persist_directory=PERSIST_DIRECTORY,
-                embedding_function=embeddings # Use the initialized embeddings object
-            )
-            print("Chroma vector store loaded.")
-
-            # Create the retriever instance
-            # Use search kwargs from config
-            retriever = vector_store.as_retriever(
-                search_type="similarity", # Common search type
-                search_kwargs=RAG_SEARCH_KWARGS
-            )
-            print(f"Retriever initialized with search kwargs: {RAG_SEARCH_KWARGS}")
-
-            # Optional: Basic check if the store has content (requires chromadb installed)
-            try:
-                # Accessing internal _client might change, but is needed to check collections
-                # Check if vector_store is not None before accessing _client
-                if vector_store and hasattr(vector_store, '_client'):
-                    collection_names = [c.name for c in vector_store._client.list_collections()]
-                    if not collection_names:
-                          print(f"*** WARNING: Vector store directory '{PERSIST_DIRECTORY}' found, but appears empty (no collections). Run build_vector_store.py. ***")
-                    else:
-                        print(f"Vector store appears to contain collections: {collection_names}.")
-                else:
-                    print("Note: Vector store client not available for detailed check.")
-
-            except Exception as e:
-                print(f"Note: Could not perform detailed check on vector store collections: {e}")
-
-
-        except Exception as e:
-            print(f"\n*** ERROR initializing Chroma vector store or retriever: {e} ***")
-            import traceback
-            traceback.print_exc()
-            vector_store = None
-            retriever = None
-
-if retriever is None:
-    print("\n*** WARNING: RAG Retriever failed to initialize. The 'retrieve_relevant_campaign_data' tool will not function. ***")
+    # Chroma is opened on first use in each process (see get_vector_store)
+    available = True
+    logger.debug("Chroma vector store at %s will be opened on first use.", PERSIST_DIRECTORY)
+
+if not available:
+    logger.warning("RAG Retriever failed to initialize. The 'retrieve_relevant_campaign_data' tool will not function.")
 else:
-    print("RAG components initialized.")
\ No newline at end of file
+    logger.debug("RAG components initialized.")
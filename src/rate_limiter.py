@@ -0,0 +1,323 @@
+# src/rate_limiter.py
+# Process-wide client-side rate limiter for the Azure OpenAI deployments.
+#
+# Azure enforces a requests-per-minute (RPM) and a tokens-per-minute (TPM) quota per
+# deployment and answers with HTTP 429 once either is exhausted. The OpenAI client then
+# backs off and retries, which slows down every in-flight workflow at the same time.
+# Instead, every chat/embedding call first acquires capacity from a token bucket here,
+# so calls queue up in the process before they are sent.
+#
+# Scheduling:
+#   - Waiters with a lower priority value (PRIORITY_INTERACTIVE) are always served
+#     before waiters with a higher one (PRIORITY_BACKGROUND, e.g. indexing).
+#   - Within a priority, requests are served round-robin (one grant per request id per
+#     turn), so a single workflow issuing many calls cannot starve the others.
+#
+# The limiters only see the calls of their own process, and priorities only apply within
+# it. When the app runs in several worker processes (serve.py), each worker gets an equal
+# share of the quotas (see share_quotas_between_workers). build_vector_store.py runs in a
+# separate process and cannot queue behind server traffic; it is limited to
+# INDEXING_QUOTA_SHARE of the quotas instead (see limit_to_quota_share).
+#
+# Chat roles configured with a deployment of their own (see src/llm.py) get a separate
+# limiter with that deployment's quota (see chat_rate_limiter_for).
+
+import asyncio
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Optional
+
+from src.config import (
+    AZURE_OPENAI_CHAT_ENDPOINT,
+    AZURE_OPENAI_CHAT_DEPLOYMENT_NAME,
+    AZURE_OPENAI_CHAT_RPM,
+    AZURE_OPENAI_CHAT_TPM,
+    AZURE_OPENAI_EMBEDDING_RPM,
+    AZURE_OPENAI_EMBEDDING_TPM,
+    RATE_LIMIT_BURST_SECONDS,
+    RATE_LIMIT_MAX_WAIT_SECONDS,
+)
+from src.request_context import get_request_context, PRIORITY_INTERACTIVE, PRIORITY_NAMES
+
+logger = logging.getLogger(__name__)
+
+
+class RateLimitTimeout(Exception):
+    """Raised when capacity could not be acquired within the maximum wait time."""
+
+
+class TokenBucket:
+    """
+    Token bucket refilled continuously at quota_per_minute / 60 units per second.
+
+    The bucket holds at most 'burst_seconds' worth of quota. Azure evaluates the
+    per-minute quotas over short windows (around 10 seconds), so allowing a full
+    minute of quota as a burst would still trigger 429s.
+    """
+
+    def __init__(self, quota_per_minute: float, burst_seconds: float):
+        self.rate_per_second = quota_per_minute / 60.0
+        self.capacity = max(1.0, self.rate_per_second * burst_seconds)
+        self.level = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float):
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate_per_second)
+        self.updated = now
+
+    def wait_time(self, amount: float, now: float) -> float:
+        """Seconds until 'amount' units are available (0 if available now)."""
+        self._refill(now)
+        amount = min(amount, self.capacity)  # A single call larger than the bucket only waits for a full bucket
+        if self.level >= amount:
+            return 0.0
+        return (amount - self.level) / self.rate_per_second
+
+    def consume(self, amount: float):
+        self.level -= min(amount, self.capacity)
+
+
+class _Waiter:
+    __slots__ = ("request_id", "priority", "tokens")
+
+    def __init__(self, request_id: str, priority: int, tokens: int):
+        self.request_id = request_id
+        self.priority = priority
+        self.tokens = tokens
+
+
+class RateLimiter:
+    """
+    Fair, prioritized RPM/TPM limiter shared by all threads of the process.
+
+    Args:
+        name: Name used in log output (e.g. 'chat', 'embedding').
+        requests_per_minute: RPM quota of the deployment. 0 disables the request bucket.
+        tokens_per_minute: TPM quota of the deployment. 0 disables the token bucket.
+        burst_seconds: Seconds of quota that may be spent in a burst.
+        max_wait_seconds: Maximum time a call waits before RateLimitTimeout is raised.
+    """
+
+    def __init__(self, name: str, requests_per_minute: int, tokens_per_minute: int,
+                 burst_seconds: float = 10.0, max_wait_seconds: float = 120.0):
+        self.name = name
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self.burst_seconds = burst_seconds
+        self.max_wait_seconds = max_wait_seconds
+        self._request_bucket = None
+        self._token_bucket = None
+        self._condition = threading.Condition()
+        self.configure(requests_per_minute, tokens_per_minute)
+        # priority -> OrderedDict(request_id -> deque of waiters); the OrderedDict order is the round-robin order
+        self._queues = {}
+        # Counters for diagnostics
+        self.granted_calls = 0
+        self.granted_tokens = 0
+        self.total_wait_seconds = 0.0
+
+    def configure(self, requests_per_minute: float, tokens_per_minute: float):
+        """Replaces the quotas (e.g. with this process's share of the deployment quota)."""
+        with self._condition:
+            self.requests_per_minute = requests_per_minute
+            self.tokens_per_minute = tokens_per_minute
+            self._request_bucket = TokenBucket(requests_per_minute, self.burst_seconds) if requests_per_minute > 0 else None
+            self._token_bucket = TokenBucket(tokens_per_minute, self.burst_seconds) if tokens_per_minute > 0 else None
+            self._condition.notify_all()
+
+    @property
+    def enabled(self) -> bool:
+        return self._request_bucket is not None or self._token_bucket is not None
+
+    # --- Queue management (caller holds self._condition) ---
+    def _enqueue(self, waiter: _Waiter):
+        per_request = self._queues.setdefault(waiter.priority, OrderedDict())
+        per_request.setdefault(waiter.request_id, deque()).append(waiter)
+
+    def _remove(self, waiter: _Waiter):
+        per_request = self._queues.get(waiter.priority)
+        if not per_request or waiter.request_id not in per_request:
+            return
+        waiters = per_request[waiter.request_id]
+        try:
+            waiters.remove(waiter)
+        except ValueError:
+            return
+        if not waiters:
+            del per_request[waiter.request_id]
+        else:
+            # Served one call for this request: move it to the back of the round-robin order
+            per_request.move_to_end(waiter.request_id)
+
+    def _head(self) -> Optional[_Waiter]:
+        for priority in sorted(self._queues):
+            per_request = self._queues[priority]
+            if per_request:
+                return next(iter(per_request.values()))[0]
+        return None
+
+    def _wait_time(self, tokens: int, now: float) -> float:
+        wait = 0.0
+        if self._request_bucket is not None:
+            wait = max(wait, self._request_bucket.wait_time(1, now))
+        if self._token_bucket is not None:
+            wait = max(wait, self._token_bucket.wait_time(tokens, now))
+        return wait
+
+    def _consume(self, tokens: int):
+        if self._request_bucket is not None:
+            self._request_bucket.consume(1)
+        if self._token_bucket is not None:
+            self._token_bucket.consume(tokens)
+
+    # --- Public API ---
+    def acquire(self, tokens: int, request_id: Optional[str] = None, priority: Optional[int] = None) -> float:
+        """
+        Blocks until one request and 'tokens' tokens are available, then consumes them.
+
+        Request id and priority default to the active RequestContext.
+
+        Returns:
+            Seconds spent waiting.
+        """
+        if not self.enabled:
+            return 0.0
+
+        context = get_request_context()
+        if request_id is None:
+            request_id = context.request_id if context else "anonymous"
+        if priority is None:
+            priority = context.priority if context else PRIORITY_INTERACTIVE
+
+        started = time.monotonic()
+        deadline = started + self.max_wait_seconds
+        waiter = _Waiter(request_id, priority, max(0, int(tokens)))
+
+        with self._condition:
+            self._enqueue(waiter)
+            try:
+                while True:
+                    now = time.monotonic()
+                    if self._head() is waiter:
+                        wait = self._wait_time(waiter.tokens, now)
+                        if wait <= 0:
+                            self._consume(waiter.tokens)
+                            break
+                    else:
+                        wait = deadline - now  # Woken up by notify_all when the head changes
+                    if now >= deadline:
+                        raise RateLimitTimeout(
+                            f"{self.name} rate limiter: no capacity for {waiter.tokens} tokens after {self.max_wait_seconds}s "
+                            f"(request '{request_id}', {PRIORITY_NAMES.get(priority, priority)} priority)."
+                        )
+                    self._condition.wait(min(wait, deadline - now))
+            finally:
+                self._remove(waiter)
+                self._condition.notify_all()
+
+            waited = time.monotonic() - started
+            self.granted_calls += 1
+            self.granted_tokens += waiter.tokens
+            self.total_wait_seconds += waited
+
+        if waited > 1.0:
+            logger.debug("Rate limiter '%s': request '%s' waited %.2fs for %d tokens.", self.name, request_id, waited, waiter.tokens,
+                         extra={"event": "rate_limit_wait", "stage": "llm", "duration_ms": round(waited * 1000, 1)})
+        return waited
+
+    async def aacquire(self, tokens: int, request_id: Optional[str] = None, priority: Optional[int] = None) -> float:
+        """Async variant of acquire(); waits in a worker thread so the event loop is not blocked."""
+        if not self.enabled:
+            return 0.0
+        return await asyncio.to_thread(self.acquire, tokens, request_id, priority)
+
+    def stats(self) -> dict:
+        """Returns counters and configuration of the limiter."""
+        with self._condition:
+            queued = sum(len(w) for per_request in self._queues.values() for w in per_request.values())
+            return {
+                "name": self.name,
+                "enabled": self.enabled,
+                "requests_per_minute": self.requests_per_minute,
+                "tokens_per_minute": self.tokens_per_minute,
+                "queued_calls": queued,
+                "granted_calls": self.granted_calls,
+                "granted_tokens": self.granted_tokens,
+                "total_wait_seconds": round(self.total_wait_seconds, 3),
+            }
+
+
+# --- Process-wide limiters, one per deployment ---
+chat_rate_limiter = RateLimiter(
+    "chat", AZURE_OPENAI_CHAT_RPM, AZURE_OPENAI_CHAT_TPM,
+    burst_seconds=RATE_LIMIT_BURST_SECONDS, max_wait_seconds=RATE_LIMIT_MAX_WAIT_SECONDS
+)
+embedding_rate_limiter = RateLimiter(
+    "embedding", AZURE_OPENAI_EMBEDDING_RPM, AZURE_OPENAI_EMBEDDING_TPM,
+    burst_seconds=RATE_LIMIT_BURST_SECONDS, max_wait_seconds=RATE_LIMIT_MAX_WAIT_SECONDS
+)
+
+_DEPLOYMENT_QUOTAS = {
+    chat_rate_limiter: (AZURE_OPENAI_CHAT_RPM, AZURE_OPENAI_CHAT_TPM),
+    embedding_rate_limiter: (AZURE_OPENAI_EMBEDDING_RPM, AZURE_OPENAI_EMBEDDING_TPM),
+}
+
+
+# (endpoint, deployment) -> limiter of chat deployments other than the default one
+_chat_limiters = {}
+_chat_limiters_lock = threading.Lock()
+
+
+def chat_rate_limiter_for(deployment: str, endpoint: str, rpm: int = 0, tpm: int = 0) -> RateLimiter:
+    """
+    Returns the limiter of a chat deployment: chat_rate_limiter for the default deployment,
+    otherwise one limiter per (endpoint, deployment), created with the given quota.
+    """
+    if deployment == AZURE_OPENAI_CHAT_DEPLOYMENT_NAME and endpoint == AZURE_OPENAI_CHAT_ENDPOINT:
+        return chat_rate_limiter
+    with _chat_limiters_lock:
+        limiter = _chat_limiters.get((endpoint, deployment))
+        if limiter is not None:
+            # Roles sharing a deployment share its limiter; the quota may be set on any one of them
+            if (rpm or tpm) and _DEPLOYMENT_QUOTAS[limiter] == (0, 0):
+                _DEPLOYMENT_QUOTAS[limiter] = (rpm, tpm)
+                limiter.configure(rpm, tpm)
+            return limiter
+        limiter = RateLimiter(f"chat:{deployment}", rpm, tpm,
+                              burst_seconds=RATE_LIMIT_BURST_SECONDS, max_wait_seconds=RATE_LIMIT_MAX_WAIT_SECONDS)
+        _chat_limiters[(endpoint, deployment)] = limiter
+        _DEPLOYMENT_QUOTAS[limiter] = (rpm, tpm)
+    if limiter.enabled:
+        logger.info("Rate limiter '%s' enabled: %s RPM, %s TPM.", limiter.name, limiter.requests_per_minute, limiter.tokens_per_minute)
+    else:
+        logger.info("Rate limiter '%s' disabled (no RPM/TPM quota configured).", limiter.name)
+    return limiter
+
+
+def limit_to_quota_share(share: float, description: Optional[str] = None):
+    """Limits this process to 'share' (0-1] of each deployment quota."""
+    share = min(1.0, max(share, 1e-6))
+    for limiter, (rpm, tpm) in _DEPLOYMENT_QUOTAS.items():
+        # Fresh lock too: a lock held by another thread at fork time would stay locked in the child
+        limiter._condition = threading.Condition()
+        limiter._queues = {}
+        limiter.configure(rpm * share, tpm * share)
+        if limiter.enabled:
+            logger.info("Rate limiter '%s' (pid %d): %.1f RPM, %.0f TPM (%s of the deployment quota).", limiter.name,
+                        os.getpid(), limiter.requests_per_minute, limiter.tokens_per_minute, description or f"{share:.0%}")
+
+
+def share_quotas_between_workers(workers: int):
+    """Limits this process to 1/workers of each deployment quota (called in every server worker after fork)."""
+    workers = max(1, workers)
+    limit_to_quota_share(1 / workers, f"1/{workers}")
+
+
+for _limiter in (chat_rate_limiter, embedding_rate_limiter):
+    if _limiter.enabled:
+        logger.info("Rate limiter '%s' enabled: %s RPM, %s TPM.", _limiter.name, _limiter.requests_per_minute, _limiter.tokens_per_minute)
+    else:
+        logger.info("Rate limiter '%s' disabled (no RPM/TPM quota configured).", _limiter.name)
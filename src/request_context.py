@@ -0,0 +1,72 @@
+# src/request_context.py
+# Per-request context shared by every component that runs on behalf of a single
+# /create-brief request (rate limiter, tools, logging, ...).
+#
+# The context lives in a contextvars.ContextVar, so it follows the request into
+# the worker threads LangGraph uses to execute graph nodes (LangGraph copies the
+# caller's context into those threads).
+
+import contextvars
+import uuid
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Optional
+
+# --- Traffic Priorities ---
+# Lower value = served first by the client-side rate limiter.
+PRIORITY_INTERACTIVE = 0  # User-facing brief generation
+PRIORITY_BACKGROUND = 1   # Indexing / embedding of the corpus
+
+PRIORITY_NAMES = {
+    PRIORITY_INTERACTIVE: "interactive",
+    PRIORITY_BACKGROUND: "background",
+}
+
+
+@dataclass
+class RequestContext:
+    """State describing the request the current thread is working for."""
+    request_id: str
+    priority: int = PRIORITY_INTERACTIVE
+    # Where populate_word_from_json saves this request's document (None = path given to the tool)
+    output_path: Optional[str] = None
+    # Template selected for this request (None = path given to the tools)
+    template_path: Optional[str] = None
+    # Token use and budgets of this request's LLM calls (src/token_budget.py; None = not profiled)
+    token_profile: Optional[object] = None
+    # Loop detection, deadlines and cancellation of this request's workflow run (src/workflows/guards.py)
+    guard: Optional[object] = None
+
+
+_current_request_context: contextvars.ContextVar = contextvars.ContextVar("request_context", default=None)
+
+
+def new_request_id() -> str:
+    """Returns a short unique id for a request."""
+    return uuid.uuid4().hex[:12]
+
+
+def get_request_context() -> Optional[RequestContext]:
+    """Returns the active RequestContext, or None outside of a request."""
+    return _current_request_context.get()
+
+
+@contextmanager
+def request_scope(request_id: Optional[str] = None, priority: int = PRIORITY_INTERACTIVE, **fields):
+    """
+    Activates a RequestContext for the duration of the 'with' block.
+
+    Args:
+        request_id: Id of the request. A new one is generated if omitted.
+        priority: Traffic priority (PRIORITY_INTERACTIVE or PRIORITY_BACKGROUND).
+        **fields: Additional RequestContext fields.
+
+    Yields:
+        The active RequestContext.
+    """
+    context = RequestContext(request_id=request_id or new_request_id(), priority=priority, **fields)
+    token = _current_request_context.set(context)
+    try:
+        yield context
+    finally:
+        _current_request_context.reset(token)
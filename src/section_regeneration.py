@@ -0,0 +1,175 @@
+# src/section_regeneration.py
+# Rewrites selected sections of a finished brief without re-running the workflow.
+#
+# POST /briefs/<request_id>/sections takes the state stored in the run's last checkpoint
+# (brief prompt, summary, brief data, image map) and asks the generator model, in one
+# small JSON-mode call, for new text for the named sections only. The other sections and
+# the summary are passed along (trimmed to SECTION_REGENERATION_CONTEXT_TOKENS) so the
+# rewrite stays consistent with the rest of the brief. Extraction, retrieval,
+# summarization and the supervisor are skipped.
+#
+# Sections are named by their brief data key or placeholder, case-insensitively and
+# with or without the PLACEHOLDER_ prefix and braces ('AUDIENCE', 'PLACEHOLDER_AUDIENCE',
+# '{{PLACEHOLDER_AUDIENCE}}' and 'audience' are the same section). Image slots are not
+# text and cannot be regenerated.
+#
+# The new text is written into the existing document by repopulate_sections
+# (src/tools/populate_word.py), which only touches the paragraphs of those sections.
+
+import json
+import logging
+import re
+from typing import Any, Dict, List, Optional
+
+from langchain_core.messages import HumanMessage, SystemMessage
+
+from src.config import SECTION_REGENERATION_MAX_SECTIONS, SECTION_REGENERATION_CONTEXT_TOKENS
+from src.llm import generator_llm
+from src.template_registry import CompiledTemplate
+from src.tokens import truncate_to_tokens
+
+logger = logging.getLogger(__name__)
+
+# Name of the LLM call in token profiles (see call_site in src/token_budget.py)
+SECTION_REGENERATOR_NAME = "section_regenerator"
+
+_NON_WORD_REGEX = re.compile(r"[^0-9A-Z]+")
+_CODE_FENCE_REGEX = re.compile(r"^\s*```(?:json)?\s*(.*?)\s*```\s*$", re.DOTALL)
+
+section_editor_system_message = """You are a Campaign Brief Section Editor.
+You receive an existing campaign brief and rewrite ONLY the sections you are asked to rewrite.
+
+Rules:
+- Keep every rewritten section consistent with the original request, the summary of past campaign data and the sections that are not rewritten (brand, campaign name, dates, budget figures, channels).
+- Follow the revision instructions if there are any; otherwise make the section clearer, more specific and more compelling.
+- Write plain text ready to be placed in a Word document (no Markdown headings, no placeholder braces).
+- Your output MUST be ONLY a JSON object whose keys are exactly the requested keys and whose values are the new section texts (strings).
+"""
+
+
+class SectionRequestError(ValueError):
+    """The sections of a request cannot be regenerated (unknown, image slots, too many)."""
+
+
+class SectionRegenerationError(Exception):
+    """The model's answer could not be used (no model, no JSON, missing sections)."""
+
+
+# --- Section Names ---
+def section_key(name: str) -> str:
+    """'{{PLACEHOLDER_TARGET_AUDIENCE}}', 'Target audience' -> 'TARGET_AUDIENCE' (comparison key of a section)."""
+    key = _NON_WORD_REGEX.sub("_", str(name).strip().strip("{}").upper()).strip("_")
+    return key.removeprefix("PLACEHOLDER_")
+
+
+def _image_slot_keys(compiled_template: Optional[CompiledTemplate]) -> set:
+    return {section_key(slot) for slot in (compiled_template.image_slots if compiled_template else [])}
+
+
+def available_sections(brief_data: Dict[str, Any], compiled_template: Optional[CompiledTemplate]) -> Dict[str, str]:
+    """
+    Sections that can be regenerated: comparison key -> key to write into the brief data.
+    Keys of the stored brief data come first; text placeholders of the template the
+    generator left out can be regenerated too (under their placeholder content).
+    """
+    image_slots = _image_slot_keys(compiled_template)
+    sections = {}
+    for key in brief_data:
+        if section_key(key) not in image_slots:
+            sections.setdefault(section_key(key), key)
+    for placeholder in (compiled_template.placeholders if compiled_template else []):
+        content = placeholder[2:-2].strip()
+        if section_key(content) not in image_slots:
+            sections.setdefault(section_key(content), content)
+    return sections
+
+
+def resolve_sections(requested: List[str], brief_data: Dict[str, Any], compiled_template: Optional[CompiledTemplate]) -> List[str]:
+    """
+    Maps the requested section names to brief data keys.
+
+    Raises:
+        SectionRequestError: No sections, too many, or a name that is not a text section of the brief.
+    """
+    if not requested:
+        raise SectionRequestError("No sections requested.")
+    sections = available_sections(brief_data, compiled_template)
+    image_slots = _image_slot_keys(compiled_template)
+    keys, unknown = [], []
+    for name in requested:
+        if section_key(name) in image_slots:
+            raise SectionRequestError(f"'{name}' is an image slot; only text sections can be regenerated.")
+        key = sections.get(section_key(name))
+        if key is None:
+            unknown.append(name)
+        elif key not in keys:
+            keys.append(key)
+    if unknown:
+        raise SectionRequestError(f"Unknown section(s) {unknown}. Sections of this brief: {sorted(sections.values())}")
+    if len(keys) > SECTION_REGENERATION_MAX_SECTIONS:
+        raise SectionRequestError(f"At most {SECTION_REGENERATION_MAX_SECTIONS} sections can be regenerated per request "
+                                  f"({len(keys)} requested). Use /create-brief to regenerate the whole brief.")
+    return keys
+
+
+# --- LLM Call ---
+def build_messages(brief_prompt: str, summary: Optional[str], brief_data: Dict[str, Any], keys: List[str],
+                   instructions: Optional[str] = None) -> List[Any]:
+    """Prompt of the regeneration call: the request, the summary, the unchanged sections and the sections to rewrite."""
+    unchanged = {key: value for key, value in brief_data.items() if key not in keys}
+    current = {key: brief_data.get(key, "") for key in keys}
+    # The summary and the unchanged sections are context only; trim them to the budget (summary first)
+    summary_text = truncate_to_tokens(summary or "", SECTION_REGENERATION_CONTEXT_TOKENS // 2)
+    unchanged_text = truncate_to_tokens(json.dumps(unchanged, ensure_ascii=False, indent=1, default=str),
+                                        SECTION_REGENERATION_CONTEXT_TOKENS // 2)
+    content = (
+        f"Original campaign brief request:\n{brief_prompt or 'Not available.'}\n\n"
+        f"Summary of relevant past campaign data:\n{summary_text or 'Not available.'}\n\n"
+        f"Sections that stay unchanged:\n{unchanged_text}\n\n"
+        f"Sections to rewrite (current text):\n{json.dumps(current, ensure_ascii=False, indent=1, default=str)}\n\n"
+        f"Revision instructions: {instructions.strip() if instructions and instructions.strip() else 'None.'}\n\n"
+        f"Keys to return: {json.dumps(keys)}"
+    )
+    return [SystemMessage(content=section_editor_system_message), HumanMessage(content=content)]
+
+
+def parse_sections(text: str, keys: List[str]) -> Dict[str, str]:
+    """
+    New text per requested key from the model's JSON answer (keys matched like section names).
+
+    Raises:
+        SectionRegenerationError: The answer is not a JSON object or lacks a requested section.
+    """
+    match = _CODE_FENCE_REGEX.match(text or "")
+    try:
+        answer = json.loads(match.group(1) if match else text)
+    except (TypeError, ValueError) as e:
+        raise SectionRegenerationError(f"The model did not answer with JSON: {e}. Answer: {str(text)[:200]!r}") from e
+    if not isinstance(answer, dict):
+        raise SectionRegenerationError(f"The model answered with {type(answer).__name__} instead of a JSON object.")
+    by_key = {section_key(key): value for key, value in answer.items()}
+    missing = [key for key in keys if section_key(key) not in by_key]
+    if missing:
+        raise SectionRegenerationError(f"The model's answer lacks the section(s) {missing}.")
+    return {key: str(by_key[section_key(key)]).strip() for key in keys}
+
+
+def regenerate_sections(brief_prompt: str, summary: Optional[str], brief_data: Dict[str, Any], keys: List[str],
+                        instructions: Optional[str] = None, callbacks: Optional[list] = None) -> Dict[str, str]:
+    """
+    Asks the generator model for new text for 'keys' (one call). Returns key -> new text.
+    Runs within the caller's request scope, so the call is rate limited, budgeted and guarded like workflow calls.
+
+    Raises:
+        SectionRegenerationError: No generator model, or an unusable answer.
+    """
+    if generator_llm is None:
+        raise SectionRegenerationError("The generator chat model is not initialized. Cannot regenerate sections.")
+    messages = build_messages(brief_prompt, summary, brief_data, keys, instructions)
+    logger.debug("Regenerating section(s) %s.", keys, extra={"stage": SECTION_REGENERATOR_NAME})
+    answer = generator_llm.invoke(
+        messages,
+        config={"callbacks": callbacks or [], "metadata": {"langgraph_node": SECTION_REGENERATOR_NAME}},
+        response_format={"type": "json_object"},
+    )
+    return parse_sections(str(answer.content), keys)
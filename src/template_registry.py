@@ -0,0 +1,372 @@
+# src/template_registry.py
+# Registry of pre-parsed ("compiled") Word brief templates.
+#
+# Every .docx in TEMPLATES_DIR (plus the default TEMPLATE_PATH) is parsed once into a
+# CompiledTemplate holding its bytes, placeholder list, placeholder locations, image
+# slots and block structure. Requests pick a template by id and the tools use the
+# compiled form instead of re-parsing the file from disk.
+#
+# A background watcher polls the files and recompiles changed ones. The registry swaps
+# its whole template map in a single assignment, so readers always see a consistent set.
+
+import hashlib
+import logging
+import os
+import re
+import threading
+import time
+from dataclasses import dataclass, field
+from functools import cached_property
+from io import BytesIO
+from typing import Dict, List, Optional, Tuple
+
+import docx  # Requires: pip install python-docx
+from docx.enum.style import WD_STYLE_TYPE
+from docx.table import Table
+from docx.text.paragraph import Paragraph
+
+from src.request_context import get_request_context
+from src.config import (
+    DEFAULT_TEMPLATE_ID,
+    TEMPLATE_PATH,
+    TEMPLATES_DIR,
+    TEMPLATE_IMAGE_PLACEHOLDER_PATTERN,
+    TEMPLATE_WATCH_ENABLED,
+    TEMPLATE_WATCH_INTERVAL_SECONDS,
+)
+
+logger = logging.getLogger(__name__)
+logger.debug("--- Setting up template registry ---")
+
+# Regex to find {{...}} allowing for whitespace inside (same as the extraction tool)
+PLACEHOLDER_REGEX = re.compile(r"\{\{\s*(.*?)\s*\}\}")
+IMAGE_PLACEHOLDER_REGEX = re.compile(TEMPLATE_IMAGE_PLACEHOLDER_PATTERN, re.IGNORECASE)
+
+# A location addresses one paragraph of the document:
+#   ("body", paragraph_index)                                  -> doc.paragraphs[paragraph_index]
+#   ("table", table_index, row_index, cell_index, paragraph_index) -> doc.tables[t].rows[r].cells[c].paragraphs[p]
+Location = Tuple
+
+
+@dataclass
+class TemplateParagraph:
+    """A paragraph of the template as it appears before population."""
+    location: Location
+    text: str
+    style: str
+    placeholders: List[str]
+
+
+@dataclass
+class TemplateTable:
+    """A table of the template; rows -> cells -> paragraphs."""
+    table_index: int
+    rows: List[List[List[TemplateParagraph]]]
+
+
+@dataclass
+class CompiledTemplate:
+    """Pre-parsed form of a .docx template."""
+    template_id: str
+    path: str
+    sha256: str
+    mtime_ns: int
+    size: int
+    data: bytes = field(repr=False)
+    placeholders: List[str]                      # Unique placeholders exactly as in the template, sorted
+    locations: Dict[str, List[Location]]         # Placeholder -> paragraphs containing it
+    image_slots: List[str]                       # Placeholder contents treated as image slots (e.g. 'PLACEHOLDER_COMPANY_LOGO')
+    blocks: List[object] = field(repr=False)     # TemplateParagraph / TemplateTable in document order
+    compiled_at: float = field(default_factory=time.time)
+
+    @cached_property
+    def placeholder_locations(self) -> List[Location]:
+        """Distinct paragraph locations containing at least one placeholder, in document order."""
+        seen = []
+        for block in self.blocks:
+            for paragraph in _iter_block_paragraphs(block):
+                if paragraph.placeholders and paragraph.location not in seen:
+                    seen.append(paragraph.location)
+        return seen
+
+    @cached_property
+    def paragraphs(self) -> Dict[Location, TemplateParagraph]:
+        """Template paragraphs by location."""
+        return {paragraph.location: paragraph for block in self.blocks for paragraph in _iter_block_paragraphs(block)}
+
+    def open_document(self):
+        """Returns a fresh python-docx Document of the template, loaded from memory."""
+        return docx.Document(BytesIO(self.data))
+
+
+def _iter_block_paragraphs(block):
+    if isinstance(block, TemplateParagraph):
+        yield block
+    else:
+        for row in block.rows:
+            for cell in row:
+                yield from cell
+
+
+def resolve_location(doc, location: Location):
+    """Returns the python-docx Paragraph of 'doc' at a compiled location."""
+    if location[0] == "body":
+        return doc.paragraphs[location[1]]
+    _, table_index, row_index, cell_index, paragraph_index = location
+    return doc.tables[table_index].rows[row_index].cells[cell_index].paragraphs[paragraph_index]
+
+
+def _placeholders_in(paragraph) -> List[str]:
+    text = paragraph.text
+    if '{{' not in text or '}}' not in text:
+        return []
+    # Reconstruct the original placeholder strings found (text joined across runs)
+    return [f"{{{{{content}}}}}" for content in PLACEHOLDER_REGEX.findall(text)]
+
+
+def _paragraph_style_names(doc) -> Tuple[Dict[str, str], str]:
+    """
+    Paragraph style id -> style name of a document, and the name of its default paragraph style.
+    Built once per document: paragraph.style scans every style of the document on each access.
+    """
+    names, default = {}, ""
+    for style in doc.styles:
+        if style.type == WD_STYLE_TYPE.PARAGRAPH:
+            names[style.style_id] = style.name
+            if style._element.default:
+                default = style.name
+    return names, default
+
+
+def _compile_paragraph(paragraph, location: Location, style_names: Tuple[Dict[str, str], str]) -> TemplateParagraph:
+    # Same result as paragraph.style.name: unknown or missing style ids resolve to the default style
+    names, default = style_names
+    style = names.get(paragraph._p.style, default)
+    return TemplateParagraph(location=location, text=paragraph.text, style=style, placeholders=_placeholders_in(paragraph))
+
+
+def compile_template(path: str, template_id: Optional[str] = None) -> CompiledTemplate:
+    """
+    Parses a .docx template into a CompiledTemplate.
+
+    Args:
+        path: Path to the .docx template file.
+        template_id: Registry id of the template (defaults to the file name without extension).
+
+    Returns:
+        The CompiledTemplate.
+    """
+    absolute_path = os.path.abspath(path)
+    with open(absolute_path, "rb") as f:
+        data = f.read()
+    stat = os.stat(absolute_path)
+    doc = docx.Document(BytesIO(data))
+
+    style_names = _paragraph_style_names(doc)
+    blocks = []
+    paragraph_index = 0
+    table_index = 0
+    # Walk the body in document order so paragraphs and tables keep their relative position
+    for element in doc.element.body.iterchildren():
+        tag = element.tag.rsplit('}', 1)[-1]
+        if tag == "p":
+            blocks.append(_compile_paragraph(Paragraph(element, doc), ("body", paragraph_index), style_names))
+            paragraph_index += 1
+        elif tag == "tbl":
+            table = Table(element, doc)
+            rows = []
+            for row_index, row in enumerate(table.rows):
+                cells = []
+                seen_cells = set()
+                for cell_index, cell in enumerate(row.cells):
+                    if id(cell._tc) in seen_cells:  # Merged cells are returned once per grid column
+                        continue
+                    seen_cells.add(id(cell._tc))
+                    cells.append([
+                        _compile_paragraph(p, ("table", table_index, row_index, cell_index, p_index), style_names)
+                        for p_index, p in enumerate(cell.paragraphs)
+                    ])
+                rows.append(cells)
+            blocks.append(TemplateTable(table_index=table_index, rows=rows))
+            table_index += 1
+
+    locations: Dict[str, List[Location]] = {}
+    for block in blocks:
+        for paragraph in _iter_block_paragraphs(block):
+            for placeholder in paragraph.placeholders:
+                locations.setdefault(placeholder, []).append(paragraph.location)
+
+    placeholders = sorted(locations)
+    image_slots = [p[2:-2].strip() for p in placeholders if IMAGE_PLACEHOLDER_REGEX.search(p)]
+
+    return CompiledTemplate(
+        template_id=template_id or os.path.splitext(os.path.basename(absolute_path))[0],
+        path=absolute_path,
+        sha256=hashlib.sha256(data).hexdigest(),
+        mtime_ns=stat.st_mtime_ns,
+        size=stat.st_size,
+        data=data,
+        placeholders=placeholders,
+        locations=locations,
+        image_slots=image_slots,
+        blocks=blocks,
+    )
+
+
+def resolve_template_path(template_path: str) -> str:
+    """
+    Returns the template selected for the current request (RequestContext.template_path),
+    or 'template_path' if the request did not select one.
+    The tools receive the template path from the supervisor prompt, which always names the default template.
+    """
+    request_context = get_request_context()
+    if request_context is not None and request_context.template_path:
+        if os.path.abspath(template_path) != os.path.abspath(request_context.template_path):
+            logger.debug("Using request template '%s' instead of '%s'", request_context.template_path, template_path)
+        return request_context.template_path
+    return template_path
+
+
+class TemplateRegistry:
+    """
+    Thread-safe registry of compiled templates with hot reload.
+
+    Args:
+        templates_dir: Directory scanned for .docx templates (id = file name without extension).
+        default_template_path: Template registered under DEFAULT_TEMPLATE_ID.
+        watch_interval: Seconds between change checks of the background watcher.
+    """
+
+    def __init__(self, templates_dir: str, default_template_path: str, watch_interval: float = 2.0):
+        self.templates_dir = templates_dir
+        self.default_template_path = os.path.abspath(default_template_path)
+        self.watch_interval = watch_interval
+        self._templates: Dict[str, CompiledTemplate] = {}  # Replaced as a whole, never mutated in place
+        self._reload_lock = threading.Lock()
+        self._watcher_thread = None
+        self._watcher_pid = None
+        self._stop_event = threading.Event()
+
+    # --- Discovery ---
+    def _discover(self) -> Dict[str, str]:
+        """Returns template id -> absolute path of all templates on disk."""
+        sources = {}
+        if os.path.exists(self.default_template_path):
+            sources[DEFAULT_TEMPLATE_ID] = self.default_template_path
+        if os.path.isdir(self.templates_dir):
+            for entry in sorted(os.scandir(self.templates_dir), key=lambda e: e.name):
+                # Skip Word lock files (~$name.docx) and non-docx files
+                if entry.is_file() and entry.name.lower().endswith(".docx") and not entry.name.startswith("~$"):
+                    template_id = os.path.splitext(entry.name)[0]
+                    if template_id != DEFAULT_TEMPLATE_ID:
+                        sources[template_id] = os.path.abspath(entry.path)
+        return sources
+
+    def reload(self) -> List[str]:
+        """
+        Recompiles new or changed templates and drops removed ones.
+
+        Returns:
+            Ids of the templates that were (re)compiled.
+        """
+        with self._reload_lock:
+            current = self._templates
+            updated = {}
+            changed = []
+            for template_id, path in self._discover().items():
+                existing = current.get(template_id)
+                try:
+                    stat = os.stat(path)
+                    if existing and existing.path == path and (existing.mtime_ns, existing.size) == (stat.st_mtime_ns, stat.st_size):
+                        updated[template_id] = existing
+                        continue
+                    updated[template_id] = compile_template(path, template_id)
+                    changed.append(template_id)
+                except Exception as e:
+                    # Keep serving the previous version (e.g. file is half-written while being saved)
+                    logger.exception("ERROR compiling template '%s' from '%s': %s", template_id, path, e)
+                    if existing:
+                        updated[template_id] = existing
+
+            removed = set(current) - set(updated)
+            # Atomic swap: readers see either the old or the new map, never a mix
+            self._templates = updated
+
+        if changed:
+            logger.info("Template registry compiled: %s", changed)
+        if removed:
+            logger.info("Template registry removed: %s", sorted(removed))
+        return changed
+
+    # --- Lookup ---
+    def get(self, template_id: Optional[str] = None) -> Optional[CompiledTemplate]:
+        """Returns the compiled template with the given id (default template if None)."""
+        return self._templates.get(template_id or DEFAULT_TEMPLATE_ID)
+
+    def get_by_path(self, path: str) -> Optional[CompiledTemplate]:
+        """
+        Returns the compiled template for a file path.
+        Paths outside the registry are compiled on demand (not cached).
+        """
+        absolute_path = os.path.abspath(path)
+        for template in self._templates.values():
+            if template.path == absolute_path:
+                return template
+        if not os.path.exists(absolute_path):
+            return None
+        return compile_template(absolute_path)
+
+    def ids(self) -> List[str]:
+        return sorted(self._templates)
+
+    def describe(self) -> List[dict]:
+        """Summary of the registered templates (for the /templates endpoint)."""
+        return [
+            {
+                "template_id": t.template_id,
+                "path": t.path,
+                "sha256": t.sha256,
+                "placeholders": t.placeholders,
+                "image_slots": t.image_slots,
+            }
+            for t in (self._templates[i] for i in self.ids())
+        ]
+
+    # --- Hot Reload ---
+    def _watch(self):
+        while not self._stop_event.wait(self.watch_interval):
+            try:
+                self.reload()
+            except Exception as e:
+                logger.exception("ERROR in template watcher: %s", e)
+
+    def start_watcher(self):
+        """Starts the background watcher (again, if this process was forked from the one that started it)."""
+        if self._watcher_thread is not None and self._watcher_pid == os.getpid() and self._watcher_thread.is_alive():
+            return
+        self._stop_event = threading.Event()
+        self._watcher_thread = threading.Thread(target=self._watch, name="template-watcher", daemon=True)
+        self._watcher_pid = os.getpid()
+        self._watcher_thread.start()
+        logger.info("Template watcher started (interval %ss, directory '%s').", self.watch_interval, self.templates_dir)
+
+    def stop_watcher(self):
+        self._stop_event.set()
+
+    def after_fork(self, watch: bool = TEMPLATE_WATCH_ENABLED):
+        """Prepares a forked worker: fresh lock (the parent's may have been held at fork time) and its own watcher."""
+        self._reload_lock = threading.Lock()
+        if watch:
+            self.start_watcher()
+
+
+# --- Process-wide registry ---
+template_registry = TemplateRegistry(TEMPLATES_DIR, TEMPLATE_PATH, watch_interval=TEMPLATE_WATCH_INTERVAL_SECONDS)
+try:
+    template_registry.reload()
+    logger.info("Template registry loaded templates: %s", template_registry.ids())
+except Exception as e:
+    logger.exception("ERROR loading template registry: %s", e)
+
+if TEMPLATE_WATCH_ENABLED:
+    template_registry.start_watcher()
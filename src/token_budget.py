@@ -0,0 +1,241 @@
+# src/token_budget.py
+# Per-request token profiler and budgets for the LLM calls of a workflow run.
+#
+# The supervisor prompt is several thousand tokens and is re-sent on every supervisor
+# turn together with the growing message history. Every chat call made on behalf of a
+# request is recorded here (by RateLimitedAzureChatOpenAI, see src/llm_clients.py) with
+# its tiktoken counts broken down into system prompt, conversation history, tool outputs,
+# tool schemas and completion. The profile is written to the workflow log and summarized
+# in the API response.
+#
+# Budgets: once a request has used WORKFLOW_TOKEN_BUDGET tokens or made
+# WORKFLOW_TURN_BUDGET LLM calls, further calls are not sent. The model answers with a
+# final message without tool calls instead, so the agents and the supervisor finish the
+# run (status "budget_exceeded") long before the graph's recursion limit is reached.
+
+import logging
+import threading
+import time
+from dataclasses import dataclass, field, asdict
+from typing import Any, Dict, List, Optional
+
+from langchain_core.messages import SystemMessage, ToolMessage
+
+from src.config import (
+    TOKEN_PROFILING_ENABLED,
+    WORKFLOW_TOKEN_BUDGET,
+    WORKFLOW_TURN_BUDGET,
+)
+from src.tokens import count_message_tokens, count_tokens, TOKENS_PER_REPLY
+
+BUDGET_EXCEEDED_MESSAGE = (
+    "STOP: the token budget of this request is exhausted ({reason}). "
+    "Do not call any more tools or agents; end the workflow now."
+)
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class PromptBreakdown:
+    """Token counts of the parts of one chat request."""
+    system_tokens: int = 0
+    history_tokens: int = 0       # Human and AI messages (including tool call arguments)
+    tool_output_tokens: int = 0   # ToolMessage contents
+    tool_schema_tokens: int = 0   # JSON schemas of the tools bound to the model
+
+    @property
+    def prompt_tokens(self) -> int:
+        return self.system_tokens + self.history_tokens + self.tool_output_tokens + self.tool_schema_tokens + TOKENS_PER_REPLY
+
+
+def profile_prompt(messages: List[Any], tool_schemas_text: str = "", model: Optional[str] = None) -> PromptBreakdown:
+    """Counts the tokens of a chat request by part."""
+    breakdown = PromptBreakdown(tool_schema_tokens=count_tokens(tool_schemas_text, model))
+    for message in messages:
+        tokens = count_message_tokens(message, model)
+        if isinstance(message, SystemMessage):
+            breakdown.system_tokens += tokens
+        elif isinstance(message, ToolMessage):
+            breakdown.tool_output_tokens += tokens
+        else:
+            breakdown.history_tokens += tokens
+    return breakdown
+
+
+@dataclass
+class LLMCallRecord:
+    """One chat call made for a request."""
+    index: int
+    agent: str
+    model: str
+    system_tokens: int
+    history_tokens: int
+    tool_output_tokens: int
+    tool_schema_tokens: int
+    prompt_tokens: int
+    completion_tokens: int = 0
+    reported_prompt_tokens: Optional[int] = None  # As billed by Azure (usage of the response), if available
+    messages: int = 0
+    seconds: float = 0.0
+    skipped: bool = False  # Not sent because the budget was exhausted
+
+    @property
+    def total_tokens(self) -> int:
+        return (self.reported_prompt_tokens or self.prompt_tokens) + self.completion_tokens
+
+
+class BudgetExceeded(Exception):
+    """Raised internally when a request has exhausted its token or turn budget."""
+
+
+@dataclass
+class TokenProfile:
+    """
+    Token use of one request (all LLM calls of its workflow run).
+
+    Args:
+        request_id: Request the profile belongs to.
+        token_budget: Maximum prompt + completion tokens of the run (0 = unlimited).
+        turn_budget: Maximum number of LLM calls of the run (0 = unlimited).
+    """
+    request_id: str
+    token_budget: int = WORKFLOW_TOKEN_BUDGET
+    turn_budget: int = WORKFLOW_TURN_BUDGET
+    calls: List[LLMCallRecord] = field(default_factory=list)
+    retrievals: List[dict] = field(default_factory=list)  # Context assembly figures per retrieval (src/context_assembly.py)
+    exceeded_reason: Optional[str] = None
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    @property
+    def total_tokens(self) -> int:
+        return sum(c.total_tokens for c in self.calls if not c.skipped)
+
+    @property
+    def turns(self) -> int:
+        return sum(1 for c in self.calls if not c.skipped)
+
+    def check_budget(self, upcoming_prompt_tokens: int = 0):
+        """Raises BudgetExceeded if the next call would exceed a budget (the reason is kept in exceeded_reason)."""
+        with self._lock:
+            if self.exceeded_reason is None:
+                if self.turn_budget and self.turns >= self.turn_budget:
+                    self.exceeded_reason = f"turn budget of {self.turn_budget} LLM calls reached"
+                elif self.token_budget and self.total_tokens + upcoming_prompt_tokens > self.token_budget:
+                    self.exceeded_reason = (f"token budget of {self.token_budget} tokens reached "
+                                            f"({self.total_tokens} used, next prompt {upcoming_prompt_tokens})")
+                if self.exceeded_reason is not None:
+                    logger.warning("Request %s: %s. Stopping the workflow.", self.request_id, self.exceeded_reason)
+            if self.exceeded_reason is not None:
+                raise BudgetExceeded(self.exceeded_reason)
+
+    def start_call(self, agent: str, model: str, breakdown: PromptBreakdown, messages: int) -> LLMCallRecord:
+        with self._lock:
+            record = LLMCallRecord(
+                index=len(self.calls) + 1,
+                agent=agent,
+                model=model,
+                system_tokens=breakdown.system_tokens,
+                history_tokens=breakdown.history_tokens,
+                tool_output_tokens=breakdown.tool_output_tokens,
+                tool_schema_tokens=breakdown.tool_schema_tokens,
+                prompt_tokens=breakdown.prompt_tokens,
+                messages=messages,
+            )
+            self.calls.append(record)
+            return record
+
+    def finish_call(self, record: LLMCallRecord, completion_tokens: int, reported_prompt_tokens: Optional[int],
+                    started: float, skipped: bool = False):
+        with self._lock:
+            record.completion_tokens = completion_tokens
+            record.reported_prompt_tokens = reported_prompt_tokens
+            record.seconds = round(time.monotonic() - started, 3)
+            record.skipped = skipped
+
+    def record_retrieval(self, query: str, stats: dict):
+        """Records the token figures of one assembled retrieval context."""
+        with self._lock:
+            self.retrievals.append(dict(stats, query=query))
+
+    def retrieval_summary(self) -> Optional[dict]:
+        with self._lock:
+            if not self.retrievals:
+                return None
+            return {
+                "calls": len(self.retrievals),
+                "context_tokens": sum(r["tokens"] for r in self.retrievals),
+                "raw_tokens": sum(r["raw_tokens"] for r in self.retrievals),
+                "tokens_saved": sum(r["tokens_saved"] for r in self.retrievals),
+                "per_call": [dict(r) for r in self.retrievals],
+            }
+
+    def summary(self) -> dict:
+        """Totals for the API response."""
+        retrieval = self.retrieval_summary()
+        with self._lock:
+            calls = [c for c in self.calls if not c.skipped]
+            by_agent: Dict[str, dict] = {}
+            for c in calls:
+                agent = by_agent.setdefault(c.agent, {"calls": 0, "prompt_tokens": 0, "completion_tokens": 0})
+                agent["calls"] += 1
+                agent["prompt_tokens"] += c.reported_prompt_tokens or c.prompt_tokens
+                agent["completion_tokens"] += c.completion_tokens
+            return {
+                "llm_calls": len(calls),
+                "prompt_tokens": sum(c.reported_prompt_tokens or c.prompt_tokens for c in calls),
+                "completion_tokens": sum(c.completion_tokens for c in calls),
+                "system_prompt_tokens": sum(c.system_tokens for c in calls),
+                "tool_output_tokens": sum(c.tool_output_tokens for c in calls),
+                "largest_prompt_tokens": max((c.prompt_tokens for c in calls), default=0),
+                "token_budget": self.token_budget or None,
+                "turn_budget": self.turn_budget or None,
+                "budget_exceeded": self.exceeded_reason,
+                "by_agent": by_agent,
+                "retrieval": retrieval,
+            }
+
+    def calls_as_dicts(self) -> List[dict]:
+        with self._lock:
+            return [dict(asdict(c), total_tokens=c.total_tokens) for c in self.calls]
+
+    def format_table(self) -> str:
+        """Plain-text table of all calls for the workflow log."""
+        header = f"{'#':>3} {'agent':<22} {'model':<18} {'system':>7} {'history':>8} {'tools':>7} {'schemas':>8} {'prompt':>7} {'billed':>7} {'compl.':>7} {'secs':>6}"
+        lines = [header, "-" * len(header)]
+        for c in self.calls_as_dicts():
+            lines.append(
+                f"{c['index']:>3} {c['agent'][:22]:<22} {c['model'][:18]:<18} {c['system_tokens']:>7} {c['history_tokens']:>8} "
+                f"{c['tool_output_tokens']:>7} {c['tool_schema_tokens']:>8} {c['prompt_tokens']:>7} "
+                f"{c['reported_prompt_tokens'] if c['reported_prompt_tokens'] is not None else '-':>7} "
+                f"{c['completion_tokens']:>7} {c['seconds']:>6.2f}" + ("  (skipped: budget)" if c["skipped"] else "")
+            )
+        summary = self.summary()
+        lines.append("-" * len(header))
+        lines.append(f"Total: {summary['llm_calls']} call(s), {summary['prompt_tokens']} prompt + "
+                     f"{summary['completion_tokens']} completion tokens "
+                     f"(budget: {self.token_budget or 'unlimited'} tokens, {self.turn_budget or 'unlimited'} calls)")
+        if self.exceeded_reason:
+            lines.append(f"Budget exceeded: {self.exceeded_reason}")
+        retrieval = summary["retrieval"]
+        if retrieval:
+            lines.append(f"Retrieval: {retrieval['calls']} context(s), {retrieval['context_tokens']} tokens "
+                         f"({retrieval['raw_tokens']} raw, {retrieval['tokens_saved']} saved)")
+        return "\n".join(lines)
+
+
+def new_token_profile(request_id: str) -> Optional[TokenProfile]:
+    """Creates the profile of a request (None when profiling and budgets are disabled)."""
+    if not TOKEN_PROFILING_ENABLED and not WORKFLOW_TOKEN_BUDGET and not WORKFLOW_TURN_BUDGET:
+        return None
+    return TokenProfile(request_id=request_id)
+
+
+def call_site(run_manager) -> str:
+    """Name of the graph node (agent) making an LLM call, from LangGraph's callback metadata."""
+    metadata = getattr(run_manager, "metadata", None) or {}
+    namespace = metadata.get("langgraph_checkpoint_ns") or ""
+    if namespace:
+        # e.g. "summarizer_agent:<task id>|agent:<task id>" -> "summarizer_agent"
+        return namespace.split("|")[0].split(":")[0]
+    return metadata.get("langgraph_node") or "unknown"
@@ -0,0 +1,110 @@
+# src/tokens.py
+# Token counting helpers based on tiktoken.
+# Used to estimate the size of LLM requests (rate limiting, prompt budgets).
+
+import json
+import logging
+from functools import lru_cache
+from typing import Any, Iterable, Optional
+
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+from src.config import TIKTOKEN_ENCODING
+
+logger = logging.getLogger(__name__)
+if tiktoken is None:
+    logger.warning("'tiktoken' is not installed. Token counts will be approximated (4 characters per token).")
+
+# Fixed overhead OpenAI chat models add per message (role, separators) and per reply.
+TOKENS_PER_MESSAGE = 3
+TOKENS_PER_REPLY = 3
+
+
+_encoding_unavailable_logged = False
+
+
+@lru_cache(maxsize=16)
+def get_encoding(model: Optional[str] = None):
+    """
+    Returns the tiktoken encoding for a model/deployment name.
+    Falls back to TIKTOKEN_ENCODING from config for unknown names (Azure deployment names
+    rarely match the OpenAI model names tiktoken knows about).
+    Returns None (4 characters per token) if the encoding cannot be loaded: tiktoken
+    downloads its BPE files on first use, which fails on hosts without internet access.
+    """
+    global _encoding_unavailable_logged
+    if tiktoken is None:
+        return None
+    try:
+        if model:
+            try:
+                return tiktoken.encoding_for_model(model)
+            except KeyError:
+                pass
+        return tiktoken.get_encoding(TIKTOKEN_ENCODING)
+    except Exception as e:
+        if not _encoding_unavailable_logged:
+            _encoding_unavailable_logged = True
+            logger.warning("Could not load the tiktoken encoding '%s' (%s). Token counts will be approximated "
+                           "(4 characters per token). Set TIKTOKEN_CACHE_DIR to a directory with the BPE files "
+                           "to count exactly offline.", TIKTOKEN_ENCODING, e)
+        return None
+
+
+def count_tokens(text: str, model: Optional[str] = None) -> int:
+    """Counts the tokens of a text string."""
+    if not text:
+        return 0
+    encoding = get_encoding(model)
+    if encoding is None:
+        return max(1, len(text) // 4)
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def truncate_to_tokens(text: str, max_tokens: int, model: Optional[str] = None) -> str:
+    """Returns the longest prefix of 'text' that fits in 'max_tokens' tokens."""
+    if max_tokens <= 0 or not text:
+        return ""
+    encoding = get_encoding(model)
+    if encoding is None:
+        return text[:max_tokens * 4]
+    token_ids = encoding.encode(text, disallowed_special=())
+    if len(token_ids) <= max_tokens:
+        return text
+    return encoding.decode(token_ids[:max_tokens])
+
+
+def _content_to_text(content: Any) -> str:
+    """Flattens message content (string or list of content blocks) to text."""
+    if isinstance(content, str):
+        return content
+    if isinstance(content, list):
+        parts = []
+        for block in content:
+            if isinstance(block, str):
+                parts.append(block)
+            elif isinstance(block, dict) and "text" in block:
+                parts.append(str(block["text"]))
+        return "".join(parts)
+    return str(content) if content is not None else ""
+
+
+def count_message_tokens(message: Any, model: Optional[str] = None) -> int:
+    """Counts the tokens of a single LangChain message (content, name and tool calls)."""
+    tokens = TOKENS_PER_MESSAGE
+    tokens += count_tokens(_content_to_text(getattr(message, "content", message)), model)
+    name = getattr(message, "name", None)
+    if name:
+        tokens += count_tokens(name, model)
+    for tool_call in getattr(message, "tool_calls", None) or []:
+        tokens += count_tokens(tool_call.get("name", ""), model)
+        tokens += count_tokens(json.dumps(tool_call.get("args", {}), default=str), model)
+    return tokens
+
+
+def count_messages_tokens(messages: Iterable[Any], model: Optional[str] = None) -> int:
+    """Counts the tokens of a list of LangChain messages as sent to a chat model."""
+    return sum(count_message_tokens(m, model) for m in messages) + TOKENS_PER_REPLY
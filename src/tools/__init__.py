@@ -1,5 +1,7 @@
 # src/tools/__init__.py
 
+import logging
+
 # Import the tools so they can be easily accessed from 'from src.tools import ...'
 # Ensure the names match the variables defined in the tool files
 from .extract_placeholders import extract_placeholders_tool
@@ -13,4 +15,4 @@ __all__ = [
     "retrieve_data_tool",
 ]
 
-print("src.tools package initialized.")
\ No newline at end of file
+logging.getLogger(__name__).debug("src.tools package initialized.")
\ No newline at end of file
@@ -1,19 +1,30 @@
 # src/tools/populate_word.py
 
+import logging
 import os
+import time
 import json # Kept import, though not used in func
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, Tuple
+import docx  # Requires: pip install python-docx (documents of earlier runs are re-opened from disk)
+from typing_extensions import Annotated
 from pydantic import BaseModel, Field
 from langchain.tools import StructuredTool
-import docx
-from docx.shared import Inches # Import Inches for image size
-import traceback # Import traceback
+from langchain_core.tools import InjectedToolCallId
+from langgraph.types import Command
 
 # Import paths from config, though the tool accepts paths as args
 # Use the paths from config for consistency, matching where the final file will be saved
 from src.config import TEMPLATE_PATH, OUTPUT_PATH # Use OUTPUT_PATH from config directly
+from src.request_context import get_request_context
+# Pre-parsed templates: the document is loaded from memory and only paragraphs with placeholders are visited
+from src.template_registry import template_registry, resolve_template_path, resolve_location
+# Pre-processed logo images (loaded once, embedded from memory)
+from src.logo_cache import logo_cache, add_logo_to_run
+# The tool writes the 'brief_data', 'image_placeholders' and 'output_artifact' fields of the workflow state
+from src.brief_state import tool_command, populate_artifact
 
-print("--- Defining populate_word tool ---")
+logger = logging.getLogger(__name__)
+logger.debug("--- Defining populate_word tool ---")
 
 # --- Pydantic Schema for Tool Arguments (Copied from app copy.py) ---
 # This matches the definition in app copy.py
@@ -23,6 +34,178 @@ class PopulateWordArgs(BaseModel):
     image_placeholders: Optional[Dict[str, str]] = Field(default=None, description="Optional dictionary mapping image placeholder content (e.g., 'PLACEHOLDER_COMPANY_LOGO') to the local image file path (e.g., './logos/nike.png').")
     template_path: str = Field(description="Path to the Word template (.docx) file containing placeholders.")
     output_path: str = Field(description="Path where the populated Word document will be saved.")
+    # Injected by the tool node (not visible to the model)
+    tool_call_id: Annotated[str, InjectedToolCallId]
+
+
+# --- Text Replacement ---
+# Shared by populate_word_from_json_func and the preview renderer (src/preview.py),
+# so previews show exactly the text the Word document will contain.
+def replace_text_placeholders(text: str, data_dict: Dict[str, Any]):
+    """
+    Replaces the text placeholders of 'data_dict' in 'text'.
+
+    A key 'KEY' fills {{KEY}} or, if that is absent, {{PLACEHOLDER_KEY}}.
+    A key 'PLACEHOLDER_KEY' fills {{PLACEHOLDER_KEY}} only.
+    Keys are applied in order; all occurrences of the matched placeholder are replaced.
+
+    Returns:
+        Tuple of (replaced text, list of (key, placeholder) pairs that were replaced).
+    """
+    replaced_text = text # Start with the combined text
+    replacements = []
+
+    for key_from_json in list(data_dict.keys()):
+        # Construct the two possible placeholder formats
+        # Ensure the key is treated correctly if it already starts with PLACEHOLDER_
+        content_key = key_from_json # The key from the JSON data (e.g., "CAMPAIGN_NAME" or "PLACEHOLDER_COMPANY_LOGO")
+
+        # Construct placeholder to find: {{KEY}} or {{PLACEHOLDER_KEY}}
+        if not content_key.upper().startswith("PLACEHOLDER_"):
+            placeholder_to_find_1 = f"{{{{{content_key}}}}}" # e.g., {{KEY}}
+            placeholder_to_find_2 = f"{{{{PLACEHOLDER_{content_key}}}}}" # e.g., {{PLACEHOLDER_KEY}}
+        else:
+            placeholder_to_find_1 = f"{{{{{content_key}}}}}" # e.g., {{PLACEHOLDER_KEY}}
+            placeholder_to_find_2 = None # Only look for {{PLACEHOLDER_...}} if key starts with it
+
+        # Check if either placeholder exists in the text (keep track of which one is used)
+        if placeholder_to_find_1 in replaced_text:
+            placeholder_to_use = placeholder_to_find_1
+        elif placeholder_to_find_2 and placeholder_to_find_2 in replaced_text:
+            placeholder_to_use = placeholder_to_find_2
+        else:
+            continue # Neither placeholder found, skip this key
+
+        text_to_insert = str(data_dict.get(key_from_json, "")) # Get the value to insert, default to empty string
+        # Per-key traces are hot-path events: sampled, and only logged at DEBUG
+        logger.debug("Attempting to replace TEXT '%s' with '%s...' (using key '%s')", placeholder_to_use, text_to_insert[:50], key_from_json,
+                     extra={"event": "text_replace_attempt", "stage": "populate"})
+
+        # Find the location(s) of the placeholder in the text
+        start_index = replaced_text.find(placeholder_to_use)
+        while start_index != -1:
+            end_index = start_index + len(placeholder_to_use)
+            # Replace in the text string
+            replaced_text = replaced_text[:start_index] + text_to_insert + replaced_text[end_index:]
+            # Find the next occurrence - start search after the newly inserted text
+            start_index = replaced_text.find(placeholder_to_use, start_index + len(text_to_insert))
+
+        # After replacing for this key, the text is updated for subsequent key searches
+        replacements.append((key_from_json, placeholder_to_use))
+
+    return replaced_text, replacements
+
+
+# --- Document Filling ---
+def fill_document(doc, compiled_template, json_data: Dict[str, Any], image_placeholders: Dict[str, str]):
+    """
+    Replaces the text and image placeholders of an opened template document in place.
+    Only the paragraphs recorded in the compiled template as containing placeholders are visited.
+
+    Returns:
+        (text keys replaced, image keys replaced) as sets.
+    """
+    text_keys_successfully_replaced = set()
+    image_keys_successfully_replaced = set()
+
+    # --- Helper Function to find and replace TEXT ---
+    # This function iterates through the runs of a paragraph/cell
+    # and replaces placeholder text. It handles cases where placeholders
+    # might be split across runs due to formatting.
+    def find_and_replace_text_in_runs(paragraph_or_cell_runs, data_dict):
+        """Finds and replaces text placeholders within a list of runs."""
+        nonlocal text_keys_successfully_replaced
+        # Get combined text of the runs to search for placeholders
+        combined_text = "".join(r.text for r in paragraph_or_cell_runs)
+        replaced_text, replacements = replace_text_placeholders(combined_text, data_dict)
+        if not replacements:
+            return # No placeholder of data_dict in these runs
+
+        # Now, update the runs based on the final replaced_text.
+        # This simplifies run structure but replaces text reliably.
+        if paragraph_or_cell_runs:
+            paragraph_or_cell_runs[0].text = replaced_text # Put all text in the first run
+            # Clear the text from all other runs
+            for run in paragraph_or_cell_runs[1:]:
+                run.text = ""
+
+        for key_from_json, placeholder_used in replacements:
+            logger.debug("Successfully replaced TEXT for '%s' using key '%s'", placeholder_used, key_from_json,
+                         extra={"event": "text_replaced", "stage": "populate"})
+            text_keys_successfully_replaced.add(key_from_json)
+
+
+    # --- Helper Function to find and replace IMAGES ---
+    # Images come from the logo asset cache (loaded, validated and downscaled once per file).
+    # 'embedded_image_parts' makes placeholders sharing an image reference one media part.
+    embedded_image_parts = {}
+
+    def find_and_replace_image_in_runs(paragraph_or_cell_runs, image_data_dict):
+        """Finds image placeholders and inserts images."""
+        nonlocal image_keys_successfully_replaced
+        # Iterate through image placeholders provided
+        # image_data_dict keys are the content *inside* the placeholder, e.g., 'PLACEHOLDER_COMPANY_LOGO'
+        for img_placeholder_content, img_path in image_data_dict.items():
+            # Construct the full placeholder string to search for
+            placeholder_to_find = f"{{{{{img_placeholder_content}}}}}" # e.g., "{{PLACEHOLDER_COMPANY_LOGO}}"
+
+            # Check if placeholder exists in the text combined from runs
+            combined_text = "".join(r.text for r in paragraph_or_cell_runs)
+
+            if placeholder_to_find in combined_text:
+                logger.debug("Found IMAGE placeholder '%s'. Attempting insertion...", placeholder_to_find,
+                             extra={"event": "image_placeholder_found", "stage": "populate"})
+                # Resolve and load the image (cached after the first use)
+                logo_asset = logo_cache.get(img_path)
+                if logo_asset is None:
+                    logger.warning("Image file not found or invalid at path: '%s' for placeholder '%s'. Skipping.", img_path, placeholder_to_find)
+                    continue # Skip to next image key
+
+                # Find the run(s) containing the placeholder.
+                # Simple approach: Find the first run, clear its text, insert picture.
+                found_run_index = -1
+                for i, run in enumerate(paragraph_or_cell_runs):
+                    if placeholder_to_find in run.text:
+                        found_run_index = i
+                        break # Found the first run containing the placeholder
+
+                if found_run_index != -1:
+                    run_to_replace = paragraph_or_cell_runs[found_run_index]
+                    original_run_text = run_to_replace.text # Keep original text to replace only the placeholder
+
+                    try:
+                        # Replace the placeholder text within the run's text
+                        run_to_replace.text = original_run_text.replace(placeholder_to_find, '')
+                        logger.debug("Cleared placeholder text in run %d.", found_run_index,
+                                     extra={"event": "image_placeholder_cleared", "stage": "populate"})
+
+                        # Add the picture to the run at the configured width (1.5 inches by default)
+                        add_logo_to_run(run_to_replace, logo_asset, embedded_image_parts)
+                        logger.debug("Inserted IMAGE '%s' into run %d.", logo_asset.path, found_run_index,
+                                     extra={"event": "image_inserted", "stage": "populate"})
+                        image_keys_successfully_replaced.add(img_placeholder_content)
+
+                    except Exception as img_e:
+                        logger.exception("Failed to insert image '%s' for placeholder '%s': %s", img_path, placeholder_to_find, img_e)
+                else:
+                    # This could happen if the placeholder spans multiple runs
+                    logger.warning("Could not find a single run containing image placeholder '%s'. Placeholder might span runs or be complex.", placeholder_to_find)
+
+    # --- Main Processing Loop ---
+    # Only the paragraphs (regular and in table cells) that contain placeholders are visited;
+    # their locations were recorded when the template was compiled.
+    logger.debug("Checking %d paragraphs of the template for text and images...", len(compiled_template.placeholder_locations))
+    all_content_items = [resolve_location(doc, location) for location in compiled_template.placeholder_locations]
+
+    # Process each paragraph/cell content
+    for item in all_content_items:
+        # Process text replacements first
+        find_and_replace_text_in_runs(item.runs, json_data)
+        # Then process image replacements if image data is provided
+        if image_placeholders:
+            find_and_replace_image_in_runs(item.runs, image_placeholders)
+
+    return text_keys_successfully_replaced, image_keys_successfully_replaced
 
 
 # --- Core Python Function (Copied from app copy.py) ---
@@ -50,204 +233,67 @@ def populate_word_from_json_func(
     Returns:
         A success or error message string.
     """
-    print(f"\n--- Running populate_word_from_json_func ---")
-    print(f"Attempting to populate template '{template_path}' and save to '{output_path}'...")
+    started = time.monotonic()
+    logger.debug("Running populate_word_from_json_func: populate template '%s' and save to '%s'...", template_path, output_path)
 
     # --- Input Validation ---
     if not isinstance(json_data, dict):
         msg = f"ERROR: Input 'json_data' is not a dictionary (received type: {type(json_data)})."
-        print(msg)
+        logger.error(msg)
         return msg
     # Validate type only if not None
     if image_placeholders is not None and not isinstance(image_placeholders, dict):
         msg = f"ERROR: Input 'image_placeholders' must be a dictionary or None (received type: {type(image_placeholders)})."
-        print(msg)
+        logger.error(msg)
         return msg
 
     image_placeholders = image_placeholders or {} # Default to empty dict if None
 
-    print(f"DEBUG: Received json_data keys: {list(json_data.keys())}")
-    print(f"DEBUG: Received image_placeholders keys: {list(image_placeholders.keys())}")
+    logger.debug("Received json_data keys: %s, image_placeholders keys: %s", list(json_data.keys()), list(image_placeholders.keys()))
 
     # --- Path handling ---
+    template_path = resolve_template_path(template_path)
+    # Each Flask request saves to its own document (concurrent requests must not overwrite
+    # each other's output), regardless of the output_path the supervisor passed in.
+    request_context = get_request_context()
+    if request_context is not None and request_context.output_path:
+        if os.path.abspath(output_path) != os.path.abspath(request_context.output_path):
+            logger.debug("Redirecting output from '%s' to request output path '%s'", output_path, request_context.output_path)
+        output_path = request_context.output_path
+
     absolute_template_path = os.path.abspath(template_path)
     absolute_output_path = os.path.abspath(output_path)
-    print(f"DEBUG: Absolute Template Path: {absolute_template_path}")
-    print(f"DEBUG: Absolute Output Path: {absolute_output_path}")
+    logger.debug("Absolute template path: %s, absolute output path: %s", absolute_template_path, absolute_output_path)
 
     try:
-        if not os.path.exists(absolute_template_path):
+        compiled_template = template_registry.get_by_path(absolute_template_path)
+        if compiled_template is None:
             return f"Error: Template file not found at '{absolute_template_path}'"
 
-        doc = docx.Document(absolute_template_path)
-        text_keys_successfully_replaced = set()
-        image_keys_successfully_replaced = set()
-
-        # --- Helper Function to find and replace TEXT ---
-        # This function iterates through the runs of a paragraph/cell
-        # and replaces placeholder text. It handles cases where placeholders
-        # might be split across runs due to formatting.
-        def find_and_replace_text_in_runs(paragraph_or_cell_runs, data_dict):
-            """Finds and replaces text placeholders within a list of runs."""
-            nonlocal text_keys_successfully_replaced
-            # Get combined text of the runs to search for placeholders
-            combined_text = "".join(r.text for r in paragraph_or_cell_runs)
-            replaced_text = combined_text # Start with the combined text
-
-            json_keys = list(data_dict.keys())
-
-            for key_from_json in json_keys:
-                # Construct the two possible placeholder formats
-                # Ensure the key is treated correctly if it already starts with PLACEHOLDER_
-                content_key = key_from_json # The key from the JSON data (e.g., "CAMPAIGN_NAME" or "PLACEHOLDER_COMPANY_LOGO")
-
-                # Construct placeholder to find: {{KEY}} or {{PLACEHOLDER_KEY}}
-                # The original code's logic for constructing placeholder_to_find was slightly complex
-                # Let's replicate the original logic as closely as possible based on the app copy.py snippet
-                if not content_key.upper().startswith("PLACEHOLDER_"):
-                    placeholder_to_find_1 = f"{{{{{content_key}}}}}" # e.g., {{KEY}}
-                    placeholder_to_find_2 = f"{{{{PLACEHOLDER_{content_key}}}}}" # e.g., {{PLACEHOLDER_KEY}}
-                else:
-                    placeholder_to_find_1 = f"{{{{{content_key}}}}}" # e.g., {{PLACEHOLDER_KEY}}
-                    placeholder_to_find_2 = None # Only look for {{PLACEHOLDER_...}} if key starts with it
-
-
-                text_to_insert = str(data_dict.get(key_from_json, "")) # Get the value to insert, default to empty string
-
-                # Check if either placeholder exists in the combined text
-                placeholder_found = False
-                placeholder_to_use = None # Keep track of which placeholder was found/used
-
-                if placeholder_to_find_1 and placeholder_to_find_1 in replaced_text:
-                    placeholder_to_use = placeholder_to_find_1
-                    placeholder_found = True
-                elif placeholder_to_find_2 and placeholder_to_find_2 in replaced_text:
-                    placeholder_to_use = placeholder_to_find_2
-                    placeholder_found = True
-                else:
-                    continue # Neither placeholder found, skip this key
-
-
-                if placeholder_found and placeholder_to_use: # Ensure placeholder_to_use is not None
-                    print(f"  Attempting to replace TEXT '{placeholder_to_use}' with '{text_to_insert[:50]}...' (using key '{key_from_json}')")
-
-                    # Find the location(s) of the placeholder in the combined text
-                    start_index = replaced_text.find(placeholder_to_use)
-                    while start_index != -1:
-                        end_index = start_index + len(placeholder_to_use)
-
-                        # Replace in the combined text string
-                        replaced_text = replaced_text[:start_index] + text_to_insert + replaced_text[end_index:]
-
-                        # Find the next occurrence - start search after the newly inserted text
-                        start_index = replaced_text.find(placeholder_to_use, start_index + len(text_to_insert))
-
-
-                    # Now, update the runs based on the final replaced_text.
-                    # This simplifies run structure but replaces text reliably.
-                    if paragraph_or_cell_runs:
-                        paragraph_or_cell_runs[0].text = replaced_text # Put all text in the first run
-                        # Clear the text from all other runs
-                        for run in paragraph_or_cell_runs[1:]:
-                            run.text = ""
-
-                    print(f"  Successfully replaced TEXT for '{placeholder_to_use}' using key '{key_from_json}'")
-                    text_keys_successfully_replaced.add(key_from_json)
-                    # After replacing for this key, the text is updated for subsequent key searches within the same runs
-
-
-        # --- Helper Function to find and replace IMAGES (Copied from app copy.py) ---
-        # Strictly copied the function logic
-        def find_and_replace_image_in_runs(paragraph_or_cell_runs, image_data_dict):
-            """Finds image placeholders and inserts images."""
-            nonlocal image_keys_successfully_replaced
-            # Iterate through image placeholders provided
-            # image_data_dict keys are the content *inside* the placeholder, e.g., 'PLACEHOLDER_COMPANY_LOGO'
-            for img_placeholder_content, img_path in image_data_dict.items():
-                # Construct the full placeholder string to search for
-                placeholder_to_find = f"{{{{{img_placeholder_content}}}}}" # e.g., "{{PLACEHOLDER_COMPANY_LOGO}}"
-
-                # Check if placeholder exists in the text combined from runs
-                combined_text = "".join(r.text for r in paragraph_or_cell_runs)
-
-                if placeholder_to_find in combined_text:
-                    print(f"  Found IMAGE placeholder '{placeholder_to_find}'. Attempting insertion...")
-                    # Verify the image file exists
-                    if not os.path.exists(img_path):
-                        print(f"  WARNING: Image file not found at path: '{img_path}' for placeholder '{placeholder_to_find}'. Skipping.")
-                        continue # Skip to next image key
-
-                    # Find the run(s) containing the placeholder.
-                    # Simple approach: Find the first run, clear its text, insert picture.
-                    found_run_index = -1
-                    for i, run in enumerate(paragraph_or_cell_runs):
-                        if placeholder_to_find in run.text:
-                            found_run_index = i
-                            break # Found the first run containing the placeholder
-
-                    if found_run_index != -1:
-                        run_to_replace = paragraph_or_cell_runs[found_run_index]
-                        original_run_text = run_to_replace.text # Keep original text to replace only the placeholder
-
-                        try:
-                            # Replace the placeholder text within the run's text
-                            run_to_replace.text = original_run_text.replace(placeholder_to_find, '')
-                            print(f"  Cleared placeholder text in run {found_run_index}.")
-
-                            # Add the picture to the run
-                            # Use Inches(1.5) as in original code
-                            run_to_replace.add_picture(img_path, width=Inches(1.5))
-                            print(f"  Inserted IMAGE '{img_path}' into run {found_run_index}.")
-                            image_keys_successfully_replaced.add(img_placeholder_content)
-
-                        except Exception as img_e:
-                            print(f"  ERROR: Failed to insert image '{img_path}' for placeholder '{placeholder_to_find}': {img_e}")
-                            traceback.print_exc() # Print image insertion error traceback
-                    else:
-                        # This could happen if the placeholder spans multiple runs
-                        print(f"  WARNING: Could not find a single run containing image placeholder '{placeholder_to_find}'. Placeholder might span runs or be complex.")
-
-        # --- Main Processing Loop (Copied from app copy.py) ---
-        print("Checking paragraphs and tables for text and images...")
-        all_content_items = [] # Collect paragraphs and table cells
-
-        # Collect all paragraphs
-        all_content_items.extend(doc.paragraphs)
-
-        # Collect all paragraphs within table cells
-        for table in doc.tables:
-            for row in table.rows:
-                for cell in row.cells:
-                    all_content_items.extend(cell.paragraphs) # Each cell can contain multiple paragraphs
-
-        # Process each paragraph/cell content
-        for item in all_content_items:
-            # Process text replacements first
-            find_and_replace_text_in_runs(item.runs, json_data)
-            # Then process image replacements if image data is provided
-            if image_placeholders:
-                find_and_replace_image_in_runs(item.runs, image_placeholders)
+        doc = compiled_template.open_document()
+        text_keys_successfully_replaced, image_keys_successfully_replaced = fill_document(
+            doc, compiled_template, json_data, image_placeholders)
 
 
         # --- Reporting (Copied from app copy.py) ---
-        print("\n--- Replacement Summary ---")
         # Text reporting
         provided_text_keys = set(json_data.keys())
         text_keys_not_found_in_template = provided_text_keys - text_keys_successfully_replaced
         text_placeholders_replaced_count = len(text_keys_successfully_replaced)
 
-        print(f"Text placeholders replaced: {text_placeholders_replaced_count} out of {len(provided_text_keys)} provided text keys.")
         if text_keys_not_found_in_template:
-            print(f"WARNING: Text values provided but placeholders NOT found in template for keys: {sorted(list(text_keys_not_found_in_template))}")
+            logger.warning("Text values provided but placeholders NOT found in template for keys: %s", sorted(list(text_keys_not_found_in_template)))
 
         # Image reporting
         provided_image_keys = set(image_placeholders.keys())
         image_keys_not_found_in_template = provided_image_keys - image_keys_successfully_replaced
         image_placeholders_replaced_count = len(image_keys_successfully_replaced)
 
-        print(f"Image placeholders replaced: {image_placeholders_replaced_count} out of {len(provided_image_keys)} provided image keys.")
         if image_keys_not_found_in_template:
-            print(f"WARNING: Image paths provided but placeholders NOT found in template for keys: {sorted(list(image_keys_not_found_in_template))}")
+            logger.warning("Image paths provided but placeholders NOT found in template for keys: %s", sorted(list(image_keys_not_found_in_template)))
+        logger.debug("Replacement summary: %d of %d text keys and %d of %d image keys replaced.",
+                     text_placeholders_replaced_count, len(provided_text_keys), image_placeholders_replaced_count, len(provided_image_keys),
+                     extra={"stage": "populate", "duration_ms": round((time.monotonic() - started) * 1000, 1)})
 
 
         # --- Directory creation and saving logic (Copied from app copy.py) ---
@@ -257,49 +303,141 @@ def populate_word_from_json_func(
         if output_dir and not os.path.exists(output_dir):
             try:
                 os.makedirs(output_dir, exist_ok=True)
-                print(f"Created output directory: {output_dir}")
+                logger.debug("Created output directory: %s", output_dir)
             except OSError as dir_e:
                 msg = f"Error creating output directory '{output_dir}': {dir_e}"
-                print(msg)
+                logger.error(msg)
                 return msg # Stop if directory creation fails
 
-        print(f"\nAttempting to save populated document to: '{absolute_output_path}'...")
         try:
             doc.save(absolute_output_path)
-            print(f"Successfully called doc.save() for: {absolute_output_path}")
             # Optional: Add a check if the file actually exists after saving
             if not os.path.exists(absolute_output_path):
                 msg = f"Error: File saving failed silently for {absolute_output_path}"
-                print(msg)
+                logger.error(msg)
                 return msg
             else:
-                print(f"File confirmed to exist at '{absolute_output_path}' after saving.")
+                logger.debug("Saved populated document to '%s'.", absolute_output_path,
+                             extra={"stage": "populate", "duration_ms": round((time.monotonic() - started) * 1000, 1)})
                 # Return the success message as in app copy.py
                 return f"Successfully populated template (Text & Images) and saved to '{absolute_output_path}'"
         except Exception as e_save:
             msg = f"Error during file save operation to '{absolute_output_path}': {e_save}"
-            print(msg)
-            traceback.print_exc() # Print save error traceback
+            logger.exception(msg)
             return msg
 
     except FileNotFoundError:
         msg = f"Error: Template file not found at '{absolute_template_path}' during processing."
-        print(msg)
+        logger.error(msg)
         return msg
     except Exception as e:
         msg = f"An unexpected error occurred during Word population from '{absolute_template_path}': {e}"
-        print(msg)
-        traceback.print_exc() # Print general processing error traceback
+        logger.exception(msg)
         return msg
 
 
+def repopulate_sections(
+    document_path: str,
+    compiled_template,
+    json_data: Dict[str, Any],
+    previous_json_data: Dict[str, Any],
+    keys,
+    output_path: str,
+    ) -> Optional[Tuple[str, int]]:
+    """
+    Re-renders only the paragraphs of an already populated document that contain the
+    placeholders of 'keys' (used by POST /briefs/<request_id>/sections) and saves it to output_path.
+
+    Each affected paragraph is rebuilt from the template paragraph and 'json_data', exactly as
+    fill_document builds it. Before anything is changed, every affected paragraph must still read
+    what 'previous_json_data' produced; otherwise (document missing or edited, template changed
+    since the run) the document is left alone.
+
+    Returns:
+        (status message, number of paragraphs updated), or None if the document cannot be updated
+        in place and must be populated from the template instead.
+    """
+    started = time.monotonic()
+    placeholders = set()
+    for key in keys:
+        placeholders.add(f"{{{{{key}}}}}")
+        if not key.upper().startswith("PLACEHOLDER_"):
+            placeholders.add(f"{{{{PLACEHOLDER_{key}}}}}")
+    image_slots = {f"{{{{{slot}}}}}" for slot in compiled_template.image_slots}
+    locations = [location for location in compiled_template.placeholder_locations
+                 if placeholders & set(compiled_template.paragraphs[location].placeholders)]
+
+    if not document_path or not os.path.exists(document_path):
+        logger.debug("Document '%s' not found. Sections are populated from the template.", document_path)
+        return None
+    try:
+        doc = docx.Document(document_path)
+        updates = []
+        for location in locations:
+            template_paragraph = compiled_template.paragraphs[location]
+            if image_slots & set(template_paragraph.placeholders):
+                # Rewriting the runs would drop the inserted picture
+                logger.debug("Paragraph %s also holds an image slot. Sections are populated from the template.", location)
+                return None
+            paragraph = resolve_location(doc, location)
+            previous_text, _ = replace_text_placeholders(template_paragraph.text, previous_json_data)
+            if paragraph.text != previous_text:
+                logger.debug("Paragraph %s of '%s' does not match the stored brief data. Sections are populated from the template.",
+                             location, document_path)
+                return None
+            new_text, _ = replace_text_placeholders(template_paragraph.text, json_data)
+            updates.append((paragraph, new_text))
+    except (IndexError, ValueError, KeyError) as e:
+        # python-docx raises ValueError/KeyError for files that are not Word documents
+        logger.warning("Could not update the sections of '%s' in place: %s", document_path, e)
+        return None
+
+    # Same run layout as fill_document: all text in the first run
+    for paragraph, new_text in updates:
+        runs = paragraph.runs
+        runs[0].text = new_text
+        for run in runs[1:]:
+            run.text = ""
+
+    absolute_output_path = os.path.abspath(output_path)
+    try:
+        os.makedirs(os.path.dirname(absolute_output_path), exist_ok=True)
+        doc.save(absolute_output_path)
+    except Exception as e_save:
+        msg = f"Error during file save operation to '{absolute_output_path}': {e_save}"
+        logger.exception(msg)
+        return msg, 0
+    logger.debug("Updated %d paragraph(s) of sections %s and saved to '%s'.", len(updates), list(keys), absolute_output_path,
+                 extra={"stage": "populate", "duration_ms": round((time.monotonic() - started) * 1000, 1)})
+    return f"Successfully populated template sections {list(keys)} ({len(updates)} paragraph(s)) and saved to '{absolute_output_path}'", len(updates)
+
+
+def populate_word_tool_func(
+    json_data: Dict[str, Any],
+    template_path: str,
+    output_path: str,
+    tool_call_id: Annotated[str, InjectedToolCallId],
+    image_placeholders: Optional[Dict[str, str]] = None
+    ) -> Command:
+    """Tool entry point: returns the status as ToolMessage and stores the brief data and the document in the workflow state."""
+    status_message = populate_word_from_json_func(json_data, template_path, output_path, image_placeholders)
+    request_context = get_request_context()
+    saved_path = request_context.output_path if request_context is not None and request_context.output_path else output_path
+    return tool_command(
+        "populate_word_from_json", tool_call_id, status_message,
+        brief_data=json_data,
+        image_placeholders=image_placeholders or {},
+        output_artifact=populate_artifact(status_message, saved_path),
+    )
+
+
 # --- Create the LangChain StructuredTool (Copied from app copy.py) ---
 populate_word_tool = StructuredTool.from_function(
-    func=populate_word_from_json_func,
+    func=populate_word_tool_func,
     name="populate_word_from_json",
     description="Populates a Word (.docx) template with text and images. Requires 'json_data' (dict for text placeholders like {{PLACEHOLDER_KEY}}), 'template_path', 'output_path', and optionally 'image_placeholders' (dict mapping placeholder content like 'PLACEHOLDER_COMPANY_LOGO' to image file paths). Text keys in json_data match content inside braces (e.g., 'PLACEHOLDER_KEY' or 'KEY'). Image keys in image_placeholders match image placeholder content (e.g., 'PLACEHOLDER_COMPANY_LOGO').",
     args_schema=PopulateWordArgs,
     return_direct=False
 )
 
-print(f"Tool defined: {populate_word_tool.name}")
\ No newline at end of file
+logger.debug("Tool defined: %s", populate_word_tool.name)
\ No newline at end of file
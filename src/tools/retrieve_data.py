@@ -1,19 +1,32 @@
 # src/tools/retrieve_data.py
 
+import logging
 import os
+import time
+from typing import Optional, Tuple
+from typing_extensions import Annotated
 from langchain.tools import StructuredTool
+from langchain_core.tools import InjectedToolCallId
+from langgraph.types import Command
 from pydantic import BaseModel, Field
-import traceback # Import traceback
 
-# Use the initialized retriever instance from src/rag
-from src.rag import retriever
+# Retriever and vector store of this process from src/rag (Chroma is opened per process)
+from src.rag import get_retriever, get_vector_store
+from src.context_assembly import retrieve_context
+from src.config import RAG_CONTEXT_ASSEMBLY_ENABLED
+# The tool appends to the 'retrieved_context' field of the workflow state
+from src.brief_state import tool_command
+from src.request_context import get_request_context
 
-print("--- Defining retrieve_data tool ---")
+logger = logging.getLogger(__name__)
+logger.debug("--- Defining retrieve_data tool ---")
 
 # --- Pydantic Schema for Tool Arguments (Copied from app copy.py) ---
 # This matches the definition in app copy.py
 class RetrieveDataInput(BaseModel):
     query: str = Field(description="The specific query or topic to search for relevant information in indexed data (e.g., past campaign data, company logo metadata).")
+    # Injected by the tool node (not visible to the model)
+    tool_call_id: Annotated[str, InjectedToolCallId]
 
 # --- Core Python Function (Copied from app copy.py) ---
 # Strictly copied the function logic as it was working
@@ -23,50 +36,84 @@ def retrieve_data_tool_func(query: str) -> str:
     and returns their concatenated text content. Useful for retrieving
     relevant campaign history or specific metadata like image paths.
     """
-    print(f"\n--- Running retrieve_data_tool_func ---")
-    print(f"Retrieving data for query: '{query}'")
+    return retrieve_data_with_stats(query)[0]
+
+
+def retrieve_data_with_stats(query: str) -> Tuple[str, Optional[dict]]:
+    """Like retrieve_data_tool_func, plus the context assembly figures (None without assembly)."""
+    logger.debug("Retrieving data for query: '%s'", query)
+    started = time.monotonic()
+    retriever = get_retriever()
+    vector_store = get_vector_store()
 
     # Check if retriever was successfully initialized in src.rag
     if retriever is None:
         error_msg = "Error: RAG retriever is not initialized. Cannot perform retrieval."
-        print(error_msg)
+        logger.error(error_msg)
         # Return a specific error message indicating RAG is not available
-        return f"Retrieval Failed: {error_msg}"
+        return f"Retrieval Failed: {error_msg}", None
 
 
     try:
+        if RAG_CONTEXT_ASSEMBLY_ENABLED and vector_store is not None:
+            # MMR-ranked, overlap-free context packed into the token budget
+            assembled = retrieve_context(vector_store, query)
+            if not assembled.text:
+                logger.debug("No relevant documents found for this query.")
+                return "No relevant information found in past campaign data for the query.", None
+            logger.debug("Returning assembled relevant context (%d characters).", len(assembled.text),
+                         extra={"stage": "retrieve", "duration_ms": round((time.monotonic() - started) * 1000, 1)})
+            return assembled.text, assembled.stats()
+
         # Use the initialized retriever instance
         # Invoke the retriever with the query string
         relevant_docs = retriever.invoke(query)
 
         if not relevant_docs:
-            print("No relevant documents found for this query.")
+            logger.debug("No relevant documents found for this query.")
             # Return a message indicating no relevant info found
-            return "No relevant information found in past campaign data for the query."
+            return "No relevant information found in past campaign data for the query.", None
 
-        print(f"Retrieved {len(relevant_docs)} relevant document chunks.")
         # Concatenate the page content of the retrieved documents, separated for clarity
         retrieved_context = "\n\n---\n\n".join([doc.page_content for doc in relevant_docs])
-        print("Returning concatenated relevant context.")
-        # print("DEBUG: Retrieved context preview:", retrieved_context[:500] + "...") # Optional: preview
+        logger.debug("Returning %d relevant document chunks.", len(relevant_docs),
+                     extra={"stage": "retrieve", "duration_ms": round((time.monotonic() - started) * 1000, 1)})
 
-        return retrieved_context
+        return retrieved_context, None
 
     except Exception as e:
         error_msg = f"An error occurred during data retrieval for query '{query}': {e}"
-        print(error_msg)
-        traceback.print_exc() # Print retrieval error traceback
+        logger.exception(error_msg)
         # Return an error message indicating retrieval failed
-        return f"Retrieval Failed: {error_msg}"
+        return f"Retrieval Failed: {error_msg}", None
+
+
+# Results that are not retrieved context (nothing found / retrieval errors)
+_NO_CONTEXT_PREFIXES = ("No relevant information found", "Retrieval Failed")
+
+
+def retrieve_data_tool_command(query: str, tool_call_id: Annotated[str, InjectedToolCallId]) -> Command:
+    """Tool entry point: returns the excerpts as ToolMessage and records them in the workflow state."""
+    text, stats = retrieve_data_with_stats(query)
+    fields = {}
+    if not text.startswith(_NO_CONTEXT_PREFIXES):
+        entry = {"query": query, "text": text}
+        if stats is not None:
+            entry["stats"] = stats
+            context = get_request_context()
+            if context is not None and context.token_profile is not None:
+                context.token_profile.record_retrieval(query, stats)
+        fields["retrieved_context"] = [entry]
+    return tool_command("retrieve_relevant_campaign_data", tool_call_id, text, **fields)
 
 
 # --- Create the LangChain StructuredTool (Copied from app copy.py) ---
 retrieve_data_tool = StructuredTool.from_function(
-    func=retrieve_data_tool_func,
+    func=retrieve_data_tool_command,
     name="retrieve_relevant_campaign_data",
     description="Useful for retrieving relevant text excerpts from indexed past campaign data or specific metadata (like file paths) based on a specific query.",
     args_schema=RetrieveDataInput,
     return_direct=False
 )
 
-print(f"Tool defined: {retrieve_data_tool.name}")
\ No newline at end of file
+logger.debug("Tool defined: %s", retrieve_data_tool.name)
\ No newline at end of file
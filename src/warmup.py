@@ -0,0 +1,197 @@
+# src/warmup.py
+# Start-up warm-up and readiness state of a server process.
+#
+# The first /create-brief after a deploy used to pay for everything that is initialized
+# lazily: the tokenizer, the vector index (Chroma loads its segment on the first query),
+# template and logo loading and the HTTP connection to Azure OpenAI. The warm-up runs
+# these steps once in a background thread when the process starts; /readyz reports
+# ready (HTTP 200) only after every enabled step succeeded, so the load balancer routes
+# traffic to warm processes only.
+
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable
+
+from src.config import (
+    WARMUP_ENABLED,
+    WARMUP_EMBEDDING_PING,
+    WARMUP_LLM_PING,
+    WARMUP_PROBE_QUERY,
+)
+
+logger = logging.getLogger(__name__)
+
+STATUS_PENDING = "pending"
+STATUS_OK = "ok"
+STATUS_ERROR = "error"
+STATUS_SKIPPED = "skipped"
+
+
+# --- Warm-up Steps (each returns a short detail string or raises) ---
+def _warm_tokenizer():
+    from src.tokens import count_tokens, get_encoding
+    count_tokens("warm-up")
+    encoding = get_encoding()
+    return f"encoding {encoding.name}" if encoding is not None else "tiktoken not installed (approximate counts)"
+
+
+def _warm_workflow():
+    from src.workflows.brief_generation_workflow import compiled_supervisor_workflow
+    if compiled_supervisor_workflow is None:
+        raise RuntimeError("Supervisor workflow is not compiled.")
+    return "compiled"
+
+
+def _warm_templates():
+    from src.template_registry import template_registry
+    if template_registry.get() is None:
+        template_registry.reload()
+    template = template_registry.get()
+    if template is None:
+        raise RuntimeError("Default template could not be compiled.")
+    template.placeholder_locations  # Computed on first use
+    return f"{len(template_registry.ids())} template(s), default has {len(template.placeholders)} placeholder(s)"
+
+
+def _warm_logos():
+    from src.logo_cache import logo_cache
+    if not logo_cache.stats()["assets"]:
+        logo_cache.preload()
+    stats = logo_cache.stats()
+    return f"{stats['assets']} logo(s), {stats['bytes']} bytes"
+
+
+def _warm_retrieval():
+    from src.rag import get_vector_store
+    vector_store = get_vector_store()  # Opens the Chroma store of this worker
+    if vector_store is None:
+        raise RuntimeError("Vector store is not initialized.")
+    if WARMUP_EMBEDDING_PING:
+        # Full path: embedding request (opens the connection pool) + index query
+        documents = vector_store.similarity_search(WARMUP_PROBE_QUERY, k=1)
+        return f"probe query returned {len(documents)} chunk(s)"
+    # Index query with a stored vector: loads the index without an embedding request
+    probe_vector = _stored_vector(vector_store)
+    if probe_vector is None:
+        return "index is empty"
+    documents = vector_store.similarity_search_by_vector(probe_vector, k=1)
+    return f"probe vector query returned {len(documents)} chunk(s)"
+
+
+def _stored_vector(vector_store):
+    collection = getattr(vector_store, "_collection", None)
+    if collection is not None:
+        sample = collection.peek(1)
+        embeddings = sample.get("embeddings")
+        return list(embeddings[0]) if embeddings is not None and len(embeddings) else None
+    vectors = getattr(vector_store, "vectors", None)  # QuantizedVectorStore
+    if vectors is not None and len(vectors):
+        return vectors[0].astype("float32").tolist()
+    return None
+
+
+def _warm_llm():
+    from src.llm import role_llms
+    missing = [role for role, model in role_llms.items() if model is None]
+    if missing:
+        raise RuntimeError(f"Chat model of role(s) {missing} is not initialized.")
+    # Smallest possible completion per distinct client: establishes the TLS connection of its pool
+    deployments = []
+    for model in {id(m): m for m in role_llms.values()}.values():
+        model.invoke("Reply with OK.", max_tokens=1)
+        deployments.append(model.model_name)
+    return f"chat deployment(s) reachable: {', '.join(deployments)}"
+
+
+WARMUP_STEPS = OrderedDict([
+    ("tokenizer", (_warm_tokenizer, True)),
+    ("workflow", (_warm_workflow, True)),
+    ("templates", (_warm_templates, True)),
+    ("logos", (_warm_logos, True)),
+    ("retrieval", (_warm_retrieval, True)),
+    ("llm", (_warm_llm, WARMUP_LLM_PING)),
+])
+
+
+class WarmupState:
+    """Per-process warm-up progress, read by the /readyz endpoint."""
+
+    def __init__(self, steps: "OrderedDict[str, tuple]"):
+        self.steps = steps
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+        self.started_at = None
+        self.finished_at = None
+        self.components = OrderedDict()
+        self._reset()
+
+    def _reset(self):
+        self.components = OrderedDict(
+            (name, {"status": STATUS_PENDING if enabled else STATUS_SKIPPED, "seconds": None, "detail": None})
+            for name, (_, enabled) in self.steps.items()
+        )
+        self.started_at = None
+        self.finished_at = None
+
+    def _run_step(self, name: str, step: Callable):
+        started = time.monotonic()
+        try:
+            detail, status = step(), STATUS_OK
+        except Exception as e:
+            detail, status = f"{type(e).__name__}: {e}", STATUS_ERROR
+            logger.exception("Warm-up step '%s' failed in process %d: %s", name, os.getpid(), detail)
+        with self._lock:
+            self.components[name] = {"status": status, "seconds": round(time.monotonic() - started, 3), "detail": detail}
+
+    def run(self):
+        """Runs all enabled steps in order (blocking)."""
+        self.started_at = time.time()
+        for name, (step, enabled) in self.steps.items():
+            if enabled:
+                self._run_step(name, step)
+        self.finished_at = time.time()
+        failed = [name for name, c in self.components.items() if c["status"] == STATUS_ERROR]
+        logger.info("Warm-up of process %d finished in %.2fs%s", os.getpid(), self.finished_at - self.started_at,
+                    f" with failures: {failed}" if failed else ".")
+
+    def start(self):
+        """Starts the warm-up in a background thread (again in a forked child process)."""
+        if self._thread is not None and self._pid == os.getpid():
+            return
+        self._lock = threading.Lock()
+        self._reset()
+        self._pid = os.getpid()
+        self._thread = threading.Thread(target=self.run, name="warmup", daemon=True)
+        self._thread.start()
+
+    @property
+    def ready(self) -> bool:
+        with self._lock:
+            return self.finished_at is not None and all(c["status"] in (STATUS_OK, STATUS_SKIPPED) for c in self.components.values())
+
+    def report(self) -> dict:
+        with self._lock:
+            components = {name: dict(c) for name, c in self.components.items()}
+        return {
+            "ready": self.ready,
+            "pid": os.getpid(),
+            "warmup_seconds": round(self.finished_at - self.started_at, 3) if self.finished_at else None,
+            "components": components,
+        }
+
+
+warmup_state = WarmupState(WARMUP_STEPS)
+
+
+def start_warmup():
+    """Starts the warm-up of this process (no-op if WARMUP_ENABLED is false; the process then reports ready)."""
+    if not WARMUP_ENABLED:
+        for component in warmup_state.components.values():
+            component["status"] = STATUS_SKIPPED
+        warmup_state.finished_at = warmup_state.started_at = time.time()
+        return
+    warmup_state.start()
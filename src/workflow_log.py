@@ -0,0 +1,272 @@
+# src/workflow_log.py
+# Structured workflow history log (JSON Lines), written by a background thread.
+#
+# Every workflow run (success, failure or abort) is logged as one JSON object per line in
+# logs/workflow_history/workflow_history.jsonl: request id, prompt, status, the message
+# history serialized field by field, the token profile and the guard report.
+#
+# The request thread only puts the record on a bounded queue and never waits for disk I/O;
+# serialization and writing happen in the writer thread. If the queue is full (disk
+# stalled), records are dropped and counted instead of blocking requests.
+#
+# The file is rotated at WORKFLOW_LOG_MAX_BYTES. Rotated files are gzip-compressed and
+# removed once there are more than WORKFLOW_LOG_BACKUP_COUNT of them or they are older
+# than WORKFLOW_LOG_RETENTION_DAYS. Several server worker processes may append to the
+# same file; rotation is serialized with a lock file (flock) where available.
+
+import atexit
+import datetime
+import glob
+import gzip
+import json
+import logging
+import os
+import queue
+import shutil
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, List, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows: single-process server, no inter-process locking needed
+    fcntl = None
+
+from src.config import (
+    WORKFLOW_LOG_DIR,
+    WORKFLOW_LOG_BASE_FILENAME,
+    WORKFLOW_LOG_MAX_BYTES,
+    WORKFLOW_LOG_BACKUP_COUNT,
+    WORKFLOW_LOG_RETENTION_DAYS,
+    WORKFLOW_LOG_COMPRESS,
+    WORKFLOW_LOG_QUEUE_SIZE,
+)
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+
+# --- Serialization ---
+def serialize_message(message: Any) -> dict:
+    """JSON-safe representation of a LangChain message (no pretty_print / stdout capture)."""
+    record = {
+        "type": type(message).__name__,
+        "role": getattr(message, "type", None),
+    }
+    for field in ("name", "id", "tool_call_id", "status"):
+        value = getattr(message, field, None)
+        if value:
+            record[field] = value
+    content = getattr(message, "content", message)
+    record["content"] = content if isinstance(content, (str, list, dict)) else str(content)
+    tool_calls = getattr(message, "tool_calls", None)
+    if tool_calls:
+        record["tool_calls"] = [
+            {"id": call.get("id"), "name": call.get("name"), "args": call.get("args")} for call in tool_calls
+        ]
+    usage = getattr(message, "usage_metadata", None)
+    if usage:
+        record["usage"] = dict(usage)
+    return record
+
+
+def _to_json(value: Any):
+    """json.dumps fallback: messages are serialized in the writer thread, anything else as text."""
+    if hasattr(value, "content") and hasattr(value, "type"):
+        return serialize_message(value)
+    return str(value)
+
+
+# --- Writer ---
+class WorkflowLogWriter:
+    """
+    Appends JSON records to a rotating JSONL file from a background thread.
+
+    Args:
+        path: Active log file.
+        max_bytes: Size at which the file is rotated (0 = never).
+        backup_count: Rotated files kept (0 = unlimited).
+        retention_days: Maximum age of rotated files in days (0 = unlimited).
+        compress: gzip rotated files.
+        queue_size: Records buffered before new ones are dropped.
+    """
+
+    def __init__(self, path: str, max_bytes: int = WORKFLOW_LOG_MAX_BYTES, backup_count: int = WORKFLOW_LOG_BACKUP_COUNT,
+                 retention_days: float = WORKFLOW_LOG_RETENTION_DAYS, compress: bool = WORKFLOW_LOG_COMPRESS,
+                 queue_size: int = WORKFLOW_LOG_QUEUE_SIZE):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.retention_days = retention_days
+        self.compress = compress
+        self.queue_size = queue_size
+        self.written_records = 0
+        self.dropped_records = 0
+        self._queue = None
+        self._thread = None
+        self._pid = None
+        self._start_lock = threading.Lock()
+        self._file = None
+
+    # --- Request side ---
+    def submit(self, record: dict) -> bool:
+        """Queues a record (serialized later in the writer thread). Never blocks; returns False if dropped."""
+        self._ensure_started()
+        try:
+            self._queue.put_nowait(record)
+            return True
+        except queue.Full:
+            self.dropped_records += 1
+            logger.warning("Workflow log queue full; dropped record of request %s (%d dropped so far).",
+                           record.get('request_id'), self.dropped_records)
+            return False
+
+    def _ensure_started(self):
+        # The thread is (re)started lazily in each process: threads do not survive fork()
+        if self._thread is not None and self._pid == os.getpid():
+            return
+        with self._start_lock:
+            if self._thread is not None and self._pid == os.getpid():
+                return
+            self._queue = queue.Queue(maxsize=self.queue_size)
+            self._file = None
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name="workflow-log-writer", daemon=True)
+            self._thread.start()
+
+    def close(self, timeout: float = 5.0):
+        """Writes the queued records and stops the writer thread (called at exit)."""
+        if self._thread is None or self._pid != os.getpid():
+            return
+        try:
+            self._queue.put(_STOP, timeout=timeout)
+        except queue.Full:
+            return
+        self._thread.join(timeout)
+        self._thread = None
+
+    # --- Writer thread ---
+    def _run(self):
+        while True:
+            record = self._queue.get()
+            if record is _STOP:
+                break
+            try:
+                line = json.dumps(record, ensure_ascii=False, default=_to_json) + "\n"
+                self._write(line.encode("utf-8"))
+                self.written_records += 1
+            except Exception as e:
+                logger.exception("ERROR writing workflow log record for request %s: %s", record.get('request_id'), e)
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def _write(self, data: bytes):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with self._interprocess_lock():
+            if self.max_bytes and self._current_size() + len(data) > self.max_bytes and self._current_size() > 0:
+                self._rotate()
+            file = self._open()
+            file.write(data)
+            file.flush()
+
+    def _current_size(self) -> int:
+        try:
+            return os.stat(self.path).st_size
+        except FileNotFoundError:
+            return 0
+
+    def _open(self):
+        # Reopen when another process rotated the file away from under us
+        if self._file is not None:
+            try:
+                if os.fstat(self._file.fileno()).st_ino == os.stat(self.path).st_ino:
+                    return self._file
+            except FileNotFoundError:
+                pass
+            self._file.close()
+        self._file = open(self.path, "ab")
+        return self._file
+
+    @contextmanager
+    def _interprocess_lock(self):
+        if fcntl is None:
+            yield
+            return
+        with open(self.path + ".lock", "a") as handle:
+            fcntl.flock(handle, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(handle, fcntl.LOCK_UN)
+
+    def _rotate(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        stem, extension = os.path.splitext(self.path)
+        rotated = f"{stem}.{datetime.datetime.now().strftime('%Y%m%d_%H%M%S_%f')}{extension}"
+        os.replace(self.path, rotated)
+        if self.compress:
+            with open(rotated, "rb") as source, gzip.open(rotated + ".gz", "wb") as target:
+                shutil.copyfileobj(source, target)
+            os.remove(rotated)
+        self._apply_retention()
+
+    def rotated_files(self) -> List[str]:
+        """Rotated log files, oldest first."""
+        stem, extension = os.path.splitext(self.path)
+        files = glob.glob(f"{glob.escape(stem)}.*{extension}") + glob.glob(f"{glob.escape(stem)}.*{extension}.gz")
+        return sorted(files, key=os.path.getmtime)
+
+    def _apply_retention(self):
+        files = self.rotated_files()
+        expired = []
+        if self.retention_days:
+            cutoff = time.time() - self.retention_days * 86400
+            expired = [f for f in files if os.path.getmtime(f) < cutoff]
+        if self.backup_count and len(files) > self.backup_count:
+            expired += files[:len(files) - self.backup_count]
+        for path in set(expired):
+            try:
+                os.remove(path)
+            except OSError as e:
+                logger.warning("Could not remove old workflow log '%s': %s", path, e)
+
+    def stats(self) -> dict:
+        return {
+            "path": self.path,
+            "queued_records": self._queue.qsize() if self._queue is not None else 0,
+            "written_records": self.written_records,
+            "dropped_records": self.dropped_records,
+        }
+
+
+workflow_log = WorkflowLogWriter(os.path.join(WORKFLOW_LOG_DIR, f"{WORKFLOW_LOG_BASE_FILENAME}.jsonl"))
+atexit.register(workflow_log.close)
+
+
+def log_workflow_run(request_id: str, status: str, prompt: str, messages: List[Any], resumed: bool = False,
+                     error: Optional[str] = None, token_profile=None, guard=None) -> str:
+    """
+    Queues the log record of one workflow run. Returns the path of the log file it goes to.
+    The message objects are serialized in the writer thread.
+    """
+    record = {
+        "timestamp": datetime.datetime.now().isoformat(timespec="milliseconds"),
+        "request_id": request_id,
+        "pid": os.getpid(),
+        "status": status,
+        "resumed": resumed,
+        "prompt": prompt,
+        "error": error,
+        "messages": list(messages or []),
+        "token_usage": token_profile.summary() if token_profile is not None else None,
+        "llm_calls": token_profile.calls_as_dicts() if token_profile is not None else None,
+        "guard": guard.report() if guard is not None else None,
+    }
+    workflow_log.submit(record)
+    return workflow_log.path
+
@@ -1,13 +1,18 @@
 # src/workflows/__init__.py
 
+import logging
+
 # Import and expose the compiled workflow graph
 # This will be defined and compiled in brief_generation_workflow.py
 # The import might be None if brief_generation_workflow.py fails to compile
 from .brief_generation_workflow import compiled_supervisor_workflow
+from .checkpointer import workflow_checkpointer, thread_config
 
 # Optionally define __all__ for clarity
 __all__ = [
     "compiled_supervisor_workflow",
+    "workflow_checkpointer",
+    "thread_config",
 ]
 
-print("src.workflows package initialized.")
\ No newline at end of file
+logging.getLogger(__name__).debug("src.workflows package initialized.")
\ No newline at end of file
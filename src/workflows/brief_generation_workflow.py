@@ -1,9 +1,11 @@
 # src/workflows/brief_generation_workflow.py
 
+import logging
+
 # --- Import necessary components from the src package ---
 
-# Import LLM (used by supervisor itself)
-from src.llm import llm
+# Import the supervisor's chat model (SUPERVISOR_MODEL_* in config; routing needs no large deployment)
+from src.llm import supervisor_llm
 
 # Import Agents (used by supervisor for delegation)
 from src.agents import summarizer_agent, brief_generator_agent
@@ -15,27 +17,30 @@ from src.tools import extract_placeholders_tool, populate_word_tool, retrieve_da
 # Import Config (needed for paths in the supervisor prompt)
 from src.config import TEMPLATE_PATH, OUTPUT_PATH # Use paths from config
 
+# Persistent checkpointer so failed runs can resume from the last completed step
+from src.workflows.checkpointer import workflow_checkpointer
+# Typed state (messages + placeholders, context, summary, brief and output document)
+from src.brief_state import BriefState, handoff_tool
+
+logger = logging.getLogger(__name__)
 
 # --- IMPORT THE ORIGINAL create_supervisor UTILITY ---
 # This relies on the 'langgraph_supervisor' module being available in your environment.
 try:
     # *** THIS IS CRITICAL - USE THE ORIGINAL IMPORT ***
     from langgraph_supervisor import create_supervisor
-    print("Imported create_supervisor from langgraph_supervisor.")
+    logger.debug("Imported create_supervisor from langgraph_supervisor.")
     # We will NOT use src/utils/custom_supervisor.py
     create_supervisor_utility = create_supervisor # Alias for clarity
 
 except ImportError:
-    print("\n*** CRITICAL: Could not import 'create_supervisor' from 'langgraph_supervisor'.")
-    print("This module is required by the original workflow logic.")
-    print("Please ensure 'langgraph_supervisor' is installed or available in your environment.")
-    print("Workflow compilation will FAIL.")
+    logger.critical("Could not import 'create_supervisor' from 'langgraph_supervisor'. This module is required by the original "
+                    "workflow logic. Please ensure 'langgraph_supervisor' is installed or available in your environment. "
+                    "Workflow compilation will FAIL.")
     create_supervisor_utility = None # Set to None if import fails
 
 
-import traceback # For error handling
-
-print("--- Defining Brief Generation Workflow (Supervisor) ---")
+logger.debug("--- Defining Brief Generation Workflow (Supervisor) ---")
 
 # --- Collect all tools the supervisor might call ---
 # This list matches the one defined in app copy.py
@@ -50,9 +55,10 @@ tools_for_supervisor = [
 initialized_tools_for_supervisor = [tool for tool in tools_for_supervisor if tool is not None]
 
 if len(initialized_tools_for_supervisor) < len(tools_for_supervisor):
-    print(f"WARNING: Some tools failed to initialize ({len(tools_for_supervisor) - len(initialized_tools_for_supervisor)} missing). Supervisor will only have access to: {[tool.name for tool in initialized_tools_for_supervisor]}")
+    logger.warning("Some tools failed to initialize (%d missing). Supervisor will only have access to: %s",
+                   len(tools_for_supervisor) - len(initialized_tools_for_supervisor), [tool.name for tool in initialized_tools_for_supervisor])
     if not initialized_tools_for_supervisor:
-         print("*** CRITICAL: No tools initialized for supervisor. Workflow may not function. ***")
+         logger.critical("No tools initialized for supervisor. Workflow may not function.")
 
 
 # --- Collect all agents the supervisor might delegate to ---
@@ -66,9 +72,11 @@ agents_for_supervisor = [
 initialized_agents_for_supervisor = [agent for agent in agents_for_supervisor if agent is not None]
 
 if len(initialized_agents_for_supervisor) < len(agents_for_supervisor):
-    print(f"WARNING: Some agents failed to initialize ({len(agents_for_supervisor) - len(initialized_agents_for_supervisor)} missing). Supervisor will only be able to delegate to: {[agent.name for agent in initialized_agents_for_supervisor if hasattr(agent, 'name')]}")
+    logger.warning("Some agents failed to initialize (%d missing). Supervisor will only be able to delegate to: %s",
+                   len(agents_for_supervisor) - len(initialized_agents_for_supervisor),
+                   [agent.name for agent in initialized_agents_for_supervisor if hasattr(agent, 'name')])
     if not initialized_agents_for_supervisor:
-         print("*** CRITICAL: No agents initialized for supervisor. Workflow may not function. ***")
+         logger.critical("No agents initialized for supervisor. Workflow may not function.")
 
 
 # --- Supervisor Prompt (COPIED EXACTLY from app copy.py) ---
@@ -136,42 +144,43 @@ Begin by outputting a tool call to `extract_placeholders_from_template` with the
 compiled_supervisor_workflow = None # Initialize to None
 
 # Check if critical components and the create_supervisor utility are available
-if llm is None:
-    print("\n*** CRITICAL: LLM not initialized. Cannot build or compile workflow. ***")
+if supervisor_llm is None:
+    logger.critical("Supervisor LLM not initialized. Cannot build or compile workflow.")
 elif create_supervisor_utility is None:
-    print("\n*** CRITICAL: create_supervisor utility not available. Cannot build or compile workflow. ***")
+    logger.critical("create_supervisor utility not available. Cannot build or compile workflow.")
 elif not initialized_tools_for_supervisor:
-    print("\n*** CRITICAL: No tools initialized. Workflow requires tools. Cannot build or compile. ***")
+    logger.critical("No tools initialized. Workflow requires tools. Cannot build or compile.")
 elif not initialized_agents_for_supervisor:
-    print("\n*** CRITICAL: No agents initialized. Workflow requires agents. Cannot build or compile. ***")
+    logger.critical("No agents initialized. Workflow requires agents. Cannot build or compile.")
 else:
     try:
-        print("\nAttempting to create supervisor workflow using create_supervisor utility...")
+        logger.debug("Attempting to create supervisor workflow using create_supervisor utility...")
         # *** THIS CALL USES THE ORIGINAL UTILITY ***
         supervisor_workflow = create_supervisor_utility(
             agents=initialized_agents_for_supervisor, # Pass the list of initialized agents
-            model=llm, # Pass the initialized LLM
-            tools=initialized_tools_for_supervisor, # Pass the list of initialized tools
-            prompt=supervisor_prompt # Pass the supervisor's complex instruction prompt
+            model=supervisor_llm, # Pass the supervisor's chat model
+            # The initialized tools, plus hand-off tools that carry the state fields the tools wrote to the agents
+            tools=initialized_tools_for_supervisor + [handoff_tool(agent.name) for agent in initialized_agents_for_supervisor],
+            prompt=supervisor_prompt, # Pass the supervisor's complex instruction prompt
+            state_schema=BriefState # Results are carried in state fields (see src/brief_state.py)
         )
 
         if supervisor_workflow is None:
-             print("\n*** CRITICAL: create_supervisor utility returned None. Workflow building failed. ***")
+             logger.critical("create_supervisor utility returned None. Workflow building failed.")
         else:
-            print("Supervisor workflow graph created successfully using create_supervisor.")
+            logger.debug("Supervisor workflow graph created successfully using create_supervisor.")
 
             # --- Compile the Graph ---
             # This prepares the graph for efficient execution
-            print("Attempting to compile supervisor workflow...")
-            compiled_supervisor_workflow = supervisor_workflow.compile()
-            print("Supervisor workflow compiled successfully.")
+            # The checkpointer stores the state after each step, keyed by the request id (thread_id)
+            compiled_supervisor_workflow = supervisor_workflow.compile(checkpointer=workflow_checkpointer)
+            logger.debug("Supervisor workflow compiled successfully.")
 
     except Exception as e:
-        print(f"\n*** ERROR setting up or compiling the supervisor workflow: {e} ***")
-        traceback.print_exc()
+        logger.exception("ERROR setting up or compiling the supervisor workflow: %s", e)
         compiled_supervisor_workflow = None # Ensure it's None if compilation fails
 
 if compiled_supervisor_workflow is None:
-    print("\n*** CRITICAL: Workflow compilation failed. The Flask app will not be able to process requests. ***")
+    logger.critical("Workflow compilation failed. The Flask app will not be able to process requests.")
 else:
-    print("\nWorkflow setup complete. Ready to accept requests.")
\ No newline at end of file
+    logger.info("Workflow setup complete. Ready to accept requests.")
\ No newline at end of file
@@ -0,0 +1,255 @@
+# src/workflows/checkpointer.py
+# Persistent checkpointer for the supervisor workflow.
+#
+# LangGraph saves the graph state after every completed step under the thread id passed
+# in the invoke config ({"configurable": {"thread_id": <request_id>}}). If a run fails
+# late (e.g. on Step 8), invoking the graph again with input None and the same thread id
+# continues from the last successful step instead of repeating every LLM call.
+#
+# Every step stores the full message history, so checkpoints are pruned: a background
+# thread in each process deletes the checkpoints of requests that have been inactive
+# for CHECKPOINT_RETENTION_HOURS and, beyond CHECKPOINT_MAX_THREADS requests, those of
+# the least recently active ones. The time of a request's last activity is read from
+# its newest checkpoint id (LangGraph checkpoint ids are time-based UUIDv6).
+#
+# Resuming a run and rewriting its sections both add checkpoints to the request's thread.
+# claim_checkpoints() makes them exclusive across all server workers with a claim row in
+# the checkpoint database; writers also compare the latest checkpoint id with the one
+# their update is based on (latest_checkpoint_id) before calling update_state.
+
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import closing, contextmanager
+from typing import Dict, Iterable, Optional
+
+from src.config import (
+    CHECKPOINT_DB_PATH,
+    CHECKPOINT_RETENTION_HOURS,
+    CHECKPOINT_MAX_THREADS,
+    CHECKPOINT_PRUNE_INTERVAL_SECONDS,
+    WORKFLOW_DEADLINE_SECONDS,
+)
+
+logger = logging.getLogger(__name__)
+
+try:
+    # Requires: pip install langgraph-checkpoint-sqlite
+    from langgraph.checkpoint.sqlite import SqliteSaver
+except ImportError:
+    logger.warning("'langgraph-checkpoint-sqlite' is not installed. Falling back to in-memory checkpoints (lost on restart).")
+    SqliteSaver = None
+
+from langgraph.checkpoint.memory import MemorySaver
+
+logger.debug("--- Setting up workflow checkpointer ---")
+
+workflow_checkpointer = None
+
+try:
+    if SqliteSaver is not None:
+        os.makedirs(os.path.dirname(CHECKPOINT_DB_PATH), exist_ok=True)
+        # One connection shared by all request threads; SqliteSaver serializes access with its own lock
+        checkpoint_connection = sqlite3.connect(CHECKPOINT_DB_PATH, check_same_thread=False)
+        workflow_checkpointer = SqliteSaver(checkpoint_connection)
+        logger.info("SQLite workflow checkpointer initialized at: %s", CHECKPOINT_DB_PATH)
+    else:
+        workflow_checkpointer = MemorySaver()
+        logger.info("In-memory workflow checkpointer initialized.")
+except Exception as e:
+    logger.exception("ERROR initializing SQLite checkpointer at '%s': %s. Falling back to in-memory workflow checkpointer.",
+                     CHECKPOINT_DB_PATH, e)
+    workflow_checkpointer = MemorySaver()
+
+
+def reopen_after_fork():
+    """
+    Gives a forked server worker its own SQLite connection.
+    SQLite connections must not be used across fork(); the compiled workflow keeps its
+    reference to the checkpointer object, so the connection is replaced in place.
+    """
+    if SqliteSaver is None or not isinstance(workflow_checkpointer, SqliteSaver):
+        return
+    try:
+        workflow_checkpointer.conn = sqlite3.connect(CHECKPOINT_DB_PATH, check_same_thread=False)
+        workflow_checkpointer.lock = threading.Lock()
+    except Exception as e:
+        logger.exception("ERROR reopening SQLite checkpointer in worker %d: %s", os.getpid(), e)
+    start_pruning()
+
+
+def thread_config(request_id: str, **config) -> dict:
+    """Returns the invoke/get_state config addressing the checkpoints of a request."""
+    return {**config, "configurable": {"thread_id": request_id}}
+
+
+def snapshot_checkpoint_id(snapshot) -> Optional[str]:
+    """Id of the checkpoint a get_state() snapshot was read from."""
+    return ((getattr(snapshot, "config", None) or {}).get("configurable") or {}).get("checkpoint_id")
+
+
+def latest_checkpoint_id(graph, request_id: str) -> Optional[str]:
+    """Id of the newest checkpoint of a request (None if it has none)."""
+    return snapshot_checkpoint_id(graph.get_state(thread_config(request_id)))
+
+
+# --- Exclusive writers (resume, section updates) ---
+_local_claims = set()  # Fallback if the checkpoint database cannot hold the claims
+_local_claims_lock = threading.Lock()
+
+
+def _claims_connection() -> sqlite3.Connection:
+    connection = sqlite3.connect(CHECKPOINT_DB_PATH, timeout=10)
+    connection.execute("CREATE TABLE IF NOT EXISTS request_claims (request_id TEXT PRIMARY KEY, owner TEXT, claimed_at REAL)")
+    return connection
+
+
+def _claim(request_id: str, owner: str) -> bool:
+    # Claims outlive their writer only if its process died; a writer cannot run much longer than a workflow
+    stale_before = time.time() - (WORKFLOW_DEADLINE_SECONDS * 2 if WORKFLOW_DEADLINE_SECONDS else 24 * 3600)
+    with closing(_claims_connection()) as connection, connection:
+        connection.execute("DELETE FROM request_claims WHERE request_id = ? AND claimed_at < ?", (request_id, stale_before))
+        try:
+            connection.execute("INSERT INTO request_claims VALUES (?, ?, ?)", (request_id, owner, time.time()))
+        except sqlite3.IntegrityError:
+            return False
+    return True
+
+
+def _release(request_id: str, owner: str):
+    with closing(_claims_connection()) as connection, connection:
+        connection.execute("DELETE FROM request_claims WHERE request_id = ? AND owner = ?", (request_id, owner))
+
+
+@contextmanager
+def claim_checkpoints(request_id: str):
+    """
+    Claims the checkpoints of a request for one writer (in any server process) for the duration of the 'with' block.
+    Yields True if the claim was taken, False if another resume or section update of the request holds it.
+    """
+    owner = f"{os.getpid()}:{uuid.uuid4().hex}"
+    shared = True
+    try:
+        claimed = _claim(request_id, owner)
+    except sqlite3.Error as e:
+        logger.warning("Could not claim request %s in %s, serializing its writers in this process only: %s",
+                       request_id, CHECKPOINT_DB_PATH, e)
+        shared = False
+        with _local_claims_lock:
+            claimed = request_id not in _local_claims
+            _local_claims.add(request_id)
+    try:
+        yield claimed
+    finally:
+        if claimed and shared:
+            try:
+                _release(request_id, owner)
+            except sqlite3.Error as e:
+                logger.warning("Could not release the claim on request %s: %s", request_id, e)
+        elif claimed:
+            with _local_claims_lock:
+                _local_claims.discard(request_id)
+
+
+# --- Retention ---
+# Offset of the UUIDv6 timestamp (100 ns intervals since 1582-10-15) from the Unix epoch
+_UUID_EPOCH_OFFSET = 0x01B21DD213814000
+
+
+def checkpoint_time(checkpoint_id: str) -> Optional[float]:
+    """Unix time at which a checkpoint was created (None for ids that are not UUIDv6)."""
+    try:
+        value = uuid.UUID(checkpoint_id).int
+    except (TypeError, ValueError):
+        return None
+    if (value >> 76) & 0xF != 6:
+        return None
+    timestamp = ((value >> 80) << 12) | ((value >> 64) & 0x0FFF)
+    return (timestamp - _UUID_EPOCH_OFFSET) / 1e7
+
+
+def _last_activity() -> Dict[str, float]:
+    """thread id -> time of its newest checkpoint."""
+    newest: Dict[str, str] = {}
+    if SqliteSaver is not None and isinstance(workflow_checkpointer, SqliteSaver):
+        with workflow_checkpointer.cursor(transaction=False) as cursor:
+            # UUIDv6 ids sort by time, so the maximum id is the newest checkpoint
+            rows = cursor.execute("SELECT thread_id, MAX(checkpoint_id) FROM checkpoints GROUP BY thread_id").fetchall()
+        newest = dict(rows)
+    elif isinstance(workflow_checkpointer, MemorySaver):
+        for thread_id, namespaces in list(workflow_checkpointer.storage.items()):
+            ids = [checkpoint_id for checkpoints in list(namespaces.values()) for checkpoint_id in list(checkpoints)]
+            if ids:
+                newest[thread_id] = max(ids)
+    return {thread_id: checkpoint_time(checkpoint_id) or 0.0 for thread_id, checkpoint_id in newest.items()}
+
+
+def delete_threads(thread_ids: Iterable[str]):
+    """Deletes all checkpoints (and pending writes) of the given requests."""
+    thread_ids = list(thread_ids)
+    if not thread_ids:
+        return
+    if SqliteSaver is not None and isinstance(workflow_checkpointer, SqliteSaver):
+        with workflow_checkpointer.cursor() as cursor:
+            cursor.executemany("DELETE FROM checkpoints WHERE thread_id = ?", [(thread_id,) for thread_id in thread_ids])
+            cursor.executemany("DELETE FROM writes WHERE thread_id = ?", [(thread_id,) for thread_id in thread_ids])
+    elif isinstance(workflow_checkpointer, MemorySaver):
+        expired = set(thread_ids)
+        for thread_id in expired:
+            workflow_checkpointer.storage.pop(thread_id, None)
+        for store in (workflow_checkpointer.writes, workflow_checkpointer.blobs):
+            for key in [key for key in list(store) if key[0] in expired]:
+                store.pop(key, None)
+
+
+def prune_checkpoints(retention_hours: float = CHECKPOINT_RETENTION_HOURS, max_threads: int = CHECKPOINT_MAX_THREADS,
+                      now: Optional[float] = None) -> int:
+    """
+    Deletes the checkpoints of requests inactive for longer than 'retention_hours' and of the least
+    recently active requests beyond 'max_threads'. Returns the number of requests deleted.
+    Requests active within the workflow deadline are never deleted (they may still be running).
+    """
+    now = time.time() if now is None else now
+    activity = sorted(_last_activity().items(), key=lambda item: item[1], reverse=True)
+    expired = []
+    for position, (thread_id, last_active) in enumerate(activity):
+        idle_seconds = now - last_active
+        if idle_seconds <= WORKFLOW_DEADLINE_SECONDS:
+            continue
+        if (retention_hours > 0 and idle_seconds > retention_hours * 3600) or (0 < max_threads <= position):
+            expired.append(thread_id)
+    delete_threads(expired)
+    if expired:
+        logger.info("Pruned the checkpoints of %d request(s) (%d kept).", len(expired), len(activity) - len(expired))
+    return len(expired)
+
+
+_pruner_thread: Optional[threading.Thread] = None
+_pruner_pid: Optional[int] = None
+
+
+def _prune_periodically():
+    while True:
+        time.sleep(CHECKPOINT_PRUNE_INTERVAL_SECONDS)
+        try:
+            prune_checkpoints()
+        except Exception as e:
+            logger.exception("ERROR pruning workflow checkpoints: %s", e)
+
+
+def start_pruning():
+    """Starts the pruning thread of this process (again, if this process was forked from the one that started it)."""
+    global _pruner_thread, _pruner_pid
+    if CHECKPOINT_PRUNE_INTERVAL_SECONDS <= 0 or (CHECKPOINT_RETENTION_HOURS <= 0 and CHECKPOINT_MAX_THREADS <= 0):
+        return
+    if _pruner_thread is not None and _pruner_pid == os.getpid() and _pruner_thread.is_alive():
+        return
+    _pruner_thread = threading.Thread(target=_prune_periodically, name="checkpoint-pruner", daemon=True)
+    _pruner_pid = os.getpid()
+    _pruner_thread.start()
+
+
+start_pruning()
@@ -0,0 +1,365 @@
+# src/workflows/guards.py
+# Runtime guards around a supervisor workflow run.
+#
+# The recursion limit alone lets a confused supervisor loop through tools and agents for
+# minutes, tying up a server thread. A WorkflowGuard is attached to every run (through
+# the request context and a callback handler in the invoke config) and aborts it when:
+#   - the same tool is called with identical arguments, or the same agent hand-off is
+#     made, more than WORKFLOW_MAX_REPEATED_CALLS times (loop detection);
+#   - the run exceeds WORKFLOW_DEADLINE_SECONDS, or one graph node (supervisor or agent)
+#     keeps running for more than WORKFLOW_NODE_DEADLINE_SECONDS;
+#   - the client cancels it (POST /briefs/<request_id>/cancel).
+#
+# The cancel request may reach any server worker, so running workflows are registered in
+# a table of the checkpoint database (CHECKPOINT_DB_PATH), and a cancel request for a run of
+# another worker is stored there; the guard polls it every WORKFLOW_CANCEL_POLL_SECONDS.
+# Cancellation reaches in-flight work at the next LLM call, tool call or node start
+# (WorkflowAborted is raised there). An LLM request that is already in flight is aborted
+# (src/llm_clients.py), and every LLM request gets a timeout no longer than the time left,
+# so a hanging call cannot outlive the deadline. The checkpoints of an aborted run are kept;
+# the API returns the partial result with the abort status.
+
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+from src.config import (
+    CHECKPOINT_DB_PATH,
+    WORKFLOW_CANCEL_POLL_SECONDS,
+    WORKFLOW_DEADLINE_SECONDS,
+    WORKFLOW_NODE_DEADLINE_SECONDS,
+    WORKFLOW_MAX_REPEATED_CALLS,
+)
+
+logger = logging.getLogger(__name__)
+
+# Abort statuses reported to the client
+STATUS_LOOP_DETECTED = "loop_detected"
+STATUS_DEADLINE_EXCEEDED = "deadline_exceeded"
+STATUS_CANCELLED = "cancelled"
+
+CANCEL_REASON = "Cancelled by the client."
+
+HANDOFF_TOOL_PREFIX = "transfer_to_"
+# Arguments the tool node injects (graph state, tool call id): they differ on every call, so they are not
+# part of a call's signature
+INJECTED_TOOL_ARGUMENTS = ("state", "tool_call_id")
+
+
+class WorkflowAborted(Exception):
+    """Raised inside a guarded run once its guard has tripped."""
+
+    def __init__(self, status: str, reason: str):
+        super().__init__(reason)
+        self.status = status
+        self.reason = reason
+
+
+class WorkflowGuard:
+    """
+    Loop detection, deadlines and cancellation state of one workflow run.
+
+    Args:
+        request_id: Request the run belongs to.
+        deadline_seconds: Maximum duration of the whole run (0 = unlimited).
+        node_deadline_seconds: Maximum time spent continuously in one graph node (0 = unlimited).
+        max_repeated_calls: How often an identical tool call / hand-off may occur (0 = unlimited).
+        cancellations: Shared store polled for cancel requests made in other processes (None = this process only).
+    """
+
+    def __init__(self, request_id: str, deadline_seconds: float = WORKFLOW_DEADLINE_SECONDS,
+                 node_deadline_seconds: float = WORKFLOW_NODE_DEADLINE_SECONDS,
+                 max_repeated_calls: int = WORKFLOW_MAX_REPEATED_CALLS,
+                 cancellations: Optional["SharedCancellations"] = None):
+        self.request_id = request_id
+        self.cancellations = cancellations
+        self.deadline_seconds = deadline_seconds
+        self.node_deadline_seconds = node_deadline_seconds
+        self.max_repeated_calls = max_repeated_calls
+        self.started = time.monotonic()
+        self._next_poll = self.started + WORKFLOW_CANCEL_POLL_SECONDS
+        self.status = None
+        self.reason = None
+        self._lock = threading.Lock()
+        self._cancelled = threading.Event()
+        self._call_counts = Counter()
+        self.node = None
+        self._node_started = self.started
+        self.nodes_visited = []
+        self.tool_calls = []
+
+    # --- Tripping ---
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled.is_set()
+
+    def cancel(self, status: str = STATUS_CANCELLED, reason: str = CANCEL_REASON):
+        """Trips the guard (the first reason wins). In-flight work stops at its next check."""
+        with self._lock:
+            if self._cancelled.is_set():
+                return
+            self.status, self.reason = status, reason
+            self._cancelled.set()
+        logger.warning("Workflow %s aborted after %.1fs: [%s] %s", self.request_id, self.elapsed(), status, reason,
+                       extra={"stage": "guard", "duration_ms": round(self.elapsed() * 1000, 1)})
+
+    def check(self):
+        """Raises WorkflowAborted if the guard has tripped or a deadline has passed."""
+        if not self._cancelled.is_set():
+            now = time.monotonic()
+            if self.deadline_seconds and now - self.started > self.deadline_seconds:
+                self.cancel(STATUS_DEADLINE_EXCEEDED, f"The request exceeded its deadline of {self.deadline_seconds:.0f}s.")
+            elif self.node_deadline_seconds and self.node and now - self._node_started > self.node_deadline_seconds:
+                self.cancel(STATUS_DEADLINE_EXCEEDED,
+                            f"Node '{self.node}' exceeded its deadline of {self.node_deadline_seconds:.0f}s.")
+            elif self.cancellations is not None and now >= self._next_poll:
+                self._next_poll = now + WORKFLOW_CANCEL_POLL_SECONDS
+                reason = self.cancellations.requested(self.request_id)
+                if reason is not None:
+                    self.cancel(STATUS_CANCELLED, reason)
+        if self._cancelled.is_set():
+            raise WorkflowAborted(self.status, self.reason)
+
+    # --- Observations ---
+    def elapsed(self) -> float:
+        return time.monotonic() - self.started
+
+    def remaining_seconds(self) -> Optional[float]:
+        """Time until the nearest deadline (None if no deadline applies)."""
+        now = time.monotonic()
+        limits = []
+        if self.deadline_seconds:
+            limits.append(self.started + self.deadline_seconds - now)
+        if self.node_deadline_seconds and self.node:
+            limits.append(self._node_started + self.node_deadline_seconds - now)
+        return max(0.0, min(limits)) if limits else None
+
+    def enter_node(self, node: str):
+        """Marks the top-level graph node currently running (its deadline restarts when the node changes)."""
+        with self._lock:
+            if node != self.node:
+                self.node = node
+                self._node_started = time.monotonic()
+                self.nodes_visited.append(node)
+
+    def record_tool_call(self, name: str, arguments):
+        """Counts a tool call / hand-off; trips the guard when the identical call repeats too often."""
+        signature = (name, self._call_arguments(name, arguments))
+        with self._lock:
+            self._call_counts[signature] += 1
+            count = self._call_counts[signature]
+            self.tool_calls.append(name)
+        if self.max_repeated_calls and count > self.max_repeated_calls:
+            kind = "hand-off" if name.startswith(HANDOFF_TOOL_PREFIX) else "tool call"
+            self.cancel(STATUS_LOOP_DETECTED,
+                        f"Identical {kind} '{name}' repeated {count} times (limit {self.max_repeated_calls}).")
+
+    @staticmethod
+    def _call_arguments(name: str, arguments) -> str:
+        """Canonical arguments of a call, without injected ones. A hand-off is identified by its destination alone."""
+        if name.startswith(HANDOFF_TOOL_PREFIX):
+            return ""
+        if isinstance(arguments, dict):
+            arguments = {key: value for key, value in arguments.items() if key not in INJECTED_TOOL_ARGUMENTS}
+        try:
+            return json.dumps(arguments, sort_keys=True, default=str)
+        except (TypeError, ValueError):
+            return str(arguments)
+
+    def report(self) -> dict:
+        """Progress of the run for partial results and logs."""
+        with self._lock:
+            return {
+                "status": self.status,
+                "reason": self.reason,
+                "elapsed_seconds": round(self.elapsed(), 2),
+                "nodes_visited": list(self.nodes_visited),
+                "tool_calls": list(self.tool_calls),
+            }
+
+
+class WorkflowGuardCallbackHandler(BaseCallbackHandler):
+    """Feeds graph node starts and tool calls of a run to its guard and aborts the run once it trips."""
+
+    raise_error = True  # Let WorkflowAborted propagate out of the graph
+
+    def __init__(self, guard: WorkflowGuard):
+        self.guard = guard
+
+    def on_chain_start(self, serialized, inputs, *, metadata=None, **kwargs):
+        namespace = (metadata or {}).get("langgraph_checkpoint_ns") or ""
+        if namespace:
+            # e.g. "summarizer_agent:<task id>|agent:<task id>" -> "summarizer_agent"
+            self.guard.enter_node(namespace.split("|")[0].split(":")[0])
+        self.guard.check()
+
+    def on_tool_start(self, serialized, input_str, *, inputs=None, **kwargs):
+        name = (serialized or {}).get("name") or kwargs.get("name") or "unknown_tool"
+        self.guard.record_tool_call(name, inputs if inputs is not None else input_str)
+        self.guard.check()
+
+
+class SharedCancellations:
+    """
+    Running workflows and cancel requests of all server processes, in two tables of an SQLite database.
+    Every call opens its own short-lived connection, so the store is safe across threads and fork().
+
+    Args:
+        path: SQLite database file (the checkpoint database).
+        max_run_seconds: Runs registered longer ago than this are treated as gone (e.g. their worker was killed).
+    """
+
+    def __init__(self, path: str, max_run_seconds: float = 0):
+        self.path = path
+        self.max_run_seconds = max_run_seconds
+        self._ready = False
+
+    def _connect(self) -> sqlite3.Connection:
+        connection = sqlite3.connect(self.path, timeout=10)
+        if not self._ready:
+            with connection:
+                connection.execute("CREATE TABLE IF NOT EXISTS workflow_runs ("
+                                   "request_id TEXT PRIMARY KEY, pid INTEGER, started_at REAL)")
+                connection.execute("CREATE TABLE IF NOT EXISTS workflow_cancellations ("
+                                   "request_id TEXT PRIMARY KEY, reason TEXT, requested_at REAL)")
+            self._ready = True
+        return connection
+
+    def _cutoff(self) -> float:
+        # Runs cannot outlive the workflow deadline; keep a margin for runs without one
+        return time.time() - (self.max_run_seconds * 2 if self.max_run_seconds else 24 * 3600)
+
+    def register(self, request_id: str):
+        """Records a run starting in this process (clearing cancel requests of earlier runs of the request)."""
+        connection = self._connect()
+        try:
+            with connection:
+                connection.execute("DELETE FROM workflow_runs WHERE started_at < ?", (self._cutoff(),))
+                connection.execute("DELETE FROM workflow_cancellations WHERE requested_at < ?", (self._cutoff(),))
+                connection.execute("DELETE FROM workflow_cancellations WHERE request_id = ?", (request_id,))
+                connection.execute("INSERT OR REPLACE INTO workflow_runs VALUES (?, ?, ?)",
+                                   (request_id, os.getpid(), time.time()))
+        finally:
+            connection.close()
+
+    def unregister(self, request_id: str):
+        connection = self._connect()
+        try:
+            with connection:
+                connection.execute("DELETE FROM workflow_runs WHERE request_id = ? AND pid = ?", (request_id, os.getpid()))
+                connection.execute("DELETE FROM workflow_cancellations WHERE request_id = ?", (request_id,))
+        finally:
+            connection.close()
+
+    def running(self, request_id: str) -> bool:
+        """True if a run of the request is registered by any process."""
+        connection = self._connect()
+        try:
+            return connection.execute("SELECT 1 FROM workflow_runs WHERE request_id = ? AND started_at >= ?",
+                                      (request_id, self._cutoff())).fetchone() is not None
+        finally:
+            connection.close()
+
+    def request_cancel(self, request_id: str, reason: str) -> bool:
+        """Stores a cancel request for a run of any process. Returns False if no such run is registered."""
+        connection = self._connect()
+        try:
+            with connection:
+                running = connection.execute("SELECT 1 FROM workflow_runs WHERE request_id = ? AND started_at >= ?",
+                                             (request_id, self._cutoff())).fetchone()
+                if running is None:
+                    return False
+                connection.execute("INSERT OR REPLACE INTO workflow_cancellations VALUES (?, ?, ?)",
+                                   (request_id, reason, time.time()))
+            return True
+        finally:
+            connection.close()
+
+    def requested(self, request_id: str) -> Optional[str]:
+        """Reason of a pending cancel request for the run of a request (None if there is none)."""
+        try:
+            connection = self._connect()
+            try:
+                row = connection.execute("SELECT reason FROM workflow_cancellations WHERE request_id = ?",
+                                         (request_id,)).fetchone()
+            finally:
+                connection.close()
+        except sqlite3.Error as e:
+            logger.warning("Could not read cancel requests from %s: %s", self.path, e)
+            return None
+        return row[0] if row else None
+
+
+shared_cancellations = SharedCancellations(CHECKPOINT_DB_PATH, WORKFLOW_DEADLINE_SECONDS)
+
+# --- Active runs (for cancellation by request id) ---
+_active_guards: Dict[str, WorkflowGuard] = {}
+_active_guards_lock = threading.Lock()
+
+
+@contextmanager
+def guarded_run(request_id: str):
+    """Registers the guard of a run for the duration of the 'with' block. Yields (guard, callback handler)."""
+    cancellations = shared_cancellations
+    try:
+        cancellations.register(request_id)
+    except sqlite3.Error as e:
+        logger.warning("Could not register workflow %s in %s, it can only be cancelled through this process: %s",
+                       request_id, cancellations.path, e)
+        cancellations = None
+    guard = WorkflowGuard(request_id, cancellations=cancellations)
+    with _active_guards_lock:
+        _active_guards[request_id] = guard
+    try:
+        yield guard, WorkflowGuardCallbackHandler(guard)
+    finally:
+        with _active_guards_lock:
+            if _active_guards.get(request_id) is guard:
+                del _active_guards[request_id]
+        if cancellations is not None:
+            try:
+                cancellations.unregister(request_id)
+            except sqlite3.Error as e:
+                logger.warning("Could not unregister workflow %s: %s", request_id, e)
+
+
+def is_running(request_id: str) -> bool:
+    """True if a workflow of the request is executing in this or another server process."""
+    with _active_guards_lock:
+        if request_id in _active_guards:
+            return True
+    try:
+        return shared_cancellations.running(request_id)
+    except sqlite3.Error as e:
+        logger.warning("Could not look up running workflow %s in %s: %s", request_id, shared_cancellations.path, e)
+        return False
+
+
+def cancel_run(request_id: str) -> bool:
+    """Cancels the running workflow of a request in any server process. Returns False if no such run is active."""
+    with _active_guards_lock:
+        guard = _active_guards.get(request_id)
+    if guard is not None:
+        guard.cancel()
+        return True
+    try:
+        # Running in another worker: its guard picks the request up at its next check
+        return shared_cancellations.request_cancel(request_id, CANCEL_REASON)
+    except sqlite3.Error as e:
+        logger.exception("ERROR storing the cancel request of workflow %s: %s", request_id, e)
+        return False
+
+
+def active_runs() -> Dict[str, dict]:
+    """Request id -> progress report of the runs currently executing in this process."""
+    with _active_guards_lock:
+        guards = dict(_active_guards)
+    return {request_id: guard.report() for request_id, guard in guards.items()}
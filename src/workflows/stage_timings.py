@@ -0,0 +1,98 @@
+# src/workflows/stage_timings.py
+# Per-stage timing of a workflow run (for the API response and the load test).
+#
+# A StageTimer is passed to the graph as a callback handler next to the workflow guard.
+# It records how long each top-level graph node (the supervisor and the agents) ran and
+# how long each tool took. Together with the LLM seconds per agent from the token profile
+# this gives the breakdown of a request's latency returned as 'stage_timings'
+# (see benchmarks/loadtest.py).
+
+import threading
+import time
+from collections import defaultdict
+from typing import Dict
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+
+class StageTimer(BaseCallbackHandler):
+    """Collects node and tool durations of one workflow run from LangGraph callbacks."""
+
+    def __init__(self):
+        self.started = time.monotonic()
+        self._lock = threading.Lock()
+        self._run_tasks: Dict[str, str] = {}                       # chain run id -> node task ("supervisor:<task id>")
+        self._task_spans: Dict[str, list] = {}                     # node task -> [first start, last end]
+        self._tool_starts: Dict[str, tuple] = {}                   # tool run id -> (tool name, start)
+        self._tools = defaultdict(lambda: {"calls": 0, "seconds": 0.0})
+
+    # --- Graph nodes ---
+    def on_chain_start(self, serialized, inputs, *, run_id=None, metadata=None, **kwargs):
+        namespace = (metadata or {}).get("langgraph_checkpoint_ns") or ""
+        if not namespace or run_id is None:
+            return
+        # e.g. "summarizer_agent:<task id>|agent:<task id>" -> "summarizer_agent:<task id>"
+        task = namespace.split("|")[0]
+        now = time.monotonic()
+        with self._lock:
+            self._run_tasks[str(run_id)] = task
+            span = self._task_spans.setdefault(task, [now, now])
+            span[0] = min(span[0], now)
+
+    def on_chain_end(self, outputs, *, run_id=None, **kwargs):
+        self._end_chain(run_id)
+
+    def on_chain_error(self, error, *, run_id=None, **kwargs):
+        self._end_chain(run_id)
+
+    def _end_chain(self, run_id):
+        now = time.monotonic()
+        with self._lock:
+            task = self._run_tasks.pop(str(run_id), None)
+            if task is not None:
+                span = self._task_spans[task]
+                span[1] = max(span[1], now)
+
+    # --- Tools ---
+    def on_tool_start(self, serialized, input_str, *, run_id=None, **kwargs):
+        name = (serialized or {}).get("name") or kwargs.get("name") or "unknown_tool"
+        with self._lock:
+            self._tool_starts[str(run_id)] = (name, time.monotonic())
+
+    def on_tool_end(self, output, *, run_id=None, **kwargs):
+        self._end_tool(run_id)
+
+    def on_tool_error(self, error, *, run_id=None, **kwargs):
+        self._end_tool(run_id)
+
+    def _end_tool(self, run_id):
+        now = time.monotonic()
+        with self._lock:
+            started = self._tool_starts.pop(str(run_id), None)
+            if started is not None:
+                name, start = started
+                self._tools[name]["calls"] += 1
+                self._tools[name]["seconds"] += now - start
+
+    # --- Report ---
+    def report(self, token_profile=None) -> dict:
+        """Seconds per node, per tool and (from the token profile, if given) LLM seconds per agent."""
+        with self._lock:
+            nodes = defaultdict(lambda: {"runs": 0, "seconds": 0.0})
+            for task, (start, end) in self._task_spans.items():
+                node = nodes[task.split(":")[0]]
+                node["runs"] += 1
+                node["seconds"] += end - start
+            tools = {name: {"calls": t["calls"], "seconds": round(t["seconds"], 3)} for name, t in self._tools.items()}
+        llm = defaultdict(lambda: {"calls": 0, "seconds": 0.0})
+        if token_profile is not None:
+            for call in token_profile.calls_as_dicts():
+                if not call["skipped"]:
+                    llm[call["agent"]]["calls"] += 1
+                    llm[call["agent"]]["seconds"] += call["seconds"]
+        return {
+            "total_seconds": round(time.monotonic() - self.started, 3),
+            "nodes": {name: {"runs": n["runs"], "seconds": round(n["seconds"], 3)} for name, n in nodes.items()},
+            "tools": tools,
+            "llm": {agent: {"calls": c["calls"], "seconds": round(c["seconds"], 3)} for agent, c in llm.items()},
+        }
@@ -0,0 +1,66 @@
+# tests/test_guards.py
+# Loop detection of the workflow guard for calls made through LangGraph's tool node, which
+# injects the graph state and tool call id into the inputs of hand-off and state-aware tools.
+
+import itertools
+
+import pytest
+from langchain_core.messages import AIMessage, HumanMessage
+from langgraph.graph import END, START, StateGraph
+from langgraph.prebuilt import ToolNode
+
+from src.brief_state import BriefState, handoff_tool
+from src.workflows.guards import (
+    STATUS_LOOP_DETECTED,
+    WorkflowAborted,
+    WorkflowGuard,
+    WorkflowGuardCallbackHandler,
+)
+
+
+def _handoff_loop_graph():
+    """A supervisor that hands off to the same agent on every turn, the agent answering each time."""
+    call_ids = itertools.count()
+
+    def decide(state):
+        call = {"name": "transfer_to_summarizer_agent", "args": {}, "id": f"call_{next(call_ids)}", "type": "tool_call"}
+        return {"messages": [AIMessage(content="", tool_calls=[call])]}
+
+    supervisor = StateGraph(BriefState)
+    supervisor.add_node("decide", decide)
+    supervisor.add_node("tools", ToolNode([handoff_tool("summarizer_agent")]))
+    supervisor.add_edge(START, "decide")
+    supervisor.add_edge("decide", "tools")
+    supervisor.add_edge("tools", END)
+
+    graph = StateGraph(BriefState)
+    graph.add_node("supervisor", supervisor.compile(), destinations=("summarizer_agent",))
+    graph.add_node("summarizer_agent", lambda state: {"messages": [AIMessage(content="Summary.")]})
+    graph.add_edge(START, "supervisor")
+    graph.add_edge("summarizer_agent", "supervisor")
+    return graph.compile()
+
+
+def test_repeated_handoffs_trip_the_guard():
+    guard = WorkflowGuard("loop-test", deadline_seconds=0, node_deadline_seconds=0, max_repeated_calls=2)
+    handler = WorkflowGuardCallbackHandler(guard)
+
+    # The history (part of the injected state) grows between the identical hand-offs. The tool node reports
+    # the aborted hand-off as a tool error; a real supervisor then stops at its next LLM call (guard.check)
+    _handoff_loop_graph().invoke({"messages": [HumanMessage(content="Create a brief")]},
+                                 config={"callbacks": [handler], "recursion_limit": 50})
+
+    assert guard.status == STATUS_LOOP_DETECTED
+    assert guard.tool_calls == ["transfer_to_summarizer_agent"] * 3
+    with pytest.raises(WorkflowAborted) as aborted:
+        guard.check()
+    assert aborted.value.status == STATUS_LOOP_DETECTED
+
+
+def test_injected_arguments_are_not_part_of_the_signature():
+    guard = WorkflowGuard("loop-test", deadline_seconds=0, node_deadline_seconds=0, max_repeated_calls=1)
+    guard.record_tool_call("retrieve_relevant_campaign_data", {"query": "logo", "tool_call_id": "call_1"})
+    guard.record_tool_call("retrieve_relevant_campaign_data", {"query": "campaign", "tool_call_id": "call_2"})
+    assert not guard.cancelled
+    guard.record_tool_call("retrieve_relevant_campaign_data", {"query": "logo", "tool_call_id": "call_3"})
+    assert guard.status == STATUS_LOOP_DETECTED